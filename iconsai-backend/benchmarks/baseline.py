@@ -0,0 +1,68 @@
+"""
+Baseline files for benchmark regression checks.
+
+A baseline is a JSON object mapping a case name (endpoint, function,
+corpus size...) to its metrics. find_regressions() compares a new run
+against it with a relative tolerance.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List
+
+Results = Dict[str, Dict[str, float]]
+
+
+def load_baseline(path: str) -> Results:
+    """Read a baseline file written by save_baseline()."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def save_baseline(path: str, results: Results, **meta):
+    """
+    Write results as a baseline.
+
+    Args:
+        path: Output file
+        results: Metrics per case
+        **meta: Extra context stored alongside (python version, options...)
+    """
+    Path(path).write_text(
+        json.dumps({"meta": meta, "results": results}, indent=2, sort_keys=True) + "\n",
+        encoding="utf-8",
+    )
+
+
+def find_regressions(
+    baseline: Results,
+    current: Results,
+    metric: str,
+    tolerance: float,
+    higher_is_better: bool = False,
+) -> List[str]:
+    """
+    Compare one metric across all cases present in both runs.
+
+    Args:
+        baseline: Stored results
+        current: New results
+        metric: Metric name (e.g. "p95_ms", "ops_per_sec")
+        tolerance: Allowed relative change (0.2 = 20% worse)
+        higher_is_better: True for throughput-style metrics
+
+    Returns:
+        One message per regressed case (empty when all are within tolerance)
+    """
+    regressions = []
+    for case, values in sorted(current.items()):
+        old = baseline.get(case, {}).get(metric)
+        new = values.get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        if higher_is_better:
+            change = -change
+        if change > tolerance:
+            regressions.append(f"{case}: {metric} {old:.4g} -> {new:.4g} ({change:+.0%} worse)")
+    return regressions
@@ -0,0 +1,180 @@
+"""
+Size/latency benchmark for compressing uploads before Whisper.
+
+Encodes recordings of increasing length to 16 kHz mono Opus and FLAC
+with the same ffmpeg path as AUDIO_COMPRESS, measures encode time and
+output size, and models the upload time over a range of uplink speeds
+(plus a fixed RTT) to find the break-even input size: below it sending
+the original is faster, above it compressing first wins. The suggested
+AUDIO_COMPRESS_MIN_KB is the break-even for the slowest uplink given.
+
+Inputs are synthetic 48 kHz stereo PCM WAV (browser-like) by default,
+or the files in --fixtures (any format ffmpeg reads).
+
+Usage:
+    python -m benchmarks.bench_audio_compress
+    python -m benchmarks.bench_audio_compress --uplink-mbps 1,5,20 --rtt-ms 120
+    python -m benchmarks.bench_audio_compress --fixtures caminho/para/gravacoes --codecs opus
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import shutil
+import statistics
+import sys
+import time
+import wave
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.utils.audio_probe import convert_audio, plan_for_whisper, probe_header
+
+DURATIONS = (2, 5, 15, 30, 60, 120)
+
+
+def make_speech_like_wav(seconds: float, sample_rate: int = 48000, seed: int = 0) -> bytes:
+    """Stereo 16-bit WAV with voiced segments (harmonics with pitch drift) and pauses."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = (np.sin(2 * np.pi * 2.5 * t) > -0.3).astype(float)  # syllables and gaps
+    signal = 0.25 * voice * envelope + 0.01 * rng.standard_normal(len(t))
+    pcm = (np.clip(signal, -1, 1) * 32767).astype("<i2")
+    stereo = np.repeat(pcm[:, None], 2, axis=1)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(stereo.tobytes())
+    return buffer.getvalue()
+
+
+async def encode(data: bytes, codec: str, repeat: int) -> Optional[Dict[str, float]]:
+    """Median encode time (ms) and output size of data compressed to codec."""
+    probe = probe_header(io.BytesIO(data))
+    plan = plan_for_whisper(probe, compress=codec)
+    if plan.action != "compress":
+        return None
+
+    times, size = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = await convert_audio(io.BytesIO(data), plan)
+        times.append((time.perf_counter() - start) * 1000)
+        size = output.seek(0, 2)
+        output.close()
+    return {"encode_ms": statistics.median(times), "out_bytes": size}
+
+
+def upload_ms(size: int, mbps: float, rtt_ms: float) -> float:
+    """Modeled upload time: one RTT plus transfer at the uplink speed."""
+    return rtt_ms + size * 8 / (mbps * 1e6) * 1000
+
+
+def break_even_bytes(rows: List[Dict], mbps: float) -> Optional[float]:
+    """
+    Input size where encode time equals the upload time saved.
+
+    Fits encode_ms = a + b * in_bytes and saved_ms = c * in_bytes
+    (c from the mean compression ratio) over the measured rows.
+
+    Returns:
+        Size in bytes, 0 if compressing always wins, None if it never does
+    """
+    sizes = np.array([r["in_bytes"] for r in rows], dtype=float)
+    encode_ms = np.array([r["encode_ms"] for r in rows])
+    b, a = np.polyfit(sizes, encode_ms, 1) if len(rows) > 1 else (0.0, encode_ms[0])
+    ratio = float(np.mean([r["out_bytes"] / r["in_bytes"] for r in rows]))
+    saved_per_byte = (1 - ratio) * 8 / (mbps * 1e6) * 1000
+    if saved_per_byte <= b:
+        return None
+    return max(0.0, a / (saved_per_byte - b))
+
+
+def print_table_row(cells, widths):
+    print("  ".join(f"{cell:<{w}}" if i == 0 else f"{cell:>{w}}" for i, (cell, w) in enumerate(zip(cells, widths))))
+
+
+def load_inputs(fixtures: Optional[Path]) -> Dict[str, bytes]:
+    if fixtures is None:
+        return {f"wav48k-stereo/{s}s": make_speech_like_wav(s) for s in DURATIONS}
+    return {path.name: path.read_bytes() for path in sorted(fixtures.iterdir()) if path.is_file()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compressing uploads before Whisper.")
+    parser.add_argument("--fixtures", type=Path, help="Directory with recordings (default: synthetic WAV)")
+    parser.add_argument("--codecs", default="opus,flac", help="Compression codecs")
+    parser.add_argument("--uplink-mbps", default="1,5,20,100", help="Uplink speeds to model")
+    parser.add_argument("--rtt-ms", type=float, default=80.0, help="Round trip added to every upload")
+    parser.add_argument("--repeat", type=int, default=3, help="Encodes per input (median)")
+    parser.add_argument("--json-out", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    if not shutil.which("ffmpeg"):
+        sys.exit("ffmpeg not installed. Install it with your system package manager")
+
+    codecs = [c.strip() for c in args.codecs.split(",") if c.strip()]
+    uplinks = [float(m) for m in args.uplink_mbps.split(",")]
+    inputs = load_inputs(args.fixtures)
+
+    results: Dict[str, List[Dict]] = {}
+    widths = (24, 6, 9, 9, 7, 9)
+    for codec in codecs:
+        print(f"\n{codec}")
+        print_table_row(("input", "codec", "in KB", "out KB", "ratio", "encode ms"), widths)
+        rows = []
+        for name, data in inputs.items():
+            try:
+                measured = asyncio.run(encode(data, codec, args.repeat))
+            except RuntimeError as e:
+                print(f"  {name}: {e}")
+                continue
+            if measured is None:
+                print(f"  {name}: already compact, not compressed")
+                continue
+            row = {"input": name, "in_bytes": len(data), **measured}
+            rows.append(row)
+            print_table_row((
+                name, codec, f"{len(data) / 1024:.0f}", f"{row['out_bytes'] / 1024:.0f}",
+                f"{row['out_bytes'] / len(data):.3f}", f"{row['encode_ms']:.1f}",
+            ), widths)
+        results[codec] = rows
+        if not rows:
+            continue
+
+        print()
+        print_table_row(("uplink", "input", "raw ms", "comp ms", "gain ms"), (10, 24, 9, 9, 9))
+        for mbps in uplinks:
+            for row in rows:
+                raw = upload_ms(row["in_bytes"], mbps, args.rtt_ms)
+                compressed = row["encode_ms"] + upload_ms(row["out_bytes"], mbps, args.rtt_ms)
+                print_table_row((
+                    f"{mbps:g} Mbps", row["input"], f"{raw:.0f}", f"{compressed:.0f}", f"{raw - compressed:+.0f}",
+                ), (10, 24, 9, 9, 9))
+
+        print()
+        for mbps in uplinks:
+            point = break_even_bytes(rows, mbps)
+            verdict = "never pays off" if point is None else f"break-even at {point / 1024:.0f} KB"
+            print(f"  {codec} @ {mbps:g} Mbps: {verdict}")
+        slowest = break_even_bytes(rows, min(uplinks))
+        if slowest is not None:
+            print(f"  suggested AUDIO_COMPRESS={codec} AUDIO_COMPRESS_MIN_KB={int(slowest / 1024) + 1}")
+
+    if args.json_out:
+        args.json_out.write_text(json.dumps(
+            {"rtt_ms": args.rtt_ms, "uplink_mbps": uplinks, "results": results}, indent=2
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark: vectorized chars_to_words vs the per-character loop.
+
+Builds ElevenLabs-style alignments (three parallel arrays) from PT-BR
+text of increasing length, checks both implementations agree, and
+prints time per call.
+
+Usage:
+    python -m benchmarks.bench_chars_to_words
+"""
+
+import timeit
+
+from src.services.timestamp_utils import _chars_to_words_loop, chars_to_words
+
+SAMPLE_TEXT = (
+    "O Banco Central manteve a taxa Selic em dez vírgula cinco por cento, "
+    "sinalizando cautela diante da inflação. Segundo o IBGE, o IPCA acumulado "
+    "em doze meses ficou acima da meta! O que isso significa para o crédito? "
+    "Analistas esperam cortes graduais; o dólar recuou frente ao real.\n"
+)
+
+SIZES = [100, 500, 1000, 2500, 5000]
+
+
+def make_alignment(length: int) -> tuple[list, list, list]:
+    """Build characters/starts/ends arrays like the ElevenLabs response."""
+    text = (SAMPLE_TEXT * (length // len(SAMPLE_TEXT) + 1))[:length]
+    characters = list(text)
+    starts = [i * 0.055 for i in range(length)]
+    ends = [s + 0.05 for s in starts]
+    return characters, starts, ends
+
+
+def bench(func, args, number: int) -> float:
+    """Best-of-5 time per call in microseconds."""
+    return min(timeit.repeat(lambda: func("", *args), number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    print(f"{'chars':>6} {'words':>6} {'loop us':>10} {'vector us':>10} {'speedup':>8}")
+
+    for size in SIZES:
+        args = make_alignment(size)
+
+        expected = _chars_to_words_loop("", *args)
+        actual = chars_to_words("", *args)
+        assert expected.words == actual.words
+        assert (expected.starts == actual.starts).all()
+        assert (expected.ends == actual.ends).all()
+
+        number = max(20, 20000 // size)
+        loop_us = bench(_chars_to_words_loop, args, number)
+        vector_us = bench(chars_to_words, args, number)
+
+        print(
+            f"{size:>6} {len(actual):>6} {loop_us:>10.1f} "
+            f"{vector_us:>10.1f} {loop_us / vector_us:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+"""
+Benchmark: realtime STT over the WebSocket with recorded PT-BR fixtures.
+
+Fixtures are files in a directory: <name>.wav (16-bit mono PCM) or
+<name>.webm, each with a <name>.txt reference transcript. WebM files are
+cut into standalone WebM/Opus chunks (like a MediaRecorder restarted per
+timeslice; needs ffmpeg); WAV files are streamed as raw PCM.
+
+For each model size / compute type the app is started in its own process
+(REALTIME_STT_MODEL_SIZE / REALTIME_STT_COMPUTE_TYPE) and warmed up, then
+N concurrent clients stream every fixture at real-time pace. Reported:
+
+- time to first partial: first event with text, from the first chunk sent
+- final latency: from the last chunk sent to the "end" event
+- RTF: offline transcription time / audio duration (in this process)
+- server CPU seconds per audio second and peak RSS (Linux /proc)
+- WER of the streamed and offline transcripts against the references
+
+Usage:
+    python -m benchmarks.bench_realtime_stt --fixtures path/to/fixtures
+    python -m benchmarks.bench_realtime_stt --fixtures f/ --models tiny,base,small --compute-types int8,float32 --clients 4
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.core.metrics import LogLinearHistogram
+
+from .load_test import BACKEND_DIR, free_port, stop_servers, wait_ready
+
+# Statuses that carry transcribed text
+TEXT_STATUSES = {"partial", "final"}
+
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+@dataclass
+class Fixture:
+    """One recording split into real-time chunks."""
+    name: str
+    reference: str
+    audio_format: str  # "pcm" or "webm" (as sent in the config message)
+    sample_rate: int
+    duration: float
+    chunks: List[bytes]
+    pcm: bytes  # Whole recording as 16-bit mono PCM at sample_rate (offline pass)
+
+
+def _load_wav(path: Path, chunk_ms: int) -> Tuple[str, int, float, List[bytes], bytes]:
+    with wave.open(str(path), "rb") as w:
+        if w.getnchannels() != 1 or w.getsampwidth() != 2:
+            raise ValueError(f"{path.name}: expected 16-bit mono WAV")
+        sample_rate = w.getframerate()
+        pcm = w.readframes(w.getnframes())
+    step = sample_rate * 2 * chunk_ms // 1000
+    chunks = [pcm[i:i + step] for i in range(0, len(pcm), step)]
+    return "pcm", sample_rate, len(pcm) / (sample_rate * 2), chunks, pcm
+
+
+def _load_webm(path: Path, chunk_ms: int) -> Tuple[str, int, float, List[bytes], bytes]:
+    try:
+        from pydub import AudioSegment
+    except ImportError as e:
+        raise RuntimeError("pydub not installed. Run: pip install pydub") from e
+
+    audio = AudioSegment.from_file(str(path), format="webm")
+    chunks = []
+    for start in range(0, len(audio), chunk_ms):
+        buffer = io.BytesIO()
+        audio[start:start + chunk_ms].export(buffer, format="webm", codec="libopus")
+        chunks.append(buffer.getvalue())
+    pcm = audio.set_channels(1).set_sample_width(2).set_frame_rate(16000).raw_data
+    return "webm", 16000, len(audio) / 1000, chunks, pcm
+
+
+def load_fixtures(directory: Path, chunk_ms: int) -> List[Fixture]:
+    """
+    Load <name>.wav / <name>.webm recordings with <name>.txt references.
+
+    Raises:
+        ValueError: If the directory has no usable fixture
+    """
+    fixtures = []
+    for path in sorted(directory.iterdir()):
+        loader = {".wav": _load_wav, ".webm": _load_webm}.get(path.suffix.lower())
+        reference = path.with_suffix(".txt")
+        if loader is None or not reference.exists():
+            continue
+        audio_format, sample_rate, duration, chunks, pcm = loader(path, chunk_ms)
+        fixtures.append(Fixture(
+            name=path.stem,
+            reference=reference.read_text(encoding="utf-8").strip(),
+            audio_format=audio_format,
+            sample_rate=sample_rate,
+            duration=duration,
+            chunks=chunks,
+            pcm=pcm,
+        ))
+    if not fixtures:
+        raise ValueError(f"No fixtures in {directory} (expected name.wav or name.webm plus name.txt)")
+    return fixtures
+
+
+# =============================================================================
+# WER
+# =============================================================================
+
+def normalize_words(text: str) -> List[str]:
+    """Lowercase words without punctuation (accents are kept)."""
+    return _NON_WORD.sub(" ", text.lower()).split()
+
+
+def word_errors(reference: str, hypothesis: str) -> Tuple[int, int]:
+    """
+    Word-level edit distance.
+
+    Returns:
+        Tuple of (substitutions + deletions + insertions, reference words)
+    """
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1], len(ref)
+
+
+# =============================================================================
+# Streaming clients
+# =============================================================================
+
+@dataclass
+class SessionResult:
+    """Timings and transcript of one streamed fixture."""
+    fixture: str
+    first_partial: Optional[float] = None
+    final_latency: Optional[float] = None
+    transcript: str = ""
+    error: Optional[str] = None
+
+
+async def stream_fixture(url: str, fixture: Fixture, chunk_ms: int) -> SessionResult:
+    """Stream one fixture at real-time pace and collect server events."""
+    import websockets
+
+    result = SessionResult(fixture=fixture.name)
+    texts: List[str] = []
+    started = last_sent = None
+
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.recv()  # listening
+        await ws.send(json.dumps({
+            "type": "config",
+            "language": "pt",
+            "sampleRate": fixture.sample_rate,
+            "format": fixture.audio_format,
+        }))
+        await ws.recv()  # configured
+
+        async def receive():
+            async for raw in ws:
+                event = json.loads(raw)
+                status = event.get("status")
+                if status in TEXT_STATUSES and event.get("text"):
+                    if result.first_partial is None:
+                        result.first_partial = time.perf_counter() - started
+                    texts.append(event["text"])
+                elif status == "error":
+                    result.error = event.get("error")
+                elif status == "end":
+                    if last_sent is not None and result.error is None:
+                        result.final_latency = time.perf_counter() - last_sent
+                    return
+
+        started = time.perf_counter()
+        receiver = asyncio.create_task(receive())
+        try:
+            for i, chunk in enumerate(fixture.chunks):
+                await asyncio.sleep(max(0.0, started + i * chunk_ms / 1000 - time.perf_counter()))
+                await ws.send(chunk)
+            last_sent = time.perf_counter()
+            await ws.send(json.dumps({"type": "end"}))
+        except websockets.ConnectionClosed as e:
+            # Server closed early; keep its error event if it sent one
+            result.error = result.error or str(e)
+        try:
+            await receiver
+        except websockets.ConnectionClosed as e:
+            result.error = result.error or str(e)
+
+    result.transcript = " ".join(texts)
+    return result
+
+
+async def run_clients(url: str, fixtures: List[Fixture], clients: int, chunk_ms: int) -> List[SessionResult]:
+    """Each client streams every fixture once, starting at a different one."""
+
+    async def client(offset: int) -> List[SessionResult]:
+        results = []
+        for i in range(len(fixtures)):
+            fixture = fixtures[(offset + i) % len(fixtures)]
+            try:
+                results.append(await stream_fixture(url, fixture, chunk_ms))
+            except Exception as e:
+                results.append(SessionResult(fixture=fixture.name, error=str(e)))
+        return results
+
+    per_client = await asyncio.gather(*(client(i) for i in range(clients)))
+    return [r for results in per_client for r in results]
+
+
+# =============================================================================
+# Server process
+# =============================================================================
+
+class ProcessSampler:
+    """CPU time and peak RSS of a process, read from /proc (Linux only)."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.peak_rss = 0
+        self._ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def cpu_seconds(self) -> Optional[float]:
+        try:
+            fields = Path(f"/proc/{self.pid}/stat").read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            return None
+        # utime and stime are fields 14 and 15 (1-based, counting pid and comm)
+        return (int(fields[11]) + int(fields[12])) / self._ticks
+
+    def sample_rss(self):
+        try:
+            for line in Path(f"/proc/{self.pid}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    self.peak_rss = max(self.peak_rss, int(line.split()[1]) * 1024)
+                    return
+        except OSError:
+            pass
+
+    async def watch(self, interval: float = 0.25):
+        """Sample RSS until cancelled."""
+        while True:
+            self.sample_rss()
+            await asyncio.sleep(interval)
+
+
+def start_app(model: str, compute_type: str, device: str, verbose: bool) -> Tuple[str, subprocess.Popen]:
+    """Start the app with the given realtime STT model; returns (ws URL, process)."""
+    port = free_port()
+    output = None if verbose else subprocess.DEVNULL
+    env = {
+        **os.environ,
+        "REALTIME_STT_MODEL_SIZE": model,
+        "REALTIME_STT_COMPUTE_TYPE": compute_type,
+        "REALTIME_STT_DEVICE": device,
+        "TRACING_EXPORTER": "none",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=output, stderr=output,
+    )
+    try:
+        wait_ready(f"http://127.0.0.1:{port}", process)
+    except Exception:
+        stop_servers([process])
+        raise
+    return f"ws://127.0.0.1:{port}/functions/v1/realtime-stt", process
+
+
+# =============================================================================
+# Runs
+# =============================================================================
+
+async def offline_pass(fixtures: List[Fixture], model: str, compute_type: str, device: str) -> Dict[str, float]:
+    """Transcribe each fixture whole in-process: RTF and offline WER."""
+    from src.services.realtime_stt import RealtimeSTTService
+
+    service = RealtimeSTTService(model_size=model, device=device, compute_type=compute_type)
+    await service.initialize()
+    elapsed = audio = 0.0
+    errors = words = 0
+    try:
+        for fixture in fixtures:
+            start = time.perf_counter()
+            event = await service.transcribe_audio_chunk(fixture.pcm, sample_rate=fixture.sample_rate)
+            elapsed += time.perf_counter() - start
+            audio += fixture.duration
+            e, n = word_errors(fixture.reference, event.text)
+            errors += e
+            words += n
+    finally:
+        service.cleanup()
+    return {"rtf": elapsed / audio, "wer_offline": errors / words if words else 0.0}
+
+
+async def streaming_pass(
+    fixtures: List[Fixture],
+    model: str,
+    compute_type: str,
+    device: str,
+    clients: int,
+    chunk_ms: int,
+    verbose: bool,
+) -> Dict[str, float]:
+    """Stream fixtures through the WebSocket with concurrent clients."""
+    url, process = start_app(model, compute_type, device, verbose)
+    try:
+        # Warm-up session loads the model before measuring
+        await stream_fixture(url, fixtures[0], chunk_ms)
+
+        sampler = ProcessSampler(process.pid)
+        cpu_before = sampler.cpu_seconds()
+        watcher = asyncio.create_task(sampler.watch())
+        try:
+            sessions = await run_clients(url, fixtures, clients, chunk_ms)
+        finally:
+            watcher.cancel()
+        cpu_after = sampler.cpu_seconds()
+    finally:
+        stop_servers([process])
+
+    first_partial = LogLinearHistogram(scale=1e6)
+    final_latency = LogLinearHistogram(scale=1e6)
+    by_name = {f.name: f for f in fixtures}
+    errors = words = failed = 0
+    audio = 0.0
+    for session in sessions:
+        fixture = by_name[session.fixture]
+        audio += fixture.duration
+        if session.error:
+            failed += 1
+        if session.first_partial is not None:
+            first_partial.record(session.first_partial)
+        if session.final_latency is not None:
+            final_latency.record(session.final_latency)
+        e, n = word_errors(fixture.reference, session.transcript)
+        errors += e
+        words += n
+
+    result = {
+        "sessions": len(sessions),
+        "failed": failed,
+        "first_partial_p50_ms": first_partial.quantile(0.5) * 1000,
+        "first_partial_p95_ms": first_partial.quantile(0.95) * 1000,
+        "final_p50_ms": final_latency.quantile(0.5) * 1000,
+        "final_p95_ms": final_latency.quantile(0.95) * 1000,
+        "peak_rss_mb": sampler.peak_rss / 2**20,
+        "wer_stream": errors / words if words else 0.0,
+    }
+    if cpu_before is not None and cpu_after is not None and audio:
+        result["cpu_per_audio_s"] = (cpu_after - cpu_before) / audio
+    return result
+
+
+def print_report(results: Dict[str, Dict[str, float]], clients: int):
+    print(f"\n{clients} concurrent clients, real-time pace\n")
+    print(
+        f"{'model/compute':<20} {'sess':>5} {'fail':>5} {'1st p50':>8} {'1st p95':>8} "
+        f"{'fin p50':>8} {'fin p95':>8} {'rtf':>6} {'cpu/s':>6} {'rss MB':>7} {'wer st':>7} {'wer off':>7}"
+    )
+    for name, r in results.items():
+        cpu = f"{r['cpu_per_audio_s']:>6.2f}" if "cpu_per_audio_s" in r else f"{'-':>6}"
+        print(
+            f"{name:<20} {r['sessions']:>5} {r['failed']:>5} "
+            f"{r['first_partial_p50_ms']:>8.0f} {r['first_partial_p95_ms']:>8.0f} "
+            f"{r['final_p50_ms']:>8.0f} {r['final_p95_ms']:>8.0f} {r['rtf']:>6.2f} {cpu} "
+            f"{r['peak_rss_mb']:>7.0f} {r['wer_stream']:>7.1%} {r['wer_offline']:>7.1%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark realtime STT over the WebSocket.")
+    parser.add_argument("--fixtures", required=True, type=Path, help="Directory with name.wav/webm + name.txt")
+    parser.add_argument("--models", default="base", help="Comma-separated model sizes")
+    parser.add_argument("--compute-types", default="int8", help="Comma-separated compute types")
+    parser.add_argument("--device", default="auto", help="auto, cpu or cuda")
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent WebSocket clients")
+    parser.add_argument("--chunk-ms", type=int, default=250, help="Audio per message (client timeslice)")
+    parser.add_argument("--json-out", help="Write results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show server output")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures, args.chunk_ms)
+    total = sum(f.duration for f in fixtures)
+    print(f"{len(fixtures)} fixtures, {total:.1f}s of audio")
+
+    results: Dict[str, Dict[str, float]] = {}
+    for model in args.models.split(","):
+        for compute_type in args.compute_types.split(","):
+            name = f"{model}/{compute_type}"
+            print(f"running {name}...")
+            result = asyncio.run(offline_pass(fixtures, model, compute_type, args.device))
+            result.update(asyncio.run(streaming_pass(
+                fixtures, model, compute_type, args.device, args.clients, args.chunk_ms, args.verbose,
+            )))
+            results[name] = result
+
+    print_report(results, args.clients)
+
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps({
+            "clients": args.clients,
+            "chunk_ms": args.chunk_ms,
+            "fixtures": [f.name for f in fixtures],
+            "results": results,
+        }, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
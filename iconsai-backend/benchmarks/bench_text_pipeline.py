@@ -0,0 +1,175 @@
+"""
+Micro-benchmarks for the per-request text and timestamp utilities.
+
+Runs prepare_text_for_tts, normalize_numbers, chars_to_words,
+align_words_to_text and sanitize_branding on PT-BR corpora of increasing
+length and reports ops/sec (best of 5) and peak memory allocated per
+call (tracemalloc). Results can be stored as a baseline and later runs
+checked against it; the check exits with code 1 on regression.
+
+Usage:
+    python -m benchmarks.bench_text_pipeline
+    python -m benchmarks.bench_text_pipeline --check
+    python -m benchmarks.bench_text_pipeline --check --tolerance 0.5 --only chars_to_words
+    python -m benchmarks.bench_text_pipeline --save-baseline
+"""
+
+import argparse
+import platform
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from src.services.openai_chat import sanitize_branding
+from src.services.timestamp_utils import WordTrack, align_words_to_text, chars_to_words
+from src.utils.text_normalizer import normalize_numbers, prepare_text_for_tts
+
+from .baseline import find_regressions, load_baseline, save_baseline
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline_text_pipeline.json"
+
+# Chat answers as they reach TTS: numbers, currency, percentages, acronyms
+PARAGRAPHS = [
+    "Olá! Eu sou o assistente da Arbache AI. Como posso ajudar você hoje?",
+    (
+        "O Banco Central manteve a Selic em 10,5% ao ano. Segundo o IBGE, o IPCA "
+        "acumulado em 12 meses ficou em 4,23%, acima do centro da meta de 3%. "
+    ),
+    (
+        "O dólar fechou a R$ 5,12 e o Ibovespa subiu 1,8%, aos 128.450 pontos. "
+        "Um financiamento de R$ 250.000,00 em 360 meses terá parcelas perto de R$ 2.300,00. "
+    ),
+    (
+        "Para a pressão alta, o ideal é reduzir o sal para menos de 5 gramas por dia, "
+        "caminhar 30 minutos, 5 vezes por semana, e medir a pressão regularmente; "
+        "valores acima de 14 por 9 pedem avaliação médica. "
+    ),
+    (
+        "Diferente do ChatGPT ou do Gemini, aqui as respostas usam dados do SUS e do "
+        "INSS atualizados em 2024. Pergunte o que quiser sobre o Pix, o FGTS ou o PIB! "
+    ),
+]
+
+# Target lengths (characters): greeting, short answer, typical answer, long answer
+SIZES = {"short": 70, "medium": 400, "long": 1500, "xlong": 5000}
+
+SECONDS_PER_CHAR = 0.055
+
+
+def make_corpus(length: int) -> str:
+    """Repeat the paragraphs up to length, cut at a word boundary."""
+    text = ""
+    i = 0
+    while len(text) < length:
+        text += PARAGRAPHS[i % len(PARAGRAPHS)]
+        i += 1
+    return text[:length].rsplit(" ", 1)[0].strip()
+
+
+def make_alignment(text: str) -> Tuple[List[str], List[float], List[float]]:
+    """ElevenLabs-style character alignment for text."""
+    characters = list(text)
+    starts = [i * SECONDS_PER_CHAR for i in range(len(text))]
+    ends = [s + SECONDS_PER_CHAR - 0.005 for s in starts]
+    return characters, starts, ends
+
+
+def make_transcription(text: str) -> WordTrack:
+    """Whisper-like words for text: lowercased, without punctuation."""
+    words = [w.strip(".,;:!?").lower() for w in text.split()]
+    words = [w for w in words if w]
+    return WordTrack(
+        words,
+        [i * 0.3 for i in range(len(words))],
+        [i * 0.3 + 0.25 for i in range(len(words))],
+    )
+
+
+def build_cases() -> Dict[str, Tuple[Callable, tuple]]:
+    """Map "function/size" to (function, args)."""
+    cases = {}
+    for size, length in SIZES.items():
+        text = make_corpus(length)
+        tts_text = prepare_text_for_tts(text)
+        cases[f"prepare_text_for_tts/{size}"] = (prepare_text_for_tts, (text,))
+        cases[f"normalize_numbers/{size}"] = (normalize_numbers, (text,))
+        cases[f"chars_to_words/{size}"] = (chars_to_words, (tts_text, *make_alignment(tts_text)))
+        cases[f"align_words_to_text/{size}"] = (align_words_to_text, (text, make_transcription(text)))
+        cases[f"sanitize_branding/{size}"] = (sanitize_branding, (text,))
+    return cases
+
+
+def measure(func: Callable, args: tuple, min_time: float = 0.2) -> Dict[str, float]:
+    """
+    Throughput and allocation of one case.
+
+    Returns:
+        Dict with ops_per_sec (best of 5) and peak_kib (peak memory
+        allocated during one call)
+    """
+    func(*args)  # warm caches (compiled regexes, lazy tables)
+
+    number = 1
+    while timeit.timeit(lambda: func(*args), number=number) < min_time / 5:
+        number *= 2
+    best = min(timeit.repeat(lambda: func(*args), number=number, repeat=5)) / number
+
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        func(*args)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+    return {"ops_per_sec": 1 / best, "peak_kib": peak / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark text and timestamp utilities.")
+    parser.add_argument("--only", help="Run cases whose name contains this")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store results as the baseline")
+    parser.add_argument("--check", action="store_true", help="Fail on regression against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed ops/sec drop")
+    parser.add_argument("--alloc-tolerance", type=float, default=0.1, help="Allowed peak memory growth")
+    args = parser.parse_args()
+
+    cases = build_cases()
+    if args.only:
+        cases = {name: case for name, case in cases.items() if args.only in name}
+
+    print(f"{'case':<30} {'ops/sec':>12} {'us/op':>10} {'peak KiB':>9}")
+    results: Dict[str, Dict[str, float]] = {}
+    for name, (func, func_args) in cases.items():
+        result = measure(func, func_args)
+        results[name] = result
+        print(
+            f"{name:<30} {result['ops_per_sec']:>12,.0f} "
+            f"{1e6 / result['ops_per_sec']:>10.1f} {result['peak_kib']:>9.1f}"
+        )
+
+    if args.save_baseline:
+        save_baseline(
+            str(args.baseline), results,
+            python=platform.python_version(), machine=platform.machine(), processor=platform.processor(),
+        )
+        print(f"\nBaseline written to {args.baseline}")
+
+    if args.check:
+        baseline = load_baseline(str(args.baseline))
+        regressions = find_regressions(baseline, results, "ops_per_sec", args.tolerance, higher_is_better=True)
+        regressions += find_regressions(baseline, results, "peak_kib", args.alloc_tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline.name}")
+
+
+if __name__ == "__main__":
+    main()
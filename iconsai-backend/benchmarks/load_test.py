@@ -0,0 +1,466 @@
+"""
+Load test: drive the backend against mock providers.
+
+Starts the mock provider server (benchmarks.mock_providers) and the app,
+each in its own uvicorn process, then runs closed-loop virtual users
+executing a weighted mix of scenarios (voice-to-text, chat, streamed
+chat, karaoke TTS, admin user listing). Reports requests, errors, RPS
+and p50/p95/p99 latency per endpoint, plus time to first event for SSE
+streams.
+
+Results can be written as a baseline and later runs checked against it
+(exit code 1 on regression), so the test can gate a deploy.
+
+Usage:
+    python -m benchmarks.load_test --duration 30 --concurrency 20
+    python -m benchmarks.load_test --mix voice=3,chat_stream=5,karaoke=2 --latency-scale 0
+    python -m benchmarks.load_test --provider perplexity:error_rate=0.2 --tts-provider openai
+    python -m benchmarks.load_test --save-baseline load_baseline.json
+    python -m benchmarks.load_test --baseline load_baseline.json --tolerance 0.25
+    python -m benchmarks.load_test --target http://localhost:8000   # app already running
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import wave
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from src.core.metrics import LogLinearHistogram
+
+from .baseline import find_regressions, load_baseline, save_baseline
+from .mock_providers import add_profile_arguments
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_MIX = "voice=3,chat=2,chat_stream=4,karaoke=3"
+
+QUESTIONS = [
+    "Como está a inflação este ano?",
+    "O que é a taxa Selic e por que ela importa?",
+    "Quais cuidados devo ter com a pressão alta?",
+    "Me dá uma ideia de negócio para começar com pouco dinheiro.",
+    "Quais as principais notícias do mundo hoje?",
+    "Como funciona o Pix parcelado?",
+]
+
+TTS_TEXTS = [
+    "Olá! Como posso ajudar você hoje?",
+    "A Selic caiu para 10,5% e o dólar fechou a R$ 5,12 nesta terça-feira.",
+    (
+        "Segundo o IBGE, o IPCA acumulado em 12 meses ficou em 4,5%, acima da meta. "
+        "Analistas do Banco Central esperam cortes graduais ao longo de 2025, "
+        "com impacto no crédito imobiliário e no financiamento de veículos."
+    ),
+]
+
+AGENTS = ["home", "economia", "health", "ideas", "world"]
+
+# Clip lengths (seconds) for voice-to-text uploads
+AUDIO_SECONDS = [2, 4, 8, 15]
+
+
+def make_wav(seconds: float, sample_rate: int = 16000) -> bytes:
+    """Mono 16-bit WAV with a quiet tone (a realistic upload size)."""
+    frames = int(seconds * sample_rate)
+    samples = bytearray()
+    for i in range(frames):
+        value = int(3000 * math.sin(2 * math.pi * 220 * i / sample_rate))
+        samples += value.to_bytes(2, "little", signed=True)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(bytes(samples))
+    return buffer.getvalue()
+
+
+@dataclass
+class Outcome:
+    """Result of one scenario execution."""
+    ok: bool
+    status: int = 0
+    first_event: Optional[float] = None
+
+
+@dataclass
+class EndpointStats:
+    """Latency and error stats for one scenario."""
+    latency: LogLinearHistogram = field(default_factory=lambda: LogLinearHistogram(scale=1e6))
+    first_event: LogLinearHistogram = field(default_factory=lambda: LogLinearHistogram(scale=1e6))
+    errors: int = 0
+    statuses: Dict[int, int] = field(default_factory=dict)
+
+    def record(self, outcome: Outcome, elapsed: float, start: float):
+        self.latency.record(elapsed)
+        if outcome.first_event is not None:
+            self.first_event.record(outcome.first_event - start)
+        if not outcome.ok:
+            self.errors += 1
+        self.statuses[outcome.status] = self.statuses.get(outcome.status, 0) + 1
+
+    def summary(self, duration: float) -> Dict[str, float]:
+        count = self.latency.count
+        result = {
+            "count": count,
+            "errors": self.errors,
+            "error_rate": self.errors / count if count else 0.0,
+            "rps": count / duration if duration else 0.0,
+            "p50_ms": self.latency.quantile(0.5) * 1000,
+            "p95_ms": self.latency.quantile(0.95) * 1000,
+            "p99_ms": self.latency.quantile(0.99) * 1000,
+            "max_ms": self.latency.max * 1000,
+        }
+        if self.first_event.count:
+            result["ttfe_p50_ms"] = self.first_event.quantile(0.5) * 1000
+            result["ttfe_p95_ms"] = self.first_event.quantile(0.95) * 1000
+        return result
+
+
+class Scenarios:
+    """Request builders for each scenario, sharing prebuilt payloads."""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.audio = {s: base64.b64encode(make_wav(s)).decode("ascii") for s in AUDIO_SECONDS}
+
+    async def voice(self, client: httpx.AsyncClient, user: int) -> Outcome:
+        response = await client.post("/functions/v1/voice-to-text", json={
+            "audio": self.audio[self.rng.choice(AUDIO_SECONDS)],
+            "mimeType": "audio/wav",
+            "language": "pt",
+            "includeWordTimestamps": self.rng.random() < 0.5,
+        })
+        return Outcome(ok=response.status_code == 200 and "text" in response.json(), status=response.status_code)
+
+    async def chat(self, client: httpx.AsyncClient, user: int) -> Outcome:
+        response = await client.post("/functions/v1/chat-router", json={
+            "message": self.rng.choice(QUESTIONS),
+            "agentSlug": self.rng.choice(AGENTS),
+            "deviceId": f"load-test-{user}",
+            "pwaMode": True,
+        })
+        return Outcome(ok=response.status_code == 200 and bool(response.json().get("response")), status=response.status_code)
+
+    async def chat_stream(self, client: httpx.AsyncClient, user: int) -> Outcome:
+        body = {
+            "message": self.rng.choice(QUESTIONS),
+            "agentSlug": self.rng.choice(AGENTS),
+            "deviceId": f"load-test-{user}",
+            "pwaMode": True,
+        }
+        first_event = None
+        ok = False
+        async with client.stream("POST", "/functions/v1/chat-router/stream", json=body) as response:
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                if first_event is None:
+                    first_event = time.perf_counter()
+                data = line[6:]
+                if data == "[DONE]":
+                    break
+                if '"error"' in data and "error" in json.loads(data):
+                    ok = False
+                    break
+                ok = True
+            return Outcome(ok=ok and response.status_code == 200, status=response.status_code, first_event=first_event)
+
+    async def karaoke(self, client: httpx.AsyncClient, user: int) -> Outcome:
+        response = await client.post("/functions/v1/text-to-speech-karaoke", json={
+            "text": self.rng.choice(TTS_TEXTS),
+            "chatType": self.rng.choice(AGENTS),
+        })
+        return Outcome(ok=response.status_code == 200 and bool(response.json().get("audioBase64")), status=response.status_code)
+
+    async def admin_users(self, client: httpx.AsyncClient, user: int) -> Outcome:
+        response = await client.get(
+            "/functions/v1/admin/users",
+            headers={"Authorization": "Bearer load-test-token"},
+        )
+        return Outcome(ok=response.status_code == 200, status=response.status_code)
+
+
+SCENARIOS = ("voice", "chat", "chat_stream", "karaoke", "admin_users")
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    """Parse "name=weight,..." into (scenario, weight) pairs."""
+    mix = []
+    for item in filter(None, spec.split(",")):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (expected one of {', '.join(SCENARIOS)})")
+        mix.append((name, float(weight or 1)))
+    if not mix or sum(w for _, w in mix) <= 0:
+        raise ValueError("Mix needs at least one scenario with positive weight")
+    return mix
+
+
+async def run_load(
+    base_url: str,
+    mix: List[Tuple[str, float]],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int,
+) -> Tuple[Dict[str, EndpointStats], float]:
+    """
+    Run closed-loop virtual users against base_url.
+
+    Each user picks a scenario by weight, waits for it to finish and
+    repeats. Requests started during warmup are not recorded.
+
+    Returns:
+        Tuple of (stats per scenario, measured seconds)
+    """
+    rng = random.Random(seed)
+    scenarios = Scenarios(rng)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    stats = {name: EndpointStats() for name in names}
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    start = time.perf_counter()
+    measure_from = start + warmup
+    end = measure_from + duration
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+
+        async def user(index: int):
+            while time.perf_counter() < end:
+                name = rng.choices(names, weights)[0]
+                scenario: Callable[[httpx.AsyncClient, int], Awaitable[Outcome]] = getattr(scenarios, name)
+                t0 = time.perf_counter()
+                try:
+                    outcome = await scenario(client, index)
+                except (httpx.HTTPError, ValueError):
+                    outcome = Outcome(ok=False)
+                if t0 >= measure_from:
+                    stats[name].record(outcome, time.perf_counter() - t0, t0)
+
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+
+    return stats, time.perf_counter() - measure_from
+
+
+# =============================================================================
+# Processes
+# =============================================================================
+
+def free_port() -> int:
+    """Ask the OS for an unused TCP port."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def app_environment(mock_url: str, tts_provider: str, chat_cache: bool) -> Dict[str, str]:
+    """Environment for the app process: fake keys and mocked Supabase."""
+    return {
+        **os.environ,
+        "OPENAI_API_KEY": "mock-openai",
+        "PERPLEXITY_API_KEY": "mock-perplexity",
+        "GEMINI_API_KEY": "mock-gemini",
+        "ELEVENLABS_API_KEY": "mock-elevenlabs",
+        "SUPABASE_URL": f"{mock_url}/supabase",
+        "SUPABASE_SERVICE_ROLE_KEY": "mock-supabase",
+        "TTS_PROVIDER": tts_provider,
+        "CHAT_CACHE_ENABLED": str(chat_cache).lower(),
+        "SESSION_BACKEND": "memory",
+        "TRACING_EXPORTER": "none",
+    }
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    """Poll GET /health until it answers 200."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process for {url} exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+
+def start_servers(args: argparse.Namespace) -> Tuple[str, List[subprocess.Popen]]:
+    """Start the mock providers and the app; returns (app URL, processes)."""
+    output = None if args.verbose else subprocess.DEVNULL
+    mock_port, app_port = free_port(), free_port()
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    app_url = f"http://127.0.0.1:{app_port}"
+
+    mock_cmd = [
+        sys.executable, "-m", "benchmarks.mock_providers",
+        "--port", str(mock_port),
+        "--seed", str(args.seed),
+        "--latency-scale", str(args.latency_scale),
+    ]
+    for spec in args.provider:
+        mock_cmd += ["--provider", spec]
+
+    app_cmd = [
+        sys.executable, "-m", "benchmarks.load_test",
+        "--serve-app", "--port", str(app_port), "--mock-url", mock_url,
+    ]
+
+    processes = [subprocess.Popen(mock_cmd, cwd=BACKEND_DIR, stdout=output, stderr=output)]
+    try:
+        wait_ready(mock_url, processes[0])
+        processes.append(subprocess.Popen(
+            app_cmd, cwd=BACKEND_DIR, stdout=output, stderr=output,
+            env=app_environment(mock_url, args.tts_provider, args.chat_cache),
+        ))
+        wait_ready(app_url, processes[1])
+    except Exception:
+        stop_servers(processes)
+        raise
+    return app_url, processes
+
+
+def stop_servers(processes: List[subprocess.Popen]):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def serve_app(port: int, mock_url: str):
+    """Run the backend with provider URLs pointed at the mock server."""
+    import uvicorn
+
+    from .mock_providers import point_services_at
+
+    point_services_at(mock_url)
+    from src.main import app
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+# =============================================================================
+# Report
+# =============================================================================
+
+def print_report(results: Dict[str, Dict[str, float]], duration: float, concurrency: int):
+    print(f"\n{duration:.1f}s measured, {concurrency} concurrent users\n")
+    print(
+        f"{'endpoint':<12} {'count':>6} {'errors':>6} {'rps':>7} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'ttfe p50':>9} {'ttfe p95':>9}"
+    )
+    for name, r in results.items():
+        ttfe = (
+            f"{r['ttfe_p50_ms']:>9.1f} {r['ttfe_p95_ms']:>9.1f}"
+            if "ttfe_p50_ms" in r else f"{'-':>9} {'-':>9}"
+        )
+        print(
+            f"{name:<12} {r['count']:>6} {r['errors']:>6} {r['rps']:>7.2f} "
+            f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f} {ttfe}"
+        )
+    total = sum(r["count"] for r in results.values())
+    errors = sum(r["errors"] for r in results.values())
+    print(f"\ntotal: {total} requests, {errors} errors, {total / duration:.2f} rps")
+
+
+def check_baseline(path: str, results: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Latency, throughput and error-rate regressions against a baseline."""
+    baseline = load_baseline(path)
+    regressions = []
+    for metric in ("p50_ms", "p95_ms", "p99_ms"):
+        regressions += find_regressions(baseline, results, metric, tolerance)
+    regressions += find_regressions(baseline, results, "rps", tolerance, higher_is_better=True)
+    for name, r in results.items():
+        allowed = baseline.get(name, {}).get("error_rate", 0.0) + 0.01
+        if r["error_rate"] > allowed:
+            regressions.append(f"{name}: error_rate {r['error_rate']:.1%} (baseline allows {allowed:.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the backend against mock providers.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before measuring")
+    parser.add_argument("--concurrency", type=int, default=20, help="Virtual users")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Scenario weights ({', '.join(SCENARIOS)})")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tts-provider", default="elevenlabs", choices=["elevenlabs", "openai"])
+    parser.add_argument("--chat-cache", action="store_true", help="Keep the chat response cache on (repeated questions hit it)")
+    parser.add_argument("--target", help="Drive an already running app instead of starting one")
+    parser.add_argument("--json-out", help="Write results as JSON")
+    parser.add_argument("--save-baseline", help="Write results as a baseline file")
+    parser.add_argument("--baseline", help="Fail on regression against this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--verbose", action="store_true", help="Show server output")
+    add_profile_arguments(parser)
+    # Internal: run the app process (started by this script)
+    parser.add_argument("--serve-app", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--mock-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_app:
+        serve_app(args.port, args.mock_url)
+        return
+
+    mix = parse_mix(args.mix)
+    processes: List[subprocess.Popen] = []
+    if args.target:
+        base_url = args.target.rstrip("/")
+    else:
+        base_url, processes = start_servers(args)
+
+    try:
+        stats, measured = asyncio.run(run_load(
+            base_url, mix, args.concurrency, args.duration, args.warmup, args.seed,
+        ))
+    finally:
+        stop_servers(processes)
+
+    results = {name: s.summary(measured) for name, s in stats.items()}
+    print_report(results, measured, args.concurrency)
+
+    options = {
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+        "mix": args.mix,
+        "tts_provider": args.tts_provider,
+        "chat_cache": args.chat_cache,
+        "latency_scale": args.latency_scale,
+        "provider": args.provider,
+    }
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps({"options": options, "results": results}, indent=2) + "\n")
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results, **options)
+    if args.baseline:
+        regressions = check_baseline(args.baseline, results, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
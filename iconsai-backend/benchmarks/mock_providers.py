@@ -0,0 +1,390 @@
+"""
+Mock upstream providers for load tests.
+
+One FastAPI app emulating the endpoints the backend calls: OpenAI chat,
+TTS and Whisper, Perplexity, Gemini (generate and SSE stream), ElevenLabs
+(with and without timestamps) and the Supabase auth/REST endpoints used
+by the admin API. Every provider has a latency profile (base latency,
+uniform jitter, error rate, per-chunk delay for streams and a mid-stream
+abort rate).
+
+Routes are prefixed by provider (/openai, /perplexity, /gemini,
+/elevenlabs, /supabase); point_services_at() rewires the backend's
+service URLs to them.
+
+Usage:
+    python -m benchmarks.mock_providers --port 9100
+    python -m benchmarks.mock_providers --provider perplexity:latency_ms=900,error_rate=0.1
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+from dataclasses import dataclass, replace
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+PROVIDERS = ("openai", "perplexity", "gemini", "elevenlabs", "supabase")
+
+CHAT_REPLY = (
+    "A taxa Selic está em 10,5% ao ano, segundo o Banco Central. "
+    "Isso encarece o crédito e tende a segurar a inflação nos próximos meses; "
+    "para quem investe em renda fixa, o cenário continua favorável. "
+    "Vale acompanhar as próximas reuniões do Copom para entender o ritmo dos cortes."
+)
+
+TRANSCRIPT = "Qual é a previsão do tempo para amanhã em São Paulo?"
+
+# Seconds of speech per character in synthesized/aligned audio
+SECONDS_PER_CHAR = 0.055
+
+# Bytes of MP3 per second of speech (~128 kbps)
+MP3_BYTES_PER_SECOND = 16_000
+
+
+@dataclass
+class ProviderProfile:
+    """Latency and failure behaviour of one mocked provider."""
+    latency_ms: float = 300.0
+    jitter_ms: float = 50.0
+    error_rate: float = 0.0
+    chunk_delay_ms: float = 15.0
+    abort_rate: float = 0.0
+
+    def delay(self, rng: random.Random, scale: float = 1.0) -> float:
+        """Seconds to wait before responding (never negative)."""
+        jitter = rng.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, self.latency_ms + jitter) * scale / 1000
+
+
+DEFAULT_PROFILES: Dict[str, ProviderProfile] = {
+    "openai": ProviderProfile(latency_ms=400, jitter_ms=120),
+    "perplexity": ProviderProfile(latency_ms=700, jitter_ms=250, chunk_delay_ms=20),
+    "gemini": ProviderProfile(latency_ms=500, jitter_ms=150),
+    "elevenlabs": ProviderProfile(latency_ms=600, jitter_ms=200),
+    "supabase": ProviderProfile(latency_ms=25, jitter_ms=10),
+}
+
+
+def parse_provider_override(spec: str, profiles: Dict[str, ProviderProfile]):
+    """
+    Apply a "name:key=value,key=value" override to profiles in place.
+
+    Raises:
+        ValueError: On unknown provider or field
+    """
+    name, _, assignments = spec.partition(":")
+    if name not in profiles:
+        raise ValueError(f"Unknown provider '{name}' (expected one of {', '.join(PROVIDERS)})")
+    updates = {}
+    for assignment in filter(None, assignments.split(",")):
+        key, _, value = assignment.partition("=")
+        if not hasattr(profiles[name], key):
+            raise ValueError(f"Unknown profile field '{key}'")
+        updates[key] = float(value)
+    profiles[name] = replace(profiles[name], **updates)
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    """Add --provider / --latency-scale options to a parser."""
+    parser.add_argument(
+        "--provider", action="append", default=[], metavar="NAME:KEY=VALUE,...",
+        help="Override a provider profile (latency_ms, jitter_ms, error_rate, chunk_delay_ms, abort_rate)",
+    )
+    parser.add_argument(
+        "--latency-scale", type=float, default=1.0,
+        help="Multiply every mocked delay (0 measures backend overhead only)",
+    )
+
+
+def profiles_from_args(args: argparse.Namespace) -> Dict[str, ProviderProfile]:
+    """Build profiles from DEFAULT_PROFILES plus --provider overrides."""
+    profiles = dict(DEFAULT_PROFILES)
+    for spec in args.provider:
+        parse_provider_override(spec, profiles)
+    return profiles
+
+
+def point_services_at(base_url: str):
+    """
+    Rewire the backend's provider URLs to a mock server.
+
+    Must run in the process serving the app; Supabase is configured
+    through SUPABASE_URL instead (see load_test.app_environment).
+    """
+    from src.services.elevenlabs_tts import ElevenLabsTTSService
+    from src.services.openai_chat import OpenAIChatService
+    from src.services.openai_tts import OpenAITTSService
+    from src.services.whisper_stt import WhisperSTTService
+
+    base_url = base_url.rstrip("/")
+    gemini = f"{base_url}/gemini/v1beta/models/gemini-2.5-flash"
+
+    OpenAIChatService.OPENAI_URL = f"{base_url}/openai/v1/chat/completions"
+    OpenAIChatService.PERPLEXITY_URL = f"{base_url}/perplexity/chat/completions"
+    OpenAIChatService.GEMINI_URL = f"{gemini}:generateContent"
+    OpenAIChatService.GEMINI_STREAM_URL = f"{gemini}:streamGenerateContent"
+    ElevenLabsTTSService.BASE_URL = f"{base_url}/elevenlabs/v1"
+    OpenAITTSService.TTS_URL = f"{base_url}/openai/v1/audio/speech"
+    OpenAITTSService.WHISPER_URL = f"{base_url}/openai/v1/audio/transcriptions"
+    WhisperSTTService.WHISPER_URL = f"{base_url}/openai/v1/audio/transcriptions"
+
+
+def _tokens(text: str) -> List[str]:
+    """Split text into word-sized stream chunks (keeping spaces)."""
+    words = text.split(" ")
+    return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+
+def _usage(prompt_chars: int) -> dict:
+    prompt_tokens = max(1, prompt_chars // 4)
+    completion_tokens = max(1, len(CHAT_REPLY) // 4)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def create_mock_app(
+    profiles: Optional[Dict[str, ProviderProfile]] = None,
+    latency_scale: float = 1.0,
+    seed: Optional[int] = None,
+) -> FastAPI:
+    """
+    Build the mock provider app.
+
+    Args:
+        profiles: Per-provider behaviour (defaults to DEFAULT_PROFILES)
+        latency_scale: Multiplier applied to every delay
+        seed: Random seed for reproducible jitter/errors
+
+    Returns:
+        FastAPI application
+    """
+    profiles = {**DEFAULT_PROFILES, **(profiles or {})}
+    rng = random.Random(seed)
+    app = FastAPI(title="IconsAI mock providers")
+    # Shared MP3-ish payload sliced per response, so encoding cost stays off the mock
+    audio_blob = rng.randbytes(MP3_BYTES_PER_SECOND * 30)
+
+    async def wait(provider: str) -> Optional[JSONResponse]:
+        """Sleep for the provider's latency; return an error response if one is injected."""
+        profile = profiles[provider]
+        await asyncio.sleep(profile.delay(rng, latency_scale))
+        if profile.error_rate and rng.random() < profile.error_rate:
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": f"mock {provider} failure", "type": "server_error"}},
+            )
+        return None
+
+    async def stream_events(provider: str, events: List[str]) -> AsyncIterator[bytes]:
+        """Yield SSE lines with the per-chunk delay, aborting mid-stream if configured."""
+        profile = profiles[provider]
+        abort_at = len(events) // 2 if profile.abort_rate and rng.random() < profile.abort_rate else -1
+        for i, event in enumerate(events):
+            if i == abort_at:
+                raise ConnectionError(f"mock {provider} stream aborted")
+            if i:
+                await asyncio.sleep(profile.chunk_delay_ms * latency_scale / 1000)
+            yield f"data: {event}\n\n".encode()
+
+    def audio_bytes(seconds: float) -> bytes:
+        size = min(len(audio_blob), max(1024, int(seconds * MP3_BYTES_PER_SECOND)))
+        return audio_blob[:size]
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    # ---- OpenAI-compatible chat (OpenAI and Perplexity) ----
+
+    async def chat_completion(provider: str, request: Request):
+        body = await request.json()
+        error = await wait(provider)
+        if error:
+            return error
+
+        prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+        model = body.get("model", "mock")
+
+        if not body.get("stream"):
+            return {
+                "id": "mock",
+                "object": "chat.completion",
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": CHAT_REPLY}, "finish_reason": "stop"}],
+                "usage": _usage(prompt_chars),
+            }
+
+        events = [
+            json.dumps({"choices": [{"index": 0, "delta": {"content": token}}]})
+            for token in _tokens(CHAT_REPLY)
+        ]
+        # Perplexity always reports usage; OpenAI only when asked
+        if provider == "perplexity" or body.get("stream_options", {}).get("include_usage"):
+            events.append(json.dumps({"choices": [], "usage": _usage(prompt_chars)}))
+        events.append("[DONE]")
+        return StreamingResponse(stream_events(provider, events), media_type="text/event-stream")
+
+    @app.post("/openai/v1/chat/completions")
+    async def openai_chat(request: Request):
+        return await chat_completion("openai", request)
+
+    @app.post("/perplexity/chat/completions")
+    async def perplexity_chat(request: Request):
+        return await chat_completion("perplexity", request)
+
+    # ---- Gemini ----
+
+    @app.post("/gemini/v1beta/models/{target}")
+    async def gemini(target: str, request: Request):
+        body = await request.json()
+        error = await wait("gemini")
+        if error:
+            return error
+
+        prompt_chars = sum(
+            len(part.get("text", ""))
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        usage = _usage(prompt_chars)
+        usage_metadata = {
+            "promptTokenCount": usage["prompt_tokens"],
+            "candidatesTokenCount": usage["completion_tokens"],
+            "totalTokenCount": usage["total_tokens"],
+        }
+
+        if target.endswith(":generateContent"):
+            return {
+                "candidates": [{"content": {"parts": [{"text": CHAT_REPLY}], "role": "model"}}],
+                "usageMetadata": usage_metadata,
+            }
+
+        events = [
+            json.dumps({"candidates": [{"content": {"parts": [{"text": token}], "role": "model"}}]})
+            for token in _tokens(CHAT_REPLY)
+        ]
+        events.append(json.dumps({"candidates": [], "usageMetadata": usage_metadata}))
+        return StreamingResponse(stream_events("gemini", events), media_type="text/event-stream")
+
+    # ---- OpenAI audio ----
+
+    @app.post("/openai/v1/audio/speech")
+    async def openai_speech(request: Request):
+        body = await request.json()
+        error = await wait("openai")
+        if error:
+            return error
+        seconds = len(body.get("input", "")) * SECONDS_PER_CHAR
+        return Response(content=audio_bytes(seconds), media_type="audio/mpeg")
+
+    @app.post("/openai/v1/audio/transcriptions")
+    async def openai_transcriptions(request: Request):
+        form = await request.form()
+        upload = form.get("file")
+        size = len(await upload.read()) if upload is not None else 0
+        error = await wait("openai")
+        if error:
+            return error
+
+        # Uploads are 16 kHz 16-bit mono WAV in the load test, other formats roughly 32 kB/s
+        duration = round(size / 32_000, 2)
+        result = {"text": TRANSCRIPT, "language": "portuguese", "duration": duration}
+        if form.get("response_format") == "verbose_json":
+            words = TRANSCRIPT.split()
+            step = (duration or 1.0) / len(words)
+            result["words"] = [
+                {"word": word, "start": round(i * step, 3), "end": round((i + 1) * step, 3)}
+                for i, word in enumerate(words)
+            ]
+        return result
+
+    # ---- ElevenLabs ----
+
+    @app.post("/elevenlabs/v1/text-to-speech/{voice_id}/with-timestamps")
+    async def elevenlabs_timestamps(voice_id: str, request: Request):
+        body = await request.json()
+        error = await wait("elevenlabs")
+        if error:
+            return error
+
+        text = body.get("text", "")
+        starts = [round(i * SECONDS_PER_CHAR, 3) for i in range(len(text))]
+        return {
+            "audio_base64": base64.b64encode(audio_bytes(len(text) * SECONDS_PER_CHAR)).decode("ascii"),
+            "alignment": {
+                "characters": list(text),
+                "character_start_times_seconds": starts,
+                "character_end_times_seconds": [round(s + SECONDS_PER_CHAR, 3) for s in starts],
+            },
+        }
+
+    @app.post("/elevenlabs/v1/text-to-speech/{voice_id}")
+    async def elevenlabs_simple(voice_id: str, request: Request):
+        body = await request.json()
+        error = await wait("elevenlabs")
+        if error:
+            return error
+        seconds = len(body.get("text", "")) * SECONDS_PER_CHAR
+        return Response(content=audio_bytes(seconds), media_type="audio/mpeg")
+
+    # ---- Supabase ----
+
+    @app.get("/supabase/auth/v1/user")
+    async def supabase_user():
+        error = await wait("supabase")
+        if error:
+            return error
+        return {"id": "00000000-0000-0000-0000-000000000001", "email": "admin@iconsai.ai"}
+
+    @app.get("/supabase/rest/v1/{table}")
+    async def supabase_select(table: str, request: Request):
+        error = await wait("supabase")
+        if error:
+            return error
+
+        if "auth_user_id" in request.query_params:
+            return [{"role": "admin"}]
+
+        limit = int(request.query_params.get("limit", 100))
+        rows = [
+            {
+                "id": f"user-{i}",
+                "auth_user_id": f"auth-{i}",
+                "email": f"usuario{i}@iconsai.ai",
+                "first_name": "Usuário",
+                "last_name": str(i),
+                "role": "user",
+                "status": "active",
+                "created_at": "2025-01-01T00:00:00Z",
+            }
+            for i in range(min(limit, 25))
+        ]
+        return JSONResponse(rows, headers={"content-range": f"0-{len(rows) - 1}/{len(rows)}"})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the mock provider server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--seed", type=int, default=None)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = create_mock_app(profiles_from_args(args), args.latency_scale, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
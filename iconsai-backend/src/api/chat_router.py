@@ -7,12 +7,15 @@ Compatible with existing Supabase Edge Function interface.
 """
 
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
+from ..config import get_settings
+from ..core.session_manager import get_session_manager
+from ..core.tracing import trace_span
 from ..services.openai_chat import ChatMessage, OpenAIChatService
 
 logger = logging.getLogger(__name__)
@@ -60,6 +63,41 @@ class ErrorResponse(BaseModel):
     response: Optional[str] = None
 
 
+def _load_pwa_history(
+    request: ChatRouterRequest,
+    module_slug: str,
+) -> Tuple[Optional[str], Optional[str], Optional[List[ChatMessage]]]:
+    """
+    Load per-device history for a PWA request.
+
+    Returns:
+        Tuple of (session_id, device_session_id, history)
+    """
+    if not request.deviceId:
+        return request.sessionId, None, None
+
+    with trace_span("chat.load_history", module=module_slug) as span:
+        device_session_id, _, history = get_session_manager().get_recent_history(
+            request.deviceId,
+            limit=get_settings().chat_history_limit,
+            module_slug=module_slug,
+        )
+        span.set_attribute("messages", len(history))
+    return (
+        request.sessionId or device_session_id,
+        device_session_id,
+        [ChatMessage(**m) for m in history] if history else None,
+    )
+
+
+def _save_pwa_turn(device_session_id: str, message: str, response: str, module_slug: str):
+    """Save a user/assistant exchange to the device session."""
+    with trace_span("chat.save_history"):
+        session_manager = get_session_manager()
+        session_manager.save_message(device_session_id, "user", message, module_slug)
+        session_manager.save_message(device_session_id, "assistant", response, module_slug)
+
+
 @router.post(
     "/functions/v1/chat-router",
     response_model=ChatRouterResponse,
@@ -105,16 +143,19 @@ async def chat_router(request: ChatRouterRequest, http_request: Request):
             # Determine module
             module_slug = request.agentSlug or request.chatType or "general"
 
-            # For now, we don't load history from database
-            # This would need Supabase integration for full compatibility
-            history = []
+            session_id, device_session_id, history = _load_pwa_history(request, module_slug)
 
-            result = await chat_service.chat(
-                message=request.message,
-                module_slug=module_slug,
-                history=[ChatMessage(**m.model_dump()) for m in history] if history else None,
-                session_id=request.sessionId
-            )
+            with trace_span("chat.completion", module=module_slug) as span:
+                result = await chat_service.chat(
+                    message=request.message,
+                    module_slug=module_slug,
+                    history=history,
+                    session_id=session_id
+                )
+                span.set_attribute("source", result.source)
+
+            if device_session_id:
+                _save_pwa_turn(device_session_id, request.message, result.response, module_slug)
 
             return {
                 "response": result.response,
@@ -175,12 +216,14 @@ async def chat_router(request: ChatRouterRequest, http_request: Request):
 
         module_slug = request.chatType or "general"
 
-        result = await chat_service.chat(
-            message=last_user_message,
-            module_slug=module_slug,
-            history=history,
-            session_id=request.sessionId
-        )
+        with trace_span("chat.completion", module=module_slug) as span:
+            result = await chat_service.chat(
+                message=last_user_message,
+                module_slug=module_slug,
+                history=history,
+                session_id=request.sessionId
+            )
+            span.set_attribute("source", result.source)
 
         return {
             "response": result.response,
@@ -214,11 +257,18 @@ async def chat_router(request: ChatRouterRequest, http_request: Request):
         )
 
 
-# Streaming endpoint for standard mode
+# Streaming endpoint (PWA and standard mode)
 @router.post(
     "/functions/v1/chat-router/stream",
     summary="Stream chat response",
-    description="Stream chat completion response (SSE format)"
+    description="""
+    Stream chat completion response (SSE format).
+
+    Tokens are streamed from the first available provider
+    (Perplexity -> OpenAI -> Gemini) as OpenAI-style chunks:
+    `data: {"choices": [{"index": 0, "delta": {"content": "..."}}], "source": "..."}`,
+    ending with `data: [DONE]`.
+    """
 )
 async def chat_router_stream(request: ChatRouterRequest):
     """
@@ -226,27 +276,48 @@ async def chat_router_stream(request: ChatRouterRequest):
 
     Returns Server-Sent Events format for real-time streaming.
     """
-    if not request.messages:
-        raise HTTPException(
-            status_code=400,
-            detail={"error": "Messages required for streaming"}
+    chat_service = OpenAIChatService()
+
+    if request.pwaMode:
+        if not request.message:
+            raise HTTPException(
+                status_code=400,
+                detail={"error": "Message required", "response": "Message required"}
+            )
+
+        module_slug = request.agentSlug or request.chatType or "general"
+        session_id, device_session_id, history = _load_pwa_history(request, module_slug)
+
+        def on_complete(response: str, source: str):
+            if device_session_id:
+                _save_pwa_turn(device_session_id, request.message, response, module_slug)
+
+        events = chat_service.stream_reply(
+            message=request.message,
+            module_slug=module_slug,
+            history=history,
+            session_id=session_id,
+            on_complete=on_complete,
         )
 
-    chat_service = OpenAIChatService()
+    else:
+        if not request.messages:
+            raise HTTPException(
+                status_code=400,
+                detail={"error": "Messages required for streaming"}
+            )
 
-    # Build messages for streaming
-    messages = [
-        {"role": m.role, "content": m.content}
-        for m in request.messages
-        if m.type != "file-data"
-    ]
+        # Build messages for streaming
+        messages = [
+            {"role": m.role, "content": m.content}
+            for m in request.messages
+            if m.type != "file-data"
+        ]
 
-    async def generate():
-        async for chunk in chat_service.stream_chat(messages):
-            yield chunk + "\n"
+        events = chat_service.stream_chat(messages, module_slug=request.chatType or "general")
 
     return StreamingResponse(
-        generate(),
+        events,
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -28,6 +28,8 @@ import io
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.responses import JSONResponse
 
+from ..config import get_settings
+from ..core.tracing import trace_span
 from ..services.realtime_stt import (
     get_realtime_stt_service,
     TranscriptionEvent,
@@ -133,9 +135,12 @@ async def realtime_stt_websocket(websocket: WebSocket):
     logger.info(f"[{session.session_id}] WebSocket connected")
 
     # Get STT service
+    settings = get_settings()
     stt_service = get_realtime_stt_service(
-        model_size="base",  # Use base for real-time (good balance)
+        model_size=settings.realtime_stt_model_size,
         language=session.language,
+        device=settings.realtime_stt_device,
+        compute_type=settings.realtime_stt_compute_type,
     )
 
     # Audio buffer for accumulating chunks
@@ -169,10 +174,11 @@ async def realtime_stt_websocket(websocket: WebSocket):
                     # Convert to PCM if needed
                     if session.audio_format in ["webm", "opus"]:
                         try:
-                            pcm_data = await AudioConverter.webm_to_pcm(
-                                audio_data,
-                                target_sample_rate=session.sample_rate,
-                            )
+                            with trace_span("ws.convert_pcm", bytes=len(audio_data)):
+                                pcm_data = await AudioConverter.webm_to_pcm(
+                                    audio_data,
+                                    target_sample_rate=session.sample_rate,
+                                )
                             audio_buffer.extend(pcm_data)
                         except Exception as e:
                             logger.warning(f"[{session.session_id}] Audio conversion error: {e}")
@@ -183,15 +189,17 @@ async def realtime_stt_websocket(websocket: WebSocket):
 
                     # Process when we have enough audio
                     if len(audio_buffer) >= min_process_bytes:
-                        event = await stt_service.transcribe_audio_chunk(
-                            bytes(audio_buffer),
-                            sample_rate=session.sample_rate,
-                            include_timestamps=True,
-                        )
+                        with trace_span("ws.transcribe", bytes=len(audio_buffer)):
+                            event = await stt_service.transcribe_audio_chunk(
+                                bytes(audio_buffer),
+                                sample_rate=session.sample_rate,
+                                include_timestamps=True,
+                            )
 
                         if event.text:
                             session.total_transcriptions += 1
-                            await websocket.send_json(event.to_dict())
+                            with trace_span("ws.send", status=event.status.value):
+                                await websocket.send_json(event.to_dict())
 
                         # Keep last portion for context overlap
                         overlap_bytes = session.sample_rate * 2 // 4  # 0.25s overlap
@@ -224,15 +232,17 @@ async def realtime_stt_websocket(websocket: WebSocket):
                             # Base64 encoded audio
                             audio_b64 = data.get("data", "")
                             if audio_b64:
-                                audio_data = await AudioConverter.base64_to_bytes(audio_b64)
+                                with trace_span("ws.decode_base64", base64_chars=len(audio_b64)):
+                                    audio_data = await AudioConverter.base64_to_bytes(audio_b64)
                                 session.total_audio_bytes += len(audio_data)
 
                                 # Convert and buffer
                                 if session.audio_format in ["webm", "opus"]:
-                                    pcm_data = await AudioConverter.webm_to_pcm(
-                                        audio_data,
-                                        target_sample_rate=session.sample_rate,
-                                    )
+                                    with trace_span("ws.convert_pcm", bytes=len(audio_data)):
+                                        pcm_data = await AudioConverter.webm_to_pcm(
+                                            audio_data,
+                                            target_sample_rate=session.sample_rate,
+                                        )
                                     audio_buffer.extend(pcm_data)
                                 else:
                                     audio_buffer.extend(audio_data)
@@ -309,7 +319,12 @@ async def realtime_stt_info():
 
     Returns service status and configuration.
     """
-    stt_service = get_realtime_stt_service()
+    settings = get_settings()
+    stt_service = get_realtime_stt_service(
+        model_size=settings.realtime_stt_model_size,
+        device=settings.realtime_stt_device,
+        compute_type=settings.realtime_stt_compute_type,
+    )
 
     return {
         "service": "realtime-stt",
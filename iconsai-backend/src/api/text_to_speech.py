@@ -7,12 +7,15 @@ Compatible with existing Supabase Edge Function interface.
 """
 
 import logging
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
 
 from ..config import get_settings
+from ..core.single_flight import ClientDisconnected, get_single_flight, request_key, run_until_disconnected
+from ..core.tracing import trace_span
+from ..services.audio_bank import lookup_phrase
 from ..services.elevenlabs_tts import ElevenLabsTTSService
 from ..services.openai_tts import OpenAITTSService
 
@@ -54,6 +57,115 @@ class ErrorResponse(BaseModel):
     error: str
 
 
+async def _coalesced(
+    http_request: Request,
+    name: str,
+    request: TextToSpeechRequest,
+    synthesize: Callable[[], Awaitable[dict]]
+) -> dict:
+    """
+    Run synthesize once per identical in-flight request (COALESCE_REQUESTS).
+
+    Retries and double-taps with the same body share one upstream
+    call; the call is cancelled when every client has disconnected.
+    """
+    if not get_settings().coalesce_requests:
+        return await synthesize()
+    key = request_key(name, request.model_dump())
+    return await run_until_disconnected(http_request, get_single_flight(name).run(key, synthesize))
+
+
+async def _synthesize_karaoke(request: TextToSpeechRequest) -> dict:
+    """Synthesize with ElevenLabs, falling back to OpenAI TTS + Whisper."""
+    settings = get_settings()
+
+    # Try ElevenLabs first (preferred - native timestamps)
+    if settings.has_elevenlabs() and settings.tts_provider == "elevenlabs":
+        logger.info("[tts-karaoke] Using ElevenLabs (native timestamps)")
+
+        try:
+            tts_service = ElevenLabsTTSService()
+            with trace_span("tts.synthesize", provider="elevenlabs", chars=len(request.text)):
+                result = await tts_service.synthesize_with_timestamps(
+                    text=request.text,
+                    voice=request.voice,
+                    phonetic_map=request.phoneticMapOverride,
+                    speed=request.speed or 1.0,
+                    chat_type=request.chatType
+                )
+
+            logger.info(
+                f"[tts-karaoke] ElevenLabs success: "
+                f"{len(result.words or [])} words, "
+                f"duration={result.duration}"
+            )
+
+            with trace_span("response.encode"):
+                return result.to_dict()
+
+        except Exception as e:
+            logger.warning(f"[tts-karaoke] ElevenLabs failed: {e}")
+            # Fall through to OpenAI
+
+    # Fallback: OpenAI TTS + Whisper
+    if settings.has_openai():
+        logger.info("[tts-karaoke] Using OpenAI TTS + Whisper (fallback)")
+
+        tts_service = OpenAITTSService()
+        with trace_span("tts.synthesize", provider="openai", chars=len(request.text)):
+            result = await tts_service.synthesize_with_timestamps(
+                text=request.text,
+                voice=request.voice,
+                phonetic_map=request.phoneticMapOverride,
+                speed=request.speed or 1.0,
+                chat_type=request.chatType
+            )
+
+        logger.info(
+            f"[tts-karaoke] OpenAI success: "
+            f"{len(result.words or [])} words, "
+            f"duration={result.duration}"
+        )
+
+        with trace_span("response.encode"):
+            return result.to_dict()
+
+    # No TTS service available
+    raise HTTPException(
+        status_code=500,
+        detail={"error": "Nenhum serviço TTS disponível"}
+    )
+
+
+async def _synthesize_simple(request: TextToSpeechRequest) -> dict:
+    """Synthesize without timestamps (ElevenLabs, else OpenAI)."""
+    settings = get_settings()
+
+    if settings.has_elevenlabs():
+        tts_service = ElevenLabsTTSService()
+        result = await tts_service.synthesize_simple(
+            text=request.text,
+            voice=request.voice,
+            phonetic_map=request.phoneticMapOverride,
+            chat_type=request.chatType
+        )
+    elif settings.has_openai():
+        tts_service = OpenAITTSService()
+        result = await tts_service.synthesize_simple(
+            text=request.text,
+            voice=request.voice,
+            phonetic_map=request.phoneticMapOverride,
+            chat_type=request.chatType
+        )
+    else:
+        raise HTTPException(
+            status_code=500,
+            detail={"error": "Nenhum serviço TTS disponível"}
+        )
+
+    return result.to_dict()
+
+
 @router.post(
     "/functions/v1/text-to-speech-karaoke",
     response_model=TextToSpeechResponse,
@@ -71,16 +183,19 @@ class ErrorResponse(BaseModel):
 
     ElevenLabs is preferred as it provides timestamps directly from synthesis,
     eliminating the ~1-2s latency of Whisper re-alignment.
+
+    Identical requests arriving while one is being synthesized share
+    its result instead of calling the provider again. Phrases from the
+    audio bank catalog (greetings, module intros, error messages) are
+    served pre-synthesized.
     """
 )
-async def text_to_speech_karaoke(request: TextToSpeechRequest):
+async def text_to_speech_karaoke(request: TextToSpeechRequest, http_request: Request):
     """
     Synthesize text to speech with word timestamps.
 
     Maintains compatibility with existing Supabase Edge Function interface.
     """
-    settings = get_settings()
-
     logger.info(
         f"[tts-karaoke] Request: {len(request.text)} chars, "
         f"voice={request.voice}, type={request.chatType}"
@@ -98,58 +213,19 @@ async def text_to_speech_karaoke(request: TextToSpeechRequest):
             detail={"error": "Texto muito longo. Máximo 5000 caracteres."}
         )
 
-    try:
-        # Try ElevenLabs first (preferred - native timestamps)
-        if settings.has_elevenlabs() and settings.tts_provider == "elevenlabs":
-            logger.info("[tts-karaoke] Using ElevenLabs (native timestamps)")
-
-            try:
-                tts_service = ElevenLabsTTSService()
-                result = await tts_service.synthesize_with_timestamps(
-                    text=request.text,
-                    voice=request.voice,
-                    phonetic_map=request.phoneticMapOverride,
-                    speed=request.speed or 1.0
-                )
-
-                logger.info(
-                    f"[tts-karaoke] ElevenLabs success: "
-                    f"{len(result.words or [])} words, "
-                    f"duration={result.duration}"
-                )
-
-                return result.to_dict()
-
-            except Exception as e:
-                logger.warning(f"[tts-karaoke] ElevenLabs failed: {e}")
-                # Fall through to OpenAI
-
-        # Fallback: OpenAI TTS + Whisper
-        if settings.has_openai():
-            logger.info("[tts-karaoke] Using OpenAI TTS + Whisper (fallback)")
-
-            tts_service = OpenAITTSService()
-            result = await tts_service.synthesize_with_timestamps(
-                text=request.text,
-                voice=request.voice,
-                phonetic_map=request.phoneticMapOverride,
-                speed=request.speed or 1.0,
-                chat_type=request.chatType
-            )
-
-            logger.info(
-                f"[tts-karaoke] OpenAI success: "
-                f"{len(result.words or [])} words, "
-                f"duration={result.duration}"
-            )
+    # Static prompts and greetings come pre-synthesized from the audio bank
+    if not request.phoneticMapOverride:
+        entry = lookup_phrase(request.text, request.voice, request.chatType, request.speed)
+        if entry is not None:
+            logger.info("[tts-karaoke] Served from audio bank")
+            return entry.to_dict(request.text)
 
-            return result.to_dict()
+    try:
+        return await _coalesced(http_request, "tts-karaoke", request, lambda: _synthesize_karaoke(request))
 
-        # No TTS service available
-        raise HTTPException(
-            status_code=500,
-            detail={"error": "Nenhum serviço TTS disponível"}
-        )
+    except ClientDisconnected:
+        logger.info("[tts-karaoke] Client disconnected")
+        raise HTTPException(status_code=499, detail={"error": "Cliente desconectado"})
 
     except ValueError as e:
         logger.warning(f"[tts-karaoke] ValueError: {e}")
@@ -177,14 +253,12 @@ async def text_to_speech_karaoke(request: TextToSpeechRequest):
     summary="Synthesize speech (simple)",
     description="Generate speech audio without word timestamps."
 )
-async def text_to_speech_simple(request: TextToSpeechRequest):
+async def text_to_speech_simple(request: TextToSpeechRequest, http_request: Request):
     """
     Simple text-to-speech without timestamps.
 
     Faster than karaoke endpoint when timestamps aren't needed.
     """
-    settings = get_settings()
-
     logger.info(f"[tts-simple] Request: {len(request.text)} chars")
 
     if not request.text or not request.text.strip():
@@ -194,28 +268,11 @@ async def text_to_speech_simple(request: TextToSpeechRequest):
         )
 
     try:
-        if settings.has_elevenlabs():
-            tts_service = ElevenLabsTTSService()
-            result = await tts_service.synthesize_simple(
-                text=request.text,
-                voice=request.voice,
-                phonetic_map=request.phoneticMapOverride
-            )
-        elif settings.has_openai():
-            tts_service = OpenAITTSService()
-            result = await tts_service.synthesize_simple(
-                text=request.text,
-                voice=request.voice,
-                phonetic_map=request.phoneticMapOverride,
-                chat_type=request.chatType
-            )
-        else:
-            raise HTTPException(
-                status_code=500,
-                detail={"error": "Nenhum serviço TTS disponível"}
-            )
+        return await _coalesced(http_request, "tts-simple", request, lambda: _synthesize_simple(request))
 
-        return result.to_dict()
+    except ClientDisconnected:
+        logger.info("[tts-simple] Client disconnected")
+        raise HTTPException(status_code=499, detail={"error": "Cliente desconectado"})
 
     except ValueError as e:
         raise HTTPException(status_code=400, detail={"error": str(e)})
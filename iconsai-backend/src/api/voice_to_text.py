@@ -5,23 +5,33 @@ POST /functions/v1/voice-to-text
 Compatible with existing Supabase Edge Function interface.
 """
 
+import json
 import logging
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel, Field
-
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, Field, ValidationError
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+from ..config import get_settings
+from ..core.single_flight import ClientDisconnected, get_single_flight, request_key, run_until_disconnected
+from ..core.tracing import trace_span
 from ..services.whisper_stt import WhisperSTTService
-from ..utils.audio import decode_base64_audio, validate_and_normalize_mime
+from ..utils.audio import validate_and_normalize_mime
+from ..utils.upload import AudioTooLargeError, AudioUpload, limit_stream, spool_json_audio, spool_raw_audio
 
 logger = logging.getLogger(__name__)
 
+# Multipart bytes allowed beyond the audio limit (boundaries, headers, option fields)
+MULTIPART_OVERHEAD = 64 * 1024
+
 router = APIRouter()
 
 
-class VoiceToTextRequest(BaseModel):
-    """Request body for voice-to-text endpoint."""
-    audio: str = Field(..., description="Base64 encoded audio data")
+class VoiceToTextOptions(BaseModel):
+    """Transcription options (JSON fields, form fields or query parameters)."""
     mimeType: Optional[str] = Field(None, description="MIME type of audio")
     language: Optional[str] = Field("pt", description="Language code")
     includeWordTimestamps: Optional[bool] = Field(
@@ -30,6 +40,11 @@ class VoiceToTextRequest(BaseModel):
     )
 
 
+class VoiceToTextRequest(VoiceToTextOptions):
+    """Request body for voice-to-text endpoint."""
+    audio: str = Field(..., description="Base64 encoded audio data")
+
+
 class WordTimestampResponse(BaseModel):
     """Word with timing information."""
     word: str
@@ -49,11 +64,78 @@ class ErrorResponse(BaseModel):
     error: str
 
 
+def _validate(model: type, data: Dict[str, Any]) -> BaseModel:
+    """Validate parsed fields, reporting errors like FastAPI body validation (422)."""
+    try:
+        return model.model_validate(data)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+
+
+async def _read_upload(request: Request, upload: AudioUpload) -> VoiceToTextOptions:
+    """
+    Stream the request body into upload according to its Content-Type.
+
+    - application/json: {"audio": "<base64>", ...}, decoded while streaming
+    - multipart/form-data: "audio" (or "file") part plus option fields
+    - audio/* or application/octet-stream: raw bytes, options in the query
+
+    Returns:
+        Transcription options
+    """
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+
+    if content_type == "multipart/form-data":
+        max_body = upload.max_size + MULTIPART_OVERHEAD
+        length = int(request.headers.get("content-length") or 0)
+        if length > max_body:
+            raise AudioTooLargeError(f"Áudio muito grande. Máximo {upload.max_size // (1024 * 1024)} MB.")
+
+        # Counted while streaming: chunked bodies have no Content-Length
+        try:
+            form = await MultiPartParser(request.headers, limit_stream(request.stream(), max_body)).parse()
+        except MultiPartException as e:
+            raise HTTPException(status_code=400, detail={"error": e.message})
+
+        part = form.get("audio") or form.get("file")
+        try:
+            if not isinstance(part, UploadFile):
+                raise RequestValidationError([{
+                    "type": "missing", "loc": ("body", "audio"), "msg": "Field required", "input": None,
+                }])
+            fields = {k: v for k, v in form.items() if isinstance(v, str)}
+            fields.setdefault("mimeType", part.content_type)
+            upload.adopt(part.file)
+        finally:
+            # The adopted part now belongs to upload; close any other file parts
+            for _, value in form.multi_items():
+                if isinstance(value, UploadFile) and value is not part:
+                    value.file.close()
+        return _validate(VoiceToTextOptions, fields)
+
+    if content_type.startswith("audio/") or content_type == "application/octet-stream":
+        await spool_raw_audio(request.stream(), upload)
+        fields = dict(request.query_params)
+        if content_type != "application/octet-stream":
+            fields.setdefault("mimeType", content_type)
+        return _validate(VoiceToTextOptions, fields)
+
+    try:
+        fields = await spool_json_audio(request.stream(), upload)
+    except json.JSONDecodeError as e:
+        raise RequestValidationError([{
+            "type": "json_invalid", "loc": ("body", e.pos), "msg": "JSON decode error",
+            "input": {}, "ctx": {"error": e.msg},
+        }])
+    return _validate(VoiceToTextRequest, fields)
+
+
 @router.post(
     "/functions/v1/voice-to-text",
     response_model=VoiceToTextResponse,
     responses={
         400: {"model": ErrorResponse, "description": "Bad request"},
+        413: {"model": ErrorResponse, "description": "Audio too large"},
         429: {"model": ErrorResponse, "description": "Rate limit"},
         500: {"model": ErrorResponse, "description": "Server error"},
     },
@@ -65,72 +147,137 @@ class ErrorResponse(BaseModel):
 
     When includeWordTimestamps is true, returns word-level timing
     for karaoke synchronization.
-    """
+
+    The body is streamed into a spooled buffer (memory, then a temp
+    file) and may be sent as JSON with base64 audio (legacy), as
+    multipart/form-data with an "audio" file part, or as raw audio
+    bytes (Content-Type audio/*) with options in the query string.
+
+    Identical uploads with the same options arriving while one is being
+    transcribed share its result.
+    """,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": VoiceToTextRequest.model_json_schema()},
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["audio"],
+                        "properties": {
+                            "audio": {"type": "string", "format": "binary"},
+                            **VoiceToTextOptions.model_json_schema()["properties"],
+                        },
+                    }
+                },
+                "audio/*": {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
 )
-async def voice_to_text(request: VoiceToTextRequest):
+async def voice_to_text(request: Request):
     """
     Transcribe audio to text.
 
     Maintains compatibility with existing Supabase Edge Function interface.
     """
-    logger.info(
-        f"[voice-to-text] Request: mimeType={request.mimeType}, "
-        f"timestamps={request.includeWordTimestamps}"
+    settings = get_settings()
+    upload = AudioUpload(
+        max_size=settings.audio_upload_max_mb * 1024 * 1024,
+        max_memory=settings.audio_spool_memory_kb * 1024,
     )
+    handed_off = False
 
     try:
-        # Decode base64 audio
-        audio_bytes = decode_base64_audio(request.audio)
+        # Stream the body into the spool (base64 is decoded on the fly)
+        with trace_span("audio.read_body", content_type=request.headers.get("content-type", "")) as span:
+            options = await _read_upload(request, upload)
+            span.set_attribute("audio_bytes", upload.size)
+
+        logger.info(
+            f"[voice-to-text] Request: mimeType={options.mimeType}, "
+            f"timestamps={options.includeWordTimestamps}"
+        )
 
-        if len(audio_bytes) < 1000:
+        if upload.size < 1000:
             raise HTTPException(
                 status_code=400,
                 detail={"error": "Áudio muito curto. Grave por mais tempo."}
             )
 
-        logger.info(f"[voice-to-text] Audio size: {len(audio_bytes)} bytes")
+        logger.info(f"[voice-to-text] Audio size: {upload.size} bytes")
 
         # Validate and normalize MIME type
-        mime_type, extension = validate_and_normalize_mime(
-            request.mimeType,
-            audio_bytes
-        )
+        with trace_span("audio.sniff_mime", declared=options.mimeType or "") as span:
+            mime_type, extension = validate_and_normalize_mime(
+                options.mimeType,
+                upload.head
+            )
+            span.set_attribute("mime_type", mime_type)
 
         logger.info(f"[voice-to-text] Format: {mime_type} (.{extension})")
 
         # Initialize STT service
         stt_service = WhisperSTTService()
 
-        # Transcribe with fallback
-        result = await stt_service.transcribe_with_fallback(
-            audio_bytes=audio_bytes,
-            mime_type=mime_type,
-            language=request.language or "pt",
-            include_word_timestamps=request.includeWordTimestamps or False
-        )
+        async def transcribe():
+            # Owns the upload from here on: a coalesced call may outlive this request
+            try:
+                with trace_span("stt.transcribe", audio_bytes=upload.size):
+                    return await stt_service.transcribe_with_fallback(
+                        audio_file=upload.file,
+                        mime_type=mime_type,
+                        language=options.language or "pt",
+                        include_word_timestamps=options.includeWordTimestamps or False
+                    )
+            finally:
+                upload.close()
+
+        def start():
+            nonlocal handed_off
+            handed_off = True
+            return transcribe()
+
+        # Transcribe with fallback (identical in-flight uploads share one call)
+        if settings.coalesce_requests:
+            key = request_key(
+                "voice-to-text", upload.digest, mime_type,
+                options.language or "pt", bool(options.includeWordTimestamps)
+            )
+            flights = get_single_flight("voice-to-text")
+            result = await run_until_disconnected(request, flights.run(key, start))
+        else:
+            result = await start()
 
         logger.info(f"[voice-to-text] Success: {result.text[:50]}...")
 
         # Build response
-        response_data = {"text": result.text}
+        with trace_span("response.build"):
+            response_data = {"text": result.text}
 
-        if result.words:
-            response_data["words"] = [
-                {"word": w.word, "start": w.start, "end": w.end}
-                for w in result.words
-            ]
+            if result.words:
+                response_data["words"] = result.words.to_list()
 
-        if result.duration is not None:
-            response_data["duration"] = result.duration
+            if result.duration is not None:
+                response_data["duration"] = result.duration
 
         return response_data
 
+    except AudioTooLargeError as e:
+        logger.warning(f"[voice-to-text] {e}")
+        raise HTTPException(status_code=413, detail={"error": str(e)})
+
+    except ClientDisconnected:
+        logger.info("[voice-to-text] Client disconnected")
+        raise HTTPException(status_code=499, detail={"error": "Cliente desconectado"})
+
     except ValueError as e:
         # User-facing errors
         logger.warning(f"[voice-to-text] ValueError: {e}")
         raise HTTPException(status_code=400, detail={"error": str(e)})
 
-    except HTTPException:
+    except (HTTPException, RequestValidationError):
         raise
 
     except Exception as e:
@@ -139,3 +286,7 @@ async def voice_to_text(request: VoiceToTextRequest):
             status_code=500,
             detail={"error": "Erro interno no servidor"}
         )
+
+    finally:
+        if not handed_off:
+            upload.close()
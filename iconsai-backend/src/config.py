@@ -42,6 +42,63 @@ class Settings(BaseSettings):
 
     # Feature Flags
     tts_provider: str = "elevenlabs"  # elevenlabs or openai
+    coalesce_requests: bool = True  # Identical in-flight TTS/STT requests share one upstream call
+
+    # Pre-synthesized audio bank (static prompts and greetings)
+    audio_bank_enabled: bool = True  # Serve exact catalog matches from AUDIO_BANK_DIR
+    audio_bank_dir: str = "audio_bank"
+    audio_bank_catalog: str = ""  # Phrase catalog JSON; empty uses src/data/audio_bank_catalog.json
+    audio_bank_build_on_boot: bool = False  # Render new/changed catalog phrases in the background at startup
+
+    # Session storage
+    session_backend: str = "memory"  # memory or redis
+    redis_url: str = ""
+    session_ttl_seconds: int = 86400
+    session_max_messages: int = 200
+    session_memory_budget_mb: int = 64
+    sync_session_ttl_seconds: int = 3600
+    session_sweep_interval_seconds: float = 60.0
+
+    # Chat context
+    chat_context_max_tokens: int = 1500  # History budget per request
+    chat_history_limit: int = 50  # Messages loaded from SessionManager
+
+    # Chat response cache
+    chat_cache_enabled: bool = True
+    chat_cache_max_entries: int = 500  # Per module
+    chat_cache_similarity_threshold: float = 0.0  # Paraphrase matching; 0 disables, try 0.95
+
+    # Audio uploads (voice-to-text)
+    audio_upload_max_mb: int = 25  # Whisper API limit
+    audio_spool_memory_kb: int = 1024  # Larger uploads spill to a temp file
+    audio_probe_ffprobe: bool = True  # ffprobe for headers the local probe does not recognize
+    audio_convert: bool = True  # Remux/transcode with ffmpeg formats Whisper rejects
+    audio_compress: str = "off"  # off, opus or flac: re-encode to 16 kHz mono before upload
+    audio_compress_min_kb: int = 256  # Smaller uploads are sent as is (see bench_audio_compress)
+    audio_transcode_workers: int = 2  # Concurrent ffmpeg processes
+    audio_trim_silence: str = "off"  # off, edges (leading/trailing) or spans (also long pauses)
+    audio_trim_max_gap_ms: int = 1000  # In spans mode, longer pauses are shortened
+    audio_trim_max_seconds: float = 300.0  # Longer uploads are sent untrimmed
+
+    # Batch STT backend (voice-to-text); the local model is the realtime one below
+    stt_backend: str = "api"  # api, local, or auto (local for short clips while the queue has room)
+    stt_local_max_seconds: float = 30.0  # Longer clips go to the API in auto mode
+    stt_local_workers: int = 1  # Inference threads shared with realtime STT
+    stt_local_max_queue: int = 2  # Batch jobs waiting for a thread before spilling to the API
+    stt_chunk_min_seconds: float = 120.0  # Longer recordings are split at pauses and transcribed in parallel (0 disables)
+    stt_chunk_max_seconds: float = 60.0  # Upper bound per chunk
+    stt_chunk_concurrency: int = 4  # Chunks in flight per recording
+
+    # Realtime STT (faster-whisper)
+    realtime_stt_model_size: str = "base"  # tiny, base, small, medium, large-v3
+    realtime_stt_device: str = "auto"  # auto, cpu or cuda
+    realtime_stt_compute_type: str = "auto"  # auto, int8, float16 or float32
+
+    # Tracing
+    tracing_exporter: str = "none"  # none, file or otlp
+    tracing_file_path: str = "traces.jsonl"
+    tracing_otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    tracing_sample_rate: float = 0.01  # Requests without a sampled traceparent
 
     # Logging
     log_level: str = "INFO"
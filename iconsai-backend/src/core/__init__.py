@@ -1,8 +1,14 @@
 # Core module
 from .sync_coordinator import SyncCoordinator
 from .session_manager import SessionManager
+from .session_store import SessionStore, InMemorySessionStore, RedisSessionStore
+from .session_sweeper import SessionSweeper
 
 __all__ = [
     "SyncCoordinator",
     "SessionManager",
+    "SessionStore",
+    "InMemorySessionStore",
+    "RedisSessionStore",
+    "SessionSweeper",
 ]
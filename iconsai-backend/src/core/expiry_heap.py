@@ -0,0 +1,68 @@
+"""
+Expiry heap for idle-session eviction.
+
+Min-heap of (last_activity, key) with lazy updates: activity does not
+touch the heap. When an entry reaches the top, its owner's current
+last_activity is checked; if the session was active since, the entry is
+pushed back with the new time. Each key has at most one entry, and each
+sweep costs O(log n) per popped entry instead of a scan of all sessions.
+"""
+
+import heapq
+from typing import Callable, Hashable, List, Optional, Set, Tuple
+
+
+class ExpiryHeap:
+    """Min-heap of keys ordered by last activity time."""
+
+    def __init__(self):
+        """Initialize empty heap."""
+        self._heap: List[Tuple[float, Hashable]] = []
+        self._scheduled: Set[Hashable] = set()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._scheduled
+
+    def schedule(self, key: Hashable, last_activity: float):
+        """Track a key. No-op if the key is already tracked."""
+        if key in self._scheduled:
+            return
+        self._scheduled.add(key)
+        heapq.heappush(self._heap, (last_activity, key))
+
+    def pop_stale(
+        self,
+        cutoff: float,
+        get_last_activity: Callable[[Hashable], Optional[float]],
+    ) -> List[Hashable]:
+        """
+        Pop keys whose last activity is older than cutoff.
+
+        Args:
+            cutoff: Keys last active before this time are stale
+            get_last_activity: Current last_activity for a key, or None
+                if the key no longer exists
+
+        Returns:
+            Stale keys (no longer tracked by the heap)
+        """
+        stale: List[Hashable] = []
+
+        while self._heap and self._heap[0][0] < cutoff:
+            _, key = heapq.heappop(self._heap)
+            last_activity = get_last_activity(key)
+
+            if last_activity is None:
+                # Removed elsewhere (explicit end, memory budget)
+                self._scheduled.discard(key)
+            elif last_activity < cutoff:
+                self._scheduled.discard(key)
+                stale.append(key)
+            else:
+                # Active since it was scheduled: re-queue at its real time
+                heapq.heappush(self._heap, (last_activity, key))
+
+        return stale
@@ -0,0 +1,208 @@
+"""
+ASGI middleware for per-route HTTP and WebSocket metrics.
+
+Measures latency, in-flight requests, request/response bytes and status
+codes per (method, route template), and active WebSocket sessions per
+route. Stats are preaggregated in plain objects mutated on the event loop
+(no locks, no label formatting per request) and rendered only when
+/metrics is scraped.
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import EXPORT_QUANTILES, LogLinearHistogram, MetricsRegistry, format_labels, format_value
+
+# Requests that match no route share one label to bound cardinality
+UNMATCHED_ROUTE = "unmatched"
+
+
+class _RouteStats:
+    """Preaggregated counters for one (method, route)."""
+
+    __slots__ = ("latency", "statuses", "request_bytes", "response_bytes")
+
+    def __init__(self):
+        self.latency = LogLinearHistogram(scale=1e6)
+        self.statuses: Dict[int, int] = {}
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+class HttpMetrics:
+    """
+    Per-route request statistics.
+
+    Only touched from the event loop, so updates need no locking.
+    """
+
+    def __init__(self):
+        """Initialize empty stats."""
+        self.routes: Dict[Tuple[str, str], _RouteStats] = {}
+        self.in_flight = 0
+        self.websockets: Dict[str, int] = {}
+
+    def record(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        elapsed: float,
+        request_bytes: int,
+        response_bytes: int,
+    ):
+        """Add one finished request."""
+        stats = self.routes.get((method, route))
+        if stats is None:
+            stats = self.routes[(method, route)] = _RouteStats()
+        stats.latency.record(elapsed)
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.request_bytes += request_bytes
+        stats.response_bytes += response_bytes
+
+    def render(self) -> str:
+        """Render stats in Prometheus text format."""
+        lines: List[str] = [
+            "# HELP iconsai_http_requests_in_flight HTTP requests being served.",
+            "# TYPE iconsai_http_requests_in_flight gauge",
+            f"iconsai_http_requests_in_flight {self.in_flight}",
+            "# HELP iconsai_websocket_sessions_active Open WebSocket connections.",
+            "# TYPE iconsai_websocket_sessions_active gauge",
+        ]
+        for route, count in sorted(self.websockets.items()):
+            lines.append(f"iconsai_websocket_sessions_active{format_labels((('route', route),))} {count}")
+
+        routes = sorted(self.routes.items())
+
+        lines.append("# HELP iconsai_http_requests_total HTTP requests by status code.")
+        lines.append("# TYPE iconsai_http_requests_total counter")
+        for (method, route), stats in routes:
+            for status, count in sorted(stats.statuses.items()):
+                labels = format_labels((("method", method), ("route", route), ("status", str(status))))
+                lines.append(f"iconsai_http_requests_total{labels} {count}")
+
+        lines.append("# HELP iconsai_http_request_duration_seconds HTTP request latency (until the response body is sent).")
+        lines.append("# TYPE iconsai_http_request_duration_seconds summary")
+        for (method, route), stats in routes:
+            key = (("method", method), ("route", route))
+            for q in EXPORT_QUANTILES:
+                labels = format_labels(key, [("quantile", str(q))])
+                lines.append(f"iconsai_http_request_duration_seconds{labels} {format_value(stats.latency.quantile(q))}")
+            lines.append(f"iconsai_http_request_duration_seconds_sum{format_labels(key)} {format_value(stats.latency.total)}")
+            lines.append(f"iconsai_http_request_duration_seconds_count{format_labels(key)} {stats.latency.count}")
+
+        for name, attr, help_text in (
+            ("iconsai_http_request_bytes_total", "request_bytes", "HTTP request body bytes received."),
+            ("iconsai_http_response_bytes_total", "response_bytes", "HTTP response body bytes sent."),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (method, route), stats in routes:
+                labels = format_labels((("method", method), ("route", route)))
+                lines.append(f"{name}{labels} {getattr(stats, attr)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _route_path(scope: dict) -> str:
+    """Route template set by the router (e.g. /functions/v1/chat-router)."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware feeding HttpMetrics.
+
+    Wraps receive/send to count body bytes and capture the status code;
+    streaming responses are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app, metrics: Optional[HttpMetrics] = None):
+        """
+        Initialize middleware.
+
+        Args:
+            app: Wrapped ASGI application
+            metrics: Stats to update (defaults to the global instance)
+        """
+        self.app = app
+        self.metrics = metrics or get_http_metrics()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        status = 500
+        request_bytes = 0
+        response_bytes = 0
+
+        async def receive_wrapper():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            metrics.record(
+                scope["method"],
+                _route_path(scope),
+                status,
+                time.perf_counter() - start,
+                request_bytes,
+                response_bytes,
+            )
+
+    async def _websocket(self, scope, receive, send):
+        """Count open WebSocket sessions per route."""
+        websockets = self.metrics.websockets
+        route: Optional[str] = None
+
+        async def send_wrapper(message):
+            nonlocal route
+            if message["type"] == "websocket.accept" and route is None:
+                route = _route_path(scope)
+                websockets[route] = websockets.get(route, 0) + 1
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if route is not None:
+                websockets[route] -= 1
+
+
+def register_http_metrics(registry: MetricsRegistry, metrics: Optional[HttpMetrics] = None):
+    """Add HTTP stats to a registry's /metrics output."""
+    registry.add_collector((metrics or get_http_metrics()).render)
+
+
+# Global HTTP metrics instance
+_http_metrics: Optional[HttpMetrics] = None
+
+
+def get_http_metrics() -> HttpMetrics:
+    """Get global HTTP metrics instance."""
+    global _http_metrics
+    if _http_metrics is None:
+        _http_metrics = HttpMetrics()
+    return _http_metrics
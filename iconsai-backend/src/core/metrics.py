@@ -0,0 +1,256 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Counters, gauges and HDR-style histograms keyed by label sets. Histograms
+use log-linear buckets (fixed relative error, O(1) record, sparse
+storage) and are exported as Prometheus summaries with precomputed
+quantiles, so one series stays small regardless of the value range.
+"""
+
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Histogram resolution when a metric is not described (1/1000 of a unit)
+DEFAULT_SCALE = 1e3
+
+# Quantiles exported for every histogram
+EXPORT_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+class LogLinearHistogram:
+    """
+    HDR-style histogram.
+
+    Values are scaled to integers (e.g. seconds * 1e6 for microsecond
+    resolution). Below 2**precision_bits every integer has its own bucket;
+    above, each power of two is split into 2**(precision_bits - 1) equal
+    buckets, bounding the relative error to 2**-(precision_bits - 1).
+    """
+
+    __slots__ = ("scale", "precision_bits", "_sub_count", "_half", "counts", "count", "total", "max")
+
+    def __init__(self, scale: float = 1.0, precision_bits: int = 7):
+        """
+        Initialize histogram.
+
+        Args:
+            scale: Multiplier applied before bucketing (1e6 for seconds -> us)
+            precision_bits: Sub-bucket bits (7 gives < 1.6% relative error)
+        """
+        self.scale = scale
+        self.precision_bits = precision_bits
+        self._sub_count = 1 << precision_bits
+        self._half = self._sub_count >> 1
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _index(self, n: int) -> int:
+        if n < self._sub_count:
+            return n
+        shift = n.bit_length() - self.precision_bits
+        return self._sub_count + (shift - 1) * self._half + ((n >> shift) - self._half)
+
+    def _bounds(self, index: int) -> Tuple[int, int]:
+        """Integer range [low, high) covered by a bucket."""
+        if index < self._sub_count:
+            return index, index + 1
+        shift = (index - self._sub_count) // self._half + 1
+        sub = (index - self._sub_count) % self._half + self._half
+        return sub << shift, (sub + 1) << shift
+
+    def record(self, value: float, count: int = 1):
+        """Record a value (negative values count as 0)."""
+        value = max(0.0, value)
+        index = self._index(int(value * self.scale))
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """
+        Value at quantile q (0-1), within the bucket's relative error.
+
+        Returns:
+            Bucket midpoint in original units (0.0 when empty)
+        """
+        if not self.count:
+            return 0.0
+
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                low, high = self._bounds(index)
+                return min((low + high - 1) / 2 / self.scale, self.max)
+        return self.max
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    if not labels:
+        return ()
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    """Format a label set as {k="v",...} (empty string when no labels)."""
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def format_value(value: float) -> str:
+    """Format a sample value (integers without a decimal point)."""
+    if math.isfinite(value) and value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    Registry of named metrics.
+
+    Metrics are created on first use; call describe() to attach HELP text
+    and the type. Thread-safe (recording may happen from worker threads).
+    """
+
+    def __init__(self):
+        """Initialize empty registry."""
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._scales: Dict[str, float] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauge_callbacks: Dict[str, Callable[[], float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, LogLinearHistogram]] = {}
+        self._collectors: List[Callable[[], str]] = []
+
+    def describe(self, name: str, metric_type: str, help_text: str, scale: float = DEFAULT_SCALE):
+        """
+        Register HELP/TYPE for a metric.
+
+        Args:
+            name: Metric name
+            metric_type: counter, gauge or summary (histograms)
+            help_text: Description
+            scale: Histogram resolution multiplier (values are bucketed
+                as int(value * scale))
+        """
+        self._meta[name] = (metric_type, help_text)
+        self._scales[name] = scale
+
+    def inc(self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None):
+        """Increment a counter."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        """Set a gauge value."""
+        key = _label_key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def add_gauge(self, name: str, delta: float, labels: Optional[Dict[str, str]] = None):
+        """Add to a gauge value."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._gauges.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + delta
+
+    def gauge_callback(self, name: str, callback: Callable[[], float]):
+        """Register a gauge whose value is read at scrape time."""
+        self._gauge_callbacks[name] = callback
+
+    def add_collector(self, collector: Callable[[], str]):
+        """Register a callable returning preformatted exposition text."""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        """Record a value in a histogram."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = LogLinearHistogram(scale=self._scales.get(name, DEFAULT_SCALE))
+                series[key] = histogram
+            histogram.record(value)
+
+    def get_counter(self, name: str, labels: Optional[Dict[str, str]] = None) -> float:
+        """Current counter value (0 if never incremented)."""
+        return self._counters.get(name, {}).get(_label_key(labels), 0.0)
+
+    def get_histogram(self, name: str, labels: Optional[Dict[str, str]] = None) -> Optional[LogLinearHistogram]:
+        """Histogram for a label set, if any value was recorded."""
+        return self._histograms.get(name, {}).get(_label_key(labels))
+
+    def _header(self, lines: List[str], name: str, default_type: str):
+        metric_type, help_text = self._meta.get(name, (default_type, ""))
+        if help_text:
+            lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text format (version 0.0.4)."""
+        lines: List[str] = []
+
+        gauge_values: Dict[str, float] = {}
+        for name, callback in self._gauge_callbacks.items():
+            try:
+                gauge_values[name] = float(callback())
+            except Exception:
+                continue
+
+        with self._lock:
+            for name in sorted(self._counters):
+                self._header(lines, name, "counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{format_labels(key)} {format_value(value)}")
+
+            for name in sorted(set(self._gauges) | set(gauge_values)):
+                self._header(lines, name, "gauge")
+                if name in gauge_values:
+                    lines.append(f"{name} {format_value(gauge_values[name])}")
+                for key, value in sorted(self._gauges.get(name, {}).items()):
+                    lines.append(f"{name}{format_labels(key)} {format_value(value)}")
+
+            for name in sorted(self._histograms):
+                self._header(lines, name, "summary")
+                for key, histogram in sorted(self._histograms[name].items()):
+                    for q in EXPORT_QUANTILES:
+                        value = histogram.quantile(q)
+                        lines.append(f"{name}{format_labels(key, [('quantile', str(q))])} {format_value(value)}")
+                    lines.append(f"{name}_sum{format_labels(key)} {format_value(histogram.total)}")
+                    lines.append(f"{name}_count{format_labels(key)} {histogram.count}")
+
+        text = "\n".join(lines) + "\n"
+        for collector in self._collectors:
+            text += collector()
+        return text
+
+
+# Global registry instance
+_metrics: Optional[MetricsRegistry] = None
+
+
+def get_metrics() -> MetricsRegistry:
+    """Get global metrics registry instance."""
+    global _metrics
+    if _metrics is None:
+        _metrics = MetricsRegistry()
+    return _metrics
@@ -2,76 +2,42 @@
 Session Manager for PWA Voice Sessions.
 
 Manages user sessions and conversation history.
-This is a simple in-memory implementation.
-For production, integrate with Supabase or Redis.
+Storage is pluggable (see session_store.py): in-memory by default,
+Redis for multi-worker deployments.
 """
 
-import time
-from dataclasses import dataclass, field
 from typing import Dict, List, Optional
 import logging
 import uuid
 
-logger = logging.getLogger(__name__)
-
-
-@dataclass
-class ConversationMessage:
-    """Single conversation message."""
-    role: str  # "user" or "assistant"
-    content: str
-    timestamp: float = field(default_factory=time.time)
-    module_slug: Optional[str] = None
-
-
-@dataclass
-class Session:
-    """User session state."""
-    session_id: str
-    device_id: str
-    user_name: Optional[str] = None
-    messages: List[ConversationMessage] = field(default_factory=list)
-    created_at: float = field(default_factory=time.time)
-    last_activity: float = field(default_factory=time.time)
-
-    def add_message(
-        self,
-        role: str,
-        content: str,
-        module_slug: Optional[str] = None
-    ):
-        """Add message to conversation history."""
-        self.messages.append(ConversationMessage(
-            role=role,
-            content=content,
-            module_slug=module_slug,
-        ))
-        self.last_activity = time.time()
+from ..config import get_settings
+from .session_store import (
+    ConversationMessage,
+    InMemorySessionStore,
+    RedisSessionStore,
+    Session,
+    SessionStore,
+)
 
-    def get_recent_messages(
-        self,
-        limit: int = 50,
-        module_slug: Optional[str] = None
-    ) -> List[ConversationMessage]:
-        """Get recent messages, optionally filtered by module."""
-        msgs = self.messages
-        if module_slug:
-            msgs = [m for m in msgs if m.module_slug == module_slug]
-        return msgs[-limit:]
+logger = logging.getLogger(__name__)
 
 
 class SessionManager:
     """
     Manages user sessions and conversation history.
 
-    In-memory implementation for development.
-    For production, replace with Supabase/Redis backend.
+    Delegates storage to a SessionStore so several workers can share
+    state through Redis; defaults to the in-memory store.
     """
 
-    def __init__(self):
-        """Initialize session manager."""
-        self.sessions: Dict[str, Session] = {}  # session_id -> Session
-        self.device_sessions: Dict[str, str] = {}  # device_id -> session_id
+    def __init__(self, store: Optional[SessionStore] = None):
+        """
+        Initialize session manager.
+
+        Args:
+            store: Storage backend. If None, uses in-memory storage.
+        """
+        self.store: SessionStore = store or InMemorySessionStore()
 
     def get_or_create_session(self, device_id: str) -> Session:
         """
@@ -84,29 +50,30 @@ class SessionManager:
             Session object
         """
         # Check if device has existing session
-        if device_id in self.device_sessions:
-            session_id = self.device_sessions[device_id]
-            if session_id in self.sessions:
-                session = self.sessions[session_id]
-                session.last_activity = time.time()
+        session_id = self.store.get_session_id(device_id)
+        if session_id:
+            session = self.store.get_session(session_id)
+            if session:
+                self.store.touch(session)
                 return session
 
         # Create new session
         session_id = str(uuid.uuid4())
-        session = Session(
+        session = self.store.create_session(Session(
             session_id=session_id,
             device_id=device_id,
-        )
-
-        self.sessions[session_id] = session
-        self.device_sessions[device_id] = session_id
+        ))
+        if session.session_id != session_id:
+            # Another worker created the device's session first
+            self.store.touch(session)
+            return session
 
         logger.info(f"[SessionManager] Created session {session_id} for device {device_id[:15]}...")
         return session
 
     def get_session(self, session_id: str) -> Optional[Session]:
         """Get session by ID."""
-        return self.sessions.get(session_id)
+        return self.store.get_session(session_id)
 
     def save_message(
         self,
@@ -127,13 +94,16 @@ class SessionManager:
         Returns:
             Message ID (for database compatibility)
         """
-        session = self.sessions.get(session_id)
-        if not session:
+        message = ConversationMessage(
+            role=role,
+            content=content,
+            module_slug=module_slug,
+        )
+
+        if not self.store.append_message(session_id, message):
             logger.warning(f"[SessionManager] Session not found: {session_id}")
             return None
 
-        session.add_message(role, content, module_slug)
-
         # Return fake message ID for compatibility
         return str(uuid.uuid4())
 
@@ -155,7 +125,9 @@ class SessionManager:
             Tuple of (session_id, user_name, messages)
         """
         session = self.get_or_create_session(device_id)
-        messages = session.get_recent_messages(limit, module_slug)
+        user_name, messages = self.store.get_recent(
+            session.session_id, limit, module_slug
+        )
 
         # Convert to dict format
         history = [
@@ -163,13 +135,11 @@ class SessionManager:
             for m in messages
         ]
 
-        return session.session_id, session.user_name, history
+        return session.session_id, user_name, history
 
     def set_user_name(self, session_id: str, name: str):
         """Set user name for session."""
-        session = self.sessions.get(session_id)
-        if session:
-            session.user_name = name
+        if self.store.set_user_name(session_id, name):
             logger.info(f"[SessionManager] Set user name: {name}")
 
     def detect_and_save_name(
@@ -222,20 +192,23 @@ class SessionManager:
         Returns:
             Number of sessions cleaned up
         """
-        now = time.time()
-        stale = [
-            sid for sid, session in self.sessions.items()
-            if now - session.last_activity > max_age_seconds
-        ]
+        return self.store.cleanup_stale(max_age_seconds)
 
-        for sid in stale:
-            session = self.sessions[sid]
-            if session.device_id in self.device_sessions:
-                del self.device_sessions[session.device_id]
-            del self.sessions[sid]
-            logger.info(f"[SessionManager] Cleaned up stale session: {sid}")
+    def expire_idle_sessions(self, max_age_seconds: float = 86400) -> int:
+        """
+        Evict idle sessions via the store's expiry index (no full scan).
+
+        Args:
+            max_age_seconds: Maximum inactivity before eviction (default 24h)
+
+        Returns:
+            Number of sessions evicted
+        """
+        return self.store.expire_idle(max_age_seconds)
 
-        return len(stale)
+    def session_count(self) -> int:
+        """Number of live sessions in the store."""
+        return self.store.count()
 
 
 # Global session manager instance
@@ -246,5 +219,23 @@ def get_session_manager() -> SessionManager:
     """Get global session manager instance."""
     global _manager
     if _manager is None:
-        _manager = SessionManager()
+        _manager = SessionManager(store=_create_store())
     return _manager
+
+
+def _create_store() -> SessionStore:
+    """Build the storage backend selected in settings."""
+    settings = get_settings()
+
+    if settings.session_backend == "redis":
+        logger.info("[SessionManager] Using Redis session store")
+        return RedisSessionStore(
+            url=settings.redis_url,
+            ttl_seconds=settings.session_ttl_seconds,
+            max_messages=settings.session_max_messages,
+        )
+
+    return InMemorySessionStore(
+        max_messages=settings.session_max_messages,
+        max_bytes=settings.session_memory_budget_mb * 1024 * 1024,
+    )
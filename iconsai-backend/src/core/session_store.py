@@ -0,0 +1,565 @@
+"""
+Storage backends for the Session Manager.
+
+SessionManager delegates persistence to a SessionStore:
+- InMemorySessionStore: process-local dicts (single worker, development)
+- RedisSessionStore: shared Redis storage for multi-worker deployments
+
+Redis layout (all keys expire after ttl_seconds of inactivity):
+- {prefix}:device:{device_id}            -> session_id (bound with SET NX)
+- {prefix}:session:{session_id}          -> hash (device_id, user_name, ...)
+- {prefix}:session:{session_id}:messages -> capped list of JSON messages
+- {prefix}:session:{session_id}:messages:{module_slug} -> same, per module
+- {prefix}:session:{session_id}:modules  -> set of module slugs with a list
+- {prefix}:sessions                      -> sorted set session_id -> last activity
+                                            (no TTL; trimmed by expire_idle)
+"""
+
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .expiry_heap import ExpiryHeap
+
+logger = logging.getLogger(__name__)
+
+
+# Approximate fixed cost of one message entry (object, timestamp, deque slot)
+MESSAGE_OVERHEAD_BYTES = 120
+
+
+@dataclass(slots=True)
+class ConversationMessage:
+    """Single conversation message."""
+    role: str  # "user" or "assistant"
+    content: str
+    timestamp: float = field(default_factory=time.time)
+    module_slug: Optional[str] = None
+
+    def approx_bytes(self) -> int:
+        """Approximate memory held by this message."""
+        return len(self.content) + MESSAGE_OVERHEAD_BYTES
+
+
+@dataclass
+class Session:
+    """
+    User session state.
+
+    History is kept in ring buffers: one for all messages and one per
+    module, each capped at max_messages, so appends are O(1) and recent
+    history is read in O(limit) without filtering.
+    """
+    session_id: str
+    device_id: str
+    user_name: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    last_activity: float = field(default_factory=time.time)
+    max_messages: int = 200
+    messages: Deque[ConversationMessage] = field(init=False, repr=False)
+    module_messages: Dict[str, Deque[ConversationMessage]] = field(init=False, repr=False)
+    approx_bytes: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        self.messages = deque(maxlen=self.max_messages)
+        self.module_messages = {}
+
+    def set_max_messages(self, max_messages: int):
+        """Resize the ring buffers, keeping the most recent messages."""
+        self.max_messages = max_messages
+        self.messages = deque(self.messages, maxlen=max_messages)
+        self.module_messages = {
+            slug: deque(buffer, maxlen=max_messages)
+            for slug, buffer in self.module_messages.items()
+        }
+        self.approx_bytes = sum(m.approx_bytes() for m in self.messages) + sum(
+            m.approx_bytes()
+            for buffer in self.module_messages.values()
+            for m in buffer
+        )
+
+    def _push(self, buffer: Deque[ConversationMessage], message: ConversationMessage) -> int:
+        """Append to a ring buffer, returning the change in approx bytes."""
+        delta = message.approx_bytes()
+        if len(buffer) == buffer.maxlen:
+            delta -= buffer[0].approx_bytes()
+        buffer.append(message)
+        return delta
+
+    def append(self, message: ConversationMessage) -> int:
+        """
+        Append a message to the history.
+
+        Returns:
+            Change in approximate memory use (bytes). Messages are counted
+            once per buffer they are held in.
+        """
+        delta = self._push(self.messages, message)
+
+        if message.module_slug:
+            buffer = self.module_messages.get(message.module_slug)
+            if buffer is None:
+                buffer = deque(maxlen=self.max_messages)
+                self.module_messages[message.module_slug] = buffer
+            delta += self._push(buffer, message)
+
+        self.approx_bytes += delta
+        self.last_activity = time.time()
+        return delta
+
+    def add_message(
+        self,
+        role: str,
+        content: str,
+        module_slug: Optional[str] = None
+    ) -> int:
+        """Add message to conversation history."""
+        return self.append(ConversationMessage(
+            role=role,
+            content=content,
+            module_slug=module_slug,
+        ))
+
+    def get_recent_messages(
+        self,
+        limit: int = 50,
+        module_slug: Optional[str] = None
+    ) -> List[ConversationMessage]:
+        """Get recent messages, optionally filtered by module."""
+        if module_slug:
+            buffer = self.module_messages.get(module_slug)
+            if buffer is None:
+                return []
+        else:
+            buffer = self.messages
+
+        if limit <= 0:
+            return []
+
+        recent = list(islice(reversed(buffer), limit))
+        recent.reverse()
+        return recent
+
+
+class SessionStore(ABC):
+    """
+    Storage backend interface for sessions and conversation history.
+
+    Implementations must be safe to share between requests of a single
+    worker; the Redis implementation is also shared between workers.
+    """
+
+    @abstractmethod
+    def get_session_id(self, device_id: str) -> Optional[str]:
+        """Get the session ID bound to a device, if any."""
+
+    @abstractmethod
+    def get_session(self, session_id: str) -> Optional[Session]:
+        """Load session state (without guaranteeing loaded messages)."""
+
+    @abstractmethod
+    def create_session(self, session: Session) -> Session:
+        """
+        Persist a new session and bind it to its device.
+
+        Returns the session bound to the device: the given one, or one
+        created concurrently for the same device (which wins).
+        """
+
+    @abstractmethod
+    def touch(self, session: Session) -> None:
+        """Mark session as active now."""
+
+    @abstractmethod
+    def append_message(self, session_id: str, message: ConversationMessage) -> bool:
+        """Append a message. Returns False if the session does not exist."""
+
+    @abstractmethod
+    def get_recent(
+        self,
+        session_id: str,
+        limit: int,
+        module_slug: Optional[str] = None
+    ) -> Tuple[Optional[str], List[ConversationMessage]]:
+        """Get (user_name, recent messages) for a session."""
+
+    @abstractmethod
+    def set_user_name(self, session_id: str, name: str) -> bool:
+        """Set the user name. Returns False if the session does not exist."""
+
+    @abstractmethod
+    def cleanup_stale(self, max_age_seconds: float) -> int:
+        """Remove sessions inactive for longer than max_age_seconds."""
+
+    @abstractmethod
+    def expire_idle(self, max_age_seconds: float) -> int:
+        """
+        Evict idle sessions without scanning every session.
+
+        Called periodically by the background sweeper.
+        """
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of live sessions."""
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local session storage (one copy per worker).
+
+    Sessions are kept in least-recently-active order. When the approximate
+    memory of all histories exceeds max_bytes, the most idle sessions are
+    evicted first.
+    """
+
+    def __init__(self, max_messages: int = 200, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize empty storage.
+
+        Args:
+            max_messages: Ring buffer size per session (and per module)
+            max_bytes: Global memory budget for conversation history
+        """
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.evictions = 0
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()  # session_id -> Session
+        self.device_sessions: Dict[str, str] = {}  # device_id -> session_id
+        self._expiry = ExpiryHeap()
+
+    def _remove(self, session_id: str) -> Optional[Session]:
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return None
+        if self.device_sessions.get(session.device_id) == session_id:
+            del self.device_sessions[session.device_id]
+        self.total_bytes -= session.approx_bytes
+        return session
+
+    def _enforce_budget(self):
+        """Evict least recently active sessions until under budget."""
+        # The active session is always last, so it is never evicted
+        while self.total_bytes > self.max_bytes and len(self.sessions) > 1:
+            session_id = next(iter(self.sessions))
+            self._remove(session_id)
+            self.evictions += 1
+            logger.info(f"[SessionStore] Evicted idle session (memory budget): {session_id}")
+
+    def get_session_id(self, device_id: str) -> Optional[str]:
+        session_id = self.device_sessions.get(device_id)
+        if session_id in self.sessions:
+            return session_id
+        return None
+
+    def get_session(self, session_id: str) -> Optional[Session]:
+        return self.sessions.get(session_id)
+
+    def create_session(self, session: Session) -> Session:
+        existing = self.get_session_id(session.device_id)
+        if existing:
+            return self.sessions[existing]
+        if session.max_messages != self.max_messages:
+            session.set_max_messages(self.max_messages)
+        self.sessions[session.session_id] = session
+        self.total_bytes += session.approx_bytes
+        self._expiry.schedule(session.session_id, session.last_activity)
+        self.device_sessions[session.device_id] = session.session_id
+        return session
+
+    def touch(self, session: Session) -> None:
+        session.last_activity = time.time()
+        if session.session_id in self.sessions:
+            self.sessions.move_to_end(session.session_id)
+
+    def append_message(self, session_id: str, message: ConversationMessage) -> bool:
+        session = self.sessions.get(session_id)
+        if not session:
+            return False
+        self.total_bytes += session.append(message)
+        self.sessions.move_to_end(session_id)
+        self._enforce_budget()
+        return True
+
+    def get_recent(
+        self,
+        session_id: str,
+        limit: int,
+        module_slug: Optional[str] = None
+    ) -> Tuple[Optional[str], List[ConversationMessage]]:
+        session = self.sessions.get(session_id)
+        if not session:
+            return None, []
+        return session.user_name, session.get_recent_messages(limit, module_slug)
+
+    def set_user_name(self, session_id: str, name: str) -> bool:
+        session = self.sessions.get(session_id)
+        if not session:
+            return False
+        session.user_name = name
+        return True
+
+    def _last_activity(self, session_id: str) -> Optional[float]:
+        session = self.sessions.get(session_id)
+        return session.last_activity if session else None
+
+    def expire_idle(self, max_age_seconds: float) -> int:
+        cutoff = time.time() - max_age_seconds
+        stale = self._expiry.pop_stale(cutoff, self._last_activity)
+
+        for sid in stale:
+            self._remove(sid)
+            logger.info(f"[SessionStore] Expired idle session: {sid}")
+
+        return len(stale)
+
+    def cleanup_stale(self, max_age_seconds: float) -> int:
+        # Full scan; also catches sessions whose last_activity was moved back
+        now = time.time()
+        stale = [
+            sid for sid, session in self.sessions.items()
+            if now - session.last_activity > max_age_seconds
+        ]
+
+        for sid in stale:
+            self._remove(sid)
+            logger.info(f"[SessionStore] Cleaned up stale session: {sid}")
+
+        return len(stale)
+
+    def count(self) -> int:
+        return len(self.sessions)
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Redis-backed session storage shared by all workers and replicas.
+
+    Messages are kept in capped lists (RPUSH + LTRIM) and every key carries
+    a TTL that is refreshed on activity, so idle sessions expire inside
+    Redis instead of being scanned in Python.
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        url: Optional[str] = None,
+        ttl_seconds: int = 86400,
+        max_messages: int = 200,
+        key_prefix: str = "iconsai",
+    ):
+        """
+        Initialize Redis session storage.
+
+        Args:
+            client: Redis client (redis.Redis compatible). If None, built from url.
+            url: Redis URL, e.g. redis://localhost:6379/0
+            ttl_seconds: Inactivity before a session expires
+            max_messages: Maximum messages kept per list
+            key_prefix: Prefix for all keys
+        """
+        if client is None:
+            if not url:
+                raise ValueError("Redis URL is required for RedisSessionStore")
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError(
+                    "redis not installed. Run: pip install redis"
+                ) from e
+            client = redis.Redis.from_url(url, decode_responses=True)
+
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self.key_prefix = key_prefix
+
+    def _device_key(self, device_id: str) -> str:
+        return f"{self.key_prefix}:device:{device_id}"
+
+    def _session_key(self, session_id: str) -> str:
+        return f"{self.key_prefix}:session:{session_id}"
+
+    def _messages_key(self, session_id: str, module_slug: Optional[str] = None) -> str:
+        key = f"{self._session_key(session_id)}:messages"
+        if module_slug:
+            key = f"{key}:{module_slug}"
+        return key
+
+    def _modules_key(self, session_id: str) -> str:
+        return f"{self._session_key(session_id)}:modules"
+
+    def _index_key(self) -> str:
+        return f"{self.key_prefix}:sessions"
+
+    @staticmethod
+    def _decode(value: Any) -> Optional[str]:
+        if isinstance(value, bytes):
+            return value.decode("utf-8")
+        return value
+
+    @staticmethod
+    def _encode_message(message: ConversationMessage) -> str:
+        return json.dumps({
+            "role": message.role,
+            "content": message.content,
+            "timestamp": message.timestamp,
+            "module_slug": message.module_slug,
+        }, ensure_ascii=False)
+
+    @classmethod
+    def _decode_message(cls, raw: Any) -> ConversationMessage:
+        data = json.loads(cls._decode(raw))
+        return ConversationMessage(
+            role=data["role"],
+            content=data["content"],
+            timestamp=data.get("timestamp", 0.0),
+            module_slug=data.get("module_slug"),
+        )
+
+    def get_session_id(self, device_id: str) -> Optional[str]:
+        return self._decode(self.client.get(self._device_key(device_id)))
+
+    def get_session(self, session_id: str) -> Optional[Session]:
+        data = self.client.hgetall(self._session_key(session_id))
+        if not data:
+            return None
+
+        data = {self._decode(k): self._decode(v) for k, v in data.items()}
+        return Session(
+            session_id=session_id,
+            device_id=data.get("device_id", ""),
+            user_name=data.get("user_name") or None,
+            created_at=float(data.get("created_at", 0)),
+            last_activity=float(data.get("last_activity", 0)),
+        )
+
+    def create_session(self, session: Session) -> Session:
+        session_key = self._session_key(session.session_id)
+        device_key = self._device_key(session.device_id)
+
+        # Hash first, so a worker that reads the device key finds the session
+        pipe = self.client.pipeline()
+        pipe.hset(session_key, mapping={
+            "device_id": session.device_id,
+            "user_name": session.user_name or "",
+            "created_at": session.created_at,
+            "last_activity": session.last_activity,
+        })
+        pipe.expire(session_key, self.ttl_seconds)
+        pipe.set(device_key, session.session_id, ex=self.ttl_seconds, nx=True)
+        _, _, bound = pipe.execute()
+        if bound:
+            self.client.zadd(self._index_key(), {session.session_id: session.last_activity})
+            return session
+
+        # Another worker bound the device first; use its session
+        existing_id = self.get_session_id(session.device_id)
+        existing = self.get_session(existing_id) if existing_id else None
+        if existing is not None:
+            self.client.delete(session_key)
+            return existing
+
+        # Device key outlived its session: take it over
+        pipe = self.client.pipeline()
+        pipe.set(device_key, session.session_id, ex=self.ttl_seconds)
+        pipe.zadd(self._index_key(), {session.session_id: session.last_activity})
+        pipe.execute()
+        return session
+
+    def _refresh(
+        self,
+        pipe: Any,
+        session_id: str,
+        modules: Any,
+        device_id: Optional[str] = None
+    ) -> float:
+        """Queue last_activity update and TTL refresh of every session key on a pipeline."""
+        now = time.time()
+        session_key = self._session_key(session_id)
+        pipe.hset(session_key, "last_activity", now)
+        pipe.zadd(self._index_key(), {session_id: now})
+        keys = [session_key, self._messages_key(session_id), self._modules_key(session_id)]
+        keys += [self._messages_key(session_id, self._decode(slug)) for slug in modules]
+        if device_id:
+            keys.append(self._device_key(device_id))
+        for key in keys:
+            pipe.expire(key, self.ttl_seconds)
+        return now
+
+    def touch(self, session: Session) -> None:
+        modules = self.client.smembers(self._modules_key(session.session_id))
+        pipe = self.client.pipeline()
+        session.last_activity = self._refresh(pipe, session.session_id, modules, session.device_id)
+        pipe.execute()
+
+    def append_message(self, session_id: str, message: ConversationMessage) -> bool:
+        pipe = self.client.pipeline()
+        pipe.exists(self._session_key(session_id))
+        pipe.smembers(self._modules_key(session_id))
+        exists, modules = pipe.execute()
+        if not exists:
+            return False
+
+        encoded = self._encode_message(message)
+        keys = [self._messages_key(session_id)]
+        modules = set(modules)
+        if message.module_slug:
+            keys.append(self._messages_key(session_id, message.module_slug))
+            modules.add(message.module_slug)
+
+        pipe = self.client.pipeline()
+        if message.module_slug:
+            pipe.sadd(self._modules_key(session_id), message.module_slug)
+        for key in keys:
+            pipe.rpush(key, encoded)
+            pipe.ltrim(key, -self.max_messages, -1)
+        self._refresh(pipe, session_id, modules)
+        pipe.execute()
+        return True
+
+    def get_recent(
+        self,
+        session_id: str,
+        limit: int,
+        module_slug: Optional[str] = None
+    ) -> Tuple[Optional[str], List[ConversationMessage]]:
+        if limit <= 0:
+            return self._decode(self.client.hget(self._session_key(session_id), "user_name")) or None, []
+
+        # One round trip for name and messages
+        pipe = self.client.pipeline()
+        pipe.hget(self._session_key(session_id), "user_name")
+        pipe.lrange(self._messages_key(session_id, module_slug), -limit, -1)
+        user_name, raw_messages = pipe.execute()
+
+        return (
+            self._decode(user_name) or None,
+            [self._decode_message(raw) for raw in raw_messages],
+        )
+
+    def set_user_name(self, session_id: str, name: str) -> bool:
+        session_key = self._session_key(session_id)
+        if not self.client.exists(session_key):
+            return False
+        self.client.hset(session_key, "user_name", name)
+        return True
+
+    def cleanup_stale(self, max_age_seconds: float) -> int:
+        # Expiry is handled by Redis TTLs
+        return 0
+
+    def expire_idle(self, max_age_seconds: float) -> int:
+        # Keys expire through Redis TTLs; drop their index entries and report
+        # them, so the sweeper counts sessions Redis expired since the last sweep
+        return self.client.zremrangebyscore(self._index_key(), "-inf", time.time() - self.ttl_seconds)
+
+    def count(self) -> int:
+        # O(log n) on the activity index instead of scanning device keys
+        return self.client.zcount(self._index_key(), time.time() - self.ttl_seconds, "+inf")
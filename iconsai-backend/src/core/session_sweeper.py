@@ -0,0 +1,148 @@
+"""
+Background sweeper for idle sessions.
+
+Periodically evicts idle conversation sessions (SessionManager) and
+clock-sync sessions (SyncCoordinator) using their expiry heaps.
+Started and stopped by the application lifespan in main.py.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from ..config import get_settings
+from .session_manager import SessionManager, get_session_manager
+from .sync_coordinator import SyncCoordinator, get_sync_coordinator
+
+logger = logging.getLogger(__name__)
+
+
+class SessionSweeper:
+    """
+    Runs idle-session eviction on a fixed interval.
+
+    Keeps cumulative counters so eviction can be monitored.
+    """
+
+    def __init__(
+        self,
+        session_manager: SessionManager,
+        sync_coordinator: SyncCoordinator,
+        interval_seconds: float = 60.0,
+        session_ttl_seconds: float = 86400,
+        sync_session_ttl_seconds: float = 3600,
+    ):
+        """
+        Initialize sweeper.
+
+        Args:
+            session_manager: Conversation session manager
+            sync_coordinator: Clock-sync coordinator
+            interval_seconds: Time between sweeps
+            session_ttl_seconds: Inactivity before a conversation session is evicted
+            sync_session_ttl_seconds: Inactivity before a sync session is evicted
+        """
+        self.session_manager = session_manager
+        self.sync_coordinator = sync_coordinator
+        self.interval_seconds = interval_seconds
+        self.session_ttl_seconds = session_ttl_seconds
+        self.sync_session_ttl_seconds = sync_session_ttl_seconds
+
+        self.sweeps = 0
+        self.sessions_evicted = 0
+        self.sync_sessions_evicted = 0
+        self.errors = 0
+        self.last_sweep_ms = 0.0
+
+        self._task: Optional[asyncio.Task] = None
+
+    def sweep(self) -> int:
+        """
+        Run one eviction pass.
+
+        Returns:
+            Number of sessions evicted in this pass
+        """
+        start = time.perf_counter()
+
+        sessions = self.session_manager.expire_idle_sessions(self.session_ttl_seconds)
+        sync_sessions = self.sync_coordinator.expire_idle_sessions(self.sync_session_ttl_seconds)
+
+        self.sweeps += 1
+        self.sessions_evicted += sessions
+        self.sync_sessions_evicted += sync_sessions
+        self.last_sweep_ms = (time.perf_counter() - start) * 1000
+
+        if sessions or sync_sessions:
+            logger.info(
+                f"[SessionSweeper] Evicted {sessions} sessions, "
+                f"{sync_sessions} sync sessions in {self.last_sweep_ms:.1f}ms"
+            )
+
+        return sessions + sync_sessions
+
+    async def _run(self):
+        """Sweep loop."""
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                self.sweep()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"[SessionSweeper] Sweep failed: {e}", exc_info=True)
+
+    def start(self):
+        """Start the background task (must be called inside a running loop)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"[SessionSweeper] Started (interval={self.interval_seconds}s)")
+
+    async def stop(self):
+        """Cancel the background task and wait for it to finish."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("[SessionSweeper] Stopped")
+
+    def is_running(self) -> bool:
+        """Check if the background task is running."""
+        return self._task is not None and not self._task.done()
+
+    def stats(self) -> dict:
+        """Counters for monitoring."""
+        return {
+            "running": self.is_running(),
+            "sweeps": self.sweeps,
+            "sessionsEvicted": self.sessions_evicted,
+            "syncSessionsEvicted": self.sync_sessions_evicted,
+            "errors": self.errors,
+            "lastSweepMs": round(self.last_sweep_ms, 3),
+            "activeSessions": self.session_manager.session_count(),
+            "activeSyncSessions": len(self.sync_coordinator.sessions),
+        }
+
+
+# Global sweeper instance
+_sweeper: Optional[SessionSweeper] = None
+
+
+def get_session_sweeper() -> SessionSweeper:
+    """Get global session sweeper instance."""
+    global _sweeper
+    if _sweeper is None:
+        settings = get_settings()
+        _sweeper = SessionSweeper(
+            session_manager=get_session_manager(),
+            sync_coordinator=get_sync_coordinator(),
+            interval_seconds=settings.session_sweep_interval_seconds,
+            session_ttl_seconds=settings.session_ttl_seconds,
+            sync_session_ttl_seconds=settings.sync_session_ttl_seconds,
+        )
+    return _sweeper
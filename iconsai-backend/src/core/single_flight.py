@@ -0,0 +1,165 @@
+"""
+Single-flight coalescing of identical in-flight requests.
+
+The PWA retries and double-taps, so the same text is often synthesized
+(or the same recording transcribed) twice at the same moment. Callers
+with the same key while a call is running wait for that call instead
+of starting their own; its result or exception fans out to all of them.
+Nothing is cached: the key is forgotten as soon as the call finishes.
+
+The shared call runs as its own task. A caller that goes away stops
+waiting without affecting the others; when the last one goes away the
+upstream call is cancelled.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from starlette.requests import Request
+
+from .metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+SINGLE_FLIGHT_TOTAL = "iconsai_single_flight_total"
+
+# How often a waiting handler checks whether its client is still connected
+DISCONNECT_POLL_INTERVAL = 0.25
+
+get_metrics().describe(
+    SINGLE_FLIGHT_TOTAL, "counter",
+    "Requests by single-flight role: leader (made the call), follower (joined one) or abandoned."
+)
+
+
+class ClientDisconnected(Exception):
+    """The client closed the connection while its request was being served."""
+
+
+def request_key(*parts: Any) -> str:
+    """Stable key for JSON-serializable request parts."""
+    data = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key onto one execution.
+
+    Usage:
+        flights = SingleFlight("tts-karaoke")
+        result = await flights.run(key, lambda: synthesize(text))
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize group.
+
+        Args:
+            name: Label for metrics and logs
+        """
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await the call for key, starting it with factory() if none is running.
+
+        factory is only called by the caller that starts the call, so it
+        may hand over resources (e.g. an upload) to the shared task.
+
+        Args:
+            key: Identity of the request (see request_key)
+            factory: Returns the awaitable doing the work
+
+        Returns:
+            Result of the shared call
+
+        Raises:
+            Whatever the shared call raises
+        """
+        metrics = get_metrics()
+        flight = self._flights.get(key)
+        if flight is None or flight.task.cancelled():
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            metrics.inc(SINGLE_FLIGHT_TOTAL, labels={"name": self.name, "role": "leader"})
+        else:
+            logger.info(f"[SingleFlight] {self.name}: joined in-flight call ({flight.waiters} waiting)")
+            metrics.inc(SINGLE_FLIGHT_TOTAL, labels={"name": self.name, "role": "follower"})
+
+        flight.waiters += 1
+        try:
+            # shield: one caller going away must not cancel the shared call
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                logger.info(f"[SingleFlight] {self.name}: all callers gone, cancelling")
+                metrics.inc(SINGLE_FLIGHT_TOTAL, labels={"name": self.name, "role": "abandoned"})
+                flight.task.cancel()
+                self._forget(key, flight)
+
+
+async def run_until_disconnected(
+    request: Request,
+    awaitable: Awaitable[T],
+    poll_interval: float = DISCONNECT_POLL_INTERVAL
+) -> T:
+    """
+    Await a result, cancelling it if the client disconnects first.
+
+    Args:
+        request: Incoming request (its body must already be consumed)
+        awaitable: Work to wait for
+        poll_interval: Seconds between connection checks
+
+    Returns:
+        Result of awaitable
+
+    Raises:
+        ClientDisconnected: If the client went away
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+# Global groups, one per endpoint
+_flights: Dict[str, SingleFlight] = {}
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Get the single-flight group for an endpoint."""
+    flights: Optional[SingleFlight] = _flights.get(name)
+    if flights is None:
+        flights = _flights[name] = SingleFlight(name)
+    return flights
@@ -11,9 +11,12 @@ Implements:
 import time
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 import logging
 
+from ..services.timestamp_utils import WordTrack
+from .expiry_heap import ExpiryHeap
+
 logger = logging.getLogger(__name__)
 
 
@@ -99,6 +102,7 @@ class SyncCoordinator:
     def __init__(self):
         """Initialize sync coordinator."""
         self.sessions: Dict[str, SyncSession] = {}
+        self._expiry = ExpiryHeap()
 
     def get_or_create_session(self, session_id: str) -> SyncSession:
         """Get existing session or create new one."""
@@ -108,6 +112,7 @@ class SyncCoordinator:
 
         session = self.sessions[session_id]
         session.last_activity = time.time()
+        self._expiry.schedule(session_id, session.last_activity)
         return session
 
     def process_clock_sync(
@@ -160,35 +165,27 @@ class SyncCoordinator:
     def get_adjusted_timestamps(
         self,
         session_id: str,
-        words: List[dict]
+        words: Union[WordTrack, List[dict]]
     ) -> List[dict]:
         """
         Adjust word timestamps with lookahead for latency compensation.
 
         Args:
             session_id: Session identifier
-            words: List of word timestamps (word, start, end)
+            words: WordTrack or list of word timestamps (word, start, end)
 
         Returns:
-            Adjusted word timestamps
+            Adjusted word timestamps, serialized for JSON
         """
         session = self.get_or_create_session(session_id)
 
         if not words:
-            return words
-
-        # Apply lookahead (shift earlier by lookahead_ms)
-        lookahead_sec = session.lookahead_ms / 1000
+            return []
 
-        adjusted = []
-        for w in words:
-            adjusted.append({
-                "word": w["word"],
-                "start": max(0, w["start"] - lookahead_sec),
-                "end": max(0, w["end"] - lookahead_sec),
-            })
+        track = words if isinstance(words, WordTrack) else WordTrack.from_dicts(words)
 
-        return adjusted
+        # Apply lookahead (shift earlier by lookahead_ms)
+        return track.shift(session.lookahead_ms / 1000).to_list()
 
     def start_playback(self, session_id: str) -> dict:
         """Mark session as playing."""
@@ -221,6 +218,29 @@ class SyncCoordinator:
 
         return len(stale)
 
+    def _last_activity(self, session_id: str) -> Optional[float]:
+        session = self.sessions.get(session_id)
+        return session.last_activity if session else None
+
+    def expire_idle_sessions(self, max_age_seconds: float = 3600) -> int:
+        """
+        Evict idle sessions via the expiry heap (no full scan).
+
+        Args:
+            max_age_seconds: Maximum inactivity before eviction
+
+        Returns:
+            Number of sessions evicted
+        """
+        cutoff = time.time() - max_age_seconds
+        stale = self._expiry.pop_stale(cutoff, self._last_activity)
+
+        for sid in stale:
+            del self.sessions[sid]
+            logger.info(f"[SyncCoordinator] Expired idle session: {sid}")
+
+        return len(stale)
+
 
 # Global coordinator instance
 _coordinator: Optional[SyncCoordinator] = None
@@ -0,0 +1,439 @@
+"""
+Lightweight request tracing.
+
+Spans follow the OpenTelemetry data model and are exported as OTLP/JSON,
+either appended to a file (one trace per line) or posted to a local
+collector (OTLP/HTTP, e.g. http://localhost:4318/v1/traces).
+
+Trace context is read from the W3C `traceparent` header: a client that
+sampled a trace is always followed; otherwise traces are sampled at
+TRACING_SAMPLE_RATE. Unsampled requests only pay a context-variable
+lookup per span, and exporting happens on a background thread.
+"""
+
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_HEADER = "traceparent"
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+
+@dataclass(slots=True)
+class Span:
+    """A timed operation within a trace."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    kind: int = SPAN_KIND_INTERNAL
+    start_ns: int = 0
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        """Attach an attribute (str, bool, int or float)."""
+        self.attributes[key] = value
+
+    def to_otlp(self) -> dict:
+        """Span in OTLP/JSON form."""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """Stand-in returned when the current request is not sampled."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class _Trace:
+    """Spans of one sampled trace collected until the root span ends."""
+
+    __slots__ = ("trace_id", "spans", "dropped")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List[Span] = []
+        self.dropped = 0
+
+
+# (trace, current span) for the running request; None when not sampled
+_current: ContextVar[Optional[Tuple[_Trace, Span]]] = ContextVar("iconsai_trace", default=None)
+
+
+def _restore(token, previous: Optional[Tuple[_Trace, Span]]):
+    """Reset the current span; spans closed from another context (e.g. an
+    async generator finalized by the loop) fall back to a plain set."""
+    try:
+        _current.reset(token)
+    except ValueError:
+        _current.set(previous)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """
+    Parse a W3C traceparent header.
+
+    Returns:
+        Tuple of (trace_id, parent_span_id, sampled) or None if invalid
+    """
+    if not header:
+        return None
+    match = _TRACEPARENT.match(header.strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+class SpanExporter(ABC):
+    """
+    Exports finished traces on a background thread.
+
+    Subclasses implement _write(payload). The queue is bounded; traces
+    are dropped (and counted) rather than blocking requests.
+    """
+
+    def __init__(self, max_queue: int = 1000):
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.exported = 0
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def submit(self, payload: dict):
+        """Queue an OTLP/JSON payload for export."""
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            payload = self._queue.get()
+            try:
+                self._write(payload)
+                self.exported += 1
+            except Exception as e:
+                logger.warning(f"[Tracing] Export failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0):
+        """Wait until queued traces are exported (best effort)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    @abstractmethod
+    def _write(self, payload: dict):
+        """Export one payload (runs on the exporter thread)."""
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends one OTLP/JSON trace per line to a file."""
+
+    def __init__(self, path: str, max_queue: int = 1000):
+        self.path = path
+        super().__init__(max_queue)
+
+    def _write(self, payload: dict):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+
+class OtlpHttpExporter(SpanExporter):
+    """Posts OTLP/JSON traces to a collector (OTLP/HTTP)."""
+
+    def __init__(self, endpoint: str, max_queue: int = 1000):
+        import httpx
+
+        self.endpoint = endpoint
+        self._client = httpx.Client(timeout=5.0)
+        super().__init__(max_queue)
+
+    def _write(self, payload: dict):
+        response = self._client.post(self.endpoint, json=payload)
+        response.raise_for_status()
+
+
+class Tracer:
+    """
+    Creates spans for sampled requests and hands finished traces to an exporter.
+
+    Usage:
+        with tracer.start_trace("POST /functions/v1/voice-to-text", traceparent):
+            with trace_span("audio.decode_base64", bytes=n):
+                ...
+    """
+
+    def __init__(
+        self,
+        exporter: Optional[SpanExporter] = None,
+        sample_rate: float = 0.01,
+        service_name: str = "iconsai-backend",
+        max_spans_per_trace: int = 1000,
+    ):
+        """
+        Initialize tracer.
+
+        Args:
+            exporter: Destination for finished traces (None disables tracing)
+            sample_rate: Fraction of requests without a sampled parent to trace
+            service_name: OTLP service.name resource attribute
+            max_spans_per_trace: Cap for long-lived traces (WebSocket sessions)
+        """
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.service_name = service_name
+        self.max_spans_per_trace = max_spans_per_trace
+        self._random = random.Random()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def _new_id(self, bits: int) -> str:
+        return f"{self._random.getrandbits(bits):0{bits // 4}x}"
+
+    @contextmanager
+    def start_trace(
+        self,
+        name: str,
+        traceparent: Optional[str] = None,
+        **attributes: Any,
+    ) -> Iterator[Any]:
+        """
+        Start a root (server) span for a request.
+
+        Follows the client's sampling decision when a valid traceparent is
+        given; otherwise samples at sample_rate.
+
+        Yields:
+            The root Span, or NOOP_SPAN when not sampled
+        """
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+
+        parent = parse_traceparent(traceparent)
+        if parent:
+            trace_id, parent_id, sampled = parent
+        else:
+            sampled = self._random.random() < self.sample_rate
+            trace_id, parent_id = None, None
+
+        if not sampled:
+            yield NOOP_SPAN
+            return
+
+        trace = _Trace(trace_id or self._new_id(128))
+        root = Span(
+            name=name,
+            trace_id=trace.trace_id,
+            span_id=self._new_id(64),
+            parent_id=parent_id,
+            kind=SPAN_KIND_SERVER,
+            start_ns=time.time_ns(),
+            attributes=dict(attributes),
+        )
+        token = _current.set((trace, root))
+        try:
+            yield root
+        except BaseException as e:
+            root.error = type(e).__name__
+            raise
+        finally:
+            root.end_ns = time.time_ns()
+            _restore(token, None)
+            trace.spans.append(root)
+            self._export(trace)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """
+        Time a stage inside the current trace.
+
+        Yields:
+            The child Span, or NOOP_SPAN when the request is not sampled
+        """
+        current = _current.get()
+        if current is None:
+            yield NOOP_SPAN
+            return
+
+        trace, parent = current
+        child = Span(
+            name=name,
+            trace_id=trace.trace_id,
+            span_id=self._new_id(64),
+            parent_id=parent.span_id,
+            start_ns=time.time_ns(),
+            attributes=dict(attributes),
+        )
+        token = _current.set((trace, child))
+        try:
+            yield child
+        except BaseException as e:
+            child.error = type(e).__name__
+            raise
+        finally:
+            child.end_ns = time.time_ns()
+            _restore(token, current)
+            if len(trace.spans) < self.max_spans_per_trace:
+                trace.spans.append(child)
+            else:
+                trace.dropped += 1
+
+    def current_traceparent(self) -> Optional[str]:
+        """traceparent header value for the current span (None if not sampled)."""
+        current = _current.get()
+        if current is None:
+            return None
+        _, span = current
+        return f"00-{span.trace_id}-{span.span_id}-01"
+
+    def _export(self, trace: _Trace):
+        resource = [_otlp_attribute("service.name", self.service_name)]
+        if trace.dropped:
+            resource.append(_otlp_attribute("iconsai.dropped_spans", trace.dropped))
+        self.exporter.submit({
+            "resourceSpans": [{
+                "resource": {"attributes": resource},
+                "scopeSpans": [{
+                    "scope": {"name": "iconsai"},
+                    "spans": [span.to_otlp() for span in trace.spans],
+                }],
+            }]
+        })
+
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware opening a root span per HTTP request or WebSocket session.
+
+    The span is named after the route template once routing is done, and
+    sampled responses carry a traceparent header so clients can correlate.
+    """
+
+    def __init__(self, app, tracer: Optional[Tracer] = None):
+        """
+        Initialize middleware.
+
+        Args:
+            app: Wrapped ASGI application
+            tracer: Tracer to use (defaults to the global instance)
+        """
+        self.app = app
+        self.tracer = tracer or get_tracer()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket") or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope.get("headers", ()):
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        method = scope.get("method", "WS")
+        with self.tracer.start_trace(f"{method} {scope['path']}", traceparent) as root:
+            if root is NOOP_SPAN:
+                await self.app(scope, receive, send)
+                return
+
+            header = f"00-{root.trace_id}-{root.span_id}-01".encode("latin-1")
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    root.set_attribute("http.status_code", message["status"])
+                    message = {**message, "headers": [*message.get("headers", []), (b"traceparent", header)]}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    root.name = f"{method} {route}"
+                    root.set_attribute("http.route", route)
+
+
+def trace_span(name: str, **attributes: Any):
+    """Span in the current trace of the global tracer (no-op if unsampled)."""
+    return get_tracer().span(name, **attributes)
+
+
+# Global tracer instance
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """Get global tracer instance (configured from settings)."""
+    global _tracer
+    if _tracer is None:
+        settings = get_settings()
+        exporter: Optional[SpanExporter] = None
+
+        if settings.tracing_exporter == "file":
+            exporter = FileSpanExporter(settings.tracing_file_path)
+        elif settings.tracing_exporter == "otlp":
+            exporter = OtlpHttpExporter(settings.tracing_otlp_endpoint)
+
+        _tracer = Tracer(exporter=exporter, sample_rate=settings.tracing_sample_rate)
+        if exporter:
+            logger.info(
+                f"[Tracing] Exporting to {settings.tracing_exporter} "
+                f"(sample_rate={settings.tracing_sample_rate})"
+            )
+    return _tracer
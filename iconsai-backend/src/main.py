@@ -12,17 +12,26 @@ Endpoints:
 Change VITE_SUPABASE_URL to point to this server to switch.
 """
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from .config import get_settings
 from .api import voice_to_text_router, text_to_speech_router, chat_router, realtime_voice_router, admin_users_router
 from .core.sync_coordinator import get_sync_coordinator
 from .core.session_manager import get_session_manager
+from .core.http_metrics import MetricsMiddleware, register_http_metrics
+from .core.metrics import get_metrics
+from .core.session_sweeper import get_session_sweeper
+from .core.tracing import TracingMiddleware, get_tracer
+from .services.audio_bank import get_audio_bank, refresh_audio_bank
+from .services.openai_chat import SYSTEM_MESSAGES, get_prompt_cache_stats
+from .services.realtime_stt import get_inference_pool, get_realtime_stt_service
+from .services.response_cache import get_response_cache
 
 # Configure logging
 settings = get_settings()
@@ -33,6 +42,19 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def warm_local_stt():
+    """Load the faster-whisper model so voice-to-text can route short clips to it."""
+    try:
+        await get_realtime_stt_service(
+            model_size=settings.realtime_stt_model_size,
+            device=settings.realtime_stt_device,
+            compute_type=settings.realtime_stt_compute_type,
+        ).initialize()
+        logger.info(f"Local STT ready: {settings.realtime_stt_model_size}")
+    except Exception as e:
+        logger.warning(f"Local STT unavailable, voice-to-text uses the API: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
@@ -45,12 +67,35 @@ async def lifespan(app: FastAPI):
     logger.info(f"Perplexity configured: {settings.has_perplexity()}")
     logger.info(f"Gemini configured: {settings.has_gemini()}")
     logger.info(f"CORS Origins: {settings.cors_origins_list}")
+    logger.info(f"System prompts prebuilt: {len(SYSTEM_MESSAGES)} modules")
+    logger.info(f"STT backend: {settings.stt_backend}")
     logger.info("=" * 50)
 
+    sweeper = get_session_sweeper()
+    sweeper.start()
+
+    warmup = None
+    if settings.stt_backend != "api":
+        warmup = asyncio.create_task(warm_local_stt())
+
+    bank_build = None
+    if settings.audio_bank_enabled:
+        get_audio_bank()
+        if settings.audio_bank_build_on_boot:
+            bank_build = asyncio.create_task(refresh_audio_bank())
+
     yield
 
     # Shutdown
     logger.info("IconsAI Backend Shutting down...")
+    await sweeper.stop()
+    for task in (warmup, bank_build):
+        if task and not task.done():
+            task.cancel()
+
+    tracer = get_tracer()
+    if tracer.exporter:
+        tracer.exporter.flush()
 
 
 # Create FastAPI application
@@ -77,10 +122,27 @@ app.add_middleware(
 )
 
 
+# Request metrics (latency, status, bytes, in-flight, WebSocket sessions)
+app.add_middleware(MetricsMiddleware)
+
+# Root span per request/WebSocket session (sampled; see TRACING_* settings)
+app.add_middleware(TracingMiddleware)
+
+_metrics = get_metrics()
+register_http_metrics(_metrics)
+_metrics.describe("iconsai_sessions_active", "gauge", "Conversation sessions held by SessionManager.")
+_metrics.gauge_callback("iconsai_sessions_active", lambda: get_session_manager().session_count())
+_metrics.describe("iconsai_sync_sessions_active", "gauge", "Clock-sync sessions held by SyncCoordinator.")
+_metrics.gauge_callback("iconsai_sync_sessions_active", lambda: len(get_sync_coordinator().sessions))
+_metrics.describe("iconsai_stt_local_pending", "gauge", "Local STT jobs running or queued on the inference pool.")
+_metrics.gauge_callback("iconsai_stt_local_pending", lambda: get_inference_pool().pending)
+
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
+    response_cache = get_response_cache()
     return {
         "status": "healthy",
         "version": "1.0.0",
@@ -90,10 +152,25 @@ async def health_check():
             "openai": settings.has_openai(),
             "perplexity": settings.has_perplexity(),
             "gemini": settings.has_gemini(),
-        }
+        },
+        "sessions": get_session_sweeper().stats(),
+        "chat": {
+            "promptCache": get_prompt_cache_stats().stats(),
+            "responseCache": response_cache.stats() if response_cache else None,
+        },
     }
 
 
+# Prometheus metrics endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Provider usage, latency and cost metrics in Prometheus text format."""
+    return PlainTextResponse(
+        get_metrics().render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -110,6 +187,7 @@ async def root():
             "realtime_stt_info": "POST /functions/v1/realtime-stt/info",
             "admin_users": "POST/GET/PUT/DELETE /functions/v1/admin/users",
             "health": "GET /health",
+            "metrics": "GET /metrics",
         },
         "docs": "/docs",
     }
@@ -3,13 +3,14 @@ from .whisper_stt import WhisperSTTService
 from .elevenlabs_tts import ElevenLabsTTSService
 from .openai_tts import OpenAITTSService
 from .openai_chat import OpenAIChatService
-from .timestamp_utils import chars_to_words, align_words_to_text
+from .timestamp_utils import WordTrack, chars_to_words, align_words_to_text
 
 __all__ = [
     "WhisperSTTService",
     "ElevenLabsTTSService",
     "OpenAITTSService",
     "OpenAIChatService",
+    "WordTrack",
     "chars_to_words",
     "align_words_to_text",
 ]
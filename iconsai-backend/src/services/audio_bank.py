@@ -0,0 +1,489 @@
+"""
+Pre-synthesized audio bank for static prompts and greetings.
+
+Module intros, greetings and error messages are rendered once from a
+catalog (src/data/audio_bank_catalog.json) through the TTS services and
+stored on disk as two files:
+
+- bank.idx: header plus fixed-size records sorted by key, memory-mapped
+  and binary-searched (no parsing at startup, shared page cache
+  between workers)
+- bank-<digest>.bin: per entry, the audio bytes followed by the word
+  track (float32 starts/ends and the words)
+
+The blob is named after its content and the index header names the
+blob, so replacing bank.idx is the single atomic step that publishes a
+new bank: a reader never pairs an index with another build's blob.
+
+text-to-speech-karaoke serves exact matches (same text, voice, module
+and speed, no phonetic override) from the bank with no upstream call.
+
+Build it at image build time or on boot (AUDIO_BANK_BUILD_ON_BOOT):
+    python -m src.services.audio_bank build
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import get_settings
+from ..core.metrics import get_metrics
+from .timestamp_utils import WordTrack
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG = Path(__file__).resolve().parent.parent / "data" / "audio_bank_catalog.json"
+
+INDEX_FILE = "bank.idx"
+BLOB_PATTERN = "bank-*.bin"
+
+MAGIC = b"IABK"
+VERSION = 2
+# magic, version, entry count, catalog digest, blob digest
+HEADER = struct.Struct("<4sHxxI16s16s")
+# key, blob offset, audio bytes, track bytes, duration
+RECORD = struct.Struct("<16sQIIf")
+KEY_SIZE = 16
+
+# Catalog digest of a bank with missing entries (rebuilt on the next boot)
+INCOMPLETE = b"\0" * 16
+
+# Unreferenced blobs younger than this may belong to a concurrent build
+STALE_BLOB_SECONDS = 3600
+
+AUDIO_BANK_TOTAL = "iconsai_audio_bank_requests_total"
+
+get_metrics().describe(AUDIO_BANK_TOTAL, "counter", "Karaoke TTS requests by audio bank result (hit, miss).")
+
+# (text, voice, chat_type, speed) -> TTS result with audio_base64/audio_mime_type/words/duration
+Synthesizer = Callable[[str, str, str, float], Awaitable]
+
+
+def bank_key(text: str, voice: Optional[str], chat_type: Optional[str], speed: Optional[float]) -> bytes:
+    """Key of a phrase (exact text; voice, module and speed as the endpoint defaults them)."""
+    parts = [text.strip(), (voice or "nova").lower(), chat_type or "home", round(speed or 1.0, 2)]
+    return hashlib.blake2b(json.dumps(parts, ensure_ascii=False).encode("utf-8"), digest_size=KEY_SIZE).digest()
+
+
+@dataclass
+class BankEntry:
+    """Pre-synthesized audio with its word track."""
+    audio: bytes
+    mime_type: str
+    words: WordTrack
+    duration: Optional[float]
+
+    def to_dict(self, text: str) -> dict:
+        """Response body of text-to-speech-karaoke."""
+        return {
+            "audioBase64": base64.b64encode(self.audio).decode("ascii"),
+            "audioMimeType": self.mime_type,
+            "words": self.words.to_list() if len(self.words) else None,
+            "duration": self.duration,
+            "text": text,
+        }
+
+
+def blob_name(blob_digest: bytes) -> str:
+    """File name of the blob with this content digest."""
+    return f"bank-{blob_digest.hex()}.bin"
+
+
+def _pack_track(mime_type: str, words: WordTrack) -> bytes:
+    labels = "\n".join([mime_type, *words.words]).encode("utf-8")
+    return (
+        struct.pack("<I", len(words))
+        + words.starts.astype("<f4").tobytes()
+        + words.ends.astype("<f4").tobytes()
+        + labels
+    )
+
+
+def _unpack_track(data: bytes) -> Tuple[str, WordTrack]:
+    (count,) = struct.unpack_from("<I", data)
+    starts = np.frombuffer(data, dtype="<f4", count=count, offset=4)
+    ends = np.frombuffer(data, dtype="<f4", count=count, offset=4 + 4 * count)
+    mime_type, *words = data[4 + 8 * count:].decode("utf-8").split("\n")
+    return mime_type, WordTrack(words, starts, ends)
+
+
+class AudioBank:
+    """Read-only view of a bank directory (memory-mapped)."""
+
+    def __init__(self, directory: Path):
+        """
+        Open a bank.
+
+        Args:
+            directory: Directory with bank.idx and the blob it names
+
+        Raises:
+            OSError: If the files are missing
+            ValueError: If the index is not a bank of this version
+        """
+        self.directory = Path(directory)
+        self._files = []
+        try:
+            try:
+                self._open()
+            except FileNotFoundError:
+                # The index was replaced and its blob swept while opening
+                self.close()
+                self._open()
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self):
+        self._files = [open(self.directory / INDEX_FILE, "rb")]
+        self._index = mmap.mmap(self._files[0].fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._index) < HEADER.size:
+            raise ValueError(f"{self.directory / INDEX_FILE} is not an audio bank (v{VERSION})")
+        magic, version, self.count, self.catalog_digest, blob_digest = HEADER.unpack_from(self._index)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.directory / INDEX_FILE} is not an audio bank (v{VERSION})")
+
+        self.blob_path = self.directory / blob_name(blob_digest)
+        self._files.append(open(self.blob_path, "rb"))
+        blob_size = os.fstat(self._files[1].fileno()).st_size
+        self._blob = mmap.mmap(self._files[1].fileno(), 0, access=mmap.ACCESS_READ) if blob_size else b""
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _record(self, i: int) -> Tuple[bytes, int, int, int, float]:
+        return RECORD.unpack_from(self._index, HEADER.size + i * RECORD.size)
+
+    def _find(self, key: bytes) -> Optional[int]:
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            start = HEADER.size + mid * RECORD.size
+            probe = self._index[start:start + KEY_SIZE]
+            if probe < key:
+                low = mid + 1
+            elif probe > key:
+                high = mid
+            else:
+                return mid
+        return None
+
+    def get(self, key: bytes) -> Optional[BankEntry]:
+        """Entry for a key from bank_key(), or None."""
+        i = self._find(key)
+        if i is None:
+            return None
+        _, offset, audio_size, track_size, duration = self._record(i)
+        audio = self._blob[offset:offset + audio_size]
+        mime_type, words = _unpack_track(self._blob[offset + audio_size:offset + audio_size + track_size])
+        return BankEntry(audio, mime_type, words, round(duration, 3) if duration >= 0 else None)
+
+    def lookup(
+        self,
+        text: str,
+        voice: Optional[str] = None,
+        chat_type: Optional[str] = None,
+        speed: Optional[float] = None
+    ) -> Optional[BankEntry]:
+        """Entry for an exact phrase, or None."""
+        return self.get(bank_key(text, voice, chat_type, speed))
+
+    def close(self):
+        """Unmap and close the files."""
+        for mapped in (getattr(self, "_index", None), getattr(self, "_blob", None)):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        self._index = self._blob = None
+        for file in self._files:
+            file.close()
+        self._files = []
+
+
+def _write_temp(directory: Path, chunks: List[bytes]) -> Path:
+    """Write chunks to a uniquely named temporary file in directory."""
+    fd, path = tempfile.mkstemp(dir=directory, prefix=".bank-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            for chunk in chunks:
+                file.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return Path(path)
+
+
+def _sweep_blobs(directory: Path, keep: str):
+    """Remove old blobs no longer named by the index (open mappings stay valid)."""
+    cutoff = time.time() - STALE_BLOB_SECONDS
+    for path in directory.glob(BLOB_PATTERN):
+        try:
+            if path.name != keep and path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
+
+
+def write_bank(directory: Path, entries: Dict[bytes, BankEntry], catalog_digest: bytes):
+    """
+    Write entries as a bank.
+
+    The blob is written under its content digest first, then bank.idx is
+    replaced in one os.replace; readers see either the old bank or the
+    new one. Temporary names are unique, so concurrent builds (several
+    workers with AUDIO_BANK_BUILD_ON_BOOT) do not clobber each other and
+    the last index written wins.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    chunks = []
+    records = []
+    offset = 0
+    blob_hash = hashlib.blake2b(digest_size=16)
+    for key in sorted(entries):
+        entry = entries[key]
+        track = _pack_track(entry.mime_type, entry.words)
+        chunks += [entry.audio, track]
+        blob_hash.update(entry.audio)
+        blob_hash.update(track)
+        duration = -1.0 if entry.duration is None else entry.duration
+        records.append(RECORD.pack(key, offset, len(entry.audio), len(track), duration))
+        offset += len(entry.audio) + len(track)
+
+    blob_digest = blob_hash.digest()
+    blob_tmp = _write_temp(directory, chunks)
+    os.replace(blob_tmp, directory / blob_name(blob_digest))
+
+    header = HEADER.pack(MAGIC, VERSION, len(records), catalog_digest, blob_digest)
+    index_tmp = _write_temp(directory, [header, *records])
+    os.replace(index_tmp, directory / INDEX_FILE)
+
+    _sweep_blobs(directory, keep=blob_name(blob_digest))
+
+
+def load_catalog(path: Path) -> Tuple[List[Tuple[str, str, str, float]], bytes]:
+    """
+    Read the phrase catalog.
+
+    Format: {"voices": [...], "speed": 1.0, "modules": {"home": ["Olá!", ...]}}
+
+    Returns:
+        ((text, voice, chat_type, speed) per phrase, catalog digest)
+    """
+    raw = Path(path).read_bytes()
+    catalog = json.loads(raw)
+    voices = catalog.get("voices") or ["nova"]
+    speed = float(catalog.get("speed", 1.0))
+    phrases = [
+        (text, voice, chat_type, speed)
+        for chat_type, texts in catalog.get("modules", {}).items()
+        for text in texts
+        for voice in voices
+    ]
+    # The provider is part of the digest: switching it re-renders the bank
+    digest = hashlib.blake2b(raw + get_settings().tts_provider.encode(), digest_size=16).digest()
+    return phrases, digest
+
+
+async def synthesize_phrase(text: str, voice: str, chat_type: str, speed: float):
+    """Render a phrase with the configured provider (ElevenLabs, else OpenAI TTS + Whisper)."""
+    from .elevenlabs_tts import ElevenLabsTTSService
+    from .openai_tts import OpenAITTSService
+
+    settings = get_settings()
+    if settings.has_elevenlabs() and settings.tts_provider == "elevenlabs":
+        service = ElevenLabsTTSService()
+    elif settings.has_openai():
+        service = OpenAITTSService()
+    else:
+        raise RuntimeError("No TTS provider configured")
+    return await service.synthesize_with_timestamps(text=text, voice=voice, speed=speed, chat_type=chat_type)
+
+
+async def build_audio_bank(
+    catalog_path: Optional[Path] = None,
+    directory: Optional[Path] = None,
+    synthesize: Synthesizer = synthesize_phrase,
+    concurrency: int = 2,
+    force: bool = False
+) -> int:
+    """
+    Render the catalog into a bank.
+
+    Phrases already in the current bank are reused, so only new ones
+    cost upstream calls (force re-renders everything). If some phrases
+    fail, the rest is written and the bank is marked incomplete so the
+    next build retries them.
+
+    Args:
+        catalog_path: Catalog JSON (AUDIO_BANK_CATALOG, else the bundled one)
+        directory: Output directory (AUDIO_BANK_DIR)
+        synthesize: Renders one phrase
+        concurrency: Phrases synthesized at a time
+        force: Ignore the current bank
+
+    Returns:
+        Number of phrases synthesized
+    """
+    settings = get_settings()
+    catalog_path = Path(catalog_path or settings.audio_bank_catalog or DEFAULT_CATALOG)
+    directory = Path(directory or settings.audio_bank_dir)
+    phrases, digest = load_catalog(catalog_path)
+
+    current = None
+    if not force:
+        try:
+            current = AudioBank(directory)
+        except (OSError, ValueError):
+            pass
+
+    entries: Dict[bytes, BankEntry] = {}
+    missing: Dict[bytes, Tuple[str, str, str, float]] = {}
+    try:
+        for phrase in phrases:
+            key = bank_key(*phrase)
+            entry = current.get(key) if current else None
+            if entry is not None:
+                entries[key] = BankEntry(bytes(entry.audio), entry.mime_type, entry.words, entry.duration)
+            else:
+                missing[key] = phrase
+    finally:
+        if current:
+            current.close()
+
+    slots = asyncio.Semaphore(max(1, concurrency))
+    failed = 0
+
+    async def render(key: bytes, phrase: Tuple[str, str, str, float]):
+        nonlocal failed
+        async with slots:
+            try:
+                result = await synthesize(*phrase)
+            except Exception as e:
+                failed += 1
+                logger.warning(f"[AudioBank] Failed to render {phrase[2]}/{phrase[1]} {phrase[0][:40]!r}: {e}")
+                return
+        words = result.words if isinstance(result.words, WordTrack) else WordTrack.from_words(result.words or [])
+        entries[key] = BankEntry(
+            base64.b64decode(result.audio_base64), result.audio_mime_type, words, result.duration
+        )
+
+    await asyncio.gather(*(render(key, phrase) for key, phrase in missing.items()))
+
+    write_bank(directory, entries, INCOMPLETE if failed else digest)
+    logger.info(
+        f"[AudioBank] {len(entries)} phrases in {directory} "
+        f"({len(missing) - failed} synthesized, {len(entries) - len(missing) + failed} reused, {failed} failed)"
+    )
+    return len(missing) - failed
+
+
+def bank_is_current(catalog_path: Optional[Path] = None, directory: Optional[Path] = None) -> bool:
+    """Whether the bank on disk was fully rendered from the current catalog."""
+    settings = get_settings()
+    _, digest = load_catalog(Path(catalog_path or settings.audio_bank_catalog or DEFAULT_CATALOG))
+    try:
+        bank = AudioBank(Path(directory or settings.audio_bank_dir))
+    except (OSError, ValueError):
+        return False
+    try:
+        return bank.catalog_digest == digest
+    finally:
+        bank.close()
+
+
+# Global bank instance (None when no bank has been built)
+_bank: Optional[AudioBank] = None
+_bank_loaded = False
+
+
+def get_audio_bank() -> Optional[AudioBank]:
+    """Get the bank from AUDIO_BANK_DIR, opened on first use."""
+    global _bank, _bank_loaded
+    if not _bank_loaded:
+        _bank_loaded = True
+        settings = get_settings()
+        if settings.audio_bank_enabled:
+            try:
+                _bank = AudioBank(Path(settings.audio_bank_dir))
+                logger.info(f"[AudioBank] Loaded {len(_bank)} phrases from {settings.audio_bank_dir}")
+            except (OSError, ValueError) as e:
+                logger.info(f"[AudioBank] No bank loaded: {e}")
+    return _bank
+
+
+def reload_audio_bank() -> Optional[AudioBank]:
+    """Reopen the bank after a build (the old mapping is released)."""
+    global _bank, _bank_loaded
+    old = _bank
+    _bank, _bank_loaded = None, False
+    bank = get_audio_bank()
+    if old is not None:
+        old.close()
+    return bank
+
+
+def lookup_phrase(
+    text: str,
+    voice: Optional[str],
+    chat_type: Optional[str],
+    speed: Optional[float]
+) -> Optional[BankEntry]:
+    """Bank entry for a karaoke request, counting hits and misses."""
+    bank = get_audio_bank()
+    if bank is None:
+        return None
+    entry = bank.lookup(text, voice, chat_type, speed)
+    get_metrics().inc(AUDIO_BANK_TOTAL, labels={"result": "hit" if entry else "miss"})
+    return entry
+
+
+async def refresh_audio_bank():
+    """Boot-time job: render the bank if the catalog changed, then load it."""
+    try:
+        if not bank_is_current():
+            await build_audio_bank()
+            reload_audio_bank()
+    except Exception as e:
+        logger.warning(f"[AudioBank] Build failed: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the pre-synthesized audio bank.")
+    parser.add_argument("command", choices=["build", "stats"])
+    parser.add_argument("--catalog", type=Path, help="Catalog JSON (default: AUDIO_BANK_CATALOG or bundled)")
+    parser.add_argument("--dir", type=Path, help="Output directory (default: AUDIO_BANK_DIR)")
+    parser.add_argument("--concurrency", type=int, default=2, help="Phrases synthesized at a time")
+    parser.add_argument("--force", action="store_true", help="Re-render every phrase")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.command == "build":
+        asyncio.run(build_audio_bank(args.catalog, args.dir, concurrency=args.concurrency, force=args.force))
+        return
+
+    directory = args.dir or Path(get_settings().audio_bank_dir)
+    if not (directory / INDEX_FILE).exists():
+        print(f"No audio bank in {directory}; run: python -m src.services.audio_bank build")
+        return
+    bank = AudioBank(directory)
+    size = os.path.getsize(bank.blob_path)
+    print(f"{len(bank)} phrases, {size / 1024:.0f} KB audio, current={bank_is_current(args.catalog, args.dir)}")
+    bank.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Token-budgeted conversation context for chat completions.
+
+Packs the most recent history under a token budget (estimated locally,
+no tokenizer download) and replaces older turns with a summary that is
+generated in the background, so prompt size stays predictable as
+conversations grow.
+"""
+
+import asyncio
+import logging
+import math
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Words, numbers and individual punctuation marks
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# BPE tokenizers split long Portuguese words into several pieces
+_CHARS_PER_WORD_TOKEN = 6
+
+# Per-message overhead (role, separators) in chat formats
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of text without a tokenizer.
+
+    Counts words and punctuation, charging long words one token per
+    ~6 characters. Rough, but cheap enough to run on every message.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count
+    """
+    if not text:
+        return 0
+
+    tokens = 0
+    for piece in _TOKEN_PATTERN.findall(text):
+        tokens += math.ceil(len(piece) / _CHARS_PER_WORD_TOKEN)
+    return tokens
+
+
+@dataclass
+class ChatContext:
+    """Result of packing history under a token budget."""
+    messages: List[dict]
+    summary: Optional[str] = None
+    dropped: int = 0
+    tokens: int = 0
+
+
+Summarizer = Callable[[List[dict]], Awaitable[Optional[str]]]
+
+
+class ChatContextBuilder:
+    """
+    Builds the history part of a chat prompt under a token budget.
+
+    Newest turns are kept verbatim. When older turns do not fit, a cached
+    summary of them is used and a fresh one is generated in the background
+    for the next request (the current request never waits for it).
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 1500,
+        summary_max_input_tokens: int = 3000,
+        max_summaries: int = 1000,
+        resummarize_after: int = 4,
+    ):
+        """
+        Initialize context builder.
+
+        Args:
+            max_tokens: Token budget for history (and summary)
+            summary_max_input_tokens: Cap on dropped text sent to the summarizer
+            max_summaries: Number of conversation summaries kept in memory
+            resummarize_after: Newly dropped turns before a summary is refreshed
+        """
+        self.max_tokens = max_tokens
+        self.summary_max_input_tokens = summary_max_input_tokens
+        self.max_summaries = max_summaries
+        self.resummarize_after = resummarize_after
+
+        # key -> (fingerprint of last summarized turn, summary)
+        self._summaries: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._pending: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def build(
+        self,
+        history: List[dict],
+        reserved_tokens: int = 0,
+        summary_key: Optional[str] = None,
+        summarizer: Optional[Summarizer] = None,
+    ) -> ChatContext:
+        """
+        Pack history under the token budget.
+
+        Args:
+            history: Messages as dicts (role, content), oldest first
+            reserved_tokens: Tokens already used by the current message
+            summary_key: Conversation key for summaries (None disables them)
+            summarizer: Coroutine that summarizes a list of messages
+
+        Returns:
+            ChatContext with kept messages and an optional summary
+        """
+        budget = self.max_tokens - reserved_tokens
+        cached = self._summaries.get(summary_key) if summary_key else None
+        if cached:
+            budget -= estimate_tokens(cached[1]) + MESSAGE_OVERHEAD_TOKENS
+
+        kept: List[dict] = []
+        used = 0
+
+        for msg in reversed(history):
+            cost = estimate_tokens(msg["content"]) + MESSAGE_OVERHEAD_TOKENS
+            if used + cost > budget:
+                break
+            kept.append(msg)
+            used += cost
+
+        kept.reverse()
+        dropped = history[:len(history) - len(kept)]
+
+        summary = None
+        if dropped and summary_key:
+            if cached:
+                summary = cached[1]
+                self._summaries.move_to_end(summary_key)
+            if summarizer:
+                self._schedule_summary(summary_key, dropped, summarizer)
+
+        return ChatContext(
+            messages=kept,
+            summary=summary,
+            dropped=len(dropped),
+            tokens=used,
+        )
+
+    @staticmethod
+    def _fingerprint(message: dict) -> str:
+        return f"{message['role']}:{hash(message['content'])}"
+
+    def _new_turns(self, dropped: List[dict], fingerprint: str) -> int:
+        """Count dropped turns newer than the last summarized one."""
+        for age, msg in enumerate(reversed(dropped)):
+            if self._fingerprint(msg) == fingerprint:
+                return age
+        return len(dropped)
+
+    def _schedule_summary(
+        self,
+        key: str,
+        dropped: List[dict],
+        summarizer: Summarizer,
+    ):
+        """Start a background summary unless one is fresh enough or running."""
+        if key in self._pending:
+            return
+
+        cached = self._summaries.get(key)
+        if cached and self._new_turns(dropped, cached[0]) < self.resummarize_after:
+            return
+
+        fingerprint = self._fingerprint(dropped[-1])
+
+        # Keep the newest dropped turns within the summarizer input cap
+        selected: List[dict] = []
+        used = 0
+        for msg in reversed(dropped):
+            used += estimate_tokens(msg["content"]) + MESSAGE_OVERHEAD_TOKENS
+            if used > self.summary_max_input_tokens:
+                break
+            selected.append(msg)
+        selected.reverse()
+
+        if not selected:
+            return
+
+        self._pending.add(key)
+        task = asyncio.create_task(self._summarize(key, fingerprint, selected, summarizer))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(
+        self,
+        key: str,
+        fingerprint: str,
+        messages: List[dict],
+        summarizer: Summarizer,
+    ):
+        try:
+            summary = await summarizer(messages)
+            if summary:
+                self._summaries[key] = (fingerprint, summary)
+                self._summaries.move_to_end(key)
+                while len(self._summaries) > self.max_summaries:
+                    self._summaries.popitem(last=False)
+                logger.info(f"[ChatContext] Summarized {len(messages)} turns for {key[:20]}")
+        except Exception as e:
+            logger.warning(f"[ChatContext] Summary failed: {e}")
+        finally:
+            self._pending.discard(key)
+
+
+# Global context builder instance
+_builder: Optional[ChatContextBuilder] = None
+
+
+def get_context_builder() -> ChatContextBuilder:
+    """Get global context builder instance."""
+    global _builder
+    if _builder is None:
+        settings = get_settings()
+        _builder = ChatContextBuilder(max_tokens=settings.chat_context_max_tokens)
+    return _builder
@@ -6,13 +6,15 @@ directly, eliminating the need for Whisper re-alignment.
 
 import logging
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Optional
 
 import httpx
 
 from ..config import get_settings
+from ..core.tracing import trace_span
 from ..utils.text_normalizer import prepare_text_for_tts
-from .timestamp_utils import WordTimestamp, chars_to_words
+from .timestamp_utils import WordTrack, chars_to_words
+from .usage_metrics import record_characters, tracked_post
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +24,7 @@ class TTSResult:
     """Result from text-to-speech synthesis."""
     audio_base64: str
     audio_mime_type: str = "audio/mpeg"
-    words: Optional[List[WordTimestamp]] = None
+    words: Optional[WordTrack] = None
     duration: Optional[float] = None
     text: str = ""
 
@@ -31,7 +33,7 @@ class TTSResult:
         return {
             "audioBase64": self.audio_base64,
             "audioMimeType": self.audio_mime_type,
-            "words": [w.to_dict() for w in self.words] if self.words else None,
+            "words": self.words.to_list() if self.words else None,
             "duration": self.duration,
             "text": self.text,
         }
@@ -103,7 +105,8 @@ class ElevenLabsTTSService:
         stability: float = 0.5,
         similarity_boost: float = 0.75,
         style: float = 0.0,
-        speed: float = 1.0
+        speed: float = 1.0,
+        chat_type: Optional[str] = None
     ) -> TTSResult:
         """
         Synthesize speech with native character-level timestamps.
@@ -116,6 +119,7 @@ class ElevenLabsTTSService:
             similarity_boost: Voice similarity (0-1)
             style: Style exaggeration (0-1)
             speed: Speech speed multiplier
+            chat_type: Module type (for usage metrics)
 
         Returns:
             TTSResult with audio and word timestamps
@@ -133,7 +137,8 @@ class ElevenLabsTTSService:
             raise ValueError(f"Text too long. Maximum {max_length} characters.")
 
         # Prepare text with phonetic normalization
-        normalized_text = prepare_text_for_tts(text, phonetic_map)
+        with trace_span("tts.normalize", chars=len(text)):
+            normalized_text = prepare_text_for_tts(text, phonetic_map)
 
         logger.info(
             f"[ElevenLabs] Synthesizing: {len(normalized_text)} chars, "
@@ -160,7 +165,10 @@ class ElevenLabsTTSService:
         }
 
         async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
+            response = await tracked_post(
+                client, "elevenlabs", "tts.timestamps", chat_type,
+                url, json=payload, headers=headers,
+            )
 
             if response.status_code == 401:
                 raise ValueError("Invalid ElevenLabs API key")
@@ -175,6 +183,8 @@ class ElevenLabsTTSService:
             response.raise_for_status()
             data = response.json()
 
+        record_characters("elevenlabs", "tts.timestamps", chat_type, self.model_id, len(normalized_text))
+
         # Extract audio and alignment
         audio_base64 = data.get("audio_base64", "")
         alignment = data.get("alignment", {})
@@ -184,10 +194,11 @@ class ElevenLabsTTSService:
         char_ends = alignment.get("character_end_times_seconds", [])
 
         # Convert character timestamps to word timestamps
-        words = chars_to_words(normalized_text, characters, char_starts, char_ends)
+        with trace_span("tts.chars_to_words", chars=len(characters)):
+            words = chars_to_words(normalized_text, characters, char_starts, char_ends)
 
         # Calculate duration from last word
-        duration = words[-1].end if words else None
+        duration = words.duration
 
         logger.info(
             f"[ElevenLabs] Synthesis complete: {len(words)} words, "
@@ -206,7 +217,8 @@ class ElevenLabsTTSService:
         self,
         text: str,
         voice: Optional[str] = None,
-        phonetic_map: Optional[dict] = None
+        phonetic_map: Optional[dict] = None,
+        chat_type: Optional[str] = None
     ) -> TTSResult:
         """
         Simple synthesis without timestamps (faster).
@@ -217,6 +229,7 @@ class ElevenLabsTTSService:
             text: Text to synthesize
             voice: Voice name or ID
             phonetic_map: Optional phonetic map
+            chat_type: Module type (for usage metrics)
 
         Returns:
             TTSResult with audio only (no timestamps)
@@ -244,12 +257,17 @@ class ElevenLabsTTSService:
         }
 
         async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
+            response = await tracked_post(
+                client, "elevenlabs", "tts.simple", chat_type,
+                url, json=payload, headers=headers,
+            )
             response.raise_for_status()
 
             import base64
             audio_base64 = base64.b64encode(response.content).decode("utf-8")
 
+        record_characters("elevenlabs", "tts.simple", chat_type, self.model_id, len(normalized_text))
+
         return TTSResult(
             audio_base64=audio_base64,
             audio_mime_type="audio/mpeg",
@@ -3,13 +3,20 @@ OpenAI Chat Completion Service.
 Proxy for chat-router endpoint with Perplexity/Gemini fallback support.
 """
 
+import json
 import logging
+import re
+import sys
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
 import httpx
 
 from ..config import get_settings
+from .chat_context import estimate_tokens, get_context_builder
+from .response_cache import get_response_cache
+from ..core.tracing import trace_span
+from .usage_metrics import record_tokens, track_call, tracked_post
 
 logger = logging.getLogger(__name__)
 
@@ -127,6 +134,120 @@ Ajudar o usuário com qualquer dúvida de forma clara e objetiva.
 - NUNCA mencione que é ChatGPT, OpenAI ou IA""",
 }
 
+# Branding instructions, shared by every module.
+#
+# System prompts are ~150-250 tokens, far below the 1024-token minimum for
+# provider-side prompt caching, so they are not cached on their own.
+# Padding them would cost more than it saves. Caching only applies to
+# longer conversations, where the system prompt and earlier turns form a
+# stable prefix; PromptCacheStats reports how often that happens.
+BRANDING_PROMPT = """
+REGRAS OBRIGATÓRIAS:
+1. Você é um assistente do IconsAI, desenvolvido pela Arbache AI.
+2. NUNCA mencione OpenAI, ChatGPT, GPT-4, Claude, Anthropic, Gemini, ou qualquer outra IA.
+3. Se perguntado sobre tecnologia ou quem te criou: "Fui desenvolvido pela Arbache AI."
+4. Sempre responda em português brasileiro.
+"""
+
+
+def _build_system_messages() -> Dict[str, dict]:
+    """Prebuild one system message per module (interned content)."""
+    return {
+        slug: {"role": "system", "content": sys.intern(BRANDING_PROMPT + "\n\n" + prompt)}
+        for slug, prompt in MODULE_PROMPTS.items()
+    }
+
+
+# Built once at import. Shared across requests: never mutate these dicts.
+SYSTEM_MESSAGES: Dict[str, dict] = _build_system_messages()
+
+
+def get_system_message(module_slug: str) -> dict:
+    """Get the prebuilt system message for a module (general as default)."""
+    return SYSTEM_MESSAGES.get(module_slug) or SYSTEM_MESSAGES["general"]
+
+
+def parse_usage(usage: Optional[dict]) -> Tuple[int, int, int]:
+    """
+    Read token counts from an OpenAI-style usage object or Gemini usageMetadata.
+
+    Returns:
+        Tuple of (prompt_tokens, cached_tokens, completion_tokens)
+    """
+    if not usage:
+        return 0, 0, 0
+    if "promptTokenCount" in usage:
+        return (
+            usage.get("promptTokenCount") or 0,
+            usage.get("cachedContentTokenCount") or 0,
+            usage.get("candidatesTokenCount") or 0,
+        )
+    details = usage.get("prompt_tokens_details") or {}
+    return (
+        usage.get("prompt_tokens") or 0,
+        details.get("cached_tokens") or 0,
+        usage.get("completion_tokens") or 0,
+    )
+
+
+class PromptCacheStats:
+    """
+    Provider-side prompt cache accounting.
+
+    Aggregates prompt and cached token counts from provider usage fields
+    (OpenAI prompt_tokens_details.cached_tokens, Gemini
+    cachedContentTokenCount) per provider. Prompts under the provider's
+    minimum (1024 tokens for OpenAI) are never cached, so short
+    conversations count as misses.
+    """
+
+    def __init__(self):
+        self._providers: Dict[str, Dict[str, int]] = {}
+
+    def record(self, provider: str, prompt_tokens: int, cached_tokens: int = 0):
+        """Add one request's prompt usage."""
+        stats = self._providers.setdefault(
+            provider, {"requests": 0, "promptTokens": 0, "cachedTokens": 0, "cacheHits": 0}
+        )
+        stats["requests"] += 1
+        stats["promptTokens"] += prompt_tokens
+        stats["cachedTokens"] += cached_tokens
+        if cached_tokens:
+            stats["cacheHits"] += 1
+
+    def record_usage(self, provider: str, usage: Optional[dict]):
+        """Record an OpenAI-style usage object or Gemini usageMetadata."""
+        if not usage:
+            return
+        prompt_tokens, cached_tokens, _ = parse_usage(usage)
+        self.record(provider, prompt_tokens, cached_tokens)
+
+    def stats(self) -> dict:
+        """Counters per provider with the cached share of prompt tokens."""
+        return {
+            provider: {
+                **stats,
+                "cachedRatio": round(stats["cachedTokens"] / stats["promptTokens"], 3) if stats["promptTokens"] else 0.0,
+            }
+            for provider, stats in self._providers.items()
+        }
+
+
+# Global prompt cache stats instance
+_prompt_cache_stats: Optional[PromptCacheStats] = None
+
+
+def get_prompt_cache_stats() -> PromptCacheStats:
+    """Get global prompt cache stats instance."""
+    global _prompt_cache_stats
+    if _prompt_cache_stats is None:
+        _prompt_cache_stats = PromptCacheStats()
+    return _prompt_cache_stats
+
+
+SUMMARY_PROMPT = """Resuma a conversa abaixo em no máximo 5 frases, em português brasileiro.
+Preserve nomes, fatos citados, decisões e pedidos do usuário. Não acrescente informações."""
+
 # Branding words to sanitize
 FORBIDDEN_BRANDS = [
     "OpenAI", "ChatGPT", "GPT-4", "GPT-3.5", "GPT-3",
@@ -135,13 +256,103 @@ FORBIDDEN_BRANDS = [
 ]
 
 
+BRAND_REPLACEMENT = "Arbache AI"
+
+# Longest alternatives first so "GPT-3.5" wins over "GPT-3"
+_BRAND_PATTERN = re.compile(
+    "|".join(re.escape(brand) for brand in sorted(FORBIDDEN_BRANDS, key=len, reverse=True)),
+    re.IGNORECASE,
+)
+
+# Lowercased proper prefixes of every brand ("chat", "gpt-3" of "gpt-3.5", ...)
+_BRAND_PREFIXES = frozenset(
+    brand.lower()[:size]
+    for brand in FORBIDDEN_BRANDS
+    for size in range(1, len(brand))
+)
+
+# Longest brand minus one: an unfinished brand always fits in this suffix
+_BRAND_HOLDBACK = max(len(brand) for brand in FORBIDDEN_BRANDS) - 1
+
+
 def sanitize_branding(text: str) -> str:
-    """Remove forbidden brand mentions from response."""
-    result = text
-    for brand in FORBIDDEN_BRANDS:
-        result = result.replace(brand, "Arbache AI")
-        result = result.replace(brand.lower(), "Arbache AI")
-    return result
+    """Remove forbidden brand mentions from response (single pass, any case)."""
+    return _BRAND_PATTERN.sub(BRAND_REPLACEMENT, text)
+
+
+class StreamingBrandSanitizer:
+    """
+    Applies sanitize_branding to streamed text.
+
+    A brand may be split across chunks ("Chat" + "GPT"). Only a suffix
+    that could still become a brand is held back until the next chunk
+    (at most one character less than the longest brand); everything else
+    is sanitized and emitted immediately.
+    """
+
+    def __init__(self):
+        self._pending = ""
+
+    def _safe_length(self, text: str) -> int:
+        """Length of the prefix of text that no later chunk can change."""
+        start = max(0, len(text) - _BRAND_HOLDBACK)
+        tail = text[start:].lower()
+
+        cut = len(text)
+        for offset in range(len(tail)):
+            if tail[offset:] in _BRAND_PREFIXES:
+                cut = start + offset
+                break
+
+        # Keep a complete brand whole if the cut falls inside it
+        for match in _BRAND_PATTERN.finditer(text, max(0, cut - _BRAND_HOLDBACK)):
+            if match.start() < cut < match.end():
+                return match.start()
+            if match.start() >= cut:
+                break
+
+        return cut
+
+    def feed(self, chunk: str) -> str:
+        """
+        Add a chunk and return the text that is safe to emit.
+
+        Args:
+            chunk: Raw text from the provider
+
+        Returns:
+            Sanitized text (may be empty)
+        """
+        text = self._pending + chunk
+        cut = self._safe_length(text)
+        self._pending = text[cut:]
+        return sanitize_branding(text[:cut])
+
+    def flush(self) -> str:
+        """Return the held-back text at the end of the stream."""
+        text, self._pending = self._pending, ""
+        return sanitize_branding(text)
+
+
+def format_sse(data: Any) -> str:
+    """Format one Server-Sent Event."""
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    return f"data: {payload}\n\n"
+
+
+def sse_delta(content: str, source: str) -> str:
+    """Stream chunk in OpenAI chat.completion.chunk shape (kept for existing clients)."""
+    return format_sse({
+        "choices": [{"index": 0, "delta": {"content": content}}],
+        "source": source,
+    })
+
+
+SSE_DONE = format_sse("[DONE]")
+
+
+# Called with (full sanitized response, source) when a stream completes
+StreamCompleteCallback = Callable[[str, str], None]
 
 
 @dataclass
@@ -186,6 +397,7 @@ class OpenAIChatService:
     OPENAI_URL = "https://api.openai.com/v1/chat/completions"
     PERPLEXITY_URL = "https://api.perplexity.ai/chat/completions"
     GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
+    GEMINI_STREAM_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:streamGenerateContent"
 
     def __init__(
         self,
@@ -201,17 +413,22 @@ class OpenAIChatService:
 
     def _get_system_prompt(self, module_slug: str) -> str:
         """Get module-specific system prompt."""
-        prompt = MODULE_PROMPTS.get(module_slug, MODULE_PROMPTS["general"])
-
-        # Add branding instructions
-        branding = """
-REGRAS OBRIGATÓRIAS:
-1. Você é um assistente do IconsAI, desenvolvido pela Arbache AI.
-2. NUNCA mencione OpenAI, ChatGPT, GPT-4, Claude, Anthropic, Gemini, ou qualquer outra IA.
-3. Se perguntado sobre tecnologia ou quem te criou: "Fui desenvolvido pela Arbache AI."
-4. Sempre responda em português brasileiro.
-"""
-        return branding + "\n\n" + prompt
+        return get_system_message(module_slug)["content"]
+
+    @staticmethod
+    def _record_usage(
+        provider: str,
+        endpoint: str,
+        module_slug: str,
+        model: str,
+        usage: Optional[dict],
+    ):
+        """Record provider usage for prompt-cache stats and token/cost metrics."""
+        if not usage:
+            return
+        get_prompt_cache_stats().record_usage(provider, usage)
+        prompt_tokens, _, completion_tokens = parse_usage(usage)
+        record_tokens(provider, endpoint, module_slug, model, prompt_tokens, completion_tokens)
 
     async def _call_perplexity(
         self,
@@ -226,7 +443,8 @@ REGRAS OBRIGATÓRIAS:
 
         try:
             async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
+                response = await tracked_post(
+                    client, "perplexity", "chat.completions", module_slug,
                     self.PERPLEXITY_URL,
                     headers={
                         "Authorization": f"Bearer {self.perplexity_key}",
@@ -246,6 +464,7 @@ REGRAS OBRIGATÓRIAS:
                     return None
 
                 data = response.json()
+                self._record_usage("perplexity", "chat.completions", module_slug, "sonar", data.get("usage"))
                 content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
 
                 if not content:
@@ -275,7 +494,8 @@ REGRAS OBRIGATÓRIAS:
 
         try:
             async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
+                response = await tracked_post(
+                    client, "openai", "chat.completions", module_slug,
                     self.OPENAI_URL,
                     headers={
                         "Authorization": f"Bearer {self.openai_key}",
@@ -293,6 +513,7 @@ REGRAS OBRIGATÓRIAS:
                     return None
 
                 data = response.json()
+                self._record_usage("openai", "chat.completions", module_slug, "gpt-4o-mini", data.get("usage"))
                 content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
 
                 if not content:
@@ -306,6 +527,31 @@ REGRAS OBRIGATÓRIAS:
             logger.warning(f"[Chat] OpenAI error: {e}")
             return None
 
+    @staticmethod
+    def _gemini_payload(messages: List[dict]) -> dict:
+        """Convert chat messages to a Gemini generateContent body."""
+        system_prompt = ""
+        user_messages = []
+
+        for msg in messages:
+            if msg["role"] == "system":
+                # Gemini takes a single system instruction
+                system_prompt = f"{system_prompt}\n\n{msg['content']}" if system_prompt else msg["content"]
+            else:
+                user_messages.append({
+                    "role": "model" if msg["role"] == "assistant" else "user",
+                    "parts": [{"text": msg["content"]}]
+                })
+
+        return {
+            "contents": user_messages,
+            "systemInstruction": {"parts": [{"text": system_prompt}]},
+            "generationConfig": {
+                "maxOutputTokens": 800,
+                "temperature": 0.7,
+            },
+        }
+
     async def _call_gemini(
         self,
         messages: List[dict],
@@ -318,31 +564,12 @@ REGRAS OBRIGATÓRIAS:
         logger.info(f"[Chat] Trying Gemini for {module_slug}")
 
         try:
-            # Extract system prompt
-            system_prompt = ""
-            user_messages = []
-
-            for msg in messages:
-                if msg["role"] == "system":
-                    system_prompt = msg["content"]
-                else:
-                    user_messages.append({
-                        "role": "model" if msg["role"] == "assistant" else "user",
-                        "parts": [{"text": msg["content"]}]
-                    })
-
             async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
+                response = await tracked_post(
+                    client, "gemini", "chat.completions", module_slug,
                     f"{self.GEMINI_URL}?key={self.gemini_key}",
                     headers={"Content-Type": "application/json"},
-                    json={
-                        "contents": user_messages,
-                        "systemInstruction": {"parts": [{"text": system_prompt}]},
-                        "generationConfig": {
-                            "maxOutputTokens": 800,
-                            "temperature": 0.7,
-                        },
-                    }
+                    json=self._gemini_payload(messages),
                 )
 
                 if response.status_code != 200:
@@ -350,6 +577,7 @@ REGRAS OBRIGATÓRIAS:
                     return None
 
                 data = response.json()
+                self._record_usage("gemini", "chat.completions", module_slug, "gemini-2.5-flash", data.get("usageMetadata"))
                 content = data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
 
                 if not content:
@@ -363,6 +591,40 @@ REGRAS OBRIGATÓRIAS:
             logger.warning(f"[Chat] Gemini error: {e}")
             return None
 
+    def _build_messages(
+        self,
+        message: str,
+        module_slug: str,
+        history: Optional[List[ChatMessage]],
+        session_id: Optional[str],
+    ) -> List[dict]:
+        """Build the provider message list: system prompt, packed history, message."""
+        # Shared prebuilt message (no per-request concatenation); with the
+        # history that follows, the stable prefix of long conversations
+        messages = [get_system_message(module_slug)]
+
+        # Add history packed under the token budget; older turns are
+        # replaced by a background-generated summary
+        if history:
+            context = get_context_builder().build(
+                [msg.to_dict() for msg in history],
+                reserved_tokens=estimate_tokens(message),
+                summary_key=f"{session_id}:{module_slug}" if session_id else None,
+                summarizer=self.summarize if session_id else None,
+            )
+
+            if context.summary:
+                messages.append({
+                    "role": "system",
+                    "content": f"Resumo da conversa anterior:\n{context.summary}",
+                })
+
+            messages.extend(context.messages)
+
+        # Add current message
+        messages.append({"role": "user", "content": message})
+        return messages
+
     async def chat(
         self,
         message: str,
@@ -375,6 +637,10 @@ REGRAS OBRIGATÓRIAS:
 
         Order: Perplexity -> OpenAI -> Gemini
 
+        Standalone questions are answered from the response cache when a
+        fresh answer exists for the same module; only answers generated
+        without history are stored (the cache is shared by all devices).
+
         Args:
             message: User message
             module_slug: Module type (world, health, ideas, etc.)
@@ -384,81 +650,320 @@ REGRAS OBRIGATÓRIAS:
         Returns:
             ChatResult with response
         """
-        # Build messages with system prompt
-        system_prompt = self._get_system_prompt(module_slug)
-        messages = [{"role": "system", "content": system_prompt}]
-
-        # Add history (last 4 messages)
-        if history:
-            for msg in history[-4:]:
-                messages.append(msg.to_dict())
+        cache = get_response_cache()
+        has_history = bool(history)
+
+        if cache:
+            cached = cache.get(module_slug, message, has_history)
+            if cached:
+                logger.info(f"[Chat] Cache hit for {module_slug}")
+                return ChatResult(
+                    response=cached.response,
+                    source=cached.source,
+                    session_id=session_id,
+                    context_code=module_slug,
+                )
 
-        # Add current message
-        messages.append({"role": "user", "content": message})
+        with trace_span("chat.build_messages", history=len(history or [])):
+            messages = self._build_messages(message, module_slug, history, session_id)
 
         # Try providers in order
-        response = await self._call_perplexity(messages, module_slug)
-        if response:
-            return ChatResult(
-                response=response,
-                source="perplexity",
-                session_id=session_id,
-                context_code=module_slug,
-            )
-
-        response = await self._call_openai(messages, module_slug)
-        if response:
-            return ChatResult(
-                response=response,
-                source="openai",
-                session_id=session_id,
-                context_code=module_slug,
-            )
-
-        response = await self._call_gemini(messages, module_slug)
-        if response:
-            return ChatResult(
-                response=response,
-                source="gemini",
-                session_id=session_id,
-                context_code=module_slug,
-            )
+        providers = (
+            ("perplexity", self._call_perplexity),
+            ("openai", self._call_openai),
+            ("gemini", self._call_gemini),
+        )
+
+        for source, call in providers:
+            response = await call(messages, module_slug)
+            if response:
+                if cache:
+                    cache.put(module_slug, message, response, source, has_history)
+                return ChatResult(
+                    response=response,
+                    source=source,
+                    session_id=session_id,
+                    context_code=module_slug,
+                )
 
         # All providers failed
         raise ValueError("All AI providers failed. Please try again later.")
 
+    async def summarize(self, history: List[dict]) -> Optional[str]:
+        """
+        Summarize conversation turns (used for context compaction).
+
+        Tries OpenAI, then Gemini. Perplexity is skipped since no web
+        search is needed.
+
+        Args:
+            history: Messages as dicts (role, content)
+
+        Returns:
+            Summary text or None if no provider succeeded
+        """
+        transcript = "\n".join(
+            f"{'Usuário' if m['role'] == 'user' else 'Assistente'}: {m['content']}"
+            for m in history
+        )
+        messages = [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": transcript},
+        ]
+
+        summary = await self._call_openai(messages, "summary")
+        if summary:
+            return summary
+
+        return await self._call_gemini(messages, "summary")
+
+    async def _stream_openai_compatible(
+        self,
+        url: str,
+        api_key: str,
+        body: dict,
+        provider: str,
+        module_slug: str,
+    ) -> AsyncIterator[str]:
+        """Stream content deltas from an OpenAI-compatible SSE endpoint."""
+        usage = None
+
+        with track_call(provider, "chat.stream", module_slug) as call:
+            async with httpx.AsyncClient(timeout=60.0) as client:
+                async with client.stream(
+                    "POST",
+                    url,
+                    headers={
+                        "Authorization": f"Bearer {api_key}",
+                        "Content-Type": "application/json",
+                    },
+                    json={**body, "stream": True},
+                ) as response:
+                    if response.status_code != 200:
+                        raise RuntimeError(f"{provider} stream failed: {response.status_code}")
+
+                    async for line in response.aiter_lines():
+                        call.response_bytes += len(line) + 1
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            chunk = json.loads(data)
+                        except json.JSONDecodeError:
+                            continue
+                        # Usage arrives on the last chunk(s)
+                        usage = chunk.get("usage") or usage
+                        choices = chunk.get("choices") or [{}]
+                        content = choices[0].get("delta", {}).get("content")
+                        if content:
+                            yield content
+
+        self._record_usage(provider, "chat.stream", module_slug, body["model"], usage)
+
+    async def _stream_perplexity(
+        self,
+        messages: List[dict],
+        model: str,
+        module_slug: str = "general",
+    ) -> AsyncIterator[str]:
+        """Stream from Perplexity, stripping citation markers."""
+        body = {
+            "model": "sonar",
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 1500,
+            "return_citations": True,
+        }
+        async for content in self._stream_openai_compatible(
+            self.PERPLEXITY_URL, self.perplexity_key, body, "perplexity", module_slug
+        ):
+            content = content.replace("[", "").replace("]", "")  # Remove [1], [2], etc.
+            if content:
+                yield content
+
+    async def _stream_openai(
+        self,
+        messages: List[dict],
+        model: str,
+        module_slug: str = "general",
+    ) -> AsyncIterator[str]:
+        """Stream from OpenAI Chat Completions."""
+        body = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": 500,
+            "stream_options": {"include_usage": True},
+        }
+        async for content in self._stream_openai_compatible(
+            self.OPENAI_URL, self.openai_key, body, "openai", module_slug
+        ):
+            yield content
+
+    async def _stream_gemini(
+        self,
+        messages: List[dict],
+        model: str,
+        module_slug: str = "general",
+    ) -> AsyncIterator[str]:
+        """Stream from Gemini streamGenerateContent (SSE mode)."""
+        usage = None
+
+        with track_call("gemini", "chat.stream", module_slug) as call:
+            async with httpx.AsyncClient(timeout=60.0) as client:
+                async with client.stream(
+                    "POST",
+                    f"{self.GEMINI_STREAM_URL}?alt=sse&key={self.gemini_key}",
+                    headers={"Content-Type": "application/json"},
+                    json=self._gemini_payload(messages),
+                ) as response:
+                    if response.status_code != 200:
+                        raise RuntimeError(f"gemini stream failed: {response.status_code}")
+
+                    async for line in response.aiter_lines():
+                        call.response_bytes += len(line) + 1
+                        if not line.startswith("data:"):
+                            continue
+                        try:
+                            chunk = json.loads(line[5:].strip())
+                        except json.JSONDecodeError:
+                            continue
+                        usage = chunk.get("usageMetadata") or usage
+                        candidates = chunk.get("candidates") or [{}]
+                        for part in candidates[0].get("content", {}).get("parts", []):
+                            if part.get("text"):
+                                yield part["text"]
+
+        self._record_usage("gemini", "chat.stream", module_slug, "gemini-2.5-flash", usage)
+
     async def stream_chat(
         self,
         messages: List[dict],
-        model: str = "gpt-4o-mini"
-    ):
+        module_slug: str = "general",
+        model: str = "gpt-4o-mini",
+        on_complete: Optional[StreamCompleteCallback] = None,
+    ) -> AsyncIterator[str]:
         """
-        Stream chat completion (for non-PWA mode).
+        Stream chat completion with fallback chain.
+
+        Order: Perplexity -> OpenAI -> Gemini. A provider that fails before
+        its first token is skipped; once tokens were sent, a failure ends
+        the stream with an error event.
+
+        Output is normalized to OpenAI-style chunks regardless of provider:
+        data: {"choices": [{"index": 0, "delta": {"content": ...}}], "source": ...}
+        followed by data: [DONE].
 
         Args:
             messages: Full message list including system prompt
-            model: Model to use
+            module_slug: Module type (for logging)
+            model: OpenAI model to use
+            on_complete: Called with (response, source) after a full stream,
+                before the final [DONE]
 
         Yields:
             Server-Sent Events formatted chunks
         """
-        if not self.openai_key:
-            raise ValueError("OpenAI API key required for streaming")
-
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            async with client.stream(
-                "POST",
-                self.OPENAI_URL,
-                headers={
-                    "Authorization": f"Bearer {self.openai_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": model,
-                    "messages": messages,
-                    "stream": True,
-                }
-            ) as response:
-                async for line in response.aiter_lines():
-                    if line:
-                        yield line
+        providers = (
+            ("perplexity", self.perplexity_key, self._stream_perplexity),
+            ("openai", self.openai_key, self._stream_openai),
+            ("gemini", self.gemini_key, self._stream_gemini),
+        )
+
+        for source, api_key, stream in providers:
+            if not api_key:
+                continue
+
+            logger.info(f"[Chat] Streaming from {source} for {module_slug}")
+            sanitizer = StreamingBrandSanitizer()
+            parts: List[str] = []
+            received = False  # upstream produced content
+            started = False  # content reached the client
+
+            try:
+                async for content in stream(messages, model, module_slug):
+                    received = True
+                    text = sanitizer.feed(content)
+                    if text:
+                        started = True
+                        parts.append(text)
+                        yield sse_delta(text, source)
+
+            except Exception as e:
+                if not started:
+                    # Nothing was sent (the sanitizer may have held chunks back)
+                    logger.warning(f"[Chat] {source} stream error before first token: {e}")
+                    continue
+                logger.error(f"[Chat] {source} stream interrupted: {e}")
+                yield format_sse({"error": "Resposta interrompida. Tente novamente.", "source": source})
+                yield SSE_DONE
+                return
+
+            if not received:
+                logger.warning(f"[Chat] {source} stream returned no content")
+                continue
+
+            tail = sanitizer.flush()
+            if tail:
+                parts.append(tail)
+                yield sse_delta(tail, source)
+
+            logger.info(f"[Chat] {source} stream complete for {module_slug}")
+
+            # Before DONE: clients close the stream once they see it
+            if on_complete:
+                on_complete("".join(parts), source)
+            yield SSE_DONE
+            return
+
+        # All providers failed before producing output
+        yield format_sse({"error": "All AI providers failed. Please try again later."})
+        yield SSE_DONE
+
+    async def stream_reply(
+        self,
+        message: str,
+        module_slug: str = "general",
+        history: Optional[List[ChatMessage]] = None,
+        session_id: Optional[str] = None,
+        on_complete: Optional[StreamCompleteCallback] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the answer to a single message (PWA mode).
+
+        Same prompt, history packing and response cache as chat(); a
+        cached answer is sent as one chunk.
+
+        Args:
+            message: User message
+            module_slug: Module type (world, health, ideas, etc.)
+            history: Conversation history
+            session_id: Session identifier
+            on_complete: Called with (response, source) after a full stream
+
+        Yields:
+            Server-Sent Events formatted chunks
+        """
+        cache = get_response_cache()
+        has_history = bool(history)
+
+        if cache:
+            cached = cache.get(module_slug, message, has_history)
+            if cached:
+                logger.info(f"[Chat] Cache hit for {module_slug}")
+                yield sse_delta(cached.response, cached.source)
+                if on_complete:
+                    on_complete(cached.response, cached.source)
+                yield SSE_DONE
+                return
+
+        def complete(response: str, source: str):
+            if cache:
+                cache.put(module_slug, message, response, source, has_history)
+            if on_complete:
+                on_complete(response, source)
+
+        messages = self._build_messages(message, module_slug, history, session_id)
+        async for event in self.stream_chat(messages, module_slug, on_complete=complete):
+            yield event
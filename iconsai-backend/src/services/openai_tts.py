@@ -10,13 +10,15 @@ Uses a two-step process:
 import base64
 import logging
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Optional
 
 import httpx
 
 from ..config import get_settings
+from ..core.tracing import trace_span
 from ..utils.text_normalizer import prepare_text_for_tts
-from .timestamp_utils import WordTimestamp, align_words_to_text
+from .timestamp_utils import WordTrack, align_words_to_text
+from .usage_metrics import record_audio_seconds, record_characters, tracked_post
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +28,7 @@ class TTSResult:
     """Result from text-to-speech synthesis."""
     audio_base64: str
     audio_mime_type: str = "audio/mpeg"
-    words: Optional[List[WordTimestamp]] = None
+    words: Optional[WordTrack] = None
     duration: Optional[float] = None
     text: str = ""
 
@@ -35,7 +37,7 @@ class TTSResult:
         return {
             "audioBase64": self.audio_base64,
             "audioMimeType": self.audio_mime_type,
-            "words": [w.to_dict() for w in self.words] if self.words else None,
+            "words": self.words.to_list() if self.words else None,
             "duration": self.duration,
             "text": self.text,
         }
@@ -162,25 +164,30 @@ Emotion: Genuinely interested and engaged.
             payload["instructions"] = instructions
 
         async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
+            response = await tracked_post(
+                client, "openai", "tts", chat_type,
                 self.TTS_URL,
                 headers=headers,
                 json=payload
             )
             response.raise_for_status()
-            return response.content
+
+        record_characters("openai", "tts", chat_type, payload["model"], len(text))
+        return response.content
 
     async def _get_word_timestamps(
         self,
         audio_bytes: bytes,
-        language: str = "pt"
-    ) -> tuple[List[WordTimestamp], float]:
+        language: str = "pt",
+        chat_type: Optional[str] = None
+    ) -> tuple[WordTrack, float]:
         """
         Extract word timestamps using Whisper.
 
         Args:
             audio_bytes: MP3 audio data
             language: Language code
+            chat_type: Module type (for usage metrics)
 
         Returns:
             Tuple of (word timestamps, duration)
@@ -200,7 +207,8 @@ Emotion: Genuinely interested and engaged.
         headers = {"Authorization": f"Bearer {self.api_key}"}
 
         async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
+            response = await tracked_post(
+                client, "openai", "tts.align", chat_type,
                 self.WHISPER_URL,
                 headers=headers,
                 files=files,
@@ -209,14 +217,9 @@ Emotion: Genuinely interested and engaged.
             response.raise_for_status()
             result = response.json()
 
-        words = [
-            WordTimestamp(
-                word=w["word"],
-                start=w["start"],
-                end=w["end"]
-            )
-            for w in result.get("words", [])
-        ]
+        record_audio_seconds("openai", "tts.align", chat_type, "whisper-1", result.get("duration"))
+
+        words = WordTrack.from_dicts(result.get("words", []))
 
         duration = result.get("duration", 0)
 
@@ -251,7 +254,8 @@ Emotion: Genuinely interested and engaged.
             raise ValueError(f"Text too long. Maximum {max_length} characters.")
 
         # Prepare text
-        normalized_text = prepare_text_for_tts(text, phonetic_map)
+        with trace_span("tts.normalize", chars=len(text)):
+            normalized_text = prepare_text_for_tts(text, phonetic_map)
         voice_name = self._get_voice(voice)
 
         logger.info(
@@ -277,12 +281,13 @@ Emotion: Genuinely interested and engaged.
 
         # Step 2: Get word timestamps via Whisper
         try:
-            words, duration = await self._get_word_timestamps(audio_bytes)
+            words, duration = await self._get_word_timestamps(audio_bytes, chat_type=chat_type)
             logger.info(f"[OpenAI-TTS] Got {len(words)} words, duration={duration:.2f}s")
 
             # Align transcribed words to original text
             if words:
-                words = align_words_to_text(text, words)
+                with trace_span("tts.align_words", words=len(words)):
+                    words = align_words_to_text(text, words)
 
         except Exception as e:
             logger.warning(f"[OpenAI-TTS] Whisper timestamp extraction failed: {e}")
@@ -17,17 +17,84 @@ Version: 1.0.0
 import asyncio
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import AsyncGenerator, Callable, Optional, List, Dict, Any
+from typing import AsyncGenerator, BinaryIO, Callable, Optional, List, Dict, Any, Tuple, Union
 from enum import Enum
 import io
 import wave
 import tempfile
 import os
 
+from ..config import get_settings
+
 logger = logging.getLogger(__name__)
 
 
+class LocalSTTBusy(RuntimeError):
+    """The local inference queue is full."""
+
+
+class InferencePool:
+    """
+    Bounded worker pool for local model inference.
+
+    CTranslate2 releases the GIL, so transcriptions run on worker threads
+    without blocking the event loop. pending counts running and queued
+    jobs; callers that can go elsewhere (the batch endpoint) are refused
+    once it reaches workers + max_queue.
+    """
+
+    def __init__(self, workers: int = 1, max_queue: int = 2):
+        """
+        Initialize pool.
+
+        Args:
+            workers: Concurrent inference threads
+            max_queue: Jobs allowed to wait for a thread before refusing
+        """
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="stt-local")
+
+    @property
+    def saturated(self) -> bool:
+        """Whether new optional jobs are refused."""
+        return self.pending >= self.workers + self.max_queue
+
+    async def run(self, func: Callable, *args, reject_when_full: bool = False):
+        """
+        Run func(*args) on a worker thread.
+
+        Args:
+            func: Blocking callable
+            reject_when_full: Raise LocalSTTBusy instead of queueing when saturated
+
+        Raises:
+            LocalSTTBusy: If reject_when_full and the pool is saturated
+        """
+        if reject_when_full and self.saturated:
+            raise LocalSTTBusy(f"Local STT queue full ({self.pending} pending)")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+
+
+_inference_pool: Optional[InferencePool] = None
+
+
+def get_inference_pool() -> InferencePool:
+    """Get or create the inference pool shared by realtime and batch STT."""
+    global _inference_pool
+    if _inference_pool is None:
+        settings = get_settings()
+        _inference_pool = InferencePool(settings.stt_local_workers, settings.stt_local_max_queue)
+    return _inference_pool
+
+
 class TranscriptionStatus(str, Enum):
     """Status of transcription events."""
     LISTENING = "listening"       # Waiting for speech
@@ -109,6 +176,7 @@ class RealtimeSTTService:
         self._model = None
         self._vad_model = None
         self._is_initialized = False
+        self._init_lock = asyncio.Lock()
 
     async def initialize(self):
         """
@@ -119,6 +187,12 @@ class RealtimeSTTService:
         if self._is_initialized:
             return
 
+        async with self._init_lock:
+            if not self._is_initialized:
+                await self._initialize()
+
+    async def _initialize(self):
+        """Load the Faster-Whisper model and the VAD (called once, under the init lock)."""
         logger.info(f"Initializing Faster-Whisper model: {self.model_size}")
 
         try:
@@ -140,8 +214,9 @@ class RealtimeSTTService:
 
             logger.info(f"Using device: {device}, compute_type: {compute_type}")
 
-            # Load the model
-            self._model = WhisperModel(
+            # Load the model (off the event loop: it can take seconds)
+            self._model = await asyncio.to_thread(
+                WhisperModel,
                 self.model_size,
                 device=device,
                 compute_type=compute_type,
@@ -175,6 +250,75 @@ class RealtimeSTTService:
         """Check if the service is initialized."""
         return self._is_initialized
 
+    def _run_model(
+        self,
+        audio: Union[str, BinaryIO],
+        language: str,
+        include_timestamps: bool,
+        vad_filter: bool,
+    ) -> Tuple[str, List[WordTiming], Optional[float]]:
+        """Blocking transcription on a worker thread; returns (text, words, duration)."""
+        segments, info = self._model.transcribe(
+            audio,
+            language=language,
+            word_timestamps=include_timestamps,
+            vad_filter=vad_filter,
+            vad_parameters=dict(
+                threshold=self.vad_threshold,
+                min_silence_duration_ms=int(self.min_silence_duration * 1000),
+            ),
+        )
+
+        # Segments are decoded lazily: consume them here, not on the event loop
+        full_text = ""
+        words = []
+
+        for segment in segments:
+            full_text += segment.text
+
+            if include_timestamps and segment.words:
+                for word_info in segment.words:
+                    words.append(WordTiming(
+                        word=word_info.word.strip(),
+                        start=word_info.start,
+                        end=word_info.end,
+                    ))
+
+        return full_text.strip(), words, getattr(info, "duration", None)
+
+    async def transcribe_file(
+        self,
+        audio_file: BinaryIO,
+        language: str = "pt",
+        include_timestamps: bool = False,
+    ) -> Tuple[str, List[WordTiming], Optional[float]]:
+        """
+        Transcribe a complete recording (any format faster-whisper decodes).
+
+        Used by the batch voice-to-text endpoint for short clips. The job
+        is refused instead of queued when the inference pool is saturated.
+
+        Args:
+            audio_file: Seekable binary file with the recording
+            language: Language code
+            include_timestamps: Whether to include word-level timestamps
+
+        Returns:
+            Tuple of (text, words, duration in seconds)
+
+        Raises:
+            LocalSTTBusy: If the inference pool is saturated
+            RuntimeError: If faster-whisper is not installed
+        """
+        if not self._is_initialized:
+            await self.initialize()
+
+        audio_file.seek(0)
+        return await get_inference_pool().run(
+            self._run_model, audio_file, language, include_timestamps, False,
+            reject_when_full=True,
+        )
+
     async def transcribe_audio_chunk(
         self,
         audio_data: bytes,
@@ -208,36 +352,14 @@ class RealtimeSTTService:
                     wav_file.writeframes(audio_data)
 
             try:
-                # Transcribe
-                segments, info = self._model.transcribe(
-                    temp_path,
-                    language=self.language,
-                    word_timestamps=include_timestamps,
-                    vad_filter=True,
-                    vad_parameters=dict(
-                        threshold=self.vad_threshold,
-                        min_silence_duration_ms=int(self.min_silence_duration * 1000),
-                    ),
+                # Transcribe on the inference pool (realtime jobs always queue)
+                text, words, _ = await get_inference_pool().run(
+                    self._run_model, temp_path, self.language, include_timestamps, True
                 )
 
-                # Collect results
-                full_text = ""
-                words = []
-
-                for segment in segments:
-                    full_text += segment.text
-
-                    if include_timestamps and segment.words:
-                        for word_info in segment.words:
-                            words.append(WordTiming(
-                                word=word_info.word.strip(),
-                                start=word_info.start,
-                                end=word_info.end,
-                            ))
-
                 return TranscriptionEvent(
                     status=TranscriptionStatus.FINAL,
-                    text=full_text.strip(),
+                    text=text,
                     words=words,
                     confidence=0.9,  # faster-whisper doesn't expose confidence
                 )
@@ -399,6 +521,8 @@ _realtime_stt_service: Optional[RealtimeSTTService] = None
 def get_realtime_stt_service(
     model_size: str = "base",
     language: str = "pt",
+    device: str = "auto",
+    compute_type: str = "auto",
 ) -> RealtimeSTTService:
     """
     Get or create the singleton RealtimeSTT service.
@@ -406,6 +530,8 @@ def get_realtime_stt_service(
     Args:
         model_size: Whisper model size
         language: Target language
+        device: Device to use (auto, cpu, cuda)
+        compute_type: Compute type (auto, int8, float16, float32)
 
     Returns:
         RealtimeSTTService instance
@@ -416,6 +542,8 @@ def get_realtime_stt_service(
         _realtime_stt_service = RealtimeSTTService(
             model_size=model_size,
             language=language,
+            device=device,
+            compute_type=compute_type,
         )
 
     return _realtime_stt_service
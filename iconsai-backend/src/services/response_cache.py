@@ -0,0 +1,334 @@
+"""
+Response cache for repeated chat questions.
+
+Answers are cached per module under a normalized question key. An
+optional similarity tier (off by default) matches paraphrases using
+hashed character trigram vectors (CPU-only, no model download); a
+paraphrase only hits when it asks about the same numbers, dates and
+named entities as the cached question, since "PIB em 2022" and
+"PIB em 2023" are near-identical as trigrams. Freshness depends on the
+module: news/economy answers go stale in minutes, help answers in days.
+"""
+
+import logging
+import re
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+# Freshness per module (seconds). 0 disables caching for the module.
+MODULE_CACHE_TTLS: Dict[str, int] = {
+    "world": 15 * 60,
+    "economia": 30 * 60,
+    "health": 24 * 3600,
+    "ideas": 0,  # Debate-style answers depend on the conversation
+    "help": 7 * 24 * 3600,
+    "general": 6 * 3600,
+}
+
+DEFAULT_CACHE_TTL = 3600
+
+# Openers that make a question depend on earlier turns ("e o dólar?")
+FOLLOW_UP_WORDS = {"e", "mas", "entao", "tambem", "isso", "ele", "ela", "eles", "elas", "dele", "dela"}
+
+# Words that make a question about the user ("qual é o meu nome")
+FIRST_PERSON_WORDS = {"eu", "meu", "minha", "meus", "minhas", "me", "mim", "comigo", "nosso", "nossa"}
+
+# Questions shorter than this are only served from the cache without history
+MIN_STANDALONE_WORDS = 4
+
+# Words that pin a question to a date ("IPCA de março" vs "IPCA de maio")
+DATE_WORDS = {
+    "janeiro", "fevereiro", "marco", "abril", "maio", "junho", "julho", "agosto",
+    "setembro", "outubro", "novembro", "dezembro",
+    "segunda", "terca", "quarta", "quinta", "sexta", "sabado", "domingo",
+    "hoje", "ontem", "amanha",
+}
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+_DIGIT = re.compile(r"\d")
+
+
+def normalize_question(text: str) -> str:
+    """
+    Normalize a question for cache lookup.
+
+    Lowercases, strips accents and punctuation, and collapses whitespace,
+    so "O que é a Selic?" and "o que e a selic" share a key.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def fact_tokens(question: str) -> frozenset:
+    """
+    Tokens a paraphrase must share with a cached question.
+
+    Numbers, date words and named entities (words written with a capital
+    letter after the first word, e.g. "Brasil", "IPCA") - the parts that
+    change the answer while barely changing the trigram vector.
+
+    Args:
+        question: Raw user question
+
+    Returns:
+        Normalized fact tokens
+    """
+    facts = set()
+    for i, word in enumerate(question.split()):
+        token = normalize_question(word)
+        if not token:
+            continue
+        if _DIGIT.search(token) or token in DATE_WORDS or (i > 0 and any(c.isupper() for c in word)):
+            facts.update(token.split())
+    return frozenset(facts)
+
+
+def hashed_ngram_vector(text: str, dim: int = 512) -> np.ndarray:
+    """
+    Embed text as an L2-normalized vector of hashed character trigrams.
+
+    Uses crc32 so vectors are stable across processes.
+
+    Args:
+        text: Normalized text
+        dim: Vector size
+
+    Returns:
+        float32 vector of length dim
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    padded = f" {text} "
+    for i in range(len(padded) - 2):
+        vector[zlib.crc32(padded[i:i + 3].encode("utf-8")) % dim] += 1.0
+
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+@dataclass
+class CachedResponse:
+    """Cached chat answer."""
+    response: str
+    source: str
+    created_at: float
+    slot: int = -1
+    facts: frozenset = frozenset()
+
+
+class _ModuleCache:
+    """LRU entries for one module plus a fixed-size vector matrix."""
+
+    def __init__(self, capacity: int, dim: int):
+        self.capacity = capacity
+        self.entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.keys: List[Optional[str]] = [None] * capacity
+        self.free_slots = list(range(capacity - 1, -1, -1))
+
+    def remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None and entry.slot >= 0:
+            self.vectors[entry.slot] = 0.0
+            self.keys[entry.slot] = None
+            self.free_slots.append(entry.slot)
+
+    def put(self, key: str, entry: CachedResponse, vector: Optional[np.ndarray]):
+        self.remove(key)
+        while len(self.entries) >= self.capacity:
+            self.remove(next(iter(self.entries)))
+
+        if vector is not None:
+            entry.slot = self.free_slots.pop()
+            self.vectors[entry.slot] = vector
+            self.keys[entry.slot] = key
+
+        self.entries[key] = entry
+
+
+class ResponseCache:
+    """
+    Per-module chat response cache with exact and similarity lookup.
+
+    Process-local; each worker warms its own cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 500,
+        similarity_threshold: float = 0.0,
+        vector_dim: int = 512,
+        ttls: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Initialize response cache.
+
+        Args:
+            max_entries: Entries kept per module (LRU)
+            similarity_threshold: Minimum cosine similarity for a paraphrase
+                hit (which must also share fact_tokens). 0 disables the
+                similarity tier.
+            vector_dim: Size of hashed n-gram vectors
+            ttls: Freshness per module (seconds), defaults to MODULE_CACHE_TTLS
+        """
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.vector_dim = vector_dim
+        self.ttls = ttls if ttls is not None else MODULE_CACHE_TTLS
+
+        self._modules: Dict[str, _ModuleCache] = {}
+
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def _ttl(self, module_slug: str) -> int:
+        return self.ttls.get(module_slug, DEFAULT_CACHE_TTL)
+
+    @staticmethod
+    def is_standalone(normalized: str, has_history: bool) -> bool:
+        """Check if a question can be answered without the conversation."""
+        if not has_history:
+            return True
+        words = normalized.split()
+        return (
+            len(words) >= MIN_STANDALONE_WORDS
+            and words[0] not in FOLLOW_UP_WORDS
+            and FIRST_PERSON_WORDS.isdisjoint(words)
+        )
+
+    def get(
+        self,
+        module_slug: str,
+        question: str,
+        has_history: bool = False,
+    ) -> Optional[CachedResponse]:
+        """
+        Look up a cached answer.
+
+        Args:
+            module_slug: Module the question was asked in
+            question: Raw user question
+            has_history: Whether the question comes with conversation history
+
+        Returns:
+            Fresh cached response or None
+        """
+        ttl = self._ttl(module_slug)
+        module = self._modules.get(module_slug)
+        if ttl <= 0 or module is None:
+            return None
+
+        key = normalize_question(question)
+        if not key or not self.is_standalone(key, has_history):
+            return None
+
+        cutoff = time.time() - ttl
+
+        entry = module.entries.get(key)
+        if entry is not None:
+            if entry.created_at >= cutoff:
+                module.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            module.remove(key)
+
+        if self.similarity_threshold > 0 and module.entries:
+            scores = module.vectors @ hashed_ngram_vector(key, self.vector_dim)
+            best = int(np.argmax(scores))
+            best_key = module.keys[best]
+
+            if best_key is not None and scores[best] >= self.similarity_threshold:
+                entry = module.entries[best_key]
+                if entry.created_at < cutoff:
+                    module.remove(best_key)
+                elif entry.facts == fact_tokens(question):
+                    module.entries.move_to_end(best_key)
+                    self.similar_hits += 1
+                    return entry
+
+        self.misses += 1
+        return None
+
+    def put(
+        self,
+        module_slug: str,
+        question: str,
+        response: str,
+        source: str,
+        has_history: bool = False,
+    ):
+        """
+        Store an answer.
+
+        The cache is shared by every device, so answers generated with
+        conversation history are never stored: they may draw on the
+        user's own messages (e.g. their name).
+
+        Args:
+            module_slug: Module the question was asked in
+            question: Raw user question
+            response: Answer text
+            source: Provider that produced the answer
+            has_history: Whether the question came with conversation history
+        """
+        if has_history or self._ttl(module_slug) <= 0:
+            return
+
+        key = normalize_question(question)
+        if not key:
+            return
+
+        module = self._modules.get(module_slug)
+        if module is None:
+            module = _ModuleCache(self.max_entries, self.vector_dim)
+            self._modules[module_slug] = module
+
+        vector = None
+        entry = CachedResponse(response=response, source=source, created_at=time.time())
+        if self.similarity_threshold > 0:
+            vector = hashed_ngram_vector(key, self.vector_dim)
+            entry.facts = fact_tokens(question)
+        module.put(key, entry, vector)
+
+    def stats(self) -> dict:
+        """Counters for monitoring."""
+        return {
+            "hits": self.hits,
+            "similarHits": self.similar_hits,
+            "misses": self.misses,
+            "entries": sum(len(m.entries) for m in self._modules.values()),
+        }
+
+
+# Global cache instance
+_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get global response cache instance (None when disabled)."""
+    global _cache
+    settings = get_settings()
+    if not settings.chat_cache_enabled:
+        return None
+    if _cache is None:
+        _cache = ResponseCache(
+            max_entries=settings.chat_cache_max_entries,
+            similarity_threshold=settings.chat_cache_similarity_threshold,
+        )
+    return _cache
@@ -5,7 +5,9 @@ Used with ElevenLabs API which returns per-character timing.
 
 import re
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
 
 
 @dataclass
@@ -24,18 +26,210 @@ class WordTimestamp:
         }
 
 
+class WordTrack:
+    """
+    Columnar word timing track.
+
+    Stores words as a plain list and start/end times as float32 arrays,
+    so shifting, clamping and merging operate on whole columns instead
+    of allocating one object per word.
+
+    Indexing and iteration yield WordTimestamp objects for compatibility
+    with code that expects a list of words.
+    """
+
+    __slots__ = ("words", "starts", "ends")
+
+    def __init__(
+        self,
+        words: Sequence[str],
+        starts: Union[Sequence[float], np.ndarray],
+        ends: Union[Sequence[float], np.ndarray]
+    ):
+        """
+        Initialize track from parallel columns.
+
+        Args:
+            words: Word strings
+            starts: Start time for each word (seconds)
+            ends: End time for each word (seconds)
+        """
+        self.words: List[str] = list(words)
+        self.starts: np.ndarray = np.asarray(starts, dtype=np.float32)
+        self.ends: np.ndarray = np.asarray(ends, dtype=np.float32)
+
+        if not (len(self.words) == len(self.starts) == len(self.ends)):
+            raise ValueError("words, starts and ends must have the same length")
+
+    @classmethod
+    def empty(cls) -> "WordTrack":
+        """Create an empty track."""
+        return cls([], np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32))
+
+    @classmethod
+    def from_words(cls, words: Iterable[WordTimestamp]) -> "WordTrack":
+        """Build a track from WordTimestamp objects."""
+        words = list(words)
+        return cls(
+            [w.word for w in words],
+            [w.start for w in words],
+            [w.end for w in words],
+        )
+
+    @classmethod
+    def from_dicts(cls, words: Iterable[dict]) -> "WordTrack":
+        """Build a track from JSON-style dicts with word/start/end keys."""
+        words = list(words)
+        return cls(
+            [w["word"] for w in words],
+            [w["start"] for w in words],
+            [w["end"] for w in words],
+        )
+
+    @classmethod
+    def concat(cls, tracks: Iterable["WordTrack"]) -> "WordTrack":
+        """Join tracks end to end (times are taken as they are)."""
+        tracks = list(tracks)
+        if not tracks:
+            return cls.empty()
+        return cls(
+            [word for track in tracks for word in track.words],
+            np.concatenate([track.starts for track in tracks]),
+            np.concatenate([track.ends for track in tracks]),
+        )
+
+    def select(self, mask: np.ndarray) -> "WordTrack":
+        """Keep the words where mask is True."""
+        return WordTrack(
+            [word for word, keep in zip(self.words, mask.tolist()) if keep],
+            self.starts[mask],
+            self.ends[mask],
+        )
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __iter__(self) -> Iterator[WordTimestamp]:
+        for word, start, end in zip(self.words, self.starts.tolist(), self.ends.tolist()):
+            yield WordTimestamp(word=word, start=start, end=end)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[WordTimestamp, "WordTrack"]:
+        if isinstance(index, slice):
+            return WordTrack(self.words[index], self.starts[index], self.ends[index])
+        return WordTimestamp(
+            word=self.words[index],
+            start=float(self.starts[index]),
+            end=float(self.ends[index]),
+        )
+
+    def __repr__(self) -> str:
+        return f"WordTrack({len(self)} words)"
+
+    @property
+    def duration(self) -> Optional[float]:
+        """End time of the last word (rounded to milliseconds), or None if the track is empty."""
+        if not self.words:
+            return None
+        return round(float(self.ends[-1]), 3)
+
+    def shift(self, offset_sec: float) -> "WordTrack":
+        """
+        Shift all timestamps earlier by offset_sec, clamping at zero.
+
+        Args:
+            offset_sec: Seconds to subtract from every start/end
+
+        Returns:
+            New track sharing the word list
+        """
+        return WordTrack(
+            self.words,
+            np.maximum(self.starts - offset_sec, 0),
+            np.maximum(self.ends - offset_sec, 0),
+        )
+
+    def clamp(self, lower: float = 0.0, upper: Optional[float] = None) -> "WordTrack":
+        """
+        Clamp all timestamps into [lower, upper].
+
+        Args:
+            lower: Minimum time (seconds)
+            upper: Maximum time (seconds), unbounded if None
+
+        Returns:
+            New track sharing the word list
+        """
+        return WordTrack(
+            self.words,
+            np.clip(self.starts, lower, upper),
+            np.clip(self.ends, lower, upper),
+        )
+
+    def merge_adjacent(self, max_gap: float = 0.1) -> "WordTrack":
+        """
+        Extend each word's end to the next word's start when the gap is small.
+
+        Args:
+            max_gap: Maximum gap between words to close (seconds)
+
+        Returns:
+            New track sharing the word list
+        """
+        if len(self) < 2:
+            return self
+
+        gaps = self.starts[1:] - self.ends[:-1]
+        mask = (gaps > 0) & (gaps < max_gap)
+
+        ends = self.ends.copy()
+        ends[:-1][mask] = self.starts[1:][mask]
+
+        return WordTrack(self.words, self.starts, ends)
+
+    def to_list(self) -> List[dict]:
+        """Serialize to the JSON word list (times rounded to milliseconds)."""
+        starts = np.round(self.starts.astype(np.float64), 3).tolist()
+        ends = np.round(self.ends.astype(np.float64), 3).tolist()
+        return [
+            {"word": word, "start": start, "end": end}
+            for word, start, end in zip(self.words, starts, ends)
+        ]
+
+
+def _as_track(words: Union[WordTrack, Iterable[WordTimestamp]]) -> WordTrack:
+    """Accept either a WordTrack or a list of WordTimestamp."""
+    if isinstance(words, WordTrack):
+        return words
+    return WordTrack.from_words(words)
+
+
+# Characters that end a word in ElevenLabs alignments
+WORD_BOUNDARY_CHARS = ' \t\n.,!?;:'
+
+# ASCII lookup table for boundary detection on code point arrays
+_BOUNDARY_TABLE = np.zeros(128, dtype=bool)
+_BOUNDARY_TABLE[[ord(c) for c in WORD_BOUNDARY_CHARS]] = True
+
+# Below this many characters the plain loop beats numpy's setup cost
+VECTORIZE_MIN_CHARS = 256
+
+
 def chars_to_words(
     text: str,
     characters: List[str],
     char_starts: List[float],
     char_ends: List[float]
-) -> List[WordTimestamp]:
+) -> WordTrack:
     """
     Convert character-level timestamps to word-level timestamps.
 
     This function handles the conversion from ElevenLabs' character alignment
     to word-level timing needed for karaoke display.
 
+    Vectorized: a boundary mask over the character array marks word runs,
+    and each word takes the start of its first character and the end of
+    its last one. Output is identical to the per-character loop.
+
     Args:
         text: Original text that was synthesized
         characters: List of characters from alignment
@@ -43,13 +237,75 @@ def chars_to_words(
         char_ends: End time for each character (seconds)
 
     Returns:
-        List of WordTimestamp objects with word-level timing
+        WordTrack with word-level timing
+    """
+    if not characters or not char_starts or not char_ends:
+        return WordTrack.empty()
+
+    n = min(len(characters), len(char_starts), len(char_ends))
+    if n < VECTORIZE_MIN_CHARS:
+        return _chars_to_words_loop(text, characters, char_starts, char_ends)
+
+    chars = characters[:n]
+    joined = "".join(chars)
+
+    if len(joined) == n:
+        # One code point per entry (the normal case): look boundaries up
+        # on the UTF-32 code point array directly.
+        codepoints = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32)
+        is_word = ~((codepoints < 128) & _BOUNDARY_TABLE[np.minimum(codepoints, 127)])
+        char_offsets = None
+    else:
+        # Multi-character or empty entries: same substring test as the loop
+        is_word = np.fromiter(
+            (not (c in ' \t\n' or c in '.,!?;:') for c in chars),
+            dtype=bool,
+            count=n,
+        )
+        char_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(c) for c in chars], out=char_offsets[1:])
+
+    # Word runs: rising and falling edges of the mask
+    edges = np.diff(np.concatenate(([False], is_word, [False])).astype(np.int8))
+    first = np.flatnonzero(edges == 1).tolist()
+    last = (np.flatnonzero(edges == -1) - 1).tolist()
+
+    if not first:
+        return WordTrack.empty()
+
+    if char_offsets is None:
+        words = [joined[a:b + 1] for a, b in zip(first, last)]
+    else:
+        offsets = char_offsets.tolist()
+        words = [joined[offsets[a]:offsets[b + 1]] for a, b in zip(first, last)]
+
+    # Gather only the boundary times instead of converting every character
+    starts = [char_starts[i] for i in first]
+    ends = [char_ends[i] for i in last]
+
+    return WordTrack(words, starts, ends)
+
+
+def _chars_to_words_loop(
+    text: str,
+    characters: List[str],
+    char_starts: List[float],
+    char_ends: List[float]
+) -> WordTrack:
+    """
+    Reference per-character implementation of chars_to_words.
+
+    Kept for equivalence tests and benchmarks; chars_to_words is the
+    vectorized version and must produce identical output.
     """
     if not characters or not char_starts or not char_ends:
-        return []
+        return WordTrack.empty()
 
-    words: List[WordTimestamp] = []
-    current_word = ""
+    words: List[str] = []
+    starts: List[float] = []
+    ends: List[float] = []
+
+    current_chars: List[str] = []
     word_start: Optional[float] = None
     word_end: float = 0.0
 
@@ -59,13 +315,11 @@ def chars_to_words(
 
         # Whitespace or punctuation marks word boundary
         if char in ' \t\n' or char in '.,!?;:':
-            if current_word:
-                words.append(WordTimestamp(
-                    word=current_word,
-                    start=word_start or 0.0,
-                    end=word_end
-                ))
-                current_word = ""
+            if current_chars:
+                words.append("".join(current_chars))
+                starts.append(word_start or 0.0)
+                ends.append(word_end)
+                current_chars = []
                 word_start = None
 
             # If it's punctuation, optionally add it as separate token
@@ -76,24 +330,22 @@ def chars_to_words(
         if word_start is None:
             word_start = char_starts[i]
 
-        current_word += char
+        current_chars.append(char)
         word_end = char_ends[i]
 
     # Don't forget the last word
-    if current_word:
-        words.append(WordTimestamp(
-            word=current_word,
-            start=word_start or 0.0,
-            end=word_end
-        ))
+    if current_chars:
+        words.append("".join(current_chars))
+        starts.append(word_start or 0.0)
+        ends.append(word_end)
 
-    return words
+    return WordTrack(words, starts, ends)
 
 
 def align_words_to_text(
     original_text: str,
-    transcribed_words: List[WordTimestamp]
-) -> List[WordTimestamp]:
+    transcribed_words: Union[WordTrack, List[WordTimestamp]]
+) -> WordTrack:
     """
     Align transcribed words back to original text.
 
@@ -108,24 +360,25 @@ def align_words_to_text(
     Returns:
         Aligned words matching original text where possible
     """
-    if not transcribed_words:
-        return []
+    track = _as_track(transcribed_words)
+
+    if not track:
+        return WordTrack.empty()
 
     # Split original text into words
     original_words = re.findall(r'\S+', original_text)
 
     if not original_words:
-        return transcribed_words
+        return track
 
-    # Simple alignment: match by position
-    aligned: List[WordTimestamp] = []
+    # Use transcribed timing but prefer original word spelling.
+    # Timing columns are shared; only the word column is rebuilt.
+    aligned: List[str] = []
 
-    # Use transcribed timing but prefer original word spelling
-    for i, tw in enumerate(transcribed_words):
+    for i, trans in enumerate(track.words):
         if i < len(original_words):
             # Use original word if similar enough
             orig = original_words[i]
-            trans = tw.word
 
             # Normalize for comparison
             orig_norm = re.sub(r'[^\w]', '', orig.lower())
@@ -133,63 +386,37 @@ def align_words_to_text(
 
             # Use original if they match (ignoring case/punctuation)
             if orig_norm == trans_norm or orig_norm.startswith(trans_norm) or trans_norm.startswith(orig_norm):
-                aligned.append(WordTimestamp(
-                    word=orig.rstrip('.,!?;:'),  # Strip trailing punctuation
-                    start=tw.start,
-                    end=tw.end
-                ))
+                aligned.append(orig.rstrip('.,!?;:'))  # Strip trailing punctuation
             else:
                 # Use transcribed word
-                aligned.append(tw)
+                aligned.append(trans)
         else:
-            aligned.append(tw)
+            aligned.append(trans)
 
-    return aligned
+    return WordTrack(aligned, track.starts, track.ends)
 
 
 def merge_adjacent_words(
-    words: List[WordTimestamp],
+    words: Union[WordTrack, List[WordTimestamp]],
     max_gap: float = 0.1
-) -> List[WordTimestamp]:
+) -> WordTrack:
     """
     Merge words that are very close together (for smoother karaoke).
 
     Args:
-        words: List of word timestamps
+        words: Word timestamps
         max_gap: Maximum gap between words to consider merging (seconds)
 
     Returns:
-        Potentially merged word list
+        Potentially merged word track
     """
-    if len(words) < 2:
-        return words
-
-    merged: List[WordTimestamp] = []
-    current = words[0]
-
-    for next_word in words[1:]:
-        gap = next_word.start - current.end
-
-        # If gap is small, extend current word to include it
-        if gap < max_gap and gap > 0:
-            # Extend current word's end time
-            current = WordTimestamp(
-                word=current.word,
-                start=current.start,
-                end=next_word.start  # Extend to next word's start
-            )
-
-        merged.append(current)
-        current = next_word
-
-    merged.append(current)
-    return merged
+    return _as_track(words).merge_adjacent(max_gap)
 
 
 def add_lookahead(
-    words: List[WordTimestamp],
+    words: Union[WordTrack, List[WordTimestamp]],
     lookahead_ms: float = 100
-) -> List[WordTimestamp]:
+) -> WordTrack:
     """
     Add lookahead offset to word timestamps for latency compensation.
 
@@ -197,22 +424,15 @@ def add_lookahead(
     the audio plays due to network/rendering latency.
 
     Args:
-        words: List of word timestamps
+        words: Word timestamps
         lookahead_ms: Milliseconds to shift earlier
 
     Returns:
         Words with adjusted timestamps
     """
-    if not words:
-        return words
+    track = _as_track(words)
 
-    offset_sec = lookahead_ms / 1000.0
+    if not track:
+        return track
 
-    return [
-        WordTimestamp(
-            word=w.word,
-            start=max(0, w.start - offset_sec),
-            end=max(0, w.end - offset_sec)
-        )
-        for w in words
-    ]
+    return track.shift(lookahead_ms / 1000.0)
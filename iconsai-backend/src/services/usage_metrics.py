@@ -0,0 +1,208 @@
+"""
+Provider usage and cost accounting.
+
+Records latency, request/response sizes, token usage, characters
+synthesized and audio seconds transcribed per (provider, module,
+endpoint) into the metrics registry, plus an estimated cost counter.
+Exposed through GET /metrics.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional
+
+import httpx
+
+from ..core.metrics import get_metrics
+from ..core.tracing import trace_span
+
+logger = logging.getLogger(__name__)
+
+
+# Module labels are normalized to this set to bound series cardinality
+KNOWN_MODULES = {"world", "health", "ideas", "help", "economia", "general", "home", "default", "summary"}
+
+# Approximate list prices in USD per 1M units, by model
+PRICES: Dict[str, Dict[str, float]] = {
+    "sonar": {"prompt": 1.0, "completion": 1.0},
+    "gpt-4o-mini": {"prompt": 0.15, "completion": 0.60},
+    "gemini-2.5-flash": {"prompt": 0.30, "completion": 2.50},
+    "eleven_turbo_v2_5": {"characters": 150.0},
+    "eleven_multilingual_v2": {"characters": 300.0},
+    "gpt-4o-mini-tts": {"characters": 15.0},
+    "whisper-1": {"audio_seconds": 100.0},  # $0.006 per minute
+}
+
+LATENCY = "iconsai_provider_latency_seconds"
+REQUEST_BYTES = "iconsai_provider_request_bytes"
+RESPONSE_BYTES = "iconsai_provider_response_bytes"
+REQUESTS_TOTAL = "iconsai_provider_requests_total"
+TOKENS = "iconsai_provider_tokens"
+TOKENS_TOTAL = "iconsai_provider_tokens_total"
+TTS_CHARACTERS = "iconsai_tts_characters"
+TTS_CHARACTERS_TOTAL = "iconsai_tts_characters_total"
+STT_AUDIO_SECONDS = "iconsai_stt_audio_seconds"
+STT_AUDIO_SECONDS_TOTAL = "iconsai_stt_audio_seconds_total"
+COST_TOTAL = "iconsai_provider_cost_usd_total"
+
+
+def _describe():
+    metrics = get_metrics()
+    metrics.describe(LATENCY, "summary", "Upstream provider call latency in seconds.", scale=1e6)
+    metrics.describe(REQUEST_BYTES, "summary", "Upstream request body size in bytes.", scale=1)
+    metrics.describe(RESPONSE_BYTES, "summary", "Upstream response body size in bytes.", scale=1)
+    metrics.describe(REQUESTS_TOTAL, "counter", "Upstream provider calls by status.")
+    metrics.describe(TOKENS, "summary", "Tokens per chat completion by kind (prompt, completion).", scale=1)
+    metrics.describe(TOKENS_TOTAL, "counter", "Total chat tokens by kind.")
+    metrics.describe(TTS_CHARACTERS, "summary", "Characters per speech synthesis request.", scale=1)
+    metrics.describe(TTS_CHARACTERS_TOTAL, "counter", "Total characters synthesized.")
+    metrics.describe(STT_AUDIO_SECONDS, "summary", "Audio seconds per transcription request.", scale=1e3)
+    metrics.describe(STT_AUDIO_SECONDS_TOTAL, "counter", "Total audio seconds transcribed.")
+    metrics.describe(COST_TOTAL, "counter", "Estimated provider cost in USD (list prices).")
+
+
+_describe()
+
+
+def module_label(module: Optional[str]) -> str:
+    """Normalize a module slug for use as a metric label."""
+    if not module:
+        return "default"
+    return module if module in KNOWN_MODULES else "other"
+
+
+def _labels(provider: str, endpoint: str, module: Optional[str]) -> Dict[str, str]:
+    return {"provider": provider, "module": module_label(module), "endpoint": endpoint}
+
+
+def _add_cost(labels: Dict[str, str], model: Optional[str], unit: str, amount: float):
+    price = PRICES.get(model or "", {}).get(unit)
+    if price and amount:
+        get_metrics().inc(COST_TOTAL, amount * price / 1_000_000, labels)
+
+
+@dataclass
+class ProviderCall:
+    """Mutable record filled in while a provider call runs."""
+    provider: str
+    endpoint: str
+    module: Optional[str] = None
+    request_bytes: int = 0
+    response_bytes: int = 0
+    status: str = "ok"
+
+
+@contextmanager
+def track_call(provider: str, endpoint: str, module: Optional[str] = None) -> Iterator[ProviderCall]:
+    """
+    Time a provider call and record its sizes and outcome.
+
+    Usage:
+        with track_call("openai", "chat.completions", module_slug) as call:
+            response = await client.post(...)
+            call.response_bytes = len(response.content)
+
+    Exceptions mark the call as "error" and are re-raised. Also opens a
+    tracing span for the call when the request is sampled.
+    """
+    call = ProviderCall(provider=provider, endpoint=endpoint, module=module)
+    start = time.perf_counter()
+    with trace_span(f"provider.{endpoint}", provider=provider) as span:
+        try:
+            yield call
+        except Exception:
+            call.status = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            span.set_attribute("request_bytes", call.request_bytes)
+            span.set_attribute("response_bytes", call.response_bytes)
+            span.set_attribute("status", call.status)
+            _record_call(call, elapsed)
+
+
+def _record_call(call: ProviderCall, elapsed: float):
+    """Feed a finished call into the metrics registry."""
+    labels = _labels(call.provider, call.endpoint, call.module)
+    metrics = get_metrics()
+    metrics.observe(LATENCY, elapsed, labels)
+    if call.request_bytes:
+        metrics.observe(REQUEST_BYTES, call.request_bytes, labels)
+    if call.response_bytes:
+        metrics.observe(RESPONSE_BYTES, call.response_bytes, labels)
+    metrics.inc(REQUESTS_TOTAL, 1, {**labels, "status": call.status})
+
+
+def record_tokens(
+    provider: str,
+    endpoint: str,
+    module: Optional[str],
+    model: Optional[str],
+    prompt_tokens: int,
+    completion_tokens: int,
+):
+    """Record chat token usage and its estimated cost."""
+    labels = _labels(provider, endpoint, module)
+    metrics = get_metrics()
+    for kind, tokens in (("prompt", prompt_tokens), ("completion", completion_tokens)):
+        if tokens:
+            metrics.observe(TOKENS, tokens, {**labels, "kind": kind})
+            metrics.inc(TOKENS_TOTAL, tokens, {**labels, "kind": kind})
+            _add_cost(labels, model, kind, tokens)
+
+
+def record_characters(
+    provider: str,
+    endpoint: str,
+    module: Optional[str],
+    model: Optional[str],
+    characters: int,
+):
+    """Record characters sent to speech synthesis and their estimated cost."""
+    labels = _labels(provider, endpoint, module)
+    metrics = get_metrics()
+    metrics.observe(TTS_CHARACTERS, characters, labels)
+    metrics.inc(TTS_CHARACTERS_TOTAL, characters, labels)
+    _add_cost(labels, model, "characters", characters)
+
+
+def record_audio_seconds(
+    provider: str,
+    endpoint: str,
+    module: Optional[str],
+    model: Optional[str],
+    seconds: Optional[float],
+):
+    """Record transcribed audio duration and its estimated cost."""
+    if not seconds:
+        return
+    labels = _labels(provider, endpoint, module)
+    metrics = get_metrics()
+    metrics.observe(STT_AUDIO_SECONDS, seconds, labels)
+    metrics.inc(STT_AUDIO_SECONDS_TOTAL, seconds, labels)
+    _add_cost(labels, model, "audio_seconds", seconds)
+
+
+async def tracked_post(
+    client: httpx.AsyncClient,
+    provider: str,
+    endpoint: str,
+    module: Optional[str],
+    url: str,
+    **kwargs,
+) -> httpx.Response:
+    """
+    client.post() wrapped in track_call.
+
+    HTTP error statuses are recorded as "error" but the response is
+    returned unchanged for the caller's own handling.
+    """
+    with track_call(provider, endpoint, module) as call:
+        response = await client.post(url, **kwargs)
+        call.request_bytes = int(response.request.headers.get("content-length") or 0)
+        call.response_bytes = len(response.content)
+        if response.status_code >= 400:
+            call.status = "error"
+    return response
@@ -3,23 +3,61 @@ OpenAI Whisper Speech-to-Text Service.
 Provides transcription with optional word-level timestamps.
 """
 
+import asyncio
+import io
 import logging
+import string
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import BinaryIO, List, Optional, Tuple
 
 import httpx
+import numpy as np
 
 from ..config import get_settings
-from .timestamp_utils import WordTimestamp
+from ..core.tracing import trace_span
+from ..utils.audio import (
+    VAD_SAMPLE_RATE,
+    AudioChunk,
+    TrimResult,
+    detect_speech,
+    encode_wav,
+    get_extension_for_mime,
+    plan_chunks,
+    read_wav_pcm,
+    trim_silence,
+)
+from ..utils.audio_probe import (
+    ConversionPlan,
+    ProbeResult,
+    convert_audio,
+    decode_pcm,
+    plan_for_whisper,
+    probe_audio,
+    probe_header,
+)
+from ..utils.multipart import MultipartFileStream
+from .realtime_stt import LocalSTTBusy, get_inference_pool, get_realtime_stt_service
+from .timestamp_utils import WordTrack
+from .usage_metrics import record_audio_seconds, track_call, tracked_post
 
 logger = logging.getLogger(__name__)
 
+# Trimming that saves less than this is not worth re-encoding the upload as WAV
+TRIM_MIN_SAVED_SECONDS = 1.0
+
+# Words compared when removing text repeated across a chunk overlap
+OVERLAP_MAX_WORDS = 12
+
+
+class NoSpeechError(ValueError):
+    """Nothing intelligible was transcribed."""
+
 
 @dataclass
 class TranscriptionResult:
     """Result from speech-to-text transcription."""
     text: str
-    words: Optional[List[WordTimestamp]] = None
+    words: Optional[WordTrack] = None
     duration: Optional[float] = None
     language: str = "pt"
 
@@ -28,7 +66,7 @@ class TranscriptionResult:
         result = {"text": self.text}
 
         if self.words:
-            result["words"] = [w.to_dict() for w in self.words]
+            result["words"] = self.words.to_list()
 
         if self.duration is not None:
             result["duration"] = self.duration
@@ -36,6 +74,104 @@ class TranscriptionResult:
         return result
 
 
+def choose_stt_backend(
+    backend: str,
+    duration: float,
+    max_seconds: float,
+    model_ready: bool,
+    saturated: bool
+) -> str:
+    """
+    Pick "local" or "api" for a clip.
+
+    - api: always the OpenAI API
+    - local: always the local model (the API only when its queue is full)
+    - auto: the local model for clips up to max_seconds, once it is
+      loaded and while its queue has room; the API otherwise
+
+    Args:
+        backend: STT_BACKEND setting
+        duration: Clip duration in seconds (an upper bound when the
+            headers have none, see ProbeResult.estimated_duration)
+        max_seconds: STT_LOCAL_MAX_SECONDS
+        model_ready: Whether the local model is resident
+        saturated: Whether the inference pool refuses new jobs
+    """
+    if backend == "local":
+        return "local"
+    if backend == "auto" and model_ready and not saturated and duration <= max_seconds:
+        return "local"
+    return "api"
+
+
+def _normalize_word(word: str) -> str:
+    return word.strip(string.punctuation + "¿¡…«»“”").lower()
+
+
+def strip_repeated_prefix(previous: str, text: str, max_words: int = OVERLAP_MAX_WORDS) -> str:
+    """
+    Remove the start of text that repeats the end of previous.
+
+    Neighbouring chunks cut without a pause share CHUNK_OVERLAP seconds
+    of audio, so both transcripts contain the same few words. The
+    longest run of words (ignoring case and punctuation) ending
+    previous and starting text is dropped from text.
+    """
+    tail = [_normalize_word(w) for w in previous.split()[-max_words:]]
+    words = text.split()
+    head = [_normalize_word(w) for w in words[:max_words]]
+    for size in range(min(len(tail), len(head)), 0, -1):
+        if tail[-size:] == head[:size]:
+            return " ".join(words[size:])
+    return text
+
+
+def stitch_transcripts(
+    chunks: List[AudioChunk],
+    results: List[Optional[TranscriptionResult]],
+    language: str = "pt"
+) -> TranscriptionResult:
+    """
+    Join chunk transcripts into one result on the recording's timeline.
+
+    Word times are shifted by each chunk's start. Across an overlap
+    each chunk keeps the words starting on its side of the overlap's
+    midpoint, and repeated text is removed with strip_repeated_prefix.
+
+    Args:
+        chunks: Chunks from plan_chunks
+        results: Result per chunk (None for chunks without speech)
+        language: Language code
+
+    Returns:
+        TranscriptionResult (duration unset)
+    """
+    texts: List[str] = []
+    tracks: List[WordTrack] = []
+    for i, (chunk, result) in enumerate(zip(chunks, results)):
+        if result is None:
+            continue
+
+        text = result.text
+        if chunk.overlap and texts:
+            text = strip_repeated_prefix(texts[-1], text)
+        if text:
+            texts.append(text)
+
+        if result.words:
+            words = result.words.shift(-chunk.start)
+            keep = np.ones(len(words), dtype=bool)
+            if chunk.overlap:
+                keep &= words.starts >= chunk.start + chunk.overlap / 2
+            following = chunks[i + 1] if i + 1 < len(chunks) else None
+            if following is not None and following.overlap:
+                keep &= words.starts < following.start + following.overlap / 2
+            tracks.append(words.select(keep))
+
+    words = WordTrack.concat(tracks) if tracks else None
+    return TranscriptionResult(text=" ".join(texts), words=words, language=language)
+
+
 class WhisperSTTService:
     """
     OpenAI Whisper Speech-to-Text service.
@@ -43,6 +179,7 @@ class WhisperSTTService:
     Provides:
     - Basic transcription
     - Word-level timestamps for karaoke sync
+    - Routing of short clips to the resident faster-whisper model (STT_BACKEND)
     """
 
     WHISPER_URL = "https://api.openai.com/v1/audio/transcriptions"
@@ -57,21 +194,26 @@ class WhisperSTTService:
         self.settings = get_settings()
         self.api_key = api_key or self.settings.openai_api_key
 
-        if not self.api_key:
+        if not self.api_key and self.settings.stt_backend == "api":
             raise ValueError("OpenAI API key is required for Whisper STT")
 
     async def transcribe(
         self,
-        audio_bytes: bytes,
+        audio_bytes: Optional[bytes] = None,
         filename: str = "audio.webm",
         mime_type: str = "audio/webm",
         language: str = "pt",
         include_word_timestamps: bool = False,
-        prompt: Optional[str] = None
+        prompt: Optional[str] = None,
+        audio_file: Optional[BinaryIO] = None,
+        audio_seconds: Optional[float] = None
     ) -> TranscriptionResult:
         """
         Transcribe audio to text using OpenAI Whisper.
 
+        The multipart body is streamed from audio_file in chunks, so a
+        spooled upload is never loaded into memory as a whole.
+
         Args:
             audio_bytes: Raw audio data
             filename: Filename with extension (helps Whisper detect format)
@@ -79,6 +221,9 @@ class WhisperSTTService:
             language: Language code (default: pt for Portuguese)
             include_word_timestamps: Whether to include word-level timing
             prompt: Optional prompt to guide transcription
+            audio_file: Seekable binary file with the audio (instead of audio_bytes)
+            audio_seconds: Known or probed duration, metered when the
+                response carries neither duration nor usage
 
         Returns:
             TranscriptionResult with text and optional word timestamps
@@ -87,19 +232,13 @@ class WhisperSTTService:
             httpx.HTTPStatusError: On API errors
             ValueError: On invalid input
         """
-        if len(audio_bytes) < 1000:
-            raise ValueError("Audio too short. Please record longer.")
+        if not self.api_key:
+            raise ValueError("OpenAI API key is required for Whisper STT")
 
-        logger.info(
-            f"[Whisper] Transcribing audio: {len(audio_bytes)} bytes, "
-            f"format={mime_type}, lang={language}, timestamps={include_word_timestamps}"
-        )
+        if audio_file is None:
+            audio_file = io.BytesIO(audio_bytes or b"")
 
         # Prepare form data
-        files = {
-            "file": (filename, audio_bytes, mime_type),
-        }
-
         data = {
             "model": "whisper-1",
             "language": language,
@@ -115,12 +254,22 @@ class WhisperSTTService:
             data["response_format"] = "verbose_json"
             data["timestamp_granularities[]"] = "word"
 
+        body = MultipartFileStream(data, "file", filename, audio_file, mime_type)
+
+        if body.file_size < 1000:
+            raise ValueError("Audio too short. Please record longer.")
+
+        logger.info(
+            f"[Whisper] Transcribing audio: {body.file_size} bytes, "
+            f"format={mime_type}, lang={language}, timestamps={include_word_timestamps}"
+        )
+
         async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
+            response = await tracked_post(
+                client, "openai", "stt.transcribe", None,
                 self.WHISPER_URL,
-                headers={"Authorization": f"Bearer {self.api_key}"},
-                files=files,
-                data=data
+                headers={"Authorization": f"Bearer {self.api_key}", **body.headers},
+                content=body
             )
 
             # Handle errors
@@ -143,25 +292,22 @@ class WhisperSTTService:
 
             result = response.json()
 
+        # Plain json has no duration; it may carry usage.seconds instead
+        billed = result.get("duration") or (result.get("usage") or {}).get("seconds") or audio_seconds
+        record_audio_seconds("openai", "stt.transcribe", None, "whisper-1", billed)
+
         # Parse response
         text = result.get("text", "").strip()
 
         if not text:
-            raise ValueError("Could not understand audio. Please speak more clearly.")
+            raise NoSpeechError("Could not understand audio. Please speak more clearly.")
 
         logger.info(f"[Whisper] Transcription complete: {text[:50]}...")
 
         # Extract word timestamps if present
         words = None
         if include_word_timestamps and "words" in result:
-            words = [
-                WordTimestamp(
-                    word=w["word"],
-                    start=w["start"],
-                    end=w["end"]
-                )
-                for w in result["words"]
-            ]
+            words = WordTrack.from_dicts(result["words"])
             logger.info(f"[Whisper] Found {len(words)} words with timestamps")
 
         return TranscriptionResult(
@@ -171,79 +317,345 @@ class WhisperSTTService:
             language=language
         )
 
+    def _local_model(self):
+        """The resident faster-whisper service (shared with realtime STT)."""
+        return get_realtime_stt_service(
+            model_size=self.settings.realtime_stt_model_size,
+            device=self.settings.realtime_stt_device,
+            compute_type=self.settings.realtime_stt_compute_type,
+        )
+
+    async def transcribe_local(
+        self,
+        audio_file: BinaryIO,
+        language: str = "pt",
+        include_word_timestamps: bool = False
+    ) -> TranscriptionResult:
+        """
+        Transcribe with the resident faster-whisper model on the inference pool.
+
+        Args:
+            audio_file: Seekable binary file with the audio
+            language: Language code
+            include_word_timestamps: Include word timing
+
+        Returns:
+            TranscriptionResult
+
+        Raises:
+            LocalSTTBusy: If the inference pool is saturated
+            RuntimeError: If faster-whisper is not installed
+            NoSpeechError: If nothing was recognized
+        """
+        with track_call("local", "stt.transcribe"):
+            text, words, duration = await self._local_model().transcribe_file(
+                audio_file, language, include_word_timestamps
+            )
+
+        record_audio_seconds(
+            "local", "stt.transcribe", None, f"faster-whisper-{self.settings.realtime_stt_model_size}", duration
+        )
+
+        if not text:
+            raise NoSpeechError("Could not understand audio. Please speak more clearly.")
+
+        logger.info(f"[Whisper] Local transcription complete: {text[:50]}...")
+
+        track = None
+        if include_word_timestamps and words:
+            track = WordTrack([w.word for w in words], [w.start for w in words], [w.end for w in words])
+
+        return TranscriptionResult(text=text, words=track, duration=duration, language=language)
+
     async def transcribe_with_fallback(
         self,
-        audio_bytes: bytes,
+        audio_bytes: Optional[bytes] = None,
         mime_type: str = "audio/webm",
         language: str = "pt",
-        include_word_timestamps: bool = False
+        include_word_timestamps: bool = False,
+        audio_file: Optional[BinaryIO] = None
     ) -> TranscriptionResult:
         """
-        Transcribe with format fallback on failure.
+        Transcribe after probing the container, converting if needed.
+
+        The container and codec are read locally (ffprobe when the
+        headers are not recognized) and the upload is remuxed or
+        transcoded with ffmpeg when Whisper would reject it, so exactly
+        one upstream call is made instead of retrying the same bytes
+        relabelled as ogg, m4a and mp3. With AUDIO_COMPRESS, bulky
+        uploads are re-encoded to 16 kHz mono first.
 
-        If the initial format fails, tries alternative formats
-        (ogg, m4a, mp3) which may work better with some audio.
+        With AUDIO_TRIM_SILENCE, silence is cut before either backend
+        sees the audio; word timestamps and the duration are mapped back
+        to the original recording. Recordings longer than
+        STT_CHUNK_MIN_SECONDS are split at pauses and the chunks are
+        transcribed concurrently, then stitched.
+
+        Short clips may be served by the local model instead (see
+        choose_stt_backend); the API is used when its queue is full or
+        it fails.
 
         Args:
             audio_bytes: Raw audio data
-            mime_type: Initial MIME type
+            mime_type: Declared MIME type (used when the format is not identified)
             language: Language code
             include_word_timestamps: Include word timing
+            audio_file: Seekable binary file with the audio (instead of audio_bytes)
 
         Returns:
             TranscriptionResult
+
+        Raises:
+            ValueError: If the recording is truncated or cannot be converted
         """
-        # Map MIME to extension
-        mime_to_ext = {
-            "audio/webm": "webm",
-            "audio/mp4": "m4a",
-            "audio/m4a": "m4a",
-            "audio/mpeg": "mp3",
-            "audio/mp3": "mp3",
-            "audio/ogg": "ogg",
-            "audio/wav": "wav",
-            "audio/flac": "flac",
-        }
+        if audio_file is None:
+            audio_file = io.BytesIO(audio_bytes or b"")
 
         base_mime = mime_type.split(";")[0].strip().lower()
-        extension = mime_to_ext.get(base_mime, "webm")
 
-        # Try primary format
+        with trace_span("audio.probe") as span:
+            probe = await probe_audio(audio_file, use_ffprobe=self.settings.audio_probe_ffprobe)
+            required, plan = self._plans(probe)
+            span.set_attribute("container", probe.container or "unknown")
+            span.set_attribute("codec", probe.codec or "unknown")
+            span.set_attribute("action", plan.action)
+
+        if not probe.complete:
+            raise ValueError("Audio file is incomplete. Please try recording again.")
+
+        # Without a duration in the headers the estimate is an upper bound
+        # (at most about 2x too long, see estimated_duration): it only decides
+        # whether to decode, the decoded duration decides the rest
+        trim_mode = self.settings.audio_trim_silence
+        trim_max = self.settings.audio_trim_max_seconds
+        chunk_over = self.settings.stt_chunk_min_seconds
+        wants_trim = trim_mode != "off" and (
+            probe.duration <= trim_max if probe.duration is not None else probe.estimated_duration <= 2 * trim_max
+        )
+        wants_chunks = chunk_over > 0 and probe.estimated_duration > chunk_over
+
+        decoded = None
+        if wants_trim or wants_chunks:
+            decoded = await self._decode(audio_file, probe)
+            if decoded is not None:
+                probe.duration = len(decoded[0]) / decoded[1]
+
+        trim = None
+        if decoded is not None and wants_trim and probe.duration <= trim_max:
+            trim = await self._trim_silence(*decoded)
+            if trim is not None:
+                decoded = trim.samples, trim.sample_rate
+                audio_file = io.BytesIO(encode_wav(trim.samples, trim.sample_rate))
+                probe = probe_header(audio_file)
+                required, plan = self._plans(probe)
+
+        if decoded is not None and chunk_over > 0 and len(decoded[0]) / decoded[1] > chunk_over:
+            result = await self._transcribe_chunked(*decoded, language, include_word_timestamps)
+        else:
+            result = await self._transcribe_probed(
+                audio_file, probe, required, plan, base_mime, language, include_word_timestamps
+            )
+
+        if trim is not None:
+            # Report times and duration on the timeline of the recording as sent
+            if result.words:
+                result.words = WordTrack(
+                    result.words.words,
+                    trim.to_original(result.words.starts),
+                    trim.to_original(result.words.ends, ends=True),
+                )
+            result.duration = trim.original_duration
+        return result
+
+    def _plans(self, probe: ProbeResult) -> Tuple[ConversionPlan, ConversionPlan]:
+        """The required conversion and the one to apply (with AUDIO_COMPRESS)."""
+        required = plan_for_whisper(probe)
+        plan = plan_for_whisper(
+            probe,
+            compress=self.settings.audio_compress,
+            compress_min_bytes=self.settings.audio_compress_min_kb * 1024
+        )
+        return required, plan
+
+    async def _decode(self, audio_file: BinaryIO, probe: ProbeResult) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        Decode to int16 mono samples for trimming and chunking.
+
+        PCM WAV is read directly; other formats are decoded to 16 kHz
+        mono with ffmpeg.
+
+        Returns:
+            (samples, sample_rate), or None when ffmpeg is missing or fails
+        """
+        with trace_span("audio.decode", codec=probe.codec or "unknown"):
+            if probe.container == "wav" and probe.codec == "pcm":
+                decoded = await asyncio.to_thread(read_wav_pcm, audio_file)
+                if decoded is not None:
+                    return decoded
+            try:
+                pcm = await decode_pcm(audio_file, VAD_SAMPLE_RATE)
+            except RuntimeError as e:
+                logger.info(f"[Whisper] Trimming/chunking skipped: {e}")
+                return None
+            return np.frombuffer(pcm, dtype="<i2"), VAD_SAMPLE_RATE
+
+    async def _trim_silence(self, samples: np.ndarray, sample_rate: int) -> Optional[TrimResult]:
+        """
+        Drop leading/trailing silence (and long pauses with AUDIO_TRIM_SILENCE=spans).
+
+        Trimming is skipped when no speech is detected (the recording
+        is sent as is) or it would save less than TRIM_MIN_SAVED_SECONDS.
+
+        Args:
+            samples: int16 mono samples
+            sample_rate: Sample rate in Hz
+
+        Returns:
+            TrimResult, or None to send the original
+        """
+        mode = self.settings.audio_trim_silence
+        with trace_span("audio.trim", mode=mode) as span:
+            trim = await asyncio.to_thread(
+                trim_silence, samples, sample_rate,
+                concatenate=mode == "spans",
+                max_gap=self.settings.audio_trim_max_gap_ms / 1000,
+            )
+            if trim is None:
+                logger.info("[Whisper] No speech detected, sending untrimmed")
+                return None
+            span.set_attribute("saved_seconds", round(trim.saved, 3))
+
+        if trim.saved < TRIM_MIN_SAVED_SECONDS:
+            return None
+
+        logger.info(
+            f"[Whisper] Trimmed silence: {trim.original_duration:.1f}s -> {trim.duration:.1f}s "
+            f"({len(trim.offsets)} spans)"
+        )
+        return trim
+
+    async def _transcribe_chunked(
+        self,
+        samples: np.ndarray,
+        sample_rate: int,
+        language: str,
+        include_word_timestamps: bool
+    ) -> TranscriptionResult:
+        """
+        Transcribe a long recording as chunks split at pauses, concurrently.
+
+        Up to STT_CHUNK_CONCURRENCY chunks are in flight; each one is
+        routed and converted like a short upload (local model or API,
+        AUDIO_COMPRESS applies). If a chunk fails the others are
+        cancelled and the error is raised.
+
+        Args:
+            samples: int16 mono samples
+            sample_rate: Sample rate in Hz
+            language: Language code
+            include_word_timestamps: Include word timing
+
+        Returns:
+            Stitched TranscriptionResult
+
+        Raises:
+            NoSpeechError: If no chunk contained speech
+        """
+        duration = len(samples) / sample_rate
+        spans = await asyncio.to_thread(detect_speech, samples, sample_rate)
+        chunks = plan_chunks(spans, duration, self.settings.stt_chunk_max_seconds)
+        slots = asyncio.Semaphore(max(1, self.settings.stt_chunk_concurrency))
+
+        logger.info(f"[Whisper] Chunked transcription: {duration:.1f}s in {len(chunks)} chunks")
+
+        async def run(chunk: AudioChunk) -> Optional[TranscriptionResult]:
+            async with slots:
+                part = samples[int(chunk.start * sample_rate):int(chunk.end * sample_rate)]
+                audio_file = io.BytesIO(encode_wav(part, sample_rate))
+                probe = probe_header(audio_file)
+                required, plan = self._plans(probe)
+                try:
+                    return await self._transcribe_probed(
+                        audio_file, probe, required, plan, "audio/wav", language, include_word_timestamps
+                    )
+                except NoSpeechError:
+                    return None
+
+        with trace_span("stt.chunked", chunks=len(chunks), audio_seconds=round(duration, 3)):
+            tasks = [asyncio.ensure_future(run(chunk)) for chunk in chunks]
+            try:
+                results = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+
+        result = stitch_transcripts(chunks, results, language)
+        if not result.text:
+            raise NoSpeechError("Could not understand audio. Please speak more clearly.")
+        result.duration = duration
+        return result
+
+    async def _transcribe_probed(
+        self,
+        audio_file: BinaryIO,
+        probe: ProbeResult,
+        required: ConversionPlan,
+        plan: ConversionPlan,
+        base_mime: str,
+        language: str,
+        include_word_timestamps: bool
+    ) -> TranscriptionResult:
+        """Route a probed upload to the local model or convert it and call the API."""
+        pool = get_inference_pool()
+        backend = choose_stt_backend(
+            self.settings.stt_backend,
+            probe.estimated_duration,
+            self.settings.stt_local_max_seconds,
+            model_ready=self._local_model().is_initialized(),
+            saturated=pool.saturated,
+        )
+        if backend == "local":
+            try:
+                with trace_span("stt.local", pending=pool.pending):
+                    return await self.transcribe_local(audio_file, language, include_word_timestamps)
+            except LocalSTTBusy as e:
+                logger.info(f"[Whisper] {e}, using the API")
+            except RuntimeError as e:
+                logger.warning(f"[Whisper] Local STT failed, using the API: {e}")
+
+        if required.action != "send" and not self.settings.audio_convert:
+            raise ValueError("Unsupported audio format. Please try recording again.")
+
+        upload_file = audio_file
+        if plan.action != "send":
+            try:
+                with trace_span("audio.convert", action=plan.action, target=plan.container):
+                    upload_file = await convert_audio(audio_file, plan)
+            except RuntimeError as e:
+                if required.action != "send":
+                    logger.error(f"[Whisper] {plan.action} {probe.container}/{probe.codec} failed: {e}")
+                    raise ValueError("Unsupported audio format. Please try recording again.")
+                # Compression is optional: send the original
+                logger.warning(f"[Whisper] Compression skipped: {e}")
+                plan = required
+            else:
+                logger.info(f"[Whisper] {plan.action} {probe.container}/{probe.codec} -> {plan.container}")
+
+        if plan.mime_type:
+            mime_type, extension = plan.mime_type, plan.extension
+        else:
+            mime_type, extension = base_mime, get_extension_for_mime(base_mime)
+
         try:
             return await self.transcribe(
-                audio_bytes=audio_bytes,
+                audio_file=upload_file,
                 filename=f"audio.{extension}",
-                mime_type=base_mime,
+                mime_type=mime_type,
                 language=language,
-                include_word_timestamps=include_word_timestamps
+                include_word_timestamps=include_word_timestamps,
+                audio_seconds=probe.estimated_duration
             )
-        except ValueError:
-            # Re-raise user-facing errors
-            raise
-        except Exception as e:
-            logger.warning(f"[Whisper] Primary format {extension} failed: {e}")
-
-        # Fallback formats
-        fallbacks = [
-            ("audio/ogg", "ogg"),
-            ("audio/mp4", "m4a"),
-            ("audio/mpeg", "mp3"),
-        ]
-
-        for fallback_mime, fallback_ext in fallbacks:
-            if fallback_mime == base_mime:
-                continue
-
-            try:
-                logger.info(f"[Whisper] Trying fallback format: {fallback_ext}")
-                return await self.transcribe(
-                    audio_bytes=audio_bytes,
-                    filename=f"audio.{fallback_ext}",
-                    mime_type=fallback_mime,
-                    language=language,
-                    include_word_timestamps=include_word_timestamps
-                )
-            except Exception as fallback_error:
-                logger.warning(f"[Whisper] Fallback {fallback_ext} failed: {fallback_error}")
-
-        raise ValueError("Unsupported audio format. Please try recording again.")
+        finally:
+            if upload_file is not audio_file:
+                upload_file.close()
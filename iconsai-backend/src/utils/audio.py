@@ -1,10 +1,14 @@
 """
-Audio utilities for format detection and conversion.
+Audio utilities for format detection, conversion and silence trimming.
 """
 
 import base64
 import io
-from typing import Optional, Tuple
+import wave
+from dataclasses import dataclass
+from typing import BinaryIO, List, Optional, Tuple
+
+import numpy as np
 
 # Magic numbers for audio format detection
 AUDIO_SIGNATURES = {
@@ -191,3 +195,301 @@ def convert_audio_format(
 
     except Exception as e:
         raise RuntimeError(f"Audio conversion failed: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Voice activity detection / silence trimming
+# ---------------------------------------------------------------------------
+
+# Rate non-WAV uploads are decoded to for trimming (what Whisper uses)
+VAD_SAMPLE_RATE = 16000
+VAD_FRAME_MS = 20
+VAD_MARGIN_DB = 10.0  # Above the noise floor
+VAD_RANGE_DB = 25.0  # Below the loudest frame (keeps soft speech in noise-free clips)
+VAD_FLOOR_DB = -60.0  # Never count quieter frames as speech
+VAD_MIN_SPEECH_MS = 60  # Shorter bursts are clicks, not speech
+VAD_PADDING_MS = 200  # Kept around each span so word onsets/releases are not cut
+
+# Silence left between concatenated spans, so Whisper still hears a pause
+TRIM_JOIN_GAP = 0.3
+
+
+@dataclass
+class SpeechSpan:
+    """Region of speech in seconds."""
+    start: float
+    end: float
+
+
+@dataclass
+class TrimResult:
+    """
+    Audio with silence removed and the map back to the original timeline.
+
+    Segment i starts at offsets[i] in the trimmed audio and at
+    origins[i] in the original; time within a segment is unchanged.
+    """
+    samples: np.ndarray  # int16 mono
+    sample_rate: int
+    offsets: np.ndarray
+    origins: np.ndarray
+    original_duration: float
+
+    @property
+    def duration(self) -> float:
+        """Trimmed duration in seconds."""
+        return len(self.samples) / self.sample_rate
+
+    @property
+    def saved(self) -> float:
+        """Seconds removed."""
+        return self.original_duration - self.duration
+
+    def to_original(self, times: np.ndarray, ends: bool = False) -> np.ndarray:
+        """
+        Map trimmed timestamps to the original timeline.
+
+        Args:
+            times: Seconds in the trimmed audio
+            ends: Times are word ends (a time on a segment boundary
+                belongs to the earlier segment)
+
+        Returns:
+            Seconds in the original audio
+        """
+        times = np.asarray(times, dtype=np.float64)
+        index = np.searchsorted(self.offsets, times, side="left" if ends else "right") - 1
+        index = np.clip(index, 0, len(self.offsets) - 1)
+        return np.minimum(self.origins[index] + (times - self.offsets[index]), self.original_duration)
+
+
+def read_wav_pcm(file: BinaryIO) -> Optional[Tuple[np.ndarray, int]]:
+    """
+    Read an integer PCM WAV as int16 mono samples.
+
+    Returns:
+        (samples, sample_rate), or None if file is not PCM WAV
+    """
+    file.seek(0)
+    try:
+        with wave.open(file, "rb") as w:
+            width, channels, rate = w.getsampwidth(), w.getnchannels(), w.getframerate()
+            frames = w.readframes(w.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    finally:
+        file.seek(0)
+
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.int16) - 128) << 8
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype="<i2")
+    elif width in (3, 4):
+        # Keep the top 16 bits of each sample
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, width)
+        samples = raw[:, -2:].copy().view("<i2").ravel()
+    else:
+        return None
+
+    usable = len(samples) - len(samples) % channels
+    if channels > 1:
+        samples = samples[:usable].reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, rate
+
+
+def encode_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+    """Encode int16 mono samples as a WAV file."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(samples.astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end (exclusive) indices of the True runs in mask."""
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def detect_speech(
+    samples: np.ndarray,
+    sample_rate: int,
+    frame_ms: int = VAD_FRAME_MS,
+    padding_ms: int = VAD_PADDING_MS
+) -> List[SpeechSpan]:
+    """
+    Find speech spans with an energy VAD.
+
+    Frame energies (dBFS) are compared to a threshold derived from
+    the clip itself: VAD_MARGIN_DB above the noise floor (10th
+    percentile), but at most VAD_RANGE_DB below the loudest frame and
+    never under VAD_FLOOR_DB. Bursts shorter than VAD_MIN_SPEECH_MS
+    are dropped, the rest padded by padding_ms and overlapping spans
+    merged.
+
+    Args:
+        samples: int16 mono samples
+        sample_rate: Sample rate in Hz
+        frame_ms: Analysis frame length
+        padding_ms: Silence kept before and after each span
+
+    Returns:
+        Speech spans in seconds, sorted (empty if nothing exceeds the threshold)
+    """
+    frame = max(1, sample_rate * frame_ms // 1000)
+    count = len(samples) // frame
+    if count == 0:
+        return []
+
+    frames = samples[:count * frame].reshape(count, frame).astype(np.float32) / 32768.0
+    energy = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+
+    noise = float(np.percentile(energy, 10))
+    threshold = max(min(noise + VAD_MARGIN_DB, float(energy.max()) - VAD_RANGE_DB), VAD_FLOOR_DB)
+
+    starts, ends = _runs(energy > threshold)
+    keep = (ends - starts) * frame_ms >= VAD_MIN_SPEECH_MS
+    if not keep.any():
+        return []
+
+    frame_sec = frame / sample_rate
+    duration = len(samples) / sample_rate
+    padding = padding_ms / 1000
+
+    spans: List[SpeechSpan] = []
+    for start, end in zip(starts[keep] * frame_sec - padding, ends[keep] * frame_sec + padding):
+        start, end = max(0.0, float(start)), min(duration, float(end))
+        if spans and start <= spans[-1].end:
+            spans[-1].end = end
+        else:
+            spans.append(SpeechSpan(start, end))
+    return spans
+
+
+def merge_spans(spans: List[SpeechSpan], max_gap: float) -> List[SpeechSpan]:
+    """Merge sorted spans separated by at most max_gap seconds."""
+    merged: List[SpeechSpan] = []
+    for span in spans:
+        if merged and span.start - merged[-1].end <= max_gap:
+            merged[-1] = SpeechSpan(merged[-1].start, span.end)
+        else:
+            merged.append(SpeechSpan(span.start, span.end))
+    return merged
+
+
+def trim_silence(
+    samples: np.ndarray,
+    sample_rate: int,
+    concatenate: bool = False,
+    max_gap: float = 1.0
+) -> Optional[TrimResult]:
+    """
+    Remove leading/trailing silence, optionally long pauses too.
+
+    Without concatenate only the audio before the first and after the
+    last speech span is dropped. With concatenate, pauses longer than
+    max_gap are also shortened to TRIM_JOIN_GAP seconds.
+
+    Args:
+        samples: int16 mono samples
+        sample_rate: Sample rate in Hz
+        concatenate: Also shorten long pauses between spans
+        max_gap: Pauses up to this long (seconds) are kept as they are
+
+    Returns:
+        TrimResult, or None if no speech was detected
+    """
+    spans = detect_speech(samples, sample_rate)
+    if not spans:
+        return None
+
+    if concatenate:
+        spans = merge_spans(spans, max(max_gap, TRIM_JOIN_GAP))
+    else:
+        spans = [SpeechSpan(spans[0].start, spans[-1].end)]
+
+    join = np.zeros(int(TRIM_JOIN_GAP * sample_rate), dtype=np.int16)
+    pieces, offsets, origins = [], [], []
+    position = 0
+    for i, span in enumerate(spans):
+        if i:
+            pieces.append(join)
+            position += len(join)
+        first, last = int(span.start * sample_rate), int(span.end * sample_rate)
+        offsets.append(position / sample_rate)
+        origins.append(first / sample_rate)
+        pieces.append(samples[first:last])
+        position += last - first
+
+    return TrimResult(
+        samples=np.concatenate(pieces).astype(np.int16, copy=False),
+        sample_rate=sample_rate,
+        offsets=np.array(offsets),
+        origins=np.array(origins),
+        original_duration=len(samples) / sample_rate,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Chunking of long recordings
+# ---------------------------------------------------------------------------
+
+# Audio shared by neighbouring chunks when no pause allows a clean cut
+CHUNK_OVERLAP = 1.0
+
+# A shorter remainder is kept in the last chunk instead of becoming its own
+CHUNK_MIN_SECONDS = 1.0
+
+
+@dataclass
+class AudioChunk:
+    """Part of a recording transcribed on its own (seconds)."""
+    start: float
+    end: float
+    overlap: float = 0.0  # Seconds shared with the previous chunk
+
+
+def plan_chunks(
+    spans: List[SpeechSpan],
+    duration: float,
+    max_seconds: float,
+    overlap: float = CHUNK_OVERLAP
+) -> List[AudioChunk]:
+    """
+    Split a recording into chunks of at most max_seconds.
+
+    Each cut is placed in the middle of the last pause between speech
+    spans in the second half of the window, so no word is split. When
+    the window has no pause (continuous speech), the chunk is cut at
+    the limit and the next one starts overlap seconds earlier; the
+    stitcher drops what both chunks transcribed. The last chunk may
+    exceed max_seconds by up to CHUNK_MIN_SECONDS.
+
+    Args:
+        spans: Speech spans from detect_speech
+        duration: Recording duration in seconds
+        max_seconds: Maximum chunk length
+        overlap: Seconds repeated across a hard cut
+
+    Returns:
+        Chunks covering the recording, in order
+    """
+    max_seconds = max(max_seconds, 2 * overlap + 1)
+    pauses = [(a.end + b.start) / 2 for a, b in zip(spans, spans[1:])]
+
+    chunks: List[AudioChunk] = []
+    start, shared = 0.0, 0.0
+    while duration - start > max_seconds + CHUNK_MIN_SECONDS:
+        limit = start + max_seconds
+        cuts = [p for p in pauses if start + max_seconds / 2 <= p <= limit]
+        if cuts:
+            chunks.append(AudioChunk(start, cuts[-1], shared))
+            start, shared = cuts[-1], 0.0
+        else:
+            chunks.append(AudioChunk(start, limit, shared))
+            start, shared = limit - overlap, overlap
+    chunks.append(AudioChunk(start, duration, shared))
+    return chunks
@@ -0,0 +1,712 @@
+"""
+Container/codec probing and conversion of uploads for Whisper.
+
+Parses the container headers (EBML/WebM, MP4, Ogg, RIFF/WAVE, MP3/ADTS,
+FLAC) to find the actual audio codec, optionally asks ffprobe when the
+headers are not recognized, and remuxes or transcodes with ffmpeg when
+the upload is not in a format Whisper accepts. This replaces blind
+retries with relabelled filenames: one upstream call per upload.
+Optionally, bulky uploads are compressed to 16 kHz mono Opus/FLAC to
+cut upload time on slow uplinks.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Bytes read for header parsing (EBML tracks and MP3 frames live here)
+PROBE_SIZE = 64 * 1024
+
+FFPROBE_TIMEOUT = 10.0
+FFMPEG_TIMEOUT = 60.0
+
+# Containers Whisper accepts: container -> (mime type, extension, codecs)
+WHISPER_FORMATS = {
+    "webm": ("audio/webm", "webm", {"opus", "vorbis"}),
+    "mp4": ("audio/mp4", "m4a", {"aac", "mp3"}),
+    "ogg": ("audio/ogg", "ogg", {"opus", "vorbis", "flac"}),
+    "wav": ("audio/wav", "wav", {"pcm", "pcm_float"}),
+    "mp3": ("audio/mpeg", "mp3", {"mp3"}),
+    "flac": ("audio/flac", "flac", {"flac"}),
+}
+
+# Codec -> container it can be copied into without re-encoding
+REMUX_TARGETS = {
+    "opus": "ogg",
+    "vorbis": "ogg",
+    "aac": "mp4",
+    "mp3": "mp3",
+    "flac": "flac",
+    "pcm": "wav",
+    "pcm_float": "wav",
+}
+
+# Re-encoding target for everything else (built into every ffmpeg)
+TRANSCODE_TARGET = "flac"
+
+# Compact re-encodings of speech for upload: codec -> (container, ffmpeg args)
+COMPRESS_FORMATS = {
+    "opus": ("ogg", ["-c:a", "libopus", "-b:a", "24k", "-application", "voip"]),
+    "flac": ("flac", ["-c:a", "flac"]),
+}
+COMPRESS_SAMPLE_RATE = 16000
+
+# Codecs whose bitrate is already in the range of the compressed output
+LOSSY_CODECS = {"opus", "vorbis", "aac", "mp3"}
+
+# Low-end bitrates (bytes/s) of browser/phone recordings, for duration
+# estimates when the headers have none (MediaRecorder WebM/Opus is 64-128
+# kbps). Dividing by the low end makes the estimate an upper bound.
+_TYPICAL_BYTES_PER_SECOND = {"opus": 8000, "vorbis": 8000, "aac": 16000, "mp3": 16000, "amr": 1600}
+
+# ffmpeg muxer per container
+FFMPEG_MUXERS = {"webm": "webm", "mp4": "ipod", "ogg": "ogg", "wav": "wav", "mp3": "mp3", "flac": "flac"}
+
+# ffprobe format/codec names -> probe names
+_FFPROBE_CONTAINERS = {
+    "matroska": "matroska", "webm": "webm", "mov": "mp4", "mp4": "mp4", "m4a": "mp4",
+    "ogg": "ogg", "wav": "wav", "mp3": "mp3", "flac": "flac", "aac": "adts",
+    "amr": "amr", "aiff": "aiff", "caf": "caf",
+}
+_FFPROBE_CODECS = {
+    "opus": "opus", "vorbis": "vorbis", "aac": "aac", "mp3": "mp3", "flac": "flac",
+    "pcm_s16le": "pcm", "pcm_s24le": "pcm", "pcm_s32le": "pcm", "pcm_u8": "pcm",
+    "pcm_f32le": "pcm_float", "pcm_f64le": "pcm_float",
+}
+
+
+@dataclass
+class ProbeResult:
+    """Container and codec found in an upload."""
+    container: Optional[str] = None
+    codec: Optional[str] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    complete: bool = True
+    source: str = "header"
+    size: int = 0
+    duration: Optional[float] = None  # Seconds, when the headers state it
+
+    @property
+    def recognized(self) -> bool:
+        """Whether the container was identified."""
+        return self.container is not None
+
+    @property
+    def estimated_duration(self) -> float:
+        """
+        Duration in seconds from the headers, else estimated from the size.
+
+        The estimate is an upper bound (low-end bitrate) and can be about
+        twice the real duration; callers that need the exact value decode
+        the audio first.
+        """
+        if self.duration is not None:
+            return self.duration
+        return self.size / _TYPICAL_BYTES_PER_SECOND.get(self.codec, 16000)
+
+
+@dataclass
+class ConversionPlan:
+    """How an upload is sent to Whisper."""
+    action: str  # "send", "remux", "transcode" or "compress"
+    container: Optional[str]
+    mime_type: Optional[str]
+    extension: Optional[str]
+    codec: Optional[str] = None  # Compression codec
+
+
+# ---------------------------------------------------------------------------
+# Header parsers
+# ---------------------------------------------------------------------------
+
+_EBML_HEADER = 0x1A45DFA3
+_EBML_DOCTYPE = 0x4282
+_EBML_SEGMENT = 0x18538067
+_EBML_INFO = 0x1549A966
+_EBML_TIMECODE_SCALE = 0x2AD7B1
+_EBML_DURATION = 0x4489
+_EBML_TRACKS = 0x1654AE6B
+_EBML_TRACK_ENTRY = 0xAE
+_EBML_TRACK_TYPE = 0x83
+_EBML_CODEC_ID = 0x86
+_EBML_AUDIO = 0xE1
+_EBML_SAMPLING_FREQUENCY = 0xB5
+_EBML_CHANNELS = 0x9F
+_EBML_CLUSTER = 0x1F43B675
+_EBML_MASTERS = (_EBML_SEGMENT, _EBML_TRACKS, _EBML_TRACK_ENTRY, _EBML_AUDIO)
+
+_MATROSKA_CODECS = {
+    "A_OPUS": "opus", "A_VORBIS": "vorbis", "A_FLAC": "flac",
+    "A_MPEG/L3": "mp3", "A_PCM/INT/LIT": "pcm", "A_PCM/FLOAT/IEEE": "pcm_float",
+}
+
+
+def _read_vint(data: bytes, pos: int, keep_marker: bool) -> Tuple[Optional[int], int]:
+    """Read an EBML variable-length integer; size None means unknown."""
+    if pos >= len(data):
+        raise IndexError
+    first = data[pos]
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8 or pos + length > len(data):
+        raise IndexError
+    value = first if keep_marker else first & (0xFF >> length)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        return None, pos + length
+    return value, pos + length
+
+
+def _ebml_elements(data: bytes, start: int, end: int) -> Iterator[Tuple[int, int, int]]:
+    """Yield (id, payload start, payload end) of the elements in data[start:end]."""
+    pos = start
+    while pos < end:
+        try:
+            element_id, pos = _read_vint(data, pos, keep_marker=True)
+            size, pos = _read_vint(data, pos, keep_marker=False)
+        except IndexError:
+            return
+        payload_end = end if size is None else min(pos + size, end)
+        yield element_id, pos, payload_end
+        pos = payload_end
+
+
+def _probe_ebml(data: bytes) -> ProbeResult:
+    result = ProbeResult(container="matroska")
+
+    for element_id, start, end in _ebml_elements(data, 0, len(data)):
+        if element_id == _EBML_HEADER:
+            for child_id, child_start, child_end in _ebml_elements(data, start, end):
+                if child_id == _EBML_DOCTYPE:
+                    doctype = data[child_start:child_end].rstrip(b"\x00").decode("ascii", "replace")
+                    result.container = "webm" if doctype == "webm" else "matroska"
+        elif element_id == _EBML_SEGMENT:
+            _probe_ebml_segment(data, start, end, result)
+
+    return result
+
+
+def _probe_ebml_float(value: bytes) -> Optional[float]:
+    if len(value) in (4, 8):
+        return struct.unpack(">f" if len(value) == 4 else ">d", value)[0]
+    return None
+
+
+def _probe_ebml_segment(data: bytes, start: int, end: int, result: ProbeResult):
+    """Descend into Segment/Info and Tracks/TrackEntry, stopping at the first Cluster."""
+    for element_id, child_start, child_end in _ebml_elements(data, start, end):
+        if element_id == _EBML_CLUSTER:
+            return
+        if element_id == _EBML_INFO:
+            # Live recordings (MediaRecorder) usually have no Duration
+            scale, duration = 1_000_000, None
+            for field_id, field_start, field_end in _ebml_elements(data, child_start, child_end):
+                value = data[field_start:field_end]
+                if field_id == _EBML_TIMECODE_SCALE:
+                    scale = int.from_bytes(value, "big") or scale
+                elif field_id == _EBML_DURATION:
+                    duration = _probe_ebml_float(value)
+            if duration is not None:
+                result.duration = duration * scale / 1e9
+        elif element_id == _EBML_TRACK_ENTRY:
+            track = ProbeResult()
+            track_type, codec_id = None, ""
+            for field_id, field_start, field_end in _ebml_elements(data, child_start, child_end):
+                value = data[field_start:field_end]
+                if field_id == _EBML_TRACK_TYPE:
+                    track_type = int.from_bytes(value, "big")
+                elif field_id == _EBML_CODEC_ID:
+                    codec_id = value.rstrip(b"\x00").decode("ascii", "replace")
+                elif field_id == _EBML_AUDIO:
+                    for audio_id, audio_start, audio_end in _ebml_elements(data, field_start, field_end):
+                        audio_value = data[audio_start:audio_end]
+                        if audio_id == _EBML_SAMPLING_FREQUENCY and len(audio_value) in (4, 8):
+                            track.sample_rate = int(_probe_ebml_float(audio_value))
+                        elif audio_id == _EBML_CHANNELS:
+                            track.channels = int.from_bytes(audio_value, "big")
+            if track_type == 2 and result.codec is None:
+                codec = _MATROSKA_CODECS.get(codec_id)
+                if codec is None and codec_id.startswith("A_AAC"):
+                    codec = "aac"
+                result.codec = codec or codec_id.lower() or None
+                result.sample_rate, result.channels = track.sample_rate, track.channels
+        elif element_id in _EBML_MASTERS:
+            _probe_ebml_segment(data, child_start, child_end, result)
+
+
+_MP4_CONTAINERS = (b"moov", b"trak", b"mdia", b"minf", b"stbl")
+
+_MP4_CODECS = {
+    b"mp4a": "aac", b".mp3": "mp3", b"Opus": "opus", b"fLaC": "flac", b"alac": "alac",
+    b"samr": "amr", b"sawb": "amr", b"ac-3": "ac3", b"ec-3": "eac3",
+    b"lpcm": "pcm", b"sowt": "pcm", b"twos": "pcm",
+}
+
+
+def _mp4_boxes(file: BinaryIO, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, payload start, payload end) of the boxes in file[start:end]."""
+    pos = start
+    while pos + 8 <= end:
+        file.seek(pos)
+        header = file.read(16)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack(">I4s", header[:8])
+        header_size = 8
+        if size == 1:
+            if len(header) < 16:
+                return
+            size = struct.unpack(">Q", header[8:16])[0]
+            header_size = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_size:
+            return
+        yield box_type, pos + header_size, min(pos + size, end)
+        pos += size
+
+
+def _probe_mp4(file: BinaryIO, file_size: int) -> ProbeResult:
+    result = ProbeResult(container="mp4", complete=False)
+    _probe_mp4_boxes(file, 0, file_size, result)
+    return result
+
+
+def _probe_mp4_boxes(file: BinaryIO, start: int, end: int, result: ProbeResult):
+    for box_type, payload_start, payload_end in _mp4_boxes(file, start, end):
+        if box_type == b"moov":
+            result.complete = True
+        if box_type in _MP4_CONTAINERS:
+            _probe_mp4_boxes(file, payload_start, payload_end, result)
+        elif box_type == b"mvhd":
+            file.seek(payload_start)
+            header = file.read(32)
+            if header[:1] == b"\x01" and len(header) >= 32:
+                timescale, duration = struct.unpack(">IQ", header[20:32])
+            elif len(header) >= 20:
+                timescale, duration = struct.unpack(">II", header[12:20])
+            else:
+                continue
+            if timescale:
+                result.duration = duration / timescale
+        elif box_type == b"stsd" and result.codec is None:
+            file.seek(payload_start)
+            entry = file.read(8 + 8 + 28)
+            if len(entry) < 16:
+                continue
+            fourcc = entry[12:16]
+            codec = _MP4_CODECS.get(fourcc)
+            if codec is None:
+                continue  # video or unknown sample entry
+            result.codec = codec
+            if len(entry) >= 44:
+                result.channels = struct.unpack(">H", entry[32:34])[0]
+                result.sample_rate = struct.unpack(">I", entry[40:44])[0] >> 16
+
+
+def _probe_ogg(file: BinaryIO, file_size: int, data: bytes) -> ProbeResult:
+    result = ProbeResult(container="ogg")
+    if len(data) < 27:
+        return result
+    segments = data[26]
+    table = data[27:27 + segments]
+    length = 0
+    for lacing in table:
+        length += lacing
+        if lacing < 255:
+            break
+    packet = data[27 + segments:27 + segments + length]
+
+    if packet.startswith(b"OpusHead") and len(packet) >= 16:
+        result.codec = "opus"
+        result.channels = packet[9]
+        result.sample_rate = struct.unpack("<I", packet[12:16])[0] or 48000
+    elif packet.startswith(b"\x01vorbis") and len(packet) >= 16:
+        result.codec = "vorbis"
+        result.channels = packet[11]
+        result.sample_rate = struct.unpack("<I", packet[12:16])[0]
+    elif packet.startswith(b"\x7fFLAC"):
+        result.codec = "flac"
+    elif packet.startswith(b"Speex   "):
+        result.codec = "speex"
+
+    # Duration: granule position of the last page (48 kHz for Opus, minus pre-skip)
+    rate = 48000 if result.codec == "opus" else result.sample_rate
+    if rate:
+        file.seek(max(0, file_size - PROBE_SIZE))
+        tail = file.read(PROBE_SIZE)
+        last = tail.rfind(b"OggS")
+        if last >= 0 and last + 14 <= len(tail):
+            granule = struct.unpack("<q", tail[last + 6:last + 14])[0]
+            pre_skip = struct.unpack("<H", packet[10:12])[0] if result.codec == "opus" else 0
+            if granule > pre_skip:
+                result.duration = (granule - pre_skip) / rate
+    return result
+
+
+_WAVE_CODECS = {1: "pcm", 3: "pcm_float", 6: "alaw", 7: "mulaw", 0x11: "adpcm", 0x55: "mp3"}
+
+
+def _probe_wav(file_size: int, data: bytes) -> ProbeResult:
+    result = ProbeResult(container="wav")
+    byte_rate = 0
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id, size = struct.unpack("<4sI", data[pos:pos + 8])
+        if chunk_id == b"fmt " and size >= 16 and pos + 24 <= len(data):
+            format_tag, channels, sample_rate, byte_rate = struct.unpack("<HHII", data[pos + 8:pos + 20])
+            if format_tag == 0xFFFE and size >= 40 and pos + 34 <= len(data):
+                format_tag = struct.unpack("<H", data[pos + 32:pos + 34])[0]
+            result.codec = _WAVE_CODECS.get(format_tag, f"0x{format_tag:04x}")
+            result.channels = channels
+            result.sample_rate = sample_rate
+        elif chunk_id == b"data":
+            # Streamed WAVs may carry a placeholder size: trust the file size
+            if byte_rate:
+                result.duration = min(size, file_size - pos - 8) / byte_rate
+            break
+        pos += 8 + size + (size & 1)
+    return result
+
+
+_MPEG_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+# Layer III bitrates (kbps) for MPEG-1 and MPEG-2/2.5
+_MP3_BITRATES = {
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_ADTS_SAMPLE_RATES = (96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050, 16000, 12000, 11025, 8000, 7350)
+
+
+def _probe_mpeg(file_size: int, data: bytes) -> Optional[ProbeResult]:
+    """MP3/MP2 or ADTS AAC stream, after an optional ID3v2 tag."""
+    pos = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        tag_size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        pos = 10 + tag_size + (10 if data[5] & 0x10 else 0)
+
+    limit = min(len(data) - 4, pos + 4096)
+    while pos <= limit:
+        if data[pos] == 0xFF and data[pos + 1] & 0xE0 == 0xE0:
+            b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+            if b1 & 0xF6 == 0xF0:
+                rate_index = (b2 >> 2) & 0x0F
+                if rate_index < len(_ADTS_SAMPLE_RATES):
+                    channels = ((b2 & 0x01) << 2) | (b3 >> 6)
+                    return ProbeResult("adts", "aac", _ADTS_SAMPLE_RATES[rate_index], channels or None)
+            version, layer = (b1 >> 3) & 0x03, (b1 >> 1) & 0x03
+            bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 0x03
+            if version != 1 and layer != 0 and bitrate_index != 15 and rate_index != 3:
+                codec = {1: "mp3", 2: "mp2", 3: "mp1"}[layer]
+                channels = 1 if b3 >> 6 == 3 else 2
+                result = ProbeResult("mp3", codec, _MPEG_SAMPLE_RATES[version][rate_index], channels)
+                if codec == "mp3" and bitrate_index:
+                    # Constant bitrate assumed (VBR headers are not read)
+                    kbps = _MP3_BITRATES[3 if version == 3 else 2][bitrate_index]
+                    result.duration = (file_size - pos) * 8 / (kbps * 1000)
+                return result
+        pos += 1
+    return None
+
+
+def _probe_flac(data: bytes) -> ProbeResult:
+    result = ProbeResult(container="flac", codec="flac")
+    # STREAMINFO after min/max block and frame sizes: 20-bit sample rate,
+    # 3-bit channels - 1, 5-bit bits per sample - 1, 36-bit total samples
+    if len(data) >= 26:
+        packed = int.from_bytes(data[18:26], "big")
+        result.sample_rate = packed >> 44
+        result.channels = ((packed >> 41) & 0x07) + 1
+        total_samples = packed & ((1 << 36) - 1)
+        if result.sample_rate and total_samples:
+            result.duration = total_samples / result.sample_rate
+    return result
+
+
+def _probe_data(file: BinaryIO, file_size: int, data: bytes) -> ProbeResult:
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return _probe_ebml(data)
+    if data[4:8] == b"ftyp":
+        return _probe_mp4(file, file_size)
+    if data[:4] == b"OggS":
+        return _probe_ogg(file, file_size, data)
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return _probe_wav(file_size, data)
+    if data[:4] == b"fLaC":
+        return _probe_flac(data)
+    if data[:6] == b"#!AMR\n":
+        return ProbeResult("amr", "amr", 8000, 1)
+    if data[:4] == b"FORM" and data[8:12] in (b"AIFF", b"AIFC"):
+        return ProbeResult("aiff", "pcm")
+    if data[:3] == b"ID3" or data[:1] == b"\xff":
+        return _probe_mpeg(file_size, data) or ProbeResult()
+    return ProbeResult()
+
+
+def probe_header(file: BinaryIO) -> ProbeResult:
+    """
+    Identify container and codec from the file headers.
+
+    Args:
+        file: Seekable binary file (position is restored to the start)
+
+    Returns:
+        ProbeResult (container None when not recognized)
+    """
+    file.seek(0, 2)
+    file_size = file.tell()
+    file.seek(0)
+    data = file.read(PROBE_SIZE)
+
+    result = _probe_data(file, file_size, data)
+    result.size = file_size
+    file.seek(0)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# ffprobe / ffmpeg
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def _as_path(file: BinaryIO, suffix: str = "") -> Iterator[str]:
+    """Copy file to a named temp file for ffmpeg/ffprobe (MP4 inputs need seeking)."""
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            file.seek(0)
+            shutil.copyfileobj(file, out)
+        file.seek(0)
+        yield path
+    finally:
+        os.unlink(path)
+
+
+async def _run(args: List[str], timeout: float) -> Tuple[int, bytes, bytes]:
+    process = await asyncio.create_subprocess_exec(
+        *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise RuntimeError(f"{args[0]} timed out after {timeout:.0f}s")
+    return process.returncode, stdout, stderr
+
+
+async def probe_ffprobe(file: BinaryIO) -> ProbeResult:
+    """
+    Identify container and codec with ffprobe.
+
+    Returns:
+        ProbeResult (container None when ffprobe is missing or fails)
+    """
+    if not shutil.which("ffprobe"):
+        return ProbeResult(source="ffprobe")
+
+    with _as_path(file) as path:
+        code, stdout, stderr = await _run(
+            ["ffprobe", "-v", "error", "-of", "json",
+             "-show_entries", "format=format_name:stream=codec_type,codec_name,sample_rate,channels", path],
+            FFPROBE_TIMEOUT,
+        )
+    if code != 0:
+        logger.info(f"[AudioProbe] ffprobe failed: {stderr.decode(errors='replace').strip()[:200]}")
+        return ProbeResult(source="ffprobe")
+
+    info = json.loads(stdout or b"{}")
+    result = ProbeResult(source="ffprobe")
+    for name in info.get("format", {}).get("format_name", "").split(","):
+        if name in _FFPROBE_CONTAINERS:
+            result.container = _FFPROBE_CONTAINERS[name]
+            break
+    for stream in info.get("streams", []):
+        if stream.get("codec_type") == "audio":
+            codec = stream.get("codec_name", "")
+            result.codec = _FFPROBE_CODECS.get(codec, codec or None)
+            result.sample_rate = int(stream.get("sample_rate") or 0) or None
+            result.channels = stream.get("channels")
+            break
+    return result
+
+
+async def probe_audio(file: BinaryIO, use_ffprobe: bool = True) -> ProbeResult:
+    """
+    Identify container and codec, asking ffprobe when the headers are not recognized.
+
+    Args:
+        file: Seekable binary file
+        use_ffprobe: Run ffprobe (if installed) for unrecognized headers
+
+    Returns:
+        ProbeResult
+    """
+    result = probe_header(file)
+    if not result.recognized and use_ffprobe:
+        result = await probe_ffprobe(file)
+        result.size = file.seek(0, 2)
+        file.seek(0)
+    logger.info(
+        f"[AudioProbe] container={result.container} codec={result.codec} "
+        f"rate={result.sample_rate} channels={result.channels} via {result.source}"
+    )
+    return result
+
+
+def _worth_compressing(probe: ProbeResult, codec: str, min_bytes: int) -> bool:
+    """Whether re-encoding to codec is expected to shrink the upload enough to pay off."""
+    if not probe.recognized or probe.size < min_bytes or probe.codec == "opus":
+        return False
+    if probe.codec in LOSSY_CODECS:
+        # Lossy input: only Opus at 24 kbps is smaller, and not for 16 kHz mono
+        compact = (probe.sample_rate or 0) <= COMPRESS_SAMPLE_RATE and probe.channels == 1
+        return codec == "opus" and not compact
+    return True
+
+
+def plan_for_whisper(
+    probe: ProbeResult,
+    compress: Optional[str] = None,
+    compress_min_bytes: int = 0
+) -> ConversionPlan:
+    """
+    Decide how to send a probed upload to Whisper.
+
+    - Accepted container with an accepted (or unknown) codec: send as is
+    - Codec that fits an accepted container: remux (stream copy)
+    - Anything else that was identified: transcode to FLAC
+    - Nothing identified: send as is (the declared type is used)
+
+    With compress ("opus" or "flac"), uploads that would be transcoded,
+    and large uncompressed or high-rate ones, are re-encoded to 16 kHz
+    mono in that codec instead.
+
+    Args:
+        probe: Probe result
+        compress: Compression codec, or None to disable
+        compress_min_bytes: Smaller uploads are not compressed
+    """
+    plan = _format_plan(probe)
+    if compress not in COMPRESS_FORMATS:
+        return plan
+
+    if plan.action == "transcode" or _worth_compressing(probe, compress, compress_min_bytes):
+        container = COMPRESS_FORMATS[compress][0]
+        mime_type, extension, _ = WHISPER_FORMATS[container]
+        return ConversionPlan("compress", container, mime_type, extension, codec=compress)
+    return plan
+
+
+def _format_plan(probe: ProbeResult) -> ConversionPlan:
+    if not probe.recognized:
+        return ConversionPlan("send", None, None, None)
+
+    if probe.container in WHISPER_FORMATS:
+        mime_type, extension, codecs = WHISPER_FORMATS[probe.container]
+        if probe.codec is None or probe.codec in codecs:
+            return ConversionPlan("send", probe.container, mime_type, extension)
+
+    container = REMUX_TARGETS.get(probe.codec)
+    action = "remux" if container else "transcode"
+    container = container or TRANSCODE_TARGET
+    mime_type, extension, _ = WHISPER_FORMATS[container]
+    return ConversionPlan(action, container, mime_type, extension)
+
+
+# One semaphore per event loop bounding concurrent ffmpeg processes
+_transcode_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def get_transcode_slots() -> asyncio.Semaphore:
+    """Get the semaphore limiting concurrent ffmpeg processes (AUDIO_TRANSCODE_WORKERS)."""
+    loop = asyncio.get_running_loop()
+    slots = _transcode_slots.get(loop)
+    if slots is None:
+        slots = asyncio.Semaphore(max(1, get_settings().audio_transcode_workers))
+        _transcode_slots[loop] = slots
+    return slots
+
+
+def _codec_args(plan: ConversionPlan) -> List[str]:
+    if plan.action == "remux":
+        return ["-c:a", "copy"]
+    if plan.action == "compress":
+        return [*COMPRESS_FORMATS[plan.codec][1], "-ac", "1", "-ar", str(COMPRESS_SAMPLE_RATE)]
+    return ["-c:a", plan.container]
+
+
+async def convert_audio(file: BinaryIO, plan: ConversionPlan) -> BinaryIO:
+    """
+    Remux, transcode or compress with ffmpeg according to plan.
+
+    At most AUDIO_TRANSCODE_WORKERS ffmpeg processes run at a time;
+    further conversions wait for a free slot.
+
+    Returns:
+        Open binary file with the converted audio (deleted on close)
+
+    Raises:
+        RuntimeError: If ffmpeg is not installed or fails
+    """
+    if not shutil.which("ffmpeg"):
+        raise RuntimeError("ffmpeg not installed. Install it with your system package manager")
+
+    fd, output_path = tempfile.mkstemp(suffix=f".{plan.extension}")
+    os.close(fd)
+    try:
+        async with get_transcode_slots():
+            with _as_path(file) as input_path:
+                code, _, stderr = await _run(
+                    ["ffmpeg", "-nostdin", "-v", "error", "-y", "-i", input_path,
+                     "-vn", "-map", "0:a:0", *_codec_args(plan), "-f", FFMPEG_MUXERS[plan.container], output_path],
+                    FFMPEG_TIMEOUT,
+                )
+        if code != 0:
+            raise RuntimeError(f"ffmpeg {plan.action} failed: {stderr.decode(errors='replace').strip()[:200]}")
+        return open(output_path, "rb")
+    finally:
+        # The open handle keeps the data until it is closed
+        os.unlink(output_path)
+
+
+async def decode_pcm(file: BinaryIO, sample_rate: int = COMPRESS_SAMPLE_RATE) -> bytes:
+    """
+    Decode any format ffmpeg reads to raw 16-bit mono PCM (for silence trimming).
+
+    Shares the AUDIO_TRANSCODE_WORKERS slots with convert_audio.
+
+    Returns:
+        Little-endian int16 samples at sample_rate
+
+    Raises:
+        RuntimeError: If ffmpeg is not installed or fails
+    """
+    if not shutil.which("ffmpeg"):
+        raise RuntimeError("ffmpeg not installed. Install it with your system package manager")
+
+    async with get_transcode_slots():
+        with _as_path(file) as input_path:
+            code, stdout, stderr = await _run(
+                ["ffmpeg", "-nostdin", "-v", "error", "-i", input_path,
+                 "-vn", "-map", "0:a:0", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "pipe:1"],
+                FFMPEG_TIMEOUT,
+            )
+    if code != 0:
+        raise RuntimeError(f"ffmpeg decode failed: {stderr.decode(errors='replace').strip()[:200]}")
+    return stdout
@@ -0,0 +1,90 @@
+"""
+Streaming multipart/form-data encoder for upstream uploads.
+
+Builds the body from a seekable binary file read in chunks, so audio
+kept in a spooled temp file is sent without loading it into memory.
+The stream can be iterated again (each pass seeks back to the start),
+which lets retries replay the same file instead of holding copies.
+"""
+
+import secrets
+from typing import AsyncIterator, BinaryIO, Dict
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _quote(value: str) -> str:
+    """Escape a name or filename for a Content-Disposition header."""
+    return value.replace("\\", "\\\\").replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
+
+
+class MultipartFileStream:
+    """
+    multipart/form-data body with text fields and one file part.
+
+    Pass as content= to httpx together with headers; Content-Length is
+    known up front, so the upload is not sent with chunked encoding.
+    """
+
+    def __init__(
+        self,
+        fields: Dict[str, str],
+        file_field: str,
+        filename: str,
+        file: BinaryIO,
+        content_type: str = "application/octet-stream",
+        chunk_size: int = CHUNK_SIZE,
+    ):
+        """
+        Initialize stream.
+
+        Args:
+            fields: Text form fields, sent before the file
+            file_field: Form field name of the file part
+            filename: Filename reported for the file part
+            file: Seekable binary file with the content
+            content_type: MIME type of the file part
+            chunk_size: Bytes read from the file per chunk
+        """
+        self.boundary = secrets.token_hex(16)
+        self.file = file
+        self.chunk_size = chunk_size
+
+        delimiter = f"--{self.boundary}\r\n"
+        parts = [
+            f'{delimiter}Content-Disposition: form-data; name="{_quote(name)}"\r\n\r\n{value}\r\n'
+            for name, value in fields.items()
+        ]
+        parts.append(
+            f'{delimiter}Content-Disposition: form-data; name="{_quote(file_field)}"; '
+            f'filename="{_quote(filename)}"\r\nContent-Type: {content_type}\r\n\r\n'
+        )
+        self._preamble = "".join(parts).encode()
+        self._epilogue = f"\r\n--{self.boundary}--\r\n".encode()
+
+        file.seek(0, 2)
+        self.file_size = file.tell()
+        file.seek(0)
+
+    @property
+    def content_length(self) -> int:
+        """Total body size in bytes."""
+        return len(self._preamble) + self.file_size + len(self._epilogue)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Content-Type and Content-Length headers for the request."""
+        return {
+            "Content-Type": f"multipart/form-data; boundary={self.boundary}",
+            "Content-Length": str(self.content_length),
+        }
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        yield self._preamble
+        self.file.seek(0)
+        while True:
+            chunk = self.file.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        yield self._epilogue
@@ -0,0 +1,325 @@
+"""
+Streaming upload helpers for audio request bodies.
+
+Request bodies are consumed chunk by chunk into a spooled temporary file
+(memory up to a threshold, then disk), so a recording is held about
+once per request instead of as body bytes + JSON string + decoded bytes.
+Legacy JSON bodies ({"audio": "<base64>", ...}) are scanned incrementally:
+the audio string is base64-decoded as it arrives and only the small
+remaining fields are parsed with json.
+"""
+
+import binascii
+import hashlib
+import json
+import re
+import tempfile
+from typing import Any, AsyncIterator, Dict, Optional
+
+# Bytes kept from the start of the upload for format sniffing
+HEAD_SIZE = 64
+
+# Limit for the JSON skeleton (everything except the audio string)
+MAX_JSON_FIELDS_BYTES = 64 * 1024
+
+_BASE64_INVALID = re.compile(rb"[^A-Za-z0-9+/=]")
+_DATA_URL_START = b"data:"
+
+_QUOTE = ord('"')
+_BACKSLASH = ord("\\")
+_COLON = ord(":")
+_OPENERS = (ord("{"), ord("["))
+_CLOSERS = (ord("}"), ord("]"))
+_WHITESPACE = (ord(" "), ord("\t"), ord("\r"), ord("\n"))
+
+
+class AudioTooLargeError(ValueError):
+    """Upload exceeds the configured maximum size."""
+
+
+class AudioUpload:
+    """
+    Uploaded audio in a spooled temporary file.
+
+    Tracks the size and a SHA-256 of the content (for coalescing
+    duplicate requests), and keeps the first bytes for format detection.
+    """
+
+    def __init__(self, max_size: int, max_memory: int = 1024 * 1024):
+        """
+        Initialize upload.
+
+        Args:
+            max_size: Maximum accepted size in bytes
+            max_memory: Bytes kept in memory before spilling to disk
+        """
+        self.max_size = max_size
+        self.file = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        self.size = 0
+        self.head = b""
+        self._hash = hashlib.sha256()
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 of the audio received so far (hex)."""
+        return self._hash.hexdigest()
+
+    def adopt(self, file):
+        """Use an already spooled binary file (e.g. a multipart part) as the upload."""
+        self.file.close()
+        self.file = file
+        file.seek(0, 2)
+        self.size = file.tell()
+        file.seek(0)
+        self.head = file.read(HEAD_SIZE)
+        self._check_size()
+
+        self._hash = hashlib.sha256()
+        file.seek(0)
+        for chunk in iter(lambda: file.read(64 * 1024), b""):
+            self._hash.update(chunk)
+        file.seek(0)
+
+    def _check_size(self):
+        if self.size > self.max_size:
+            raise AudioTooLargeError(
+                f"Áudio muito grande. Máximo {self.max_size // (1024 * 1024)} MB."
+            )
+
+    def write(self, data: bytes):
+        """Append decoded audio bytes."""
+        if not data:
+            return
+        self.size += len(data)
+        self._check_size()
+        if len(self.head) < HEAD_SIZE:
+            self.head += data[:HEAD_SIZE - len(self.head)]
+        self._hash.update(data)
+        self.file.write(data)
+
+    def read(self) -> bytes:
+        """Return the whole upload as bytes."""
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self):
+        """Release the spool (deletes the temp file if one was created)."""
+        self.file.close()
+
+    def __enter__(self) -> "AudioUpload":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Base64StreamDecoder:
+    """
+    Incremental base64 decoder.
+
+    Accepts the input in arbitrary pieces, strips a data URL prefix
+    ("data:audio/webm;base64,") and drops characters outside the base64
+    alphabet, like base64.b64decode() without validation.
+    """
+
+    def __init__(self):
+        self._tail = b""
+        self._prefix: Optional[bytearray] = bytearray()
+
+    def _strip_prefix(self, data: bytes) -> bytes:
+        """Hold back input until it is known whether a data URL prefix is present."""
+        self._prefix.extend(data)
+        start = bytes(self._prefix[:len(_DATA_URL_START)])
+        if not _DATA_URL_START.startswith(start) and not start.startswith(_DATA_URL_START):
+            data = bytes(self._prefix)
+        else:
+            comma = self._prefix.find(b",")
+            if comma < 0:
+                return b""
+            data = bytes(self._prefix[comma + 1:])
+        self._prefix = None
+        return data
+
+    def feed(self, data: bytes) -> bytes:
+        """Decode as many complete 4-character groups as available."""
+        if self._prefix is not None:
+            data = self._strip_prefix(data)
+        if not data:
+            return b""
+        data = self._tail + _BASE64_INVALID.sub(b"", data)
+        usable = len(data) - len(data) % 4
+        self._tail = data[usable:]
+        return binascii.a2b_base64(data[:usable]) if usable else b""
+
+    def finish(self) -> bytes:
+        """
+        Decode the remaining characters.
+
+        Raises:
+            ValueError: On truncated input
+        """
+        if self._prefix is not None:
+            data, self._prefix = bytes(self._prefix), None
+            if data.startswith(_DATA_URL_START) and b"," not in data:
+                data = b""
+            self._tail += _BASE64_INVALID.sub(b"", data)
+        tail, self._tail = self._tail, b""
+        if not tail:
+            return b""
+        if len(tail) % 4 == 1:
+            raise ValueError("Invalid base64-encoded audio")
+        return binascii.a2b_base64(tail + b"=" * (-len(tail) % 4))
+
+
+class JsonAudioBodyParser:
+    """
+    Incremental parser for {"audio": "<base64>", ...} request bodies.
+
+    The top-level "audio" string is decoded straight into the upload; the
+    rest of the document (with "audio" left as "") is kept and returned
+    by finish(). Escaped slashes ("\\/") in the audio string are honoured;
+    other escapes cannot occur in base64 and are dropped.
+    """
+
+    def __init__(self, upload: AudioUpload, field: str = "audio"):
+        """
+        Initialize parser.
+
+        Args:
+            upload: Destination for the decoded audio
+            field: Top-level key holding the base64 audio
+        """
+        self.upload = upload
+        self._field = field.encode()
+        self._decoder = Base64StreamDecoder()
+        self._skeleton = bytearray()
+        self._depth = 0
+        self._in_string = False
+        self._string_start = 0
+        self._last_string = b""
+        self._escape = False
+        self._awaiting_audio = False
+        self._in_audio = False
+
+    def _feed_audio(self, data: bytes, i: int) -> int:
+        """Consume audio characters from data[i:]; returns the next index."""
+        if self._escape:
+            self._escape = False
+            if data[i] == ord("/"):
+                self.upload.write(self._decoder.feed(b"/"))
+            return i + 1
+
+        quote = data.find(b'"', i)
+        backslash = data.find(b"\\", i, quote if quote >= 0 else len(data))
+        end = backslash if backslash >= 0 else quote if quote >= 0 else len(data)
+        if end > i:
+            self.upload.write(self._decoder.feed(data[i:end]))
+        if end == len(data):
+            return end
+        if end == backslash:
+            self._escape = True
+        else:
+            self._in_audio = False
+            self._skeleton.append(_QUOTE)
+        return end + 1
+
+    def feed(self, data: bytes):
+        """
+        Consume the next piece of the body.
+
+        Raises:
+            ValueError: If the non-audio fields are too large
+        """
+        i, n = 0, len(data)
+        while i < n:
+            if self._in_audio:
+                i = self._feed_audio(data, i)
+                continue
+
+            byte = data[i]
+            i += 1
+            self._skeleton.append(byte)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif byte == _BACKSLASH:
+                    self._escape = True
+                elif byte == _QUOTE:
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = bytes(self._skeleton[self._string_start:-1])
+                continue
+
+            if byte == _QUOTE:
+                if self._awaiting_audio:
+                    self._awaiting_audio = False
+                    self._in_audio = True
+                else:
+                    self._in_string = True
+                    self._string_start = len(self._skeleton)
+            elif byte == _COLON:
+                self._awaiting_audio = self._depth == 1 and self._last_string == self._field
+            elif byte in _OPENERS:
+                self._depth += 1
+                self._awaiting_audio = False
+            elif byte in _CLOSERS:
+                self._depth -= 1
+            elif byte not in _WHITESPACE:
+                self._awaiting_audio = False
+
+        if len(self._skeleton) > MAX_JSON_FIELDS_BYTES:
+            raise ValueError("Corpo da requisição muito grande")
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Flush the decoder and parse the remaining fields.
+
+        Returns:
+            Parsed document with the audio field set to ""
+
+        Raises:
+            json.JSONDecodeError: On malformed JSON
+            ValueError: On malformed base64
+        """
+        if self._in_audio:
+            raise json.JSONDecodeError("Unterminated string", "", len(self._skeleton))
+        self.upload.write(self._decoder.finish())
+        document = json.loads(self._skeleton)
+        if not isinstance(document, dict):
+            raise json.JSONDecodeError("Expected an object", "", 0)
+        return document
+
+
+async def spool_json_audio(chunks: AsyncIterator[bytes], upload: AudioUpload) -> Dict[str, Any]:
+    """
+    Stream a JSON body into upload, decoding its base64 audio field.
+
+    Returns:
+        The remaining JSON fields (audio is "" when present)
+    """
+    parser = JsonAudioBodyParser(upload)
+    async for chunk in chunks:
+        parser.feed(chunk)
+    return parser.finish()
+
+
+async def limit_stream(chunks: AsyncIterator[bytes], max_size: int) -> AsyncIterator[bytes]:
+    """
+    Pass a body stream through, failing once more than max_size bytes were read.
+
+    Raises:
+        AudioTooLargeError: When the limit is crossed (nothing past it is read)
+    """
+    total = 0
+    async for chunk in chunks:
+        total += len(chunk)
+        if total > max_size:
+            raise AudioTooLargeError(f"Áudio muito grande. Máximo {max_size // (1024 * 1024)} MB.")
+        yield chunk
+
+
+async def spool_raw_audio(chunks: AsyncIterator[bytes], upload: AudioUpload):
+    """Stream a binary body into upload."""
+    async for chunk in chunks:
+        upload.write(chunk)
@@ -0,0 +1,160 @@
+"""
+Tests for the pre-synthesized audio bank.
+"""
+
+import asyncio
+import base64
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from src.services import audio_bank
+from src.services.audio_bank import AudioBank, BankEntry, bank_key, build_audio_bank, write_bank
+from src.services.timestamp_utils import WordTrack
+
+
+def write_catalog(path, modules):
+    path.write_text(json.dumps({"voices": ["nova"], "speed": 1.0, "modules": modules}), encoding="utf-8")
+    return path
+
+
+def fake_synthesizer(calls, fail=()):
+    async def synthesize(text, voice, chat_type, speed):
+        calls.append(text)
+        if text in fail:
+            raise RuntimeError("upstream down")
+        words = text.split()
+        return SimpleNamespace(
+            audio_base64=base64.b64encode(f"mp3:{text}".encode()).decode(),
+            audio_mime_type="audio/mpeg",
+            words=WordTrack(words, [0.5 * i for i in range(len(words))], [0.5 * i + 0.4 for i in range(len(words))]),
+            duration=0.5 * len(words),
+        )
+    return synthesize
+
+
+class TestAudioBankFiles:
+    """Tests for the on-disk format."""
+
+    def test_round_trip(self, tmp_path):
+        """Entries are found by key with audio, words and duration intact."""
+        entries = {
+            bank_key(f"frase {i}", "nova", "home", 1.0): BankEntry(
+                f"audio {i}".encode(), "audio/mpeg", WordTrack(["frase", str(i)], [0.0, 0.3], [0.25, 0.6]), 0.6
+            )
+            for i in range(50)
+        }
+        entries[bank_key("sem palavras", "nova", "home", 1.0)] = BankEntry(b"x", "audio/mpeg", WordTrack.empty(), None)
+        write_bank(tmp_path, entries, b"d" * 16)
+
+        bank = AudioBank(tmp_path)
+        assert len(bank) == 51
+        entry = bank.lookup("frase 17", "nova", "home", 1.0)
+        assert entry.audio == b"audio 17"
+        assert entry.words.to_list() == [{"word": "frase", "start": 0.0, "end": 0.25}, {"word": "17", "start": 0.3, "end": 0.6}]
+        assert entry.duration == 0.6
+        assert bank.lookup("sem palavras").duration is None
+        assert bank.lookup("frase 17", "shimmer") is None
+        assert bank.lookup("frase 99") is None
+        bank.close()
+
+    def test_rewrite_publishes_index_and_blob_together(self, tmp_path):
+        """The index names its blob, so an open bank and a reopened one both stay consistent."""
+        import os
+
+        key = bank_key("Olá!", "nova", "home", 1.0)
+        write_bank(tmp_path, {key: BankEntry(b"old audio", "audio/mpeg", WordTrack.empty(), 1.0)}, b"a" * 16)
+        old = AudioBank(tmp_path)
+        old_blob = old.blob_path
+        os.utime(old_blob, (0, 0))
+
+        write_bank(tmp_path, {key: BankEntry(b"new", "audio/mpeg", WordTrack.empty(), 0.5)}, b"b" * 16)
+        new = AudioBank(tmp_path)
+
+        assert old.get(key).audio == b"old audio"
+        assert new.get(key).audio == b"new"
+        assert new.blob_path != old_blob and not old_blob.exists()
+        assert {p.name for p in tmp_path.iterdir()} == {"bank.idx", new.blob_path.name}
+        old.close()
+        new.close()
+
+    def test_key_defaults(self):
+        """Missing voice/module/speed match the endpoint defaults; text is exact."""
+        assert bank_key(" Olá! ", None, None, None) == bank_key("Olá!", "Nova", "home", 1.0)
+        assert bank_key("Olá!", "nova", "home", 1.0) != bank_key("olá!", "nova", "home", 1.0)
+
+
+class TestBuildAudioBank:
+    """Tests for rendering the catalog."""
+
+    def test_incremental_build(self, tmp_path):
+        """Phrases already in the bank are not synthesized again."""
+        catalog = write_catalog(tmp_path / "catalog.json", {"home": ["Olá!", "Até logo!"]})
+        calls = []
+        assert asyncio.run(build_audio_bank(catalog, tmp_path / "bank", fake_synthesizer(calls))) == 2
+
+        write_catalog(catalog, {"home": ["Olá!", "Até logo!"], "help": ["Toque no microfone."]})
+        assert asyncio.run(build_audio_bank(catalog, tmp_path / "bank", fake_synthesizer(calls))) == 1
+        assert calls == ["Olá!", "Até logo!", "Toque no microfone."]
+
+        bank = AudioBank(tmp_path / "bank")
+        assert len(bank) == 3
+        assert bank.lookup("Olá!").audio == "mp3:Olá!".encode()
+        assert audio_bank.bank_is_current(catalog, tmp_path / "bank")
+        bank.close()
+
+    def test_failed_phrase_marks_incomplete(self, tmp_path):
+        """A phrase that fails is retried by the next build."""
+        catalog = write_catalog(tmp_path / "catalog.json", {"home": ["Olá!", "Até logo!"]})
+        calls = []
+        asyncio.run(build_audio_bank(catalog, tmp_path / "bank", fake_synthesizer(calls, fail={"Até logo!"})))
+        assert not audio_bank.bank_is_current(catalog, tmp_path / "bank")
+
+        asyncio.run(build_audio_bank(catalog, tmp_path / "bank", fake_synthesizer(calls)))
+        assert calls == ["Olá!", "Até logo!", "Até logo!"]
+        assert audio_bank.bank_is_current(catalog, tmp_path / "bank")
+
+
+class TestKaraokeFromBank:
+    """Tests for serving catalog phrases from text-to-speech-karaoke."""
+
+    def test_exact_match_without_upstream_call(self, tmp_path):
+        """A catalog phrase is answered from the bank with no provider call."""
+        from src.main import app
+
+        catalog = write_catalog(tmp_path / "catalog.json", {"home": ["Olá! Como posso ajudar você hoje?"]})
+        asyncio.run(build_audio_bank(catalog, tmp_path, fake_synthesizer([])))
+        bank = AudioBank(tmp_path)
+
+        client = TestClient(app)
+        with patch.object(audio_bank, "_bank", bank), patch.object(audio_bank, "_bank_loaded", True), \
+                patch("src.api.text_to_speech.ElevenLabsTTSService") as elevenlabs, \
+                patch("src.api.text_to_speech.OpenAITTSService") as openai:
+            response = client.post(
+                "/functions/v1/text-to-speech-karaoke",
+                json={"text": "Olá! Como posso ajudar você hoje?", "chatType": "home", "voice": "nova"},
+            )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert base64.b64decode(data["audioBase64"]) == "mp3:Olá! Como posso ajudar você hoje?".encode()
+        assert [w["word"] for w in data["words"]][:2] == ["Olá!", "Como"]
+        assert data["text"] == "Olá! Como posso ajudar você hoje?"
+        elevenlabs.assert_not_called()
+        openai.assert_not_called()
+        bank.close()
+
+    def test_phonetic_override_bypasses_bank(self):
+        """A phonetic override changes the audio, so the bank is not consulted."""
+        from src.main import app
+
+        client = TestClient(app)
+        with patch("src.api.text_to_speech.lookup_phrase") as lookup, \
+                patch("src.api.text_to_speech._coalesced", side_effect=RuntimeError("upstream")):
+            client.post(
+                "/functions/v1/text-to-speech-karaoke",
+                json={"text": "Olá!", "phoneticMapOverride": {"IA": "i a"}},
+            )
+        lookup.assert_not_called()
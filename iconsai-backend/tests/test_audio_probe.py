@@ -0,0 +1,244 @@
+"""
+Tests for container/codec probing of uploads.
+"""
+
+import asyncio
+import io
+import struct
+import wave
+from unittest.mock import patch
+
+import pytest
+
+from src.utils.audio_probe import plan_for_whisper, probe_audio, probe_header
+
+
+def ebml_element(element_id: int, payload: bytes) -> bytes:
+    """Encode an EBML element with an 8-byte size."""
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    return id_bytes + (0x01 << 56 | len(payload)).to_bytes(8, "big") + payload
+
+
+def make_matroska(doctype: str, codec_id: str, unknown_segment_size: bool = False) -> bytes:
+    header = ebml_element(0x1A45DFA3, ebml_element(0x4282, doctype.encode()))
+    audio = ebml_element(0xB5, struct.pack(">f", 48000.0)) + ebml_element(0x9F, b"\x01")
+    track = ebml_element(0xAE, ebml_element(0x83, b"\x02") + ebml_element(0x86, codec_id.encode()) + ebml_element(0xE1, audio))
+    segment_payload = ebml_element(0x1654AE6B, track) + ebml_element(0x1F43B675, b"\x00" * 64)
+    if unknown_segment_size:
+        return header + b"\x18\x53\x80\x67" + b"\x01\xff\xff\xff\xff\xff\xff\xff" + segment_payload
+    return header + ebml_element(0x18538067, segment_payload)
+
+
+def mp4_box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def make_mp4(fourcc: bytes = b"mp4a", with_moov: bool = True, moov_last: bool = False, duration_ms: int = 0) -> bytes:
+    ftyp = mp4_box(b"ftyp", b"M4A \x00\x00\x00\x00isomM4A ")
+    entry = mp4_box(fourcc, b"\x00" * 6 + b"\x00\x01" + b"\x00" * 8 + struct.pack(">HHHH", 2, 16, 0, 0) + struct.pack(">I", 44100 << 16))
+    stsd = mp4_box(b"stsd", b"\x00\x00\x00\x00" + struct.pack(">I", 1) + entry)
+    mvhd = mp4_box(b"mvhd", b"\x00" * 12 + struct.pack(">II", 1000, duration_ms) + b"\x00" * 80) if duration_ms else b""
+    moov = mp4_box(b"moov", mvhd + mp4_box(b"trak", mp4_box(b"mdia", mp4_box(b"minf", mp4_box(b"stbl", stsd)))))
+    mdat = mp4_box(b"mdat", b"\x00" * 2048)
+    if not with_moov:
+        return ftyp + mdat
+    return ftyp + mdat + moov if moov_last else ftyp + moov + mdat
+
+
+def make_ogg(packet: bytes) -> bytes:
+    return b"OggS\x00\x02" + b"\x00" * 20 + bytes([1, len(packet)]) + packet
+
+
+def make_wav(format_tag: int = 1) -> bytes:
+    if format_tag == 1:
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(16000)
+            w.writeframes(b"\x00\x00" * 800)
+        return buffer.getvalue()
+    fmt = struct.pack("<4sIHHIIHH", b"fmt ", 16, format_tag, 1, 8000, 8000, 1, 8)
+    data = struct.pack("<4sI", b"data", 800) + b"\x00" * 800
+    return b"RIFF" + struct.pack("<I", 4 + len(fmt) + len(data)) + b"WAVE" + fmt + data
+
+
+def probe(data: bytes):
+    return probe_header(io.BytesIO(data))
+
+
+class TestProbeHeader:
+    """Tests for header-based container/codec detection."""
+
+    def test_webm_opus(self):
+        """WebM with an Opus track (browser MediaRecorder)."""
+        result = probe(make_matroska("webm", "A_OPUS"))
+        assert (result.container, result.codec, result.sample_rate, result.channels) == ("webm", "opus", 48000, 1)
+
+    def test_webm_unknown_segment_size(self):
+        """Live recordings have a Segment of unknown size."""
+        result = probe(make_matroska("webm", "A_OPUS", unknown_segment_size=True))
+        assert (result.container, result.codec) == ("webm", "opus")
+
+    def test_matroska_aac(self):
+        """Matroska doctype and AAC codec IDs are distinguished from WebM."""
+        result = probe(make_matroska("matroska", "A_AAC/MPEG4/LC"))
+        assert (result.container, result.codec) == ("matroska", "aac")
+
+    def test_mp4_moov_at_end(self):
+        """The sample entry is found after mdat."""
+        result = probe(make_mp4(moov_last=True))
+        assert (result.container, result.codec, result.sample_rate, result.channels) == ("mp4", "aac", 44100, 2)
+        assert result.complete
+
+    def test_mp4_without_moov_is_incomplete(self):
+        """An interrupted recording has no moov box."""
+        assert not probe(make_mp4(with_moov=False)).complete
+
+    def test_ogg_codecs(self):
+        """The first Ogg packet identifies the codec."""
+        opus_head = b"OpusHead\x01\x02\x38\x01" + struct.pack("<I", 48000) + b"\x00\x00\x00"
+        assert probe(make_ogg(opus_head)).codec == "opus"
+        assert probe(make_ogg(b"\x01vorbis" + b"\x00" * 4 + b"\x01" + struct.pack("<I", 44100))).codec == "vorbis"
+        assert probe(make_ogg(b"Speex   " + b"\x00" * 20)).codec == "speex"
+
+    def test_wav_format_tag(self):
+        """The fmt chunk distinguishes PCM from compressed WAV."""
+        result = probe(make_wav())
+        assert (result.container, result.codec, result.sample_rate, result.channels) == ("wav", "pcm", 16000, 1)
+        assert probe(make_wav(format_tag=7)).codec == "mulaw"
+
+    def test_mp3_after_id3(self):
+        """MP3 frames are validated after skipping the ID3v2 tag."""
+        id3 = b"ID3\x04\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10
+        result = probe(id3 + b"\xff\xfb\x90\x64" + b"\x00" * 400)
+        assert (result.container, result.codec, result.sample_rate) == ("mp3", "mp3", 44100)
+
+    def test_adts_aac(self):
+        """Raw AAC (ADTS) starts with a frame sync too."""
+        result = probe(b"\xff\xf1\x50\x80" + b"\x00" * 400)
+        assert (result.container, result.codec, result.sample_rate) == ("adts", "aac", 44100)
+
+    def test_durations(self):
+        """Durations come from the WAV data chunk, MP4 mvhd and FLAC STREAMINFO."""
+        assert probe(make_wav()).duration == pytest.approx(0.05)
+
+        assert probe(make_mp4(duration_ms=12500)).duration == pytest.approx(12.5)
+
+        streaminfo = ((16000 << 44) | (0 << 41) | (15 << 36) | 48000).to_bytes(8, "big")
+        flac = b"fLaC" + b"\x80\x00\x00\x22" + b"\x00" * 10 + streaminfo + b"\x00" * 16
+        result = probe(flac)
+        assert (result.sample_rate, result.channels, result.duration) == (16000, 1, 3.0)
+
+    def test_estimated_duration(self):
+        """Without a stated duration the size and a low-end bitrate give an upper bound."""
+        result = probe(make_matroska("webm", "A_OPUS"))
+        assert result.duration is None
+        result.size = 80000
+        assert result.estimated_duration == pytest.approx(10.0)
+
+    def test_unknown(self):
+        """Unrecognized data has no container."""
+        assert not probe(b"not audio at all" * 10).recognized
+
+
+class TestPlanForWhisper:
+    """Tests for the send/remux/transcode decision."""
+
+    def test_send_supported(self):
+        """Supported container and codec are sent as is."""
+        plan = plan_for_whisper(probe(make_matroska("webm", "A_OPUS")))
+        assert (plan.action, plan.mime_type, plan.extension) == ("send", "audio/webm", "webm")
+
+    def test_remux(self):
+        """A supported codec in another container is copied, not re-encoded."""
+        assert plan_for_whisper(probe(make_matroska("matroska", "A_OPUS"))).action == "remux"
+        plan = plan_for_whisper(probe(b"\xff\xf1\x50\x80" + b"\x00" * 400))
+        assert (plan.action, plan.container, plan.extension) == ("remux", "mp4", "m4a")
+
+    def test_transcode(self):
+        """Unsupported codecs are transcoded to FLAC."""
+        plan = plan_for_whisper(probe(make_wav(format_tag=7)))
+        assert (plan.action, plan.container, plan.mime_type) == ("transcode", "flac", "audio/flac")
+
+    def test_unknown_sent_as_declared(self):
+        """Unrecognized uploads are sent once with the declared type."""
+        plan = plan_for_whisper(probe(b"\x00" * 2000))
+        assert plan.action == "send"
+        assert plan.mime_type is None
+
+    def test_compress_bulky_uploads(self):
+        """Large PCM is compressed; Opus, small and 16 kHz mono lossy uploads are not."""
+        wav = probe(make_wav())
+        wav.size = 1024 * 1024
+        plan = plan_for_whisper(wav, compress="opus", compress_min_bytes=256 * 1024)
+        assert (plan.action, plan.codec, plan.mime_type) == ("compress", "opus", "audio/ogg")
+        assert plan_for_whisper(wav, compress="flac", compress_min_bytes=2 * 1024 * 1024).action == "send"
+
+        webm = probe(make_matroska("webm", "A_OPUS"))
+        webm.size = 10 * 1024 * 1024
+        assert plan_for_whisper(webm, compress="opus").action == "send"
+
+        mp4 = probe(make_mp4())
+        mp4.size = 10 * 1024 * 1024
+        assert plan_for_whisper(mp4, compress="opus").action == "compress"
+        assert plan_for_whisper(mp4, compress="flac").action == "send"
+
+    def test_compress_replaces_transcode(self):
+        """A required transcode produces the compressed format directly."""
+        plan = plan_for_whisper(probe(make_wav(format_tag=7)), compress="flac", compress_min_bytes=10 ** 9)
+        assert (plan.action, plan.container) == ("compress", "flac")
+
+    def test_ffprobe_skipped_when_missing(self):
+        """Without ffprobe the header result is used."""
+        with patch("src.utils.audio_probe.shutil.which", return_value=None):
+            result = asyncio.run(probe_audio(io.BytesIO(b"\x00" * 2000)))
+        assert not result.recognized
+
+
+class TestTranscribeConversion:
+    """Tests for conversion before the Whisper upload."""
+
+    def test_incomplete_mp4_rejected_without_upload(self):
+        """A truncated MP4 fails locally instead of costing an upstream call."""
+        from src.services.whisper_stt import WhisperSTTService
+
+        with patch("src.services.whisper_stt.tracked_post") as post:
+            service = WhisperSTTService(api_key="test")
+            with pytest.raises(ValueError, match="incomplete"):
+                asyncio.run(service.transcribe_with_fallback(audio_bytes=make_mp4(with_moov=False)))
+        post.assert_not_called()
+
+    def test_conversion_failure_is_user_facing(self):
+        """Without ffmpeg an unsupported codec is reported, not uploaded."""
+        from src.services.whisper_stt import WhisperSTTService
+
+        with patch("src.utils.audio_probe.shutil.which", return_value=None), \
+                patch("src.services.whisper_stt.tracked_post") as post:
+            service = WhisperSTTService(api_key="test")
+            with pytest.raises(ValueError, match="Unsupported audio format"):
+                asyncio.run(service.transcribe_with_fallback(audio_bytes=make_wav(format_tag=7)))
+        post.assert_not_called()
+
+    def test_compression_is_optional(self):
+        """If compression fails the original upload is sent."""
+        import httpx
+
+        from src.services.whisper_stt import WhisperSTTService
+
+        sent = []
+
+        async def fake_post(client, provider, endpoint, module, url, headers, content):
+            sent.append(b"".join([chunk async for chunk in content]))
+            return httpx.Response(200, json={"text": "Olá"}, request=httpx.Request("POST", url))
+
+        wav = make_wav()
+        with patch("src.utils.audio_probe.shutil.which", return_value=None), \
+                patch("src.services.whisper_stt.tracked_post", side_effect=fake_post):
+            service = WhisperSTTService(api_key="test")
+            service.settings = service.settings.model_copy(update={"audio_compress": "opus", "audio_compress_min_kb": 0})
+            result = asyncio.run(service.transcribe_with_fallback(audio_bytes=wav))
+
+        assert result.text == "Olá"
+        assert len(sent) == 1
+        assert wav in sent[0]
@@ -0,0 +1,280 @@
+"""
+Tests for VAD-based silence trimming and chunking of uploads.
+"""
+
+import asyncio
+import io
+import wave
+from unittest.mock import patch
+
+import httpx
+import numpy as np
+import pytest
+
+from src.services.timestamp_utils import WordTrack
+from src.utils.audio import (
+    TRIM_JOIN_GAP,
+    AudioChunk,
+    SpeechSpan,
+    detect_speech,
+    encode_wav,
+    plan_chunks,
+    read_wav_pcm,
+    trim_silence,
+)
+
+RATE = 16000
+
+
+def tone(seconds: float, amplitude: float = 0.3) -> np.ndarray:
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * 32767 * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+
+
+def silence(seconds: float, noise: float = 0.0005) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return (noise * 32767 * rng.standard_normal(int(seconds * RATE))).astype(np.int16)
+
+
+def recording(*parts) -> np.ndarray:
+    """Alternate silence and speech: recording(1.0, 2.0, 3.0) = 1s silence, 2s speech, 3s silence."""
+    return np.concatenate([silence(s) if i % 2 == 0 else tone(s) for i, s in enumerate(parts)])
+
+
+class TestDetectSpeech:
+    """Tests for the energy VAD."""
+
+    def test_spans_padded(self):
+        """Speech regions are found and padded by VAD_PADDING_MS."""
+        spans = detect_speech(recording(1.0, 1.5, 2.0, 1.0, 1.0), RATE)
+        assert len(spans) == 2
+        assert spans[0].start == pytest.approx(0.8, abs=0.03)
+        assert spans[0].end == pytest.approx(2.7, abs=0.03)
+        assert spans[1].start == pytest.approx(4.3, abs=0.03)
+
+    def test_silence_only(self):
+        """Background noise alone is not speech."""
+        assert detect_speech(silence(3.0), RATE) == []
+
+    def test_continuous_speech_kept(self):
+        """A clip without pauses is one span covering everything."""
+        spans = detect_speech(tone(2.0), RATE)
+        assert [(s.start, s.end) for s in spans] == [(0.0, 2.0)]
+
+    def test_clicks_ignored(self):
+        """Bursts shorter than VAD_MIN_SPEECH_MS are not speech."""
+        samples = np.concatenate([silence(1.0), tone(0.02), silence(1.0), tone(1.0), silence(1.0)])
+        spans = detect_speech(samples, RATE)
+        assert len(spans) == 1
+        assert spans[0].start > 1.5
+
+
+class TestTrimSilence:
+    """Tests for trimming and the timeline map."""
+
+    def test_edges(self):
+        """Only leading/trailing silence is removed; the pause stays."""
+        trim = trim_silence(recording(2.0, 1.0, 2.0, 1.0, 2.0), RATE)
+        assert trim.original_duration == pytest.approx(8.0)
+        assert trim.duration == pytest.approx(4.4, abs=0.05)
+        assert len(trim.offsets) == 1
+
+    def test_spans_shorten_long_pauses(self):
+        """Pauses longer than max_gap become TRIM_JOIN_GAP; short ones stay."""
+        trim = trim_silence(recording(2.0, 1.0, 3.0, 1.0, 0.5, 1.0, 2.0), RATE, concatenate=True, max_gap=1.0)
+        assert len(trim.offsets) == 2
+        assert trim.offsets[1] - trim.offsets[0] == pytest.approx(1.4 + TRIM_JOIN_GAP, abs=0.05)
+
+    def test_to_original(self):
+        """Trimmed times map back to the original recording."""
+        trim = trim_silence(recording(2.0, 1.0, 3.0, 1.0, 2.0), RATE, concatenate=True, max_gap=1.0)
+        second = trim.offsets[1]
+        mapped = trim.to_original(np.array([0.2, 0.7, second + 0.2]))
+        assert mapped == pytest.approx([2.0, 2.5, 6.0], abs=0.05)
+        # An end on the segment boundary stays in the earlier segment
+        assert trim.to_original(np.array([second]), ends=True)[0] < 4.0
+
+    def test_no_speech(self):
+        """Nothing is trimmed when no speech is found."""
+        assert trim_silence(silence(2.0), RATE) is None
+
+    def test_wav_round_trip(self):
+        """Stereo and 24-bit WAV are read as int16 mono."""
+        samples = tone(0.5)
+        stereo = np.repeat(samples[:, None], 2, axis=1)
+        wide = np.zeros((len(stereo), 2, 3), dtype=np.uint8)
+        wide[..., 1:] = stereo.astype("<i2").view(np.uint8).reshape(len(stereo), 2, 2)
+
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as w:
+            w.setnchannels(2)
+            w.setsampwidth(3)
+            w.setframerate(RATE)
+            w.writeframes(wide.tobytes())
+
+        decoded, rate = read_wav_pcm(buffer)
+        assert rate == RATE
+        np.testing.assert_array_equal(decoded, samples)
+        assert read_wav_pcm(io.BytesIO(encode_wav(samples, RATE)))[0].tolist() == samples.tolist()
+        assert read_wav_pcm(io.BytesIO(b"not a wav")) is None
+
+
+class TestTranscribeTrimmed:
+    """Tests for trimming before the Whisper upload."""
+
+    def _transcribe(self, wav: bytes, mode: str):
+        from src.services.whisper_stt import WhisperSTTService
+
+        sent = []
+
+        async def fake_post(client, provider, endpoint, module, url, headers, content):
+            sent.append(b"".join([chunk async for chunk in content]))
+            body = {
+                "text": "Olá mundo",
+                "duration": 3.0,
+                "words": [{"word": "Olá", "start": 0.2, "end": 0.9}, {"word": "mundo", "start": 1.9, "end": 2.2}],
+            }
+            return httpx.Response(200, json=body, request=httpx.Request("POST", url))
+
+        with patch("src.services.whisper_stt.tracked_post", side_effect=fake_post):
+            service = WhisperSTTService(api_key="test")
+            service.settings = service.settings.model_copy(update={"audio_trim_silence": mode})
+            result = asyncio.run(service.transcribe_with_fallback(audio_bytes=wav, include_word_timestamps=True))
+        return result, sent
+
+    def test_timestamps_on_original_timeline(self):
+        """The upload is shorter and word times are re-offset."""
+        wav = encode_wav(recording(3.0, 1.0, 3.0, 1.0, 3.0), RATE)
+        result, sent = self._transcribe(wav, "spans")
+
+        assert len(sent) == 1
+        assert len(sent[0]) < len(wav) / 2
+        assert result.duration == pytest.approx(11.0)
+        assert result.words.to_list()[0]["start"] == pytest.approx(3.0, abs=0.05)
+        assert result.words.to_list()[1]["start"] == pytest.approx(7.0, abs=0.05)
+
+    def test_decoded_duration_replaces_estimate(self):
+        """A size estimate over AUDIO_TRIM_MAX_SECONDS still trims once decoding shows the real length."""
+        from src.services.whisper_stt import WhisperSTTService
+        from src.utils.audio_probe import ProbeResult
+
+        samples = recording(3.0, 1.0, 3.0, 1.0, 3.0)
+        webm = b"\x1a\x45\xdf\xa3" + b"\x00" * 4000
+        probe = ProbeResult(container="webm", codec="opus", size=8000 * 400)
+        assert probe.estimated_duration > 300
+        sent = []
+
+        async def fake_post(client, provider, endpoint, module, url, headers, content):
+            sent.append(b"".join([chunk async for chunk in content]))
+            return httpx.Response(200, json={"text": "Olá mundo"}, request=httpx.Request("POST", url))
+
+        async def decode(audio_file, probe):
+            return samples, RATE
+
+        with patch("src.services.whisper_stt.tracked_post", side_effect=fake_post), \
+                patch("src.services.whisper_stt.probe_audio", return_value=probe):
+            service = WhisperSTTService(api_key="test")
+            service.settings = service.settings.model_copy(
+                update={"audio_trim_silence": "spans", "stt_backend": "api"}
+            )
+            service._decode = decode
+            result = asyncio.run(service.transcribe_with_fallback(audio_bytes=webm, mime_type="audio/webm"))
+
+        assert b'filename="audio.wav"' in sent[0]
+        assert result.duration == pytest.approx(11.0)
+
+    def test_off_sends_original(self):
+        """With AUDIO_TRIM_SILENCE=off the recording is sent unchanged."""
+        wav = encode_wav(recording(3.0, 1.0, 3.0), RATE)
+        result, sent = self._transcribe(wav, "off")
+        assert wav in sent[0]
+        assert result.words.to_list()[0]["start"] == pytest.approx(0.2)
+
+    def test_skipped_without_ffmpeg(self):
+        """Formats that need decoding are sent untrimmed when ffmpeg is missing."""
+        from tests.test_audio_probe import make_matroska
+
+        with patch("src.utils.audio_probe.shutil.which", return_value=None):
+            result, sent = self._transcribe(make_matroska("webm", "A_OPUS") + b"\x00" * 2000, "edges")
+        assert len(sent) == 1
+        assert result.duration == 3.0
+
+
+class TestChunking:
+    """Tests for splitting long recordings and stitching the transcripts."""
+
+    def test_cuts_in_pauses(self):
+        """Chunks end in the middle of the last pause of each window."""
+        spans = [SpeechSpan(t, t + 8.0) for t in range(0, 100, 10)]
+        chunks = plan_chunks(spans, 100.0, max_seconds=30.0)
+        assert [(c.start, c.end) for c in chunks] == [(0.0, 29.0), (29.0, 59.0), (59.0, 89.0), (89.0, 100.0)]
+        assert all(c.overlap == 0 for c in chunks)
+
+    def test_hard_cut_overlaps(self):
+        """Without pauses the next chunk repeats CHUNK_OVERLAP seconds."""
+        chunks = plan_chunks([SpeechSpan(0.0, 50.0)], 50.0, max_seconds=20.0)
+        assert [(c.start, c.end, c.overlap) for c in chunks] == [(0.0, 20.0, 0.0), (19.0, 39.0, 1.0), (38.0, 50.0, 1.0)]
+
+    def test_short_remainder_joins_last_chunk(self):
+        """A remainder under CHUNK_MIN_SECONDS is not a chunk of its own."""
+        assert len(plan_chunks([], 20.5, max_seconds=20.0)) == 1
+
+    def test_strip_repeated_prefix(self):
+        """Words transcribed in both chunks are kept once."""
+        from src.services.whisper_stt import strip_repeated_prefix
+
+        assert strip_repeated_prefix("e então fomos ao mercado", "Ao mercado, comprar pão.") == "comprar pão."
+        assert strip_repeated_prefix("fomos ao mercado", "comprar pão") == "comprar pão"
+
+    def test_stitch_overlap(self):
+        """Words are shifted and the overlap midpoint decides which chunk keeps a word."""
+        from src.services.whisper_stt import TranscriptionResult, stitch_transcripts
+
+        chunks = [AudioChunk(0.0, 20.0), AudioChunk(19.0, 30.0, overlap=1.0)]
+        results = [
+            TranscriptionResult("um dois", WordTrack(["um", "dois"], [18.0, 19.2], [18.5, 19.8])),
+            TranscriptionResult("dois três", WordTrack(["dois", "três"], [0.2, 1.0], [0.8, 1.5])),
+        ]
+        result = stitch_transcripts(chunks, results)
+        assert result.text == "um dois três"
+        assert result.words.words == ["um", "dois", "três"]
+        assert result.words.starts.tolist() == pytest.approx([18.0, 19.2, 20.0])
+
+    def _transcribe(self, wav: bytes, fail: bool = False):
+        from src.services.whisper_stt import WhisperSTTService
+
+        sent = []
+
+        async def fake_post(client, provider, endpoint, module, url, headers, content):
+            sent.append(b"".join([chunk async for chunk in content]))
+            part = f"parte{len(sent)}"
+            if fail and len(sent) == 2:
+                return httpx.Response(429, json={}, request=httpx.Request("POST", url))
+            await asyncio.sleep(0.01)
+            body = {"text": part, "words": [{"word": part, "start": 0.5, "end": 1.0}]}
+            return httpx.Response(200, json=body, request=httpx.Request("POST", url))
+
+        with patch("src.services.whisper_stt.tracked_post", side_effect=fake_post):
+            service = WhisperSTTService(api_key="test")
+            service.settings = service.settings.model_copy(update={
+                "stt_chunk_min_seconds": 10.0, "stt_chunk_max_seconds": 8.0, "stt_chunk_concurrency": 2,
+            })
+            result = asyncio.run(service.transcribe_with_fallback(audio_bytes=wav, include_word_timestamps=True))
+        return result, sent
+
+    def test_long_recording_chunked(self):
+        """Each chunk is one upstream call; words land on the recording's timeline."""
+        wav = encode_wav(recording(0.5, 3.0, 1.0, 3.0, 1.0, 3.0, 1.0, 3.0, 1.0, 3.0, 0.5), RATE)
+        result, sent = self._transcribe(wav)
+
+        assert len(sent) == 3
+        assert sorted(result.text.split()) == ["parte1", "parte2", "parte3"]
+        assert result.duration == pytest.approx(20.0)
+        assert result.words.starts.tolist() == sorted(result.words.starts.tolist())
+        assert result.words.starts[-1] > 10.0
+
+    def test_failed_chunk_fails_request(self):
+        """An upstream error in one chunk is raised for the whole recording."""
+        wav = encode_wav(recording(0.5, 3.0, 1.0, 3.0, 1.0, 3.0, 1.0, 3.0, 1.0, 3.0, 0.5), RATE)
+        with pytest.raises(ValueError, match="Too many requests"):
+            self._transcribe(wav, fail=True)
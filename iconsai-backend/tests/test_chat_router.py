@@ -0,0 +1,455 @@
+"""
+Tests for chat-router endpoint and chat context building.
+"""
+
+import asyncio
+from fastapi.testclient import TestClient
+from unittest.mock import patch, AsyncMock
+
+from src.main import app
+from src.services.openai_chat import ChatResult
+
+client = TestClient(app)
+
+
+class TestChatRouter:
+    """Tests for /functions/v1/chat-router endpoint."""
+
+    def test_pwa_missing_message(self):
+        """Test error when PWA message is missing."""
+        response = client.post(
+            "/functions/v1/chat-router",
+            json={"pwaMode": True, "agentSlug": "world"}
+        )
+        assert response.status_code == 400
+
+    @patch("src.api.chat_router.get_session_manager")
+    @patch("src.api.chat_router.OpenAIChatService")
+    def test_pwa_history_by_device(self, mock_service_class, mock_get_manager):
+        """Test PWA mode loads and saves history by deviceId."""
+        from src.core.session_manager import SessionManager
+
+        manager = SessionManager()
+        mock_get_manager.return_value = manager
+
+        mock_service = AsyncMock()
+        mock_service.chat.return_value = ChatResult(response="A Selic é a taxa básica.")
+        mock_service_class.return_value = mock_service
+
+        payload = {
+            "pwaMode": True,
+            "message": "O que é a Selic?",
+            "agentSlug": "economia",
+            "deviceId": "device-123",
+        }
+
+        response = client.post("/functions/v1/chat-router", json=payload)
+        assert response.status_code == 200
+        assert mock_service.chat.call_args.kwargs["history"] is None
+
+        response = client.post("/functions/v1/chat-router", json=payload)
+        assert response.status_code == 200
+
+        history = mock_service.chat.call_args.kwargs["history"]
+        assert [m.role for m in history] == ["user", "assistant"]
+        assert history[1].content == "A Selic é a taxa básica."
+
+    @patch("src.api.chat_router.get_session_manager")
+    @patch("src.api.chat_router.OpenAIChatService")
+    def test_pwa_stream_saves_history(self, mock_service_class, mock_get_manager):
+        """Test PWA streaming saves the turn once the stream completes."""
+        from src.core.session_manager import SessionManager
+        from src.services.openai_chat import SSE_DONE, sse_delta
+
+        manager = SessionManager()
+        mock_get_manager.return_value = manager
+
+        async def fake_stream_reply(message, module_slug, history, session_id, on_complete):
+            yield sse_delta("A Selic ", "openai")
+            yield sse_delta("é a taxa básica.", "openai")
+            yield SSE_DONE
+            on_complete("A Selic é a taxa básica.", "openai")
+
+        mock_service_class.return_value.stream_reply = fake_stream_reply
+
+        response = client.post(
+            "/functions/v1/chat-router/stream",
+            json={
+                "pwaMode": True,
+                "message": "O que é a Selic?",
+                "agentSlug": "economia",
+                "deviceId": "device-stream",
+            },
+        )
+
+        assert response.status_code == 200
+        assert response.text.endswith("data: [DONE]\n\n")
+
+        _, _, history = manager.get_recent_history("device-stream", module_slug="economia")
+        assert [m["content"] for m in history] == ["O que é a Selic?", "A Selic é a taxa básica."]
+
+
+def _collect_stream(service, messages):
+    """Run stream_chat and return (deltas, sources, raw events)."""
+    import json
+
+    async def run():
+        return [event async for event in service.stream_chat(messages)]
+
+    events = asyncio.run(run())
+    deltas, sources = [], set()
+    for event in events:
+        data = event[len("data: "):].strip()
+        if data == "[DONE]":
+            continue
+        payload = json.loads(data)
+        if "choices" in payload:
+            deltas.append(payload["choices"][0]["delta"]["content"])
+            sources.add(payload["source"])
+    return deltas, sources, events
+
+
+class TestChatStreaming:
+    """Tests for the unified streaming engine."""
+
+    def test_sanitizer_across_chunks(self):
+        """Test brands split across chunks are still replaced."""
+        from src.services.openai_chat import StreamingBrandSanitizer
+
+        sanitizer = StreamingBrandSanitizer()
+        chunks = ["Eu sou o Chat", "G", "PT e não ", "o Gem", "ini."]
+        text = "".join(sanitizer.feed(c) for c in chunks) + sanitizer.flush()
+
+        assert text == "Eu sou o Arbache AI e não o Arbache AI."
+
+    def test_sanitizer_every_split(self):
+        """Test streamed output equals whole-text sanitization at every split point."""
+        from src.services.openai_chat import StreamingBrandSanitizer, sanitize_branding
+
+        text = "Llamas? Não sou Llama, GPT-3.5, gpt-3 nem CHATGPT; uso Meta A e Google AI."
+        expected = sanitize_branding(text)
+
+        for i in range(len(text)):
+            for j in range(i, len(text)):
+                sanitizer = StreamingBrandSanitizer()
+                out = "".join(sanitizer.feed(c) for c in (text[:i], text[i:j], text[j:]))
+                assert out + sanitizer.flush() == expected, (i, j)
+
+    def test_sanitizer_emits_without_brand_prefix(self):
+        """Test plain text is emitted immediately (no fixed holdback)."""
+        from src.services.openai_chat import StreamingBrandSanitizer
+
+        sanitizer = StreamingBrandSanitizer()
+
+        assert sanitizer.feed("Bom dia! ") == "Bom dia! "
+        assert sanitizer.feed("Sou o Chat") == "Sou o "
+        assert sanitizer.feed("GPT.") == "Arbache AI."
+
+    def test_sanitize_matches_previous_behavior(self):
+        """Test single-pass matcher replaces what the per-brand loop did."""
+        from src.services.openai_chat import FORBIDDEN_BRANDS, sanitize_branding
+
+        def legacy(text):
+            for brand in FORBIDDEN_BRANDS:
+                text = text.replace(brand, "Arbache AI").replace(brand.lower(), "Arbache AI")
+            return text
+
+        text = " ".join(f"{b} e {b.lower()}" for b in FORBIDDEN_BRANDS) + " GPT-3.5"
+        assert sanitize_branding(text) == legacy(text)
+
+    def test_fallback_before_first_token(self):
+        """Test a provider failing before its first token falls back."""
+        from src.services.openai_chat import OpenAIChatService
+
+        service = OpenAIChatService(openai_key="sk", perplexity_key="pplx", gemini_key="g")
+
+        async def failing(messages, model, module_slug):
+            raise RuntimeError("Perplexity stream failed: 503")
+            yield  # pragma: no cover
+
+        async def working(messages, model, module_slug):
+            for piece in ["Sou o Chat", "GPT, ", "olá!"]:
+                yield piece
+
+        completed = []
+        service._stream_perplexity = failing
+        service._stream_openai = working
+
+        async def run():
+            return [e async for e in service.stream_chat(
+                [{"role": "user", "content": "oi"}],
+                on_complete=lambda r, s: completed.append((r, s)),
+            )]
+
+        events = asyncio.run(run())
+
+        assert events[-1] == "data: [DONE]\n\n"
+        assert completed == [("Sou o Arbache AI, olá!", "openai")]
+
+    def test_fallback_when_held_back_chunks_fail(self):
+        """Test a failure after chunks the sanitizer held back still falls back."""
+        from src.services.openai_chat import OpenAIChatService
+
+        service = OpenAIChatService(openai_key="sk", perplexity_key="pplx")
+
+        async def held_then_fail(messages, model, module_slug):
+            yield "Chat"
+            raise RuntimeError("connection reset")
+
+        async def working(messages, model, module_slug):
+            yield "Olá!"
+
+        completed = []
+        service._stream_perplexity = held_then_fail
+        service._stream_openai = working
+
+        async def run():
+            return [e async for e in service.stream_chat(
+                [{"role": "user", "content": "oi"}],
+                on_complete=lambda r, s: completed.append((r, s)),
+            )]
+
+        events = asyncio.run(run())
+
+        assert not any("interrompida" in e for e in events)
+        assert completed == [("Olá!", "openai")]
+
+    def test_complete_before_done(self):
+        """Test on_complete runs even if the client closes the stream at [DONE]."""
+        from src.services.openai_chat import SSE_DONE, OpenAIChatService
+
+        service = OpenAIChatService(openai_key="sk")
+
+        async def working(messages, model, module_slug):
+            yield "Olá!"
+
+        completed = []
+        service._stream_openai = working
+
+        async def run():
+            stream = service.stream_chat(
+                [{"role": "user", "content": "oi"}],
+                on_complete=lambda r, s: completed.append((r, s)),
+            )
+            async for event in stream:
+                if event == SSE_DONE:
+                    await stream.aclose()
+                    break
+
+        asyncio.run(run())
+
+        assert completed == [("Olá!", "openai")]
+
+    def test_error_after_first_token(self):
+        """Test a failure mid-stream ends with an error instead of switching provider."""
+        from src.services.openai_chat import OpenAIChatService
+
+        service = OpenAIChatService(openai_key="sk", perplexity_key="pplx", gemini_key="g")
+
+        async def interrupted(messages, model, module_slug):
+            yield "A inflação subiu este mês, segundo o IBGE"
+            raise RuntimeError("connection reset")
+
+        gemini = AsyncMock()
+        service._stream_perplexity = interrupted
+        service._stream_gemini = gemini
+
+        deltas, sources, events = _collect_stream(service, [{"role": "user", "content": "inflação?"}])
+
+        assert sources == {"perplexity"}
+        assert "".join(deltas).startswith("A inflação subiu")
+        assert '"error"' in events[-2]
+        gemini.assert_not_called()
+
+
+class TestPromptAssembly:
+    """Tests for prebuilt system prompts and prompt cache accounting."""
+
+    def test_system_messages_prebuilt(self):
+        """Test every module shares one prebuilt message and a common prefix."""
+        from src.services.openai_chat import (
+            BRANDING_PROMPT, MODULE_PROMPTS, OpenAIChatService, get_system_message,
+        )
+
+        service = OpenAIChatService(openai_key="sk")
+        first = service._build_messages("Oi", "health", None, None)
+        second = service._build_messages("Olá", "health", None, None)
+
+        assert first[0] is second[0]
+        assert get_system_message("unknown") is get_system_message("general")
+        for slug in MODULE_PROMPTS:
+            assert get_system_message(slug)["content"].startswith(BRANDING_PROMPT)
+
+    def test_usage_accounting(self):
+        """Test cached tokens are read from OpenAI and Gemini usage fields."""
+        from src.services.openai_chat import PromptCacheStats
+
+        stats = PromptCacheStats()
+        stats.record_usage("openai", {"prompt_tokens": 1200, "prompt_tokens_details": {"cached_tokens": 1024}})
+        stats.record_usage("openai", {"prompt_tokens": 800})
+        stats.record_usage("gemini", {"promptTokenCount": 500, "cachedContentTokenCount": 0})
+        stats.record_usage("perplexity", None)
+
+        result = stats.stats()
+
+        assert result["openai"]["requests"] == 2
+        assert result["openai"]["cacheHits"] == 1
+        assert result["openai"]["cachedRatio"] == 0.512
+        assert result["gemini"]["cachedTokens"] == 0
+        assert "perplexity" not in result
+
+
+class TestChatContext:
+    """Tests for token-budgeted chat context."""
+
+    def test_estimate_tokens(self):
+        """Test token estimate grows with text."""
+        from src.services.chat_context import estimate_tokens
+
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("Olá, mundo!") == 4
+        assert estimate_tokens("inconstitucionalissimamente") > 1
+
+    def test_packs_newest_under_budget(self):
+        """Test newest messages are kept within the budget."""
+        from src.services.chat_context import ChatContextBuilder
+
+        history = [
+            {"role": "user" if i % 2 == 0 else "assistant", "content": f"mensagem número {i} " * 10}
+            for i in range(20)
+        ]
+
+        builder = ChatContextBuilder(max_tokens=200)
+        context = builder.build(history)
+
+        assert 0 < len(context.messages) < 20
+        assert context.messages[-1] is history[-1]
+        assert context.tokens <= 200
+        assert context.dropped == 20 - len(context.messages)
+
+    def test_background_summary(self):
+        """Test dropped turns are summarized in the background and reused."""
+        from src.services.chat_context import ChatContextBuilder
+
+        history = [{"role": "user", "content": "palavra " * 50} for _ in range(10)]
+        summarizer = AsyncMock(return_value="Resumo curto.")
+        builder = ChatContextBuilder(max_tokens=150)
+
+        async def run():
+            first = builder.build(history, summary_key="s:world", summarizer=summarizer)
+            await asyncio.gather(*builder._tasks)
+            second = builder.build(history, summary_key="s:world", summarizer=summarizer)
+            return first, second
+
+        first, second = asyncio.run(run())
+
+        assert first.summary is None
+        assert second.summary == "Resumo curto."
+        assert summarizer.await_count == 1
+
+
+class TestResponseCache:
+    """Tests for the chat response cache."""
+
+    def test_normalized_hit(self):
+        """Test questions differing in case/accents/punctuation share a key."""
+        from src.services.response_cache import ResponseCache
+
+        cache = ResponseCache()
+        cache.put("economia", "O que é a Selic?", "A Selic é a taxa básica.", "perplexity")
+
+        hit = cache.get("economia", "o que e a selic")
+
+        assert hit is not None
+        assert hit.source == "perplexity"
+        assert cache.get("world", "o que e a selic") is None
+
+    def test_similar_hit(self):
+        """Test paraphrase lookup through the similarity tier."""
+        from src.services.response_cache import ResponseCache
+
+        cache = ResponseCache(similarity_threshold=0.85)
+        cache.put("economia", "O que é a Selic?", "A Selic é a taxa básica.", "perplexity")
+
+        assert cache.get("economia", "O que é a taxa Selic?") is not None
+        assert cache.get("economia", "O que é o IPCA?") is None
+        assert cache.similar_hits == 1
+
+    def test_similar_requires_same_facts(self):
+        """Test paraphrases asking for another year, month or entity miss."""
+        from src.services.response_cache import ResponseCache
+
+        cache = ResponseCache(similarity_threshold=0.85)
+        cache.put("economia", "qual o pib do brasil em 2023", "R$ 10,9 trilhões.", "perplexity")
+        cache.put("economia", "Qual foi o IPCA de maio de 2024?", "0,46%.", "perplexity")
+        cache.put("world", "Qual a capital da Austrália?", "Camberra.", "perplexity")
+
+        assert cache.get("economia", "qual o pib do brasil em 2022") is None
+        assert cache.get("economia", "Qual foi o IPCA de março de 2024?") is None
+        assert cache.get("world", "Qual a capital da Áustria?") is None
+        assert cache.get("economia", "qual é o pib do brasil em 2023?") is not None
+        assert cache.similar_hits == 1
+
+    def test_similarity_off_by_default(self):
+        """Test the paraphrase tier is disabled unless configured."""
+        from src.services.response_cache import ResponseCache
+
+        cache = ResponseCache()
+        cache.put("economia", "O que é a Selic?", "A Selic é a taxa básica.", "perplexity")
+
+        assert cache.get("economia", "O que é a taxa Selic?") is None
+
+    def test_module_ttl(self):
+        """Test per-module freshness and disabled modules."""
+        from src.services.response_cache import ResponseCache
+
+        cache = ResponseCache(ttls={"world": 60, "ideas": 0})
+        cache.put("world", "Quem venceu a eleição?", "Resposta", "perplexity")
+        cache.put("ideas", "Minha ideia é boa?", "Resposta", "openai")
+
+        entry = cache.get("world", "Quem venceu a eleição?")
+        entry.created_at -= 120
+
+        assert cache.get("world", "Quem venceu a eleição?") is None
+        assert cache.get("ideas", "Minha ideia é boa?") is None
+
+    def test_follow_up_not_cached(self):
+        """Test follow-up questions with history bypass the cache."""
+        from src.services.response_cache import ResponseCache
+
+        cache = ResponseCache()
+        cache.put("economia", "E o dólar?", "Resposta", "openai", has_history=True)
+        cache.put("economia", "E o dólar?", "Resposta", "openai")
+
+        assert cache.get("economia", "E o dólar?", has_history=True) is None
+        assert cache.get("economia", "E o dólar?") is not None
+
+    def test_history_answers_not_shared_between_devices(self):
+        """Test an answer drawn from one user's history is not served to another device."""
+        from src.services.openai_chat import ChatMessage, OpenAIChatService
+        from src.services.response_cache import ResponseCache
+
+        cache = ResponseCache()
+        service = OpenAIChatService(openai_key="sk")
+        service._call_perplexity = AsyncMock(return_value=None)
+        service._call_gemini = AsyncMock(return_value=None)
+
+        async def answer(messages, module_slug):
+            names = [m["content"].split()[-1] for m in messages if m["role"] == "user" and "chamo" in m["content"]]
+            return f"Seu nome é {names[-1]}." if names else "Ainda não sei seu nome."
+
+        service._call_openai = AsyncMock(side_effect=answer)
+        joao = [ChatMessage(role="user", content="Eu me chamo João")]
+        maria = [ChatMessage(role="user", content="Eu me chamo Maria")]
+
+        async def run():
+            first = await service.chat("qual é o meu nome", "health", history=joao, session_id="device-joao")
+            second = await service.chat("qual é o meu nome", "health", history=maria, session_id="device-maria")
+            return first, second
+
+        with patch("src.services.openai_chat.get_response_cache", return_value=cache):
+            first, second = asyncio.run(run())
+
+        assert first.response == "Seu nome é João."
+        assert second.response == "Seu nome é Maria."
+        assert cache.stats()["entries"] == 0
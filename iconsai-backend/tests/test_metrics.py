@@ -0,0 +1,152 @@
+"""
+Tests for metrics registry and provider usage accounting.
+"""
+
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.core.metrics import LogLinearHistogram, MetricsRegistry
+
+client = TestClient(app)
+
+
+class TestLogLinearHistogram:
+    """Tests for the HDR-style histogram."""
+
+    def test_quantiles_within_error(self):
+        """Test quantiles stay within the bucket relative error."""
+        rng = random.Random(7)
+        values = sorted(rng.lognormvariate(-1.5, 1.0) for _ in range(5000))
+
+        histogram = LogLinearHistogram(scale=1e6)
+        for value in values:
+            histogram.record(value)
+
+        for q in (0.5, 0.9, 0.99):
+            exact = values[int(q * len(values)) - 1]
+            assert histogram.quantile(q) == pytest.approx(exact, rel=0.02)
+
+        assert histogram.count == 5000
+        assert histogram.total == pytest.approx(sum(values))
+
+    def test_small_values_exact(self):
+        """Test integer values below the sub-bucket count are exact."""
+        histogram = LogLinearHistogram()
+        for value in (1, 2, 3, 4, 100):
+            histogram.record(value)
+
+        assert histogram.quantile(0.5) == 3
+        assert histogram.quantile(1.0) == 100
+
+    def test_empty(self):
+        """Test empty histogram quantile."""
+        assert LogLinearHistogram().quantile(0.99) == 0.0
+
+
+class TestMetricsRegistry:
+    """Tests for Prometheus text rendering."""
+
+    def test_render(self):
+        """Test counters and summaries render with labels."""
+        registry = MetricsRegistry()
+        registry.describe("requests_total", "counter", "Requests.")
+        registry.inc("requests_total", labels={"route": "/health"})
+        registry.inc("requests_total", labels={"route": "/health"})
+        registry.observe("latency_seconds", 0.25, labels={"route": "/health"})
+
+        text = registry.render()
+
+        assert "# TYPE requests_total counter" in text
+        assert 'requests_total{route="/health"} 2' in text
+        assert 'latency_seconds{route="/health",quantile="0.99"} 0.2' in text
+        assert registry.get_histogram("latency_seconds", {"route": "/health"}).quantile(0.5) == pytest.approx(0.25, rel=0.02)
+        assert 'latency_seconds_count{route="/health"} 1' in text
+
+
+class TestUsageMetrics:
+    """Tests for provider usage accounting."""
+
+    def test_track_call_and_cost(self):
+        """Test latency, status and cost are recorded per provider/module/endpoint."""
+        from src.core.metrics import get_metrics
+        from src.services import usage_metrics
+
+        labels = {"provider": "openai", "module": "health", "endpoint": "test.call"}
+        metrics = get_metrics()
+        before = metrics.get_counter(usage_metrics.COST_TOTAL, labels)
+
+        with usage_metrics.track_call("openai", "test.call", "health") as call:
+            call.response_bytes = 2048
+
+        with pytest.raises(RuntimeError):
+            with usage_metrics.track_call("openai", "test.call", "health"):
+                raise RuntimeError("boom")
+
+        usage_metrics.record_tokens("openai", "test.call", "health", "gpt-4o-mini", 1_000_000, 0)
+
+        assert metrics.get_counter(usage_metrics.REQUESTS_TOTAL, {**labels, "status": "ok"}) == 1
+        assert metrics.get_counter(usage_metrics.REQUESTS_TOTAL, {**labels, "status": "error"}) == 1
+        assert metrics.get_histogram(usage_metrics.LATENCY, labels).count == 2
+        assert metrics.get_counter(usage_metrics.COST_TOTAL, labels) - before == pytest.approx(0.15)
+
+    def test_module_label_bounded(self):
+        """Test unknown modules collapse into one label."""
+        from src.services.usage_metrics import module_label
+
+        assert module_label("economia") == "economia"
+        assert module_label("anything-from-the-client") == "other"
+        assert module_label(None) == "default"
+
+    def test_metrics_endpoint(self):
+        """Test /metrics serves Prometheus text."""
+        from src.services.usage_metrics import record_characters
+
+        record_characters("elevenlabs", "tts.timestamps", "home", "eleven_turbo_v2_5", 120)
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'iconsai_tts_characters_total{endpoint="tts.timestamps",module="home",provider="elevenlabs"}' in response.text
+
+
+class TestHttpMetrics:
+    """Tests for the ASGI timing middleware."""
+
+    def test_route_stats(self):
+        """Test requests are aggregated per method and route template."""
+        from src.core.http_metrics import get_http_metrics
+
+        http_metrics = get_http_metrics()
+        client.get("/health")
+        client.get("/health")
+        client.get("/does-not-exist")
+
+        stats = http_metrics.routes[("GET", "/health")]
+        assert stats.statuses[200] >= 2
+        assert stats.latency.count >= 2
+        assert stats.response_bytes > 0
+        assert http_metrics.routes[("GET", "unmatched")].statuses[404] >= 1
+        assert http_metrics.in_flight == 0
+
+    def test_request_bytes(self):
+        """Test request body bytes are counted."""
+        from src.core.http_metrics import get_http_metrics
+
+        client.post("/functions/v1/sync", json={"sessionId": "metrics-test", "clientSendTime": 1})
+
+        assert get_http_metrics().routes[("POST", "/functions/v1/sync")].request_bytes > 0
+
+    def test_metrics_exposes_http_and_gauges(self):
+        """Test /metrics includes HTTP stats and session gauges."""
+        client.get("/health")
+        text = client.get("/metrics").text
+
+        assert 'iconsai_http_requests_total{method="GET",route="/health",status="200"}' in text
+        assert 'iconsai_http_request_duration_seconds_count{method="GET",route="/health"}' in text
+        assert "iconsai_http_requests_in_flight" in text
+        assert "iconsai_sessions_active " in text
+        assert "iconsai_sync_sessions_active " in text
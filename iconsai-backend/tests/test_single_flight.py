@@ -0,0 +1,215 @@
+"""
+Tests for single-flight coalescing of in-flight requests.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from src.core.single_flight import ClientDisconnected, SingleFlight, request_key, run_until_disconnected
+
+
+class FakeRequest:
+    """Request whose client disconnects after a number of checks."""
+
+    def __init__(self, connected_checks: int = 10 ** 6):
+        self.checks = connected_checks
+
+    async def is_disconnected(self) -> bool:
+        self.checks -= 1
+        return self.checks < 0
+
+
+class TestSingleFlight:
+    """Tests for SingleFlight."""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Callers with the same key get the leader's result."""
+        calls = []
+
+        async def work(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return value
+
+        async def scenario():
+            flights = SingleFlight("test")
+            results = await asyncio.gather(
+                flights.run("a", lambda: work(1)),
+                flights.run("a", lambda: work(2)),
+                flights.run("b", lambda: work(3)),
+            )
+            assert len(flights) == 0
+            return results
+
+        assert asyncio.run(scenario()) == [1, 1, 3]
+        assert calls == [1, 3]
+
+    def test_exception_fans_out(self):
+        """Every waiter sees the shared call's exception."""
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("Texto é obrigatório")
+
+        async def scenario():
+            flights = SingleFlight("test")
+            return await asyncio.gather(
+                flights.run("a", fail), flights.run("a", fail), return_exceptions=True
+            )
+
+        results = asyncio.run(scenario())
+        assert all(isinstance(r, ValueError) for r in results)
+
+    def test_not_cached_after_completion(self):
+        """A call after the previous one finished runs again."""
+        calls = []
+
+        async def work():
+            calls.append(1)
+            return len(calls)
+
+        async def scenario():
+            flights = SingleFlight("test")
+            return [await flights.run("a", work), await flights.run("a", work)]
+
+        assert asyncio.run(scenario()) == [1, 2]
+
+    def test_one_waiter_leaving_keeps_call(self):
+        """Cancelling one caller does not cancel the shared call."""
+        async def scenario():
+            flights = SingleFlight("test")
+            started = asyncio.Event()
+
+            async def work():
+                started.set()
+                await asyncio.sleep(0.05)
+                return "ok"
+
+            first = asyncio.ensure_future(flights.run("a", work))
+            await started.wait()
+            second = asyncio.ensure_future(flights.run("a", work))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(scenario()) == "ok"
+
+    def test_last_waiter_leaving_cancels_call(self):
+        """When every caller is gone the upstream call is cancelled."""
+        async def scenario():
+            flights = SingleFlight("test")
+            cancelled = asyncio.Event()
+
+            async def work():
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+
+            waiter = asyncio.ensure_future(flights.run("a", work))
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            await asyncio.wait_for(cancelled.wait(), 1)
+            assert len(flights) == 0
+
+        asyncio.run(scenario())
+
+    def test_request_key(self):
+        """Keys ignore dict order and differ by content."""
+        assert request_key("tts", {"a": 1, "b": 2}) == request_key("tts", {"b": 2, "a": 1})
+        assert request_key("tts", {"a": 1}) != request_key("tts", {"a": 2})
+
+
+class TestRunUntilDisconnected:
+    """Tests for cancelling work when the client goes away."""
+
+    def test_result(self):
+        """The result is returned while the client is connected."""
+        async def work():
+            await asyncio.sleep(0.01)
+            return 42
+
+        assert asyncio.run(run_until_disconnected(FakeRequest(), work(), poll_interval=0.005)) == 42
+
+    def test_disconnect_cancels(self):
+        """A disconnect cancels the work and raises ClientDisconnected."""
+        async def scenario():
+            cancelled = asyncio.Event()
+
+            async def work():
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+
+            with pytest.raises(ClientDisconnected):
+                await run_until_disconnected(FakeRequest(connected_checks=1), work(), poll_interval=0.005)
+            await asyncio.wait_for(cancelled.wait(), 1)
+
+        asyncio.run(scenario())
+
+
+class TestCoalescedEndpoints:
+    """Tests for coalescing in the TTS and STT endpoints."""
+
+    def test_duplicate_tts_requests_one_synthesis(self):
+        """A double-tap on the same text synthesizes once."""
+        from src.main import app
+
+        async def synthesize(**kwargs):
+            await asyncio.sleep(0.05)
+            return MagicMock(to_dict=lambda: {"audioBase64": "dGVzdA==", "text": kwargs["text"]})
+
+        service = MagicMock()
+        service.synthesize_simple = AsyncMock(side_effect=synthesize)
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                body = {"text": "Olá", "chatType": "home"}
+                return await asyncio.gather(
+                    client.post("/functions/v1/text-to-speech", json=body),
+                    client.post("/functions/v1/text-to-speech", json=body),
+                )
+
+        with patch("src.api.text_to_speech.ElevenLabsTTSService", return_value=service), \
+                patch("src.api.text_to_speech.get_settings") as settings:
+            settings.return_value.has_elevenlabs.return_value = True
+            settings.return_value.coalesce_requests = True
+            responses = asyncio.run(scenario())
+
+        assert [r.status_code for r in responses] == [200, 200]
+        assert responses[0].json() == responses[1].json()
+        assert service.synthesize_simple.await_count == 1
+
+    def test_duplicate_uploads_one_transcription(self):
+        """The same recording uploaded twice at once is transcribed once."""
+        from src.main import app
+        from src.services.whisper_stt import TranscriptionResult
+
+        async def transcribe(**kwargs):
+            assert not kwargs["audio_file"].closed
+            await asyncio.sleep(0.05)
+            return TranscriptionResult(text="Olá")
+
+        audio = b"\x1a\x45\xdf\xa3" + b"\x00" * 2000
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                headers = {"Content-Type": "audio/webm"}
+                return await asyncio.gather(
+                    client.post("/functions/v1/voice-to-text", content=audio, headers=headers),
+                    client.post("/functions/v1/voice-to-text", content=audio, headers=headers),
+                )
+
+        with patch("src.api.voice_to_text.WhisperSTTService") as service_class:
+            service_class.return_value.transcribe_with_fallback = AsyncMock(side_effect=transcribe)
+            responses = asyncio.run(scenario())
+
+        assert [r.json()["text"] for r in responses] == ["Olá", "Olá"]
+        assert service_class.return_value.transcribe_with_fallback.await_count == 1
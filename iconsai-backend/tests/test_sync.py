@@ -4,8 +4,11 @@ Tests for sync coordinator and session manager.
 
 import time
 import pytest
+from src.core.expiry_heap import ExpiryHeap
 from src.core.sync_coordinator import SyncCoordinator, SyncState
 from src.core.session_manager import SessionManager
+from src.core.session_store import InMemorySessionStore, RedisSessionStore, Session
+from src.core.session_sweeper import SessionSweeper
 
 
 class TestSyncCoordinator:
@@ -71,6 +74,71 @@ class TestSyncCoordinator:
         assert cleaned == 1
         assert "test-session" not in coordinator.sessions
 
+    def test_expire_idle_sessions(self):
+        """Test heap-based eviction of idle sessions."""
+        coordinator = SyncCoordinator()
+        coordinator.get_or_create_session("test-session")
+
+        assert coordinator.expire_idle_sessions(max_age_seconds=3600) == 0
+        assert coordinator.expire_idle_sessions(max_age_seconds=-1) == 1
+        assert "test-session" not in coordinator.sessions
+
+
+class TestExpiryHeap:
+    """Tests for the expiry heap."""
+
+    def test_pop_stale(self):
+        """Test stale, refreshed and removed keys."""
+        heap = ExpiryHeap()
+        last_activity = {"a": 10.0, "b": 20.0, "c": 30.0}
+        for key, ts in last_activity.items():
+            heap.schedule(key, ts)
+
+        last_activity["a"] = 50.0  # Active since scheduled
+        del last_activity["b"]  # Removed elsewhere
+
+        stale = heap.pop_stale(40.0, last_activity.get)
+
+        assert stale == ["c"]
+        assert "a" in heap
+        assert "b" not in heap
+        assert len(heap) == 1
+
+    def test_schedule_once(self):
+        """Test a key is tracked at most once."""
+        heap = ExpiryHeap()
+        heap.schedule("a", 1.0)
+        heap.schedule("a", 2.0)
+
+        assert len(heap) == 1
+
+
+class TestSessionSweeper:
+    """Tests for the background session sweeper."""
+
+    def test_sweep_counters(self):
+        """Test a sweep evicts idle sessions and updates counters."""
+        manager = SessionManager()
+        coordinator = SyncCoordinator()
+        manager.get_or_create_session("device-123")
+        coordinator.get_or_create_session("sync-123")
+
+        sweeper = SessionSweeper(
+            manager,
+            coordinator,
+            session_ttl_seconds=-1,
+            sync_session_ttl_seconds=-1,
+        )
+
+        assert sweeper.sweep() == 2
+
+        stats = sweeper.stats()
+        assert stats["sweeps"] == 1
+        assert stats["sessionsEvicted"] == 1
+        assert stats["syncSessionsEvicted"] == 1
+        assert stats["activeSessions"] == 0
+        assert stats["activeSyncSessions"] == 0
+
 
 class TestSessionManager:
     """Tests for session manager."""
@@ -162,3 +230,128 @@ class TestSessionManager:
         _, _, history = manager.get_recent_history("device-123", module_slug="health")
 
         assert len(history) == 2
+
+    def test_module_history_is_capped(self):
+        """Test per-module ring buffers keep only the latest messages."""
+        manager = SessionManager(store=InMemorySessionStore(max_messages=3))
+        session = manager.get_or_create_session("device-123")
+
+        for i in range(5):
+            manager.save_message(session.session_id, "user", f"Health {i}", "health")
+        manager.save_message(session.session_id, "user", "World 0", "world")
+
+        _, _, history = manager.get_recent_history("device-123", limit=10, module_slug="health")
+
+        assert [m["content"] for m in history] == ["Health 2", "Health 3", "Health 4"]
+        assert len(session.messages) == 3
+
+    def test_memory_budget_evicts_idle_sessions(self):
+        """Test least recently active sessions are evicted over budget."""
+        store = InMemorySessionStore(max_bytes=1000)
+        manager = SessionManager(store=store)
+
+        idle = manager.get_or_create_session("device-idle")
+        manager.save_message(idle.session_id, "user", "x" * 300)
+
+        active = manager.get_or_create_session("device-active")
+        manager.save_message(active.session_id, "user", "y" * 300)
+        manager.save_message(active.session_id, "user", "z" * 300)
+
+        assert idle.session_id not in store.sessions
+        assert active.session_id in store.sessions
+        assert store.evictions == 1
+        assert store.total_bytes <= 1000
+
+
+class TestRedisSessionStore:
+    """Tests for the Redis session store (against fakeredis)."""
+
+    @pytest.fixture
+    def manager(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        client = fakeredis.FakeRedis(decode_responses=True)
+        store = RedisSessionStore(client=client, ttl_seconds=60, max_messages=3)
+        return SessionManager(store=store)
+
+    def test_shared_between_managers(self, manager):
+        """Test two managers (workers) on one Redis see the same history."""
+        other = SessionManager(store=manager.store)
+
+        session = manager.get_or_create_session("device-123")
+        manager.save_message(session.session_id, "user", "Olá")
+
+        session_id, _, history = other.get_recent_history("device-123")
+
+        assert session_id == session.session_id
+        assert history == [{"role": "user", "content": "Olá"}]
+
+    def test_capped_history(self, manager):
+        """Test message lists are trimmed to max_messages."""
+        session = manager.get_or_create_session("device-123")
+
+        for i in range(5):
+            manager.save_message(session.session_id, "user", f"Msg {i}")
+
+        _, _, history = manager.get_recent_history("device-123")
+
+        assert [m["content"] for m in history] == ["Msg 2", "Msg 3", "Msg 4"]
+
+    def test_filter_by_module(self, manager):
+        """Test per-module history lists."""
+        session = manager.get_or_create_session("device-123")
+
+        manager.save_message(session.session_id, "user", "Msg 1", "health")
+        manager.save_message(session.session_id, "user", "Msg 2", "world")
+        manager.save_message(session.session_id, "user", "Msg 3", "health")
+
+        _, _, history = manager.get_recent_history("device-123", module_slug="health")
+
+        assert [m["content"] for m in history] == ["Msg 1", "Msg 3"]
+
+    def test_user_name_and_ttl(self, manager):
+        """Test user name persistence and key expiry."""
+        session = manager.get_or_create_session("device-123")
+        manager.detect_and_save_name(session.session_id, "Me chamo João", None)
+
+        _, user_name, _ = manager.get_recent_history("device-123")
+        assert user_name == "João"
+
+        client = manager.store.client
+        assert 0 < client.ttl("iconsai:device:device-123") <= 60
+        assert 0 < client.ttl(f"iconsai:session:{session.session_id}") <= 60
+
+
+    def test_concurrent_create_binds_one_session(self, manager):
+        """Test a worker losing the create race gets the winner's session."""
+        store = manager.store
+        first = store.create_session(Session(session_id="s1", device_id="device-123"))
+        second = store.create_session(Session(session_id="s2", device_id="device-123"))
+
+        assert first.session_id == second.session_id == "s1"
+        assert not store.client.exists("iconsai:session:s2")
+        assert store.count() == 1
+
+    def test_touch_refreshes_module_lists(self, manager):
+        """Test per-module history lives as long as the session."""
+        session = manager.get_or_create_session("device-123")
+        manager.save_message(session.session_id, "user", "Msg 1", "health")
+
+        client = manager.store.client
+        module_key = f"iconsai:session:{session.session_id}:messages:health"
+        client.expire(module_key, 5)
+        manager.get_or_create_session("device-123")
+
+        assert client.ttl(module_key) > 5
+
+    def test_count_uses_activity_index(self, manager):
+        """Test the session count comes from the index and drops expired sessions."""
+        manager.get_or_create_session("device-1")
+        manager.get_or_create_session("device-2")
+        assert manager.session_count() == 2
+
+        store = manager.store
+        store.client.zadd("iconsai:sessions", {"gone": time.time() - 120})
+        assert manager.session_count() == 2
+
+        assert manager.expire_idle_sessions(60) == 1
+        assert store.client.zcard("iconsai:sessions") == 2
@@ -166,3 +166,49 @@ class TestTimestampUtils:
         # Should shift by 0.1 seconds
         assert adjusted[0].start == pytest.approx(0.4)
         assert adjusted[0].end == pytest.approx(0.7)
+
+    def test_merge_adjacent_words(self):
+        """Test small gaps are closed by extending the previous word."""
+        from src.services.timestamp_utils import WordTimestamp, merge_adjacent_words
+
+        words = [
+            WordTimestamp(word="Olá", start=0.0, end=0.3),
+            WordTimestamp(word="mundo", start=0.35, end=0.8),
+            WordTimestamp(word="hoje", start=1.5, end=1.9),
+        ]
+
+        merged = merge_adjacent_words(words, max_gap=0.1)
+
+        assert merged[0].end == pytest.approx(0.35)
+        assert merged[1].end == pytest.approx(0.8)  # Gap too large
+        assert merged[2].end == pytest.approx(1.9)
+
+    def test_word_track_to_list(self):
+        """Test WordTrack serializes to the JSON word list."""
+        from src.services.timestamp_utils import WordTrack
+
+        track = WordTrack(["Olá", "mundo"], [0.05, 0.4], [0.3, 0.8])
+
+        assert track.to_list() == [
+            {"word": "Olá", "start": 0.05, "end": 0.3},
+            {"word": "mundo", "start": 0.4, "end": 0.8},
+        ]
+        assert track.shift(0.1).to_list()[0]["start"] == 0.0
+        assert track.duration == 0.8
+        assert WordTrack(["fim"], [1.2], [1.855]).duration == 1.855
+
+    def test_chars_to_words_vectorized_matches_loop(self):
+        """Test vectorized conversion matches the per-character loop."""
+        from src.services.timestamp_utils import _chars_to_words_loop, chars_to_words
+
+        text = "Olá, mundo! O IPCA subiu; a Selic caiu.\nE agora? " * 20
+        characters = list(text)
+        starts = [i * 0.05 for i in range(len(characters))]
+        ends = [s + 0.04 for s in starts]
+
+        expected = _chars_to_words_loop(text, characters, starts, ends)
+        actual = chars_to_words(text, characters, starts, ends)
+
+        assert actual.words == expected.words
+        assert actual.to_list() == expected.to_list()
+
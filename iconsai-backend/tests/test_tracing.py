@@ -0,0 +1,151 @@
+"""
+Tests for request tracing.
+"""
+
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.core.tracing import (
+    NOOP_SPAN,
+    FileSpanExporter,
+    Tracer,
+    TracingMiddleware,
+    parse_traceparent,
+    trace_span,
+)
+
+CLIENT_TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+CLIENT_SPAN_ID = "00f067aa0ba902b7"
+
+
+class MemoryExporter:
+    """Collects exported payloads."""
+
+    def __init__(self):
+        self.payloads = []
+
+    def submit(self, payload):
+        self.payloads.append(payload)
+
+    def spans(self):
+        return [
+            span
+            for payload in self.payloads
+            for span in payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        ]
+
+
+class TestTraceparent:
+    """Tests for W3C traceparent parsing."""
+
+    def test_parse(self):
+        """Test valid and invalid headers."""
+        assert parse_traceparent(f"00-{CLIENT_TRACE_ID}-{CLIENT_SPAN_ID}-01") == (CLIENT_TRACE_ID, CLIENT_SPAN_ID, True)
+        assert parse_traceparent(f"00-{CLIENT_TRACE_ID}-{CLIENT_SPAN_ID}-00")[2] is False
+        assert parse_traceparent("00-" + "0" * 32 + f"-{CLIENT_SPAN_ID}-01") is None
+        assert parse_traceparent("garbage") is None
+        assert parse_traceparent(None) is None
+
+
+class TestTracer:
+    """Tests for span creation and sampling."""
+
+    def test_unsampled_is_noop(self):
+        """Test unsampled requests create no spans."""
+        exporter = MemoryExporter()
+        tracer = Tracer(exporter=exporter, sample_rate=0.0)
+
+        with tracer.start_trace("GET /health") as root:
+            with tracer.span("stage") as span:
+                assert span is NOOP_SPAN
+        assert root is NOOP_SPAN
+        assert exporter.payloads == []
+
+    def test_follows_client_trace(self):
+        """Test a sampled client traceparent is continued with nested spans."""
+        exporter = MemoryExporter()
+        tracer = Tracer(exporter=exporter, sample_rate=0.0)
+
+        with tracer.start_trace("POST /x", f"00-{CLIENT_TRACE_ID}-{CLIENT_SPAN_ID}-01"):
+            with tracer.span("audio.decode_base64", bytes=10):
+                with tracer.span("inner"):
+                    pass
+
+        spans = {span["name"]: span for span in exporter.spans()}
+
+        assert {span["traceId"] for span in spans.values()} == {CLIENT_TRACE_ID}
+        assert spans["POST /x"]["parentSpanId"] == CLIENT_SPAN_ID
+        assert spans["audio.decode_base64"]["parentSpanId"] == spans["POST /x"]["spanId"]
+        assert spans["inner"]["parentSpanId"] == spans["audio.decode_base64"]["spanId"]
+        assert spans["audio.decode_base64"]["attributes"] == [{"key": "bytes", "value": {"intValue": "10"}}]
+
+    def test_error_status(self):
+        """Test exceptions mark the span as failed."""
+        exporter = MemoryExporter()
+        tracer = Tracer(exporter=exporter, sample_rate=1.0)
+
+        try:
+            with tracer.start_trace("root"):
+                with tracer.span("failing"):
+                    raise ValueError("boom")
+        except ValueError:
+            pass
+
+        spans = {span["name"]: span for span in exporter.spans()}
+        assert spans["failing"]["status"] == {"code": 2, "message": "ValueError"}
+
+    def test_span_cap(self):
+        """Test long traces keep at most max_spans_per_trace children."""
+        exporter = MemoryExporter()
+        tracer = Tracer(exporter=exporter, sample_rate=1.0, max_spans_per_trace=5)
+
+        with tracer.start_trace("WS /realtime"):
+            for _ in range(20):
+                with tracer.span("ws.transcribe"):
+                    pass
+
+        assert len(exporter.spans()) == 6
+
+    def test_file_exporter(self, tmp_path):
+        """Test traces are appended as OTLP/JSON lines."""
+        path = tmp_path / "traces.jsonl"
+        exporter = FileSpanExporter(str(path))
+        tracer = Tracer(exporter=exporter, sample_rate=1.0)
+
+        for _ in range(2):
+            with tracer.start_trace("root"):
+                pass
+        exporter.flush()
+
+        lines = path.read_text().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"][0]["name"] == "root"
+
+
+class TestTracingMiddleware:
+    """Tests for the root span middleware."""
+
+    def test_route_span_and_header(self):
+        """Test the root span is named by route and echoed to the client."""
+        exporter = MemoryExporter()
+        tracer = Tracer(exporter=exporter, sample_rate=0.0)
+
+        app = FastAPI()
+        app.add_middleware(TracingMiddleware, tracer=tracer)
+
+        @app.get("/items/{item_id}")
+        async def item(item_id: str):
+            with trace_span("lookup"):
+                return {"id": item_id}
+
+        client = TestClient(app)
+
+        response = client.get("/items/1", headers={"traceparent": f"00-{CLIENT_TRACE_ID}-{CLIENT_SPAN_ID}-01"})
+        unsampled = client.get("/items/2")
+
+        spans = {span["name"]: span for span in exporter.spans()}
+        assert set(spans) == {"GET /items/{item_id}", "lookup"}
+        assert response.headers["traceparent"].startswith(f"00-{CLIENT_TRACE_ID}-")
+        assert "traceparent" not in unsampled.headers
@@ -73,15 +73,12 @@ class TestVoiceToText:
     @patch("src.api.voice_to_text.WhisperSTTService")
     def test_transcription_with_timestamps(self, mock_service_class):
         """Test transcription with word timestamps."""
-        from src.services.timestamp_utils import WordTimestamp
+        from src.services.timestamp_utils import WordTrack
 
         mock_service = AsyncMock()
         mock_service.transcribe_with_fallback.return_value = AsyncMock(
             text="Olá mundo",
-            words=[
-                WordTimestamp(word="Olá", start=0.0, end=0.3),
-                WordTimestamp(word="mundo", start=0.4, end=0.8),
-            ],
+            words=WordTrack(["Olá", "mundo"], [0.0, 0.4], [0.3, 0.8]),
             duration=1.0
         )
         mock_service_class.return_value = mock_service
@@ -134,3 +131,343 @@ class TestAudioUtils:
         data = "SGVsbG8="
         result = decode_base64_audio(data)
         assert result == b"Hello"
+
+
+class TestStreamingUpload:
+    """Tests for streamed voice-to-text uploads."""
+
+    AUDIO = b"\x1a\x45\xdf\xa3" + bytes(range(256)) * 8
+
+    def _mock_transcription(self, mock_service_class) -> dict:
+        """Patch the STT service; returns the arguments it receives (audio read from the spool)."""
+        received = {}
+
+        async def transcribe(audio_file, **kwargs):
+            audio_file.seek(0)
+            received.update(kwargs, audio=audio_file.read())
+            return AsyncMock(text="Olá", words=None, duration=1.0)
+
+        mock_service = AsyncMock()
+        mock_service.transcribe_with_fallback.side_effect = transcribe
+        mock_service_class.return_value = mock_service
+        return received
+
+    def _spool_json(self, body: bytes, step: int):
+        from src.utils.upload import AudioUpload, JsonAudioBodyParser
+
+        upload = AudioUpload(max_size=1024 * 1024)
+        parser = JsonAudioBodyParser(upload)
+        for i in range(0, len(body), step):
+            parser.feed(body[i:i + step])
+        return upload, parser.finish()
+
+    def test_json_body_split_anywhere(self):
+        """Audio and fields survive any chunking of the JSON body."""
+        encoded = base64.b64encode(self.AUDIO).decode()
+        body = (
+            '{"mimeType": "audio/webm", "audio": "data:audio/webm;base64,'
+            + encoded.replace("/", "\\/") + '", "includeWordTimestamps": true}'
+        ).encode()
+
+        for step in (1, 3, 7, 64, len(body)):
+            upload, fields = self._spool_json(body, step)
+            assert upload.read() == self.AUDIO
+            assert upload.head == self.AUDIO[:64]
+            assert fields == {"mimeType": "audio/webm", "audio": "", "includeWordTimestamps": True}
+
+    def test_nested_audio_key_is_not_decoded(self):
+        """Only the top-level audio field is streamed into the upload."""
+        upload, fields = self._spool_json(b'{"meta": {"audio": "abcd"}}', 5)
+        assert upload.size == 0
+        assert fields == {"meta": {"audio": "abcd"}}
+
+    def test_invalid_json_is_422(self):
+        """Malformed JSON is reported like FastAPI body validation."""
+        response = client.post(
+            "/functions/v1/voice-to-text",
+            content=b'{"audio": "abc',
+            headers={"Content-Type": "application/json"},
+        )
+        assert response.status_code == 422
+
+    @patch("src.api.voice_to_text.WhisperSTTService")
+    def test_multipart_upload(self, mock_service_class):
+        """Audio can be sent as a multipart file part."""
+        received = self._mock_transcription(mock_service_class)
+
+        response = client.post(
+            "/functions/v1/voice-to-text",
+            files={"audio": ("fala.webm", self.AUDIO, "audio/webm")},
+            data={"language": "en"},
+        )
+
+        assert response.status_code == 200
+        assert received["audio"] == self.AUDIO
+        assert received["mime_type"] == "audio/webm"
+        assert received["language"] == "en"
+
+    @patch("src.api.voice_to_text.WhisperSTTService")
+    def test_raw_upload(self, mock_service_class):
+        """Audio can be sent as the raw body with options in the query."""
+        received = self._mock_transcription(mock_service_class)
+
+        response = client.post(
+            "/functions/v1/voice-to-text?includeWordTimestamps=true",
+            content=self.AUDIO,
+            headers={"Content-Type": "audio/webm"},
+        )
+
+        assert response.status_code == 200
+        assert received["audio"] == self.AUDIO
+        assert received["include_word_timestamps"] is True
+
+    def test_upload_too_large(self):
+        """Uploads above AUDIO_UPLOAD_MAX_MB are rejected with 413."""
+        from src.config import get_settings
+
+        with patch.object(get_settings(), "audio_upload_max_mb", 1):
+            response = client.post(
+                "/functions/v1/voice-to-text",
+                content=b"\x1a\x45\xdf\xa3" + b"\x00" * (1024 * 1024),
+                headers={"Content-Type": "audio/webm"},
+            )
+
+        assert response.status_code == 413
+        assert "muito grande" in response.json()["detail"]["error"].lower()
+
+    def test_chunked_multipart_too_large(self):
+        """A multipart body without Content-Length is refused once it crosses the limit."""
+        import asyncio
+
+        import httpx
+
+        from src.config import get_settings
+
+        boundary = "limite"
+        head = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"audio\"; filename=\"fala.webm\"\r\n"
+            "Content-Type: audio/webm\r\n\r\n"
+        ).encode()
+        sent = []
+
+        async def body():
+            yield head + b"\x1a\x45\xdf\xa3"
+            for _ in range(64):
+                sent.append(1)
+                yield b"\x00" * (64 * 1024)
+            yield f"\r\n--{boundary}--\r\n".encode()
+
+        async def post():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return await http.post(
+                    "/functions/v1/voice-to-text",
+                    content=body(),
+                    headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+                )
+
+        with patch.object(get_settings(), "audio_upload_max_mb", 1):
+            response = asyncio.run(post())
+
+        assert response.status_code == 413
+        assert len(sent) < 64
+
+
+class TestWhisperStreamingUpload:
+    """Tests for the streamed multipart upload to Whisper."""
+
+    AUDIO = bytes(range(256)) * 300
+
+    async def _collect(self, stream) -> bytes:
+        return b"".join([chunk async for chunk in stream])
+
+    def test_multipart_body_round_trip(self):
+        """The streamed body parses back to the fields and the file."""
+        import asyncio
+        import email
+        import io
+
+        from src.utils.multipart import MultipartFileStream
+
+        stream = MultipartFileStream(
+            {"model": "whisper-1", "timestamp_granularities[]": "word"},
+            "file", "audio.webm", io.BytesIO(self.AUDIO), "audio/webm", chunk_size=4096,
+        )
+        body = asyncio.run(self._collect(stream))
+        assert len(body) == stream.content_length
+
+        message = email.message_from_bytes(
+            f"Content-Type: {stream.headers['Content-Type']}\r\n\r\n".encode() + body
+        )
+        parts = {part.get_param("name", header="content-disposition"): part for part in message.get_payload()}
+        assert parts["model"].get_payload() == "whisper-1"
+        assert parts["timestamp_granularities[]"].get_payload() == "word"
+        assert parts["file"].get_filename() == "audio.webm"
+        assert parts["file"].get_payload(decode=True) == self.AUDIO
+
+        # A second pass (retry) replays the same body
+        assert asyncio.run(self._collect(stream)) == body
+
+    def test_single_upstream_call(self):
+        """A failing upload is not retried under other format labels."""
+        import asyncio
+        import io
+        import wave
+
+        import httpx
+
+        from src.services.whisper_stt import WhisperSTTService
+
+        wav = io.BytesIO()
+        with wave.open(wav, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(16000)
+            w.writeframes(self.AUDIO)
+
+        sent = []
+
+        async def fake_post(client, provider, endpoint, module, url, headers, content):
+            body = await self._collect(content)
+            assert len(body) == int(headers["Content-Length"])
+            sent.append(body)
+            return httpx.Response(500, request=httpx.Request("POST", url))
+
+        with patch("src.services.whisper_stt.tracked_post", side_effect=fake_post):
+            service = WhisperSTTService(api_key="test")
+            with pytest.raises(httpx.HTTPStatusError):
+                asyncio.run(service.transcribe_with_fallback(audio_file=wav, mime_type="audio/webm"))
+
+        assert len(sent) == 1
+        assert b'filename="audio.wav"' in sent[0]
+        assert wav.getvalue() in sent[0]
+
+    def test_audio_seconds_without_verbose_json(self):
+        """Plain json responses carry no duration; the probed one is metered."""
+        import asyncio
+        import io
+        import wave
+
+        import httpx
+
+        from src.core.metrics import get_metrics
+        from src.services import usage_metrics
+        from src.services.whisper_stt import WhisperSTTService
+
+        wav = io.BytesIO()
+        with wave.open(wav, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(16000)
+            w.writeframes(b"\x00\x00" * 32000)
+        wav.seek(0)
+
+        async def fake_post(client, provider, endpoint, module, url, headers, content):
+            return httpx.Response(200, json={"text": "Olá"}, request=httpx.Request("POST", url))
+
+        labels = {"provider": "openai", "module": "default", "endpoint": "stt.transcribe"}
+        before = get_metrics().get_counter(usage_metrics.STT_AUDIO_SECONDS_TOTAL, labels)
+
+        with patch("src.services.whisper_stt.tracked_post", side_effect=fake_post):
+            service = WhisperSTTService(api_key="test")
+            service.settings = service.settings.model_copy(update={"stt_backend": "api"})
+            result = asyncio.run(service.transcribe_with_fallback(audio_file=wav, mime_type="audio/wav"))
+
+        assert result.text == "Olá"
+        assert get_metrics().get_counter(usage_metrics.STT_AUDIO_SECONDS_TOTAL, labels) - before == pytest.approx(2.0)
+
+
+class TestLocalSTTRouting:
+    """Tests for routing voice-to-text between the local model and the API."""
+
+    def _wav(self, seconds: float) -> bytes:
+        import io
+        import wave
+
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(16000)
+            w.writeframes(b"\x00\x00" * int(16000 * seconds))
+        return buffer.getvalue()
+
+    def _service(self, backend: str, local_model):
+        from src.services.whisper_stt import WhisperSTTService
+
+        service = WhisperSTTService(api_key="test")
+        service.settings = service.settings.model_copy(update={"stt_backend": backend})
+        service._local_model = lambda: local_model
+        return service
+
+    def test_choose_backend(self):
+        """Duration, model readiness and queue load decide the backend."""
+        from src.services.whisper_stt import choose_stt_backend
+
+        assert choose_stt_backend("auto", 5, 30, model_ready=True, saturated=False) == "local"
+        assert choose_stt_backend("auto", 45, 30, model_ready=True, saturated=False) == "api"
+        assert choose_stt_backend("auto", 5, 30, model_ready=False, saturated=False) == "api"
+        assert choose_stt_backend("auto", 5, 30, model_ready=True, saturated=True) == "api"
+        assert choose_stt_backend("local", 45, 30, model_ready=False, saturated=True) == "local"
+        assert choose_stt_backend("api", 1, 30, model_ready=True, saturated=False) == "api"
+
+    def test_pool_refuses_when_saturated(self):
+        """Optional jobs are refused once workers + queue are taken."""
+        import asyncio
+        import time
+
+        from src.services.realtime_stt import InferencePool, LocalSTTBusy
+
+        async def scenario():
+            pool = InferencePool(workers=1, max_queue=1)
+            jobs = [asyncio.create_task(pool.run(time.sleep, 0.05)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            assert pool.saturated
+            with pytest.raises(LocalSTTBusy):
+                await pool.run(time.sleep, 0, reject_when_full=True)
+            await asyncio.gather(*jobs)
+            assert pool.pending == 0
+
+        asyncio.run(scenario())
+
+    def test_short_clip_served_locally(self):
+        """A short clip is transcribed by the resident model without an API call."""
+        import asyncio
+        from unittest.mock import MagicMock
+
+        from src.services.realtime_stt import WordTiming
+
+        local = MagicMock()
+        local.is_initialized.return_value = True
+        local.transcribe_file = AsyncMock(return_value=("Olá mundo", [WordTiming("Olá", 0.0, 0.3), WordTiming("mundo", 0.4, 0.8)], 2.0))
+
+        with patch("src.services.whisper_stt.tracked_post") as post:
+            service = self._service("auto", local)
+            result = asyncio.run(service.transcribe_with_fallback(audio_bytes=self._wav(2), include_word_timestamps=True))
+
+        post.assert_not_called()
+        assert result.text == "Olá mundo"
+        assert result.words.to_list()[1]["word"] == "mundo"
+
+    def test_busy_local_falls_back_to_api(self):
+        """A full local queue sends the clip to the API."""
+        import asyncio
+        from unittest.mock import MagicMock
+
+        import httpx
+
+        from src.services.realtime_stt import LocalSTTBusy
+
+        local = MagicMock()
+        local.is_initialized.return_value = True
+        local.transcribe_file = AsyncMock(side_effect=LocalSTTBusy("full"))
+
+        async def fake_post(client, provider, endpoint, module, url, headers, content):
+            return httpx.Response(200, json={"text": "Olá"}, request=httpx.Request("POST", url))
+
+        with patch("src.services.whisper_stt.tracked_post", side_effect=fake_post) as post:
+            service = self._service("local", local)
+            result = asyncio.run(service.transcribe_with_fallback(audio_bytes=self._wav(2)))
+
+        assert result.text == "Olá"
+        assert post.call_count == 1